@@ -0,0 +1,16 @@
+_base_ = './EPCPE_6d_dab.py'
+
+# match the queries on their poses too, bottle, bowl and can are symmetric
+# around their y axis
+model = dict(
+    train_cfg=dict(
+        assigner=dict(
+            type='HungarianAssigner',
+            match_costs=[
+                dict(type='FocalLossCost', weight=2., eps=1e-8),
+                dict(type='BBoxL1Cost', weight=5.0, box_format='xywh'),
+                dict(type='IoUCost', iou_mode='giou', weight=2.0),
+                dict(type='RotationCost', sym_labels=(0, 1, 3), weight=1.0),
+                dict(type='TranslationCost', weight=2.0),
+                dict(type='Size3DCost', weight=1.0)
+            ])))
@@ -1,9 +1,9 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 from .det_inferencer import DetInferencer
 from .inference import (async_inference_detector, inference_detector,
-                        init_detector)
+                        init_detector, iter_inference_detector)
 
 __all__ = [
     'init_detector', 'async_inference_detector', 'inference_detector',
-    'DetInferencer'
+    'iter_inference_detector', 'DetInferencer'
 ]
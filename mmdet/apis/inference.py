@@ -1,8 +1,12 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import copy
+import os
 import warnings
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from itertools import chain, islice
 from pathlib import Path
-from typing import Optional, Sequence, Union
+from typing import Iterable, Iterator, Optional, Sequence, Union
 
 import numpy as np
 import torch
@@ -114,37 +118,71 @@ def init_detector(
 ImagesType = Union[str, np.ndarray, Sequence[str], Sequence[np.ndarray]]
 
 
-def inference_detector(
-    model: nn.Module,
-    imgs: ImagesType,
-    test_pipeline: Optional[Compose] = None
-) -> Union[DetDataSample, SampleList]:
-    """Inference image(s) with the detector.
+def _iter_batches(imgs: Iterable, batch_size: int) -> Iterator[list]:
+    imgs = iter(imgs)
+    batch = list(islice(imgs, batch_size))
+    while batch:
+        yield batch
+        batch = list(islice(imgs, batch_size))
+
+
+@contextmanager
+def _cpu_threads(model: nn.Module, num_workers: int):
+    """Leave a CPU to each pipeline worker when the model runs on CPU, so
+    that the intra-op threads of torch do not compete with them."""
+    if num_workers <= 0 or model.data_preprocessor.device.type != 'cpu':
+        yield
+        return
+    num_threads = torch.get_num_threads()
+    torch.set_num_threads(
+        max(1, min(num_threads, (os.cpu_count() or 1) - num_workers)))
+    try:
+        yield
+    finally:
+        torch.set_num_threads(num_threads)
+
+
+def iter_inference_detector(
+        model: nn.Module,
+        imgs: Iterable[Union[str, np.ndarray]],
+        test_pipeline: Optional[Compose] = None,
+        batch_size: int = 1,
+        num_workers: int = 0) -> Iterator[DetDataSample]:
+    """Inference a stream of images with the detector, in batches.
+
+    The images are grouped into batches of ``batch_size`` that go through
+    ``model.test_step`` at once. With ``num_workers`` > 0, the test pipeline
+    of the next batch runs in a thread pool while the model processes the
+    current batch, and on CPU the intra-op threads of torch are reduced by
+    ``num_workers``. The images of a batch are padded to the same size by
+    the data preprocessor of the model.
 
     Args:
         model (nn.Module): The loaded detector.
-        imgs (str, ndarray, Sequence[str/ndarray]):
-           Either image files or loaded images.
-        test_pipeline (:obj:`Compose`): Test pipeline.
-
-    Returns:
-        :obj:`DetDataSample` or list[:obj:`DetDataSample`]:
-        If imgs is a list or tuple, the same length list type results
-        will be returned, otherwise return the detection results directly.
+        imgs (Iterable[str/ndarray]): Image files or loaded images, e.g. a
+            generator of frames, all of the same kind.
+        test_pipeline (:obj:`Compose`, optional): Test pipeline. Defaults
+            to None, built from ``model.cfg``.
+        batch_size (int): Number of images per forward. Defaults to 1.
+        num_workers (int): Number of threads running the test pipeline.
+            Defaults to 0, the pipeline runs in the calling thread.
+
+    Yields:
+        :obj:`DetDataSample`: The result of each image, in order. The
+        ``pred_instances`` of the pose detectors also hold their ``rots``,
+        ``poses``, ``sizes`` and ``scales``.
     """
-
-    if isinstance(imgs, (list, tuple)):
-        is_batch = True
-    else:
-        imgs = [imgs]
-        is_batch = False
-
-    cfg = model.cfg
+    assert batch_size >= 1, f'batch_size must be positive, got {batch_size}'
+    imgs = iter(imgs)
+    first = next(imgs, None)
+    if first is None:
+        return
+    imgs = chain([first], imgs)
 
     if test_pipeline is None:
-        cfg = cfg.copy()
+        cfg = model.cfg.copy()
         test_pipeline = get_test_pipeline_cfg(cfg)
-        if isinstance(imgs[0], np.ndarray):
+        if isinstance(first, np.ndarray):
             # Calling this method across libraries will result
             # in module unregistered error if not prefixed with mmdet.
             test_pipeline[0].type = 'mmdet.LoadImageFromNDArray'
@@ -157,9 +195,7 @@ def inference_detector(
                 m, RoIPool
             ), 'CPU inference with RoIPool is not supported currently.'
 
-    result_list = []
-    for img in imgs:
-        # prepare data
+    def prepare(img):
         if isinstance(img, np.ndarray):
             # TODO: remove img_id.
             data_ = dict(img=img, img_id=0)
@@ -167,16 +203,78 @@ def inference_detector(
             # TODO: remove img_id.
             data_ = dict(img_path=img, img_id=0)
         # build the data pipeline
-        data_ = test_pipeline(data_)
+        return test_pipeline(data_)
+
+    batches = _iter_batches(imgs, batch_size)
+    with ExitStack() as stack:
+        stack.enter_context(_cpu_threads(model, num_workers))
+        if num_workers > 0:
+            executor = stack.enter_context(
+                ThreadPoolExecutor(
+                    num_workers, thread_name_prefix='inference_pipeline'))
+            pending = [executor.submit(prepare, img) for img in next(batches)]
+        else:
+            pending = next(batches)
+        while pending:
+            if num_workers > 0:
+                datas = [future.result() for future in pending]
+                # the next batch is prepared while the model runs
+                pending = [
+                    executor.submit(prepare, img)
+                    for img in next(batches, [])
+                ]
+            else:
+                datas = [prepare(img) for img in pending]
+                pending = next(batches, [])
+            data_ = dict(
+                inputs=[data['inputs'] for data in datas],
+                data_samples=[data['data_samples'] for data in datas])
+
+            # forward the model
+            with torch.no_grad():
+                results = model.test_step(data_)
+
+            yield from results
+
+
+def inference_detector(
+    model: nn.Module,
+    imgs: ImagesType,
+    test_pipeline: Optional[Compose] = None,
+    batch_size: int = 1,
+    num_workers: int = 0
+) -> Union[DetDataSample, SampleList]:
+    """Inference image(s) with the detector.
+
+    Args:
+        model (nn.Module): The loaded detector.
+        imgs (str, ndarray, Sequence[str/ndarray]):
+           Either image files or loaded images.
+        test_pipeline (:obj:`Compose`): Test pipeline.
+        batch_size (int): Number of images per forward, see
+            :func:`iter_inference_detector`. Defaults to 1.
+        num_workers (int): Number of threads running the test pipeline
+            while the model runs. Defaults to 0.
 
-        data_['inputs'] = [data_['inputs']]
-        data_['data_samples'] = [data_['data_samples']]
+    Returns:
+        :obj:`DetDataSample` or list[:obj:`DetDataSample`]:
+        If imgs is a list or tuple, the same length list type results
+        will be returned, otherwise return the detection results directly.
+    """
 
-        # forward the model
-        with torch.no_grad():
-            results = model.test_step(data_)[0]
+    if isinstance(imgs, (list, tuple)):
+        is_batch = True
+    else:
+        imgs = [imgs]
+        is_batch = False
 
-        result_list.append(results)
+    result_list = list(
+        iter_inference_detector(
+            model,
+            imgs,
+            test_pipeline=test_pipeline,
+            batch_size=batch_size,
+            num_workers=num_workers))
 
     if not is_batch:
         return result_list[0]
@@ -1,5 +1,5 @@
 # Copyright (c) OpenMMLab. All rights reserved.
-__author__= 'fanxiaofeng'
+__author__ = 'fanxiaofeng'
 import copy
 import os.path as osp
 from typing import List, Union
@@ -7,10 +7,11 @@ from typing import List, Union
 from mmdet.registry import DATASETS
 from .api_wrappers import COCO
 from .base_det_dataset import BaseDetDataset
+from .pose_ann_store import PoseAnnStoreMixin
 
 
 @DATASETS.register_module()
-class CocoDatasetNOCS3D(BaseDetDataset):
+class CocoDatasetNOCS3D(PoseAnnStoreMixin, BaseDetDataset):
     """Dataset for COCO."""
 
     METAINFO = {
@@ -50,6 +51,8 @@ class CocoDatasetNOCS3D(BaseDetDataset):
         Returns:
             List[dict]: A list of annotation.
         """  # noqa: E501
+        if self.ann_store:
+            return self.load_data_list_from_store()
         with self.file_client.get_local_path(self.ann_file) as local_path:
             self.coco = self.COCOAPI(local_path)
         # The order of returned `cat_ids` will not
@@ -0,0 +1,161 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import os
+import os.path as osp
+from typing import List, Sequence
+
+import numpy as np
+
+from mmdet.registry import DATASETS
+from .api_wrappers import COCO
+from .coco_nocs_3d import CocoDatasetNOCS3D
+from .pose_ann_store import PoseAnnStore, PoseAnnStoreMixin
+
+ANN_STORE_DIR = 'ann_store'
+SHARD_INDEX_FILE = 'shard_index.npz'
+
+
+def get_shard_file(pack_dir: str, shard_id: int) -> str:
+    """Path of the ``shard_id``-th shard of the packed dataset in
+    ``pack_dir``."""
+    return osp.join(pack_dir, f'shard-{shard_id:05d}.bin')
+
+
+def pack_pose_dataset(ann_file: str,
+                      img_root: str,
+                      pack_dir: str,
+                      shard_bytes: int = 1 << 30,
+                      extra_keys: Sequence[str] = ()) -> int:
+    """Pack the images and the pose annotations of a COCO style dataset
+    into large shards.
+
+    The encoded image files are concatenated in the order of the images of
+    ``ann_file`` into ``shard-xxxxx.bin`` files of about ``shard_bytes``,
+    ``shard_index.npz`` holds the shard, offset and length of each image and
+    the packed ``extra_keys``, the annotations are saved as a
+    :class:`PoseAnnStore` in ``ann_store``.
+
+    Args:
+        ann_file (str): Path of the annotation file.
+        img_root (str): Directory the ``file_name`` of the images are
+            relative to.
+        pack_dir (str): Output directory.
+        shard_bytes (int): Size above which a new shard is started.
+            Defaults to 1 GiB.
+        extra_keys (Sequence[str]): Additional annotation fields to store,
+            see :class:`PoseAnnStore`. Defaults to ().
+
+    Returns:
+        int: The number of shards.
+    """
+    store = PoseAnnStore.from_coco(COCO(ann_file), extra_keys)
+    os.makedirs(pack_dir, exist_ok=True)
+    shard_ids = np.zeros(len(store), dtype=np.int64)
+    offsets = np.zeros(len(store), dtype=np.int64)
+    lengths = np.zeros(len(store), dtype=np.int64)
+    shard_id, offset = 0, 0
+    shard = open(get_shard_file(pack_dir, shard_id), 'wb')
+    try:
+        for i, file_name in enumerate(store.file_names.tolist()):
+            with open(osp.join(img_root, file_name), 'rb') as f:
+                content = f.read()
+            if offset > 0 and offset + len(content) > shard_bytes:
+                shard.close()
+                shard_id, offset = shard_id + 1, 0
+                shard = open(get_shard_file(pack_dir, shard_id), 'wb')
+            shard.write(content)
+            shard_ids[i], offsets[i], lengths[i] = shard_id, offset, len(
+                content)
+            offset += len(content)
+    finally:
+        shard.close()
+    np.savez(
+        osp.join(pack_dir, SHARD_INDEX_FILE),
+        shard_ids=shard_ids,
+        offsets=offsets,
+        lengths=lengths,
+        extra_keys=np.array(store.extra_keys, dtype=str))
+    store.save(osp.join(pack_dir, ANN_STORE_DIR))
+    return shard_id + 1
+
+
+@DATASETS.register_module()
+class PackedPoseDataset(CocoDatasetNOCS3D):
+    """Pose dataset read from the shards written by
+    ``tools/dataset_converters/pack_pose_dataset.py``.
+
+    ``ann_file`` is the directory of the packed dataset. The annotations are
+    memory mapped from its :class:`PoseAnnStore` and the encoded images from
+    its shards, which are handed to the pipeline as ``img_bytes`` and decoded
+    by ``LoadImageFromBytes``. ``img_path`` still joins ``data_prefix['img']``
+    and the original ``file_name`` to identify the images. Use the
+    ``ShardShuffleSampler`` to read the shards sequentially while training.
+    The fields packed with ``extra_keys`` are loaded in ``ann_arrays`` along
+    with the ``ANN_STORE_EXTRA_KEYS`` of the class.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        self._shards = {}
+        self._shard_ids = None
+        kwargs['ann_store'] = True
+        super().__init__(*args, **kwargs)
+
+    def load_data_list(self) -> List[dict]:
+        """Load the data list from the packed dataset in ``self.ann_file``.
+
+        Returns:
+            List[dict]: A list of annotation.
+        """
+        with np.load(osp.join(self.ann_file, SHARD_INDEX_FILE)) as index:
+            shards = list(
+                zip(index['shard_ids'].tolist(), index['offsets'].tolist(),
+                    index['lengths'].tolist()))
+            packed_keys = tuple(index['extra_keys'].tolist()) \
+                if 'extra_keys' in index else ()
+        extra_keys = tuple(
+            dict.fromkeys(self.ANN_STORE_EXTRA_KEYS + packed_keys))
+        store = PoseAnnStore.load(
+            osp.join(self.ann_file, ANN_STORE_DIR), extra_keys=extra_keys)
+        assert store is not None, \
+            f'{self.ann_file} is not a packed pose dataset with ' \
+            f'the fields {extra_keys}'
+        data_list = self.load_data_list_from_store(store)
+        for data_info, shard in zip(data_list, shards):
+            data_info['shard'] = shard
+        return data_list
+
+    def _get_shard(self, shard_id: int) -> np.ndarray:
+        # opened lazily, in each dataloader worker
+        shard = self._shards.get(shard_id)
+        if shard is None:
+            shard = np.memmap(
+                get_shard_file(self.ann_file, shard_id),
+                dtype=np.uint8,
+                mode='r')
+            self._shards[shard_id] = shard
+        return shard
+
+    def __getstate__(self):
+        # memory maps would be pickled as copies of the shards
+        state = self.__dict__.copy()
+        state['_shards'] = {}
+        return state
+
+    def get_data_info(self, idx: int) -> dict:
+        """Get the data info of ``idx``, with the encoded image in
+        ``img_bytes``."""
+        data_info = super().get_data_info(idx)
+        shard_id, offset, length = data_info['shard']
+        data_info['img_bytes'] = self._get_shard(shard_id)[offset:offset +
+                                                           length]
+        return data_info
+
+    @property
+    def shard_ids(self) -> np.ndarray:
+        """The shard of each sample of the dataset."""
+        if self._shard_ids is None:
+            # the data infos without reading the annotations
+            get_data_info = super(PoseAnnStoreMixin, self).get_data_info
+            self._shard_ids = np.array(
+                [get_data_info(i)['shard'][0] for i in range(len(self))],
+                dtype=np.int64)
+        return self._shard_ids
@@ -0,0 +1,351 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import os
+import os.path as osp
+import shutil
+import warnings
+from collections import defaultdict
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from .api_wrappers import COCO
+
+
+class PoseAnnStore:
+    """Columnar store of the annotations of a COCO style pose dataset.
+
+    The annotations of the i-th image are rows ``offsets[i]:offsets[i+1]``
+    of the annotation columns, all contiguous arrays. The store can be saved
+    as a directory of ``.npy`` files beside the annotation file and memory
+    mapped back, so that building a dataset does not parse the json file and
+    the columns are shared by the page cache across the dataloader workers.
+
+    Missing optional fields (``relative_pose``, ``norm_pose``) are stored as
+    NaN, a missing ``handle_visibility`` as 1. ``extra_keys`` are additional
+    fixed size annotation fields stored as float32 columns, e.g. ``bbox_3d``
+    of PhoCal.
+    """
+    version = 2
+    cat_columns = ('categories', 'category_names')
+    img_columns = ('img_ids', 'file_names', 'widths', 'heights')
+    ann_columns = ('ann_ids', 'category_ids', 'bboxes_xywh', 'bboxes',
+                   'areas', 'iscrowd', 'ignore', 'rots', 'poss',
+                   'bbox_3d_sizes', 'rots_norm', 'scales_norm',
+                   'handle_visibility')
+    columns = cat_columns + img_columns + ann_columns
+
+    def __init__(self, offsets, extra_keys: Sequence[str] = (), **columns):
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.extra_keys = tuple(extra_keys)
+        for key in self.columns + self.extra_keys:
+            setattr(self, key, columns[key])
+
+    def __len__(self):
+        return len(self.img_ids)
+
+    @property
+    def num_anns(self):
+        return np.diff(self.offsets)
+
+    @classmethod
+    def from_coco(cls, coco, extra_keys: Sequence[str] = ()):
+        """Build the store from a COCO api instance."""
+        img_ids = coco.get_img_ids()
+        imgs = coco.load_imgs(img_ids)
+        anns = [ann for img_id in img_ids for ann in coco.imgToAnns[img_id]]
+        offsets = np.cumsum([0] + [len(coco.imgToAnns[i]) for i in img_ids])
+
+        def column(key, size, dtype=np.float32):
+            data = np.full((len(anns), size), np.nan, dtype=dtype)
+            for i, ann in enumerate(anns):
+                value = key(ann)
+                if value is not None:
+                    data[i] = value
+            return data
+
+        bboxes_xywh = np.array([ann['bbox'] for ann in anns],
+                               dtype=np.float64).reshape(-1, 4)
+        # x2, y2 are computed in float64 like the per-instance parsing did
+        bboxes = bboxes_xywh.copy()
+        bboxes[:, 2:] += bboxes[:, :2]
+        cats = coco.load_cats(coco.get_cat_ids())
+        columns = dict(
+            categories=np.array([cat['id'] for cat in cats], dtype=np.int64),
+            category_names=np.array([cat['name'] for cat in cats],
+                                    dtype=str),
+            img_ids=np.array(img_ids, dtype=np.int64),
+            file_names=np.array([img['file_name'] for img in imgs], dtype=str),
+            widths=np.array([img['width'] for img in imgs], dtype=np.int64),
+            heights=np.array([img['height'] for img in imgs], dtype=np.int64),
+            ann_ids=np.array([ann['id'] for ann in anns], dtype=np.int64),
+            category_ids=np.array([ann['category_id'] for ann in anns],
+                                  dtype=np.int64),
+            bboxes_xywh=bboxes_xywh,
+            bboxes=bboxes.astype(np.float32),
+            areas=np.array([ann['area'] for ann in anns], dtype=np.float64),
+            iscrowd=np.array([bool(ann.get('iscrowd', False)) for ann in anns],
+                             dtype=bool),
+            ignore=np.array([bool(ann.get('ignore', False)) for ann in anns],
+                            dtype=bool),
+            rots=column(
+                lambda ann: (ann.get('relative_pose') or {}).get('rotation'),
+                9),
+            poss=column(
+                lambda ann: (ann.get('relative_pose') or {}).get('position'),
+                3),
+            bbox_3d_sizes=column(lambda ann: ann['bbox_3d_size'], 3),
+            rots_norm=column(
+                lambda ann: (ann.get('norm_pose') or {}).get('rotation_norm'),
+                9),
+            scales_norm=column(
+                lambda ann: (ann.get('norm_pose') or {}).get('scale_norm'),
+                1)[:, 0],
+            handle_visibility=np.array(
+                [ann.get('handle_visibility', 1) for ann in anns],
+                dtype=np.int64))
+        for key in extra_keys:
+            values = np.array([ann[key] for ann in anns], dtype=np.float32)
+            columns[key] = values.reshape(len(anns), -1)
+        return cls(offsets, extra_keys=extra_keys, **columns)
+
+    @classmethod
+    def load(cls,
+             store_dir: str,
+             ann_file: Optional[str] = None,
+             extra_keys: Sequence[str] = ()):
+        """Memory map a store saved by :meth:`save`.
+
+        Returns None when the store is missing, of another version, older
+        than ``ann_file`` or lacks some of ``extra_keys``.
+        """
+        meta_file = osp.join(store_dir, 'meta.npy')
+        if not osp.isfile(meta_file):
+            return None
+        meta = np.load(meta_file)
+        source_stat = _file_stat(ann_file) if ann_file is not None else (0, 0)
+        if meta[0] != cls.version or tuple(meta[1:]) != source_stat:
+            return None
+        keys = cls.columns + tuple(extra_keys)
+        if not all(
+                osp.isfile(osp.join(store_dir, f'{key}.npy'))
+                for key in keys):
+            return None
+        columns = {
+            key: np.load(osp.join(store_dir, f'{key}.npy'), mmap_mode='r')
+            for key in keys
+        }
+        return cls(
+            np.load(osp.join(store_dir, 'offsets.npy')),
+            extra_keys=extra_keys,
+            **columns)
+
+    def save(self, store_dir: str, ann_file: Optional[str] = None):
+        """Save the store as ``.npy`` files in ``store_dir``, stamped with the
+        size and mtime of ``ann_file`` so that a changed annotation file
+        invalidates it."""
+        source_stat = _file_stat(ann_file) if ann_file is not None else (0, 0)
+        # write to a temporary directory first, other ranks may read the store
+        tmp_dir = f'{store_dir}.{os.getpid()}.tmp'
+        os.makedirs(tmp_dir, exist_ok=True)
+        np.save(osp.join(tmp_dir, 'offsets.npy'), self.offsets)
+        for key in self.columns + self.extra_keys:
+            np.save(osp.join(tmp_dir, f'{key}.npy'), getattr(self, key))
+        np.save(
+            osp.join(tmp_dir, 'meta.npy'),
+            np.array((self.version, ) + source_stat, dtype=np.int64))
+        if osp.isdir(store_dir):
+            shutil.rmtree(store_dir, ignore_errors=True)
+        os.replace(tmp_dir, store_dir)
+
+    @classmethod
+    def from_ann_file(cls,
+                      ann_file: str,
+                      coco_api=COCO,
+                      extra_keys: Sequence[str] = (),
+                      cache: bool = True):
+        """Memory map the store of ``ann_file``, converting it first when the
+        store is missing or stale.
+
+        Args:
+            ann_file (str): Path of a local annotation file.
+            coco_api (type): COCO api used for the conversion.
+                Defaults to COCO.
+            extra_keys (Sequence[str]): Additional annotation fields to
+                store. Defaults to ().
+            cache (bool): Whether to save the converted store beside
+                ``ann_file``. Defaults to True.
+
+        Returns:
+            PoseAnnStore: The store.
+        """
+        store_dir = get_pose_ann_store_dir(ann_file)
+        if cache:
+            store = cls.load(store_dir, ann_file, extra_keys)
+            if store is not None:
+                return store
+        store = cls.from_coco(coco_api(ann_file), extra_keys)
+        if cache:
+            try:
+                store.save(store_dir, ann_file)
+            except OSError as e:
+                warnings.warn(f'Failed to save the annotation store to '
+                              f'{store_dir}: {e}')
+            else:
+                store = cls.load(store_dir, ann_file, extra_keys)
+        return store
+
+    def get_cat_ids(self, cat_names: Sequence[str]) -> List[int]:
+        """Ids of the categories named in ``cat_names``, in the order of the
+        annotation file like ``COCO.get_cat_ids``."""
+        return [
+            cat_id for cat_id, name in zip(self.categories.tolist(),
+                                           self.category_names.tolist())
+            if name in cat_names
+        ]
+
+    def cat_img_map(self) -> dict:
+        """Image ids of each category id, like ``COCO.cat_img_map``."""
+        ann_img_ids = np.repeat(self.img_ids, self.num_anns)
+        cat_img_map = defaultdict(list)
+        for cat_id in np.unique(self.category_ids).tolist():
+            cat_img_map[cat_id] = ann_img_ids[self.category_ids ==
+                                              cat_id].tolist()
+        return cat_img_map
+
+    def valid_anns(self, cat_ids: Sequence[int]) -> np.ndarray:
+        """Mask of the annotations kept by the parse_data_info of the pose
+        datasets: not ignored, overlapping the image, of positive size and
+        of one of ``cat_ids``."""
+        x1, y1, w, h = self.bboxes_xywh.T
+        widths = np.repeat(self.widths, self.num_anns)
+        heights = np.repeat(self.heights, self.num_anns)
+        inter_w = np.maximum(
+            0,
+            np.minimum(x1 + w, widths) - np.maximum(x1, 0))
+        inter_h = np.maximum(
+            0,
+            np.minimum(y1 + h, heights) - np.maximum(y1, 0))
+        return ~self.ignore & (inter_w * inter_h != 0) & (self.areas > 0) \
+            & (w >= 1) & (h >= 1) & np.isin(self.category_ids, cat_ids)
+
+
+def get_pose_ann_store_dir(ann_file: str) -> str:
+    """Directory of the PoseAnnStore of ``ann_file``."""
+    return osp.splitext(ann_file)[0] + '.pose_ann_store'
+
+
+def _file_stat(path):
+    stat = os.stat(path)
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+class PoseAnnStoreMixin:
+    """Builds a pose dataset from a :class:`PoseAnnStore`.
+
+    The data infos only hold the image information and the rows of their
+    annotations. :meth:`get_data_info` hands the annotation columns to the
+    loading transforms as ``ann_arrays``, a dict of per-instance arrays keyed
+    like the fields of ``instances``, instead of a list of dicts.
+
+    Args:
+        ann_store (bool): Whether to load the annotations from the store
+            beside ``ann_file``, converted on the first use. Masks are not
+            stored. Defaults to False.
+    """
+    ANN_STORE_EXTRA_KEYS = ()
+
+    def __init__(self, *args, ann_store: bool = False, **kwargs) -> None:
+        self.ann_store = ann_store
+        super().__init__(*args, **kwargs)
+
+    def load_data_list_from_store(
+            self, store: Optional[PoseAnnStore] = None) -> List[dict]:
+        """Load the data list from ``store``, defaults to the annotation store
+        of ``self.ann_file``."""
+        if store is None:
+            with self.file_client.get_local_path(self.ann_file) as local_path:
+                # remote annotation files are converted in memory
+                store = PoseAnnStore.from_ann_file(
+                    local_path,
+                    self.COCOAPI,
+                    self.ANN_STORE_EXTRA_KEYS,
+                    cache=local_path == self.ann_file)
+        if self.ANN_ID_UNIQUE:
+            assert len(np.unique(store.ann_ids)) == len(
+                store.ann_ids
+            ), f"Annotation ids in '{self.ann_file}' are not unique!"
+
+        self.cat_ids = store.get_cat_ids(self.metainfo['classes'])
+        self.cat2label = {cat_id: i for i, cat_id in enumerate(self.cat_ids)}
+        self.cat_img_map = store.cat_img_map()
+        self._store = store
+        self._ann_valid = store.valid_anns(self.cat_ids)
+        # labels of the annotations, -1 for the categories out of classes
+        ann_cat_ids, inverse = np.unique(
+            store.category_ids, return_inverse=True)
+        cat2label = self.cat2label
+        cat_labels = np.array(
+            [cat2label.get(cat_id, -1) for cat_id in ann_cat_ids.tolist()],
+            dtype=np.int64)
+        self._ann_labels = cat_labels[inverse.reshape(-1)]
+
+        data_list = []
+        for i, (img_id, file_name, width, height) in enumerate(
+                zip(store.img_ids.tolist(), store.file_names.tolist(),
+                    store.widths.tolist(), store.heights.tolist())):
+            img_path = osp.join(self.data_prefix['img'], file_name)
+            if self.data_prefix.get('seg', None):
+                seg_map_path = osp.join(
+                    self.data_prefix['seg'],
+                    file_name.rsplit('.', 1)[0] + self.seg_map_suffix)
+            else:
+                seg_map_path = None
+            data_list.append(
+                dict(
+                    img_path=img_path,
+                    img_id=img_id,
+                    seg_map_path=seg_map_path,
+                    height=height,
+                    width=width,
+                    ann_rows=(int(store.offsets[i]),
+                              int(store.offsets[i + 1]))))
+        return data_list
+
+    def get_ann_arrays(self, ann_rows) -> dict:
+        """Annotation columns of the valid instances among ``ann_rows``."""
+        start, stop = ann_rows
+        valid = self._ann_valid[start:stop]
+        rows = slice(start, stop) if valid.all() else \
+            np.flatnonzero(valid) + start
+        store = self._store
+        ann_arrays = dict(
+            bbox=store.bboxes[rows],
+            bbox_label=self._ann_labels[rows],
+            ignore_flag=store.iscrowd[rows],
+            rot=store.rots[rows],
+            pos=store.poss[rows],
+            bbox_3d_size=store.bbox_3d_sizes[rows],
+            rot_norm=store.rots_norm[rows],
+            scale_norm=store.scales_norm[rows],
+            handle_visibility=store.handle_visibility[rows])
+        for key in store.extra_keys:
+            ann_arrays[key] = getattr(store, key)[rows]
+        return ann_arrays
+
+    def get_data_info(self, idx: int) -> dict:
+        """Get the data info of ``idx``, with its ``ann_arrays`` when built
+        from the annotation store."""
+        data_info = super().get_data_info(idx)
+        if 'ann_rows' in data_info:
+            data_info['ann_arrays'] = self.get_ann_arrays(
+                data_info['ann_rows'])
+        return data_info
+
+    def get_cat_ids(self, idx: int) -> List[int]:
+        """Get COCO category ids by index."""
+        data_info = super().get_data_info(idx)
+        if 'ann_rows' in data_info:
+            start, stop = data_info['ann_rows']
+            valid = self._ann_valid[start:stop]
+            return self._ann_labels[start:stop][valid].tolist()
+        return super().get_cat_ids(idx)
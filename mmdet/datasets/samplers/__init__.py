@@ -2,8 +2,9 @@
 from .batch_sampler import AspectRatioBatchSampler
 from .class_aware_sampler import ClassAwareSampler
 from .multi_source_sampler import GroupMultiSourceSampler, MultiSourceSampler
+from .shard_sampler import ShardShuffleSampler
 
 __all__ = [
     'ClassAwareSampler', 'AspectRatioBatchSampler', 'MultiSourceSampler',
-    'GroupMultiSourceSampler'
+    'GroupMultiSourceSampler', 'ShardShuffleSampler'
 ]
@@ -0,0 +1,66 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+from typing import Iterator, Optional, Sized
+
+import numpy as np
+import torch
+from mmengine.dataset import DefaultSampler
+
+from mmdet.registry import DATA_SAMPLERS
+
+
+@DATA_SAMPLERS.register_module()
+class ShardShuffleSampler(DefaultSampler):
+    """Sampler that shuffles the shards of a packed dataset and the samples
+    within each shard, instead of the whole dataset.
+
+    The samples of a shard are yielded contiguously, so that the dataloader
+    reads the shards of a ``PackedPoseDataset`` almost sequentially. The
+    dataset must have a ``shard_ids`` attribute, the shard of each sample.
+    Without shuffling, the order is the same as :obj:`DefaultSampler`.
+
+    Args:
+        dataset (Sized): The dataset.
+        shuffle (bool): Whether shuffle the dataset or not. Defaults to True.
+        seed (int, optional): Random seed used to shuffle the sampler if
+            :attr:`shuffle=True`. This number should be identical across all
+            processes in the distributed group. Defaults to None.
+        round_up (bool): Whether to add extra samples to make the number of
+            samples evenly divisible by the world size. Defaults to True.
+    """
+
+    def __init__(self,
+                 dataset: Sized,
+                 shuffle: bool = True,
+                 seed: Optional[int] = None,
+                 round_up: bool = True) -> None:
+        super().__init__(
+            dataset=dataset, shuffle=shuffle, seed=seed, round_up=round_up)
+        self.shard_ids = np.asarray(dataset.shard_ids)
+        assert len(self.shard_ids) == len(self.dataset)
+
+    def __iter__(self) -> Iterator[int]:
+        """Iterate the indices."""
+        if self.shuffle:
+            # deterministically shuffle based on epoch and seed
+            g = torch.Generator()
+            g.manual_seed(self.seed + self.epoch)
+            num_shards = int(self.shard_ids.max()) + 1
+            shard_order = torch.randperm(num_shards, generator=g).numpy()
+            sample_order = torch.randperm(
+                len(self.dataset), generator=g).numpy()
+            # sort by shuffled shard, then by random order within the shard
+            indices = np.lexsort(
+                (sample_order, shard_order[self.shard_ids])).tolist()
+        else:
+            indices = list(range(len(self.dataset)))
+
+        # add extra samples to make it evenly divisible
+        if self.round_up:
+            indices = (
+                indices *
+                int(self.total_size / len(indices) + 1))[:self.total_size]
+
+        # subsample
+        indices = indices[self.rank:self.total_size:self.world_size]
+
+        return iter(indices)
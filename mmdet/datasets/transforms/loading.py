@@ -144,6 +144,85 @@ class LoadMultiChannelImageFromFiles(BaseTransform):
         return repr_str
 
 
+@TRANSFORMS.register_module()
+class LoadImageFromBytes(LoadImageFromFile):
+    """Load an image from the encoded image file in ``results['img_bytes']``.
+
+    Similar with :obj:`LoadImageFromFile`, but the content of the image file
+    has been read, e.g. from the shards of a ``PackedPoseDataset``.
+
+    Required Keys:
+
+    - img_bytes
+
+    Modified Keys:
+
+    - img
+    - img_shape
+    - ori_shape
+
+    Args:
+        to_float32 (bool): Whether to convert the loaded image to a float32
+            numpy array. If set to False, the loaded image is an uint8 array.
+            Defaults to False.
+        color_type (str): The flag argument for :func:``mmcv.imfrombytes``.
+            Defaults to 'color'.
+        imdecode_backend (str): The image decoding backend type. The backend
+            argument for :func:``mmcv.imfrombytes``.
+            See :func:``mmcv.imfrombytes`` for details.
+            Defaults to 'cv2'.
+    """
+
+    def transform(self, results: dict) -> dict:
+        """Transform function to decode the image.
+
+        Args:
+            results (dict): Result dict with the encoded image in
+                ``results['img_bytes']``.
+
+        Returns:
+            dict: The dict contains loaded image and meta information.
+        """
+        img = mmcv.imfrombytes(
+            results.pop('img_bytes'),
+            flag=self.color_type,
+            backend=self.imdecode_backend)
+        if self.to_float32:
+            img = img.astype(np.float32)
+
+        results['img'] = img
+        results['img_shape'] = img.shape[:2]
+        results['ori_shape'] = img.shape[:2]
+        return results
+
+
+def get_instance_field(results: dict,
+                       key: str,
+                       dtype=np.float32,
+                       width: Optional[int] = None) -> np.ndarray:
+    """Stack the field ``key`` of all the instances of ``results`` in one
+    array, read from the ``ann_arrays`` columns when the dataset gives them.
+
+    Args:
+        results (dict): Result dict from :obj:``mmengine.BaseDataset``.
+        key (str): Field of the instances.
+        dtype (np.dtype): Type of the array. Defaults to np.float32.
+        width (int, optional): Reshape the array to (N, width) when given.
+
+    Returns:
+        np.ndarray: A new array of the field of the N instances.
+    """
+    if 'ann_arrays' in results:
+        field = np.array(results['ann_arrays'][key], dtype=dtype)
+    else:
+        field = np.array(
+            [instance[key] for instance in results.get('instances', [])],
+            dtype=dtype)
+    if width is not None:
+        field = field.reshape(-1, width)
+    return field
+
+
 @TRANSFORMS.register_module()
 class LoadAnnotations(MMCV_LoadAnnotations):
     """Load and process the ``instances`` and ``seg_map`` annotation provided
@@ -211,6 +290,9 @@ class LoadAnnotations(MMCV_LoadAnnotations):
       - ignore_flag
 
     - seg_map_path (optional)
+    - ann_arrays (optional): per-instance arrays of the fields of
+      ``instances``, used instead of them when given by a
+      :class:`PoseAnnStoreMixin` dataset
 
     Added Keys:
 
@@ -261,11 +343,17 @@ class LoadAnnotations(MMCV_LoadAnnotations):
         Returns:
             dict: The dict contains loaded bounding box annotations.
         """
-        gt_bboxes = []
-        gt_ignore_flags = []
-        for instance in results.get('instances', []):
-            gt_bboxes.append(instance['bbox'])
-            gt_ignore_flags.append(instance['ignore_flag'])
+        if 'ann_arrays' in results:
+            # columns of a PoseAnnStore, copied since the boxes are modified
+            # in place by the following transforms
+            gt_bboxes = np.array(results['ann_arrays']['bbox'])
+            gt_ignore_flags = results['ann_arrays']['ignore_flag']
+        else:
+            gt_bboxes = []
+            gt_ignore_flags = []
+            for instance in results.get('instances', []):
+                gt_bboxes.append(instance['bbox'])
+                gt_ignore_flags.append(instance['ignore_flag'])
         if self.box_type is None:
             results['gt_bboxes'] = np.array(
                 gt_bboxes, dtype=np.float32).reshape((-1, 4))
@@ -283,20 +371,12 @@ class LoadAnnotations(MMCV_LoadAnnotations):
         Returns:
             dict: The dict contains loaded pose annotations.
         """
-        gt_pose_rots = []
-        gt_pose_poses = []
-        gt_pose_sizes = []
-        gt_ignore_flags = []
-        for instance in results.get('instances', []):
-            gt_pose_rots.append(instance['rot'])
-            gt_pose_poses.append(instance['pos'])
-            gt_pose_sizes.append(instance['bbox_3d_size'])
-            gt_ignore_flags.append(instance['ignore_flag'])
-        #print('gt_pos_rot',gt_pose_rot)
-        results['gt_pose_rots'] = np.array(gt_pose_rots,dtype=np.float32).reshape(-1,9)
-        results['gt_pose_poses'] = np.array(gt_pose_poses,dtype=np.float32).reshape(-1,3)
-        results['gt_pose_sizes'] = np.array(gt_pose_sizes,dtype=np.float32).reshape(-1,3)
-        results['gt_ignore_flags'] = np.array(gt_ignore_flags, dtype=bool)
+        results['gt_pose_rots'] = get_instance_field(results, 'rot', width=9)
+        results['gt_pose_poses'] = get_instance_field(results, 'pos', width=3)
+        results['gt_pose_sizes'] = get_instance_field(
+            results, 'bbox_3d_size', width=3)
+        results['gt_ignore_flags'] = get_instance_field(
+            results, 'ignore_flag', dtype=bool)
 
     def _load_labels(self, results: dict) -> None:
         """Private function to load label annotations.
@@ -307,9 +387,12 @@ class LoadAnnotations(MMCV_LoadAnnotations):
         Returns:
             dict: The dict contains loaded label annotations.
         """
-        gt_bboxes_labels = []
-        for instance in results.get('instances', []):
-            gt_bboxes_labels.append(instance['bbox_label'])
+        if 'ann_arrays' in results:
+            gt_bboxes_labels = results['ann_arrays']['bbox_label']
+        else:
+            gt_bboxes_labels = []
+            for instance in results.get('instances', []):
+                gt_bboxes_labels.append(instance['bbox_label'])
         # TODO: Inconsistent with mmcv, consider how to deal with it later.
         results['gt_bboxes_labels'] = np.array(
             gt_bboxes_labels, dtype=np.int64)
@@ -15,6 +15,7 @@ from mmdet.registry import TRANSFORMS
 from mmdet.structures.bbox import get_box_type
 from mmdet.structures.bbox.box_type import autocast_box_type
 from mmdet.structures.mask import BitmapMasks, PolygonMasks
+from .loading import get_instance_field
 from scipy.spatial.transform import Rotation as R
 
 #from mmdet3d.structures.bbox_3d.cam_box3d import CameraInstance3DBoxes
@@ -87,6 +88,9 @@ class LoadAnnotations3D(MMCV_LoadAnnotations):
       - ignore_flag
 
     - seg_map_path (optional)
+    - ann_arrays (optional): per-instance arrays of the fields of
+      ``instances``, used instead of them when given by a
+      :class:`PoseAnnStoreMixin` dataset
 
     Added Keys:
 
@@ -108,6 +112,10 @@ class LoadAnnotations3D(MMCV_LoadAnnotations):
         poly2mask (bool): Whether to convert mask to bitmap. Default: True.
         box_type (str): The box type used to wrap the bboxes. If ``box_type``
             is None, gt_bboxes will keep being np.ndarray. Defaults to 'hbox'.
+        cache_pose (bool): Whether to cache the pose annotation arrays of
+            each image by ``img_id``, so that the conversion of the poses
+            runs once per image and worker instead of once per epoch.
+            Defaults to False.
         imdecode_backend (str): The image decoding backend type. The backend
             argument for :func:``mmcv.imfrombytes``.
             See :fun:``mmcv.imfrombytes`` for details.
@@ -122,12 +130,15 @@ class LoadAnnotations3D(MMCV_LoadAnnotations):
                  with_pose: bool = False,
                  poly2mask: bool = True,
                  box_type: str = 'hbox',
+                 cache_pose: bool = False,
                  **kwargs) -> None:
         super(LoadAnnotations3D, self).__init__(**kwargs)
         self.with_mask = with_mask
         self.poly2mask = poly2mask
         self.box_type = box_type
         self.with_pose = with_pose
+        self.cache_pose = cache_pose
+        self._pose_cache = {}
 
     def _load_bboxes(self, results: dict) -> None:
         """Private function to load bounding box annotations.
@@ -137,11 +148,17 @@ class LoadAnnotations3D(MMCV_LoadAnnotations):
         Returns:
             dict: The dict contains loaded bounding box annotations.
         """
-        gt_bboxes = []
-        gt_ignore_flags = []
-        for instance in results.get('instances', []):
-            gt_bboxes.append(instance['bbox'])
-            gt_ignore_flags.append(instance['ignore_flag'])
+        if 'ann_arrays' in results:
+            # columns of a PoseAnnStore, copied since the boxes are modified
+            # in place by the following transforms
+            gt_bboxes = np.array(results['ann_arrays']['bbox'])
+            gt_ignore_flags = results['ann_arrays']['ignore_flag']
+        else:
+            gt_bboxes = []
+            gt_ignore_flags = []
+            for instance in results.get('instances', []):
+                gt_bboxes.append(instance['bbox'])
+                gt_ignore_flags.append(instance['ignore_flag'])
         if self.box_type is None:
             results['gt_bboxes'] = np.array(
                 gt_bboxes, dtype=np.float32).reshape((-1, 4))
@@ -151,6 +168,44 @@ class LoadAnnotations3D(MMCV_LoadAnnotations):
         #print("gt_bboxes",gt_bboxes)
         results['gt_ignore_flags'] = np.array(gt_ignore_flags, dtype=bool)
 
+    def _get_pose_arrays(self, results: dict) -> dict:
+        """Private function to convert the pose annotations of all the
+        instances at once.
+
+        Args:
+            results (dict): Result dict from :obj:``mmengine.BaseDataset``.
+        Returns:
+            dict: The pose annotation arrays, and the (N, 9) rows of the
+            camera 3D boxes as ``bboxes_3d``.
+        """
+        # computed in float64 like the per-instance conversion did
+        rots = get_instance_field(results, 'rot', np.float64, width=9)
+        poses = get_instance_field(results, 'pos', np.float64, width=3)
+        sizes = get_instance_field(
+            results, 'bbox_3d_size', np.float64, width=3)
+        scales_norm = get_instance_field(results, 'scale_norm', np.float64)
+        bboxes_3d = np.zeros((len(rots), 9), dtype=np.float32)
+        bboxes_3d[:, :3] = poses
+        bboxes_3d[:, 3:6] = sizes * scales_norm[:, None]
+        if len(rots) > 0:
+            # the y angle of the xyz euler angles
+            bboxes_3d[:, 6] = R.from_matrix(rots.reshape(
+                -1, 3, 3)).as_euler('xyz')[:, 1]
+        gt_pose_poses = poses.astype(np.float32)
+        return dict(
+            gt_pose_rots=rots.astype(np.float32),
+            gt_pose_poses=gt_pose_poses,
+            gt_pose_sizes=sizes.astype(np.float32),
+            gt_ignore_flags=get_instance_field(
+                results, 'ignore_flag', dtype=bool),
+            gt_pose_rots_norm=get_instance_field(
+                results, 'rot_norm', width=9),
+            gt_pose_scales_norm=scales_norm.astype(np.float32),
+            # labels for 3d detection
+            depths=gt_pose_poses[:, 2].copy(),
+            centers_2d=gt_pose_poses[:, :2].copy(),
+            bboxes_3d=bboxes_3d)
+
     def _load_pose(self, results: dict) -> None:
         """Private function to load pose annotations.
 
@@ -159,34 +214,22 @@ class LoadAnnotations3D(MMCV_LoadAnnotations):
         Returns:
             dict: The dict contains loaded pose annotations.
         """
-        gt_pose_rots = []
-        gt_pose_poses = []
-        gt_pose_sizes = []
-        gt_ignore_flags = []
-        gt_pose_rots_norm = []
-        gt_pose_scales_norm = []
-        gt_bboxes_3d_list = []
-        for instance in results.get('instances', []):
-            gt_pose_rots.append(instance['rot'])
-            gt_pose_poses.append(instance['pos'])
-            gt_pose_sizes.append(instance['bbox_3d_size'])
-            gt_ignore_flags.append(instance['ignore_flag'])
-            gt_pose_rots_norm.append(instance['rot_norm'])
-            gt_pose_scales_norm.append(instance['scale_norm'])
-            size_x,size_y,size_z=instance['bbox_3d_size']
-            sciangle_0, sciangle_1, sciangle_2 = R.from_matrix(np.array(instance['rot']).reshape(3,3)).as_euler('xyz')
-            bboxes_3d=np.array([instance['pos'][0],instance['pos'][1],instance['pos'][2],size_x*instance['scale_norm'],size_y*instance['scale_norm'],size_z*instance['scale_norm'],sciangle_1,0,0],dtype=np.float32)
-            gt_bboxes_3d_list.append(bboxes_3d)
-        #print('gt_pos_rot',gt_pose_rot)
-        results['gt_pose_rots'] = np.array(gt_pose_rots,dtype=np.float32).reshape(-1,9)
-        results['gt_pose_poses'] = np.array(gt_pose_poses,dtype=np.float32).reshape(-1,3)
-        results['gt_pose_sizes'] = np.array(gt_pose_sizes,dtype=np.float32).reshape(-1,3)
-        results['gt_ignore_flags'] = np.array(gt_ignore_flags, dtype=bool)
-        results['gt_pose_rots_norm'] = np.array(gt_pose_rots_norm,dtype=np.float32).reshape(-1,9)
-        results['gt_pose_scales_norm'] = np.array(gt_pose_scales_norm,dtype=np.float32)
-        results['depths'] = np.array(gt_pose_poses,dtype=np.float32).reshape(-1,3)[:,2] # labels for 3d detection
-        results['centers_2d'] = np.array(gt_pose_poses,dtype=np.float32).reshape(-1,3)[:,:2]
-        gt_bboxes_3d_array = np.array(gt_bboxes_3d_list).reshape(-1,9)
+        img_id = results.get('img_id')
+        if self.cache_pose and img_id in self._pose_cache:
+            # copies, the annotations may be modified in place
+            pose_arrays = {
+                key: value.copy()
+                for key, value in self._pose_cache[img_id].items()
+            }
+        else:
+            pose_arrays = self._get_pose_arrays(results)
+            if self.cache_pose and img_id is not None:
+                self._pose_cache[img_id] = {
+                    key: value.copy()
+                    for key, value in pose_arrays.items()
+                }
+        gt_bboxes_3d_array = pose_arrays.pop('bboxes_3d')
+        results.update(pose_arrays)
         gt_bboxes_3d = CameraInstance3DBoxes(
                 gt_bboxes_3d_array,
                 box_dim=gt_bboxes_3d_array.shape[-1],
@@ -202,9 +245,12 @@ class LoadAnnotations3D(MMCV_LoadAnnotations):
         Returns:
             dict: The dict contains loaded label annotations.
         """
-        gt_bboxes_labels = []
-        for instance in results.get('instances', []):
-            gt_bboxes_labels.append(instance['bbox_label'])
+        if 'ann_arrays' in results:
+            gt_bboxes_labels = results['ann_arrays']['bbox_label']
+        else:
+            gt_bboxes_labels = []
+            for instance in results.get('instances', []):
+                gt_bboxes_labels.append(instance['bbox_label'])
         # TODO: Inconsistent with mmcv, consider how to deal with it later.
         results['gt_bboxes_labels'] = np.array(gt_bboxes_labels, dtype=np.int64)
         results['gt_labels_3d'] = np.array(gt_bboxes_labels, dtype=np.int64) # labels for 3d detection
@@ -15,6 +15,7 @@ from mmdet.registry import TRANSFORMS
 from mmdet.structures.bbox import get_box_type
 from mmdet.structures.bbox.box_type import autocast_box_type
 from mmdet.structures.mask import BitmapMasks, PolygonMasks
+from .loading import get_instance_field
 
 
 
@@ -86,6 +87,9 @@ class LoadAnnotationsPhocal(MMCV_LoadAnnotations):
       - ignore_flag
 
     - seg_map_path (optional)
+    - ann_arrays (optional): per-instance arrays of the fields of
+      ``instances``, used instead of them when given by a
+      :class:`PoseAnnStoreMixin` dataset
 
     Added Keys:
 
@@ -136,11 +140,17 @@ class LoadAnnotationsPhocal(MMCV_LoadAnnotations):
         Returns:
             dict: The dict contains loaded bounding box annotations.
         """
-        gt_bboxes = []
-        gt_ignore_flags = []
-        for instance in results.get('instances', []):
-            gt_bboxes.append(instance['bbox'])
-            gt_ignore_flags.append(instance['ignore_flag'])
+        if 'ann_arrays' in results:
+            # columns of a PoseAnnStore, copied since the boxes are modified
+            # in place by the following transforms
+            gt_bboxes = np.array(results['ann_arrays']['bbox'])
+            gt_ignore_flags = results['ann_arrays']['ignore_flag']
+        else:
+            gt_bboxes = []
+            gt_ignore_flags = []
+            for instance in results.get('instances', []):
+                gt_bboxes.append(instance['bbox'])
+                gt_ignore_flags.append(instance['ignore_flag'])
         if self.box_type is None:
             results['gt_bboxes'] = np.array(
                 gt_bboxes, dtype=np.float32).reshape((-1, 4))
@@ -158,27 +168,16 @@ class LoadAnnotationsPhocal(MMCV_LoadAnnotations):
         Returns:
             dict: The dict contains loaded pose annotations.
         """
-        gt_pose_rots = []
-        gt_pose_poses = []
-        gt_pose_sizes = []
-        gt_ignore_flags = []
-        gt_pose_rots_norm = []
-        gt_pose_scales_norm = []
-        for instance in results.get('instances', []):
-            gt_pose_rots.append(instance['rot'])
-            gt_pose_poses.append(instance['pos'])
-            gt_pose_sizes.append(instance['bbox_3d_size'])
-            gt_ignore_flags.append(instance['ignore_flag'])
-            gt_pose_rots_norm.append(instance['rot_norm'])
-            gt_pose_scales_norm.append(instance['scale_norm'])
-        #print('gt_pos_rot',gt_pose_rot)
-        results['gt_pose_rots'] = np.array(gt_pose_rots,dtype=np.float32).reshape(-1,9)
-        results['gt_pose_poses'] = np.array(gt_pose_poses,dtype=np.float32).reshape(-1,3)
-        results['gt_pose_sizes'] = np.array(gt_pose_sizes,dtype=np.float32).reshape(-1,3)
-        results['gt_ignore_flags'] = np.array(gt_ignore_flags, dtype=bool)
-        results['gt_pose_rots_norm'] = np.array(gt_pose_rots_norm,dtype=np.float32).reshape(-1,9)
-        results['gt_pose_scales_norm'] = np.array(gt_pose_scales_norm,dtype=np.float32)
-
+        results['gt_pose_rots'] = get_instance_field(results, 'rot', width=9)
+        results['gt_pose_poses'] = get_instance_field(results, 'pos', width=3)
+        results['gt_pose_sizes'] = get_instance_field(
+            results, 'bbox_3d_size', width=3)
+        results['gt_ignore_flags'] = get_instance_field(
+            results, 'ignore_flag', dtype=bool)
+        results['gt_pose_rots_norm'] = get_instance_field(
+            results, 'rot_norm', width=9)
+        results['gt_pose_scales_norm'] = get_instance_field(
+            results, 'scale_norm')
 
     def _load_labels(self, results: dict) -> None:
         """Private function to load label annotations.
@@ -189,9 +188,12 @@ class LoadAnnotationsPhocal(MMCV_LoadAnnotations):
         Returns:
             dict: The dict contains loaded label annotations.
         """
-        gt_bboxes_labels = []
-        for instance in results.get('instances', []):
-            gt_bboxes_labels.append(instance['bbox_label'])
+        if 'ann_arrays' in results:
+            gt_bboxes_labels = results['ann_arrays']['bbox_label']
+        else:
+            gt_bboxes_labels = []
+            for instance in results.get('instances', []):
+                gt_bboxes_labels.append(instance['bbox_label'])
         # TODO: Inconsistent with mmcv, consider how to deal with it later.
         results['gt_bboxes_labels'] = np.array(
             gt_bboxes_labels, dtype=np.int64)
@@ -1,5 +1,10 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import copy
+import hashlib
+import mmap
+import multiprocessing
+import os
+import pickle
 from typing import Callable, Dict, List, Optional, Union
 
 import numpy as np
@@ -9,6 +14,21 @@ from mmcv.transforms.utils import cache_random_params, cache_randomness
 from mmdet.registry import TRANSFORMS
 
 
+def _available_memory() -> Optional[int]:
+    """Memory available to new allocations in bytes, None if unknown."""
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
 @TRANSFORMS.register_module()
 class MultiBranch(BaseTransform):
     r"""Multiple branch pipeline wrapper.
@@ -279,3 +299,202 @@ class ProposalBroadcaster(BaseTransform):
         outputs = output_scatters[0]
         outputs['proposals'] = output_scatters[1]['gt_bboxes']
         return outputs
+
+
+class SharedMemoryLRU:
+    """Bounded LRU cache of byte strings in anonymous shared memory.
+
+    The cache lives in fixed size slots of one ``mmap`` created in the
+    current process, it is shared with the processes forked afterwards, e.g.
+    the dataloader workers. The slot table (key hash, last use and length of
+    each slot) is stored in the same memory and guarded by a lock, the least
+    recently used slot is overwritten when the cache is full.
+
+    The whole cache is mapped when it is created, so a cache larger than the
+    available memory raises a ValueError instead of failing in ``mmap``.
+
+    Args:
+        num_slots (int): Number of cached values.
+        slot_bytes (int): Maximum size of a value, larger values are not
+            cached.
+    """
+
+    def __init__(self, num_slots: int, slot_bytes: int) -> None:
+        assert num_slots > 0 and slot_bytes > 0
+        self.num_slots = num_slots
+        self.slot_bytes = slot_bytes
+        # key hash, last use and length of each slot, then the use counter
+        header_bytes = (3 * num_slots + 1) * 8
+        total_bytes = header_bytes + num_slots * slot_bytes
+        available = _available_memory()
+        if available is not None and total_bytes > available:
+            raise ValueError(
+                f'SharedMemoryLRU of {total_bytes} bytes exceeds the '
+                f'{available} bytes of available memory, reduce the number '
+                'of slots or their size, e.g. max_bytes of CachedPipeline')
+        try:
+            self._buffer = mmap.mmap(-1, total_bytes)
+        except OSError as e:
+            raise ValueError(
+                f'Failed to map a SharedMemoryLRU of {total_bytes} bytes '
+                f'({e}), reduce the number of slots or their size, e.g. '
+                'max_bytes of CachedPipeline') from e
+        header = np.frombuffer(
+            self._buffer, dtype=np.int64, count=3 * num_slots + 1)
+        self._keys = header[:num_slots]
+        self._last_uses = header[num_slots:2 * num_slots]
+        self._lengths = header[2 * num_slots:3 * num_slots]
+        self._clock = header[3 * num_slots:]
+        self._data = np.frombuffer(
+            self._buffer, dtype=np.uint8,
+            offset=header_bytes).reshape(num_slots, slot_bytes)
+        self._lock = multiprocessing.Lock()
+
+    @staticmethod
+    def hash_key(key: str) -> int:
+        """Non zero 63-bit hash of ``key``, 0 marks the empty slots."""
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        return (int.from_bytes(digest, 'little') >> 1) or 1
+
+    def _find(self, key_hash: int) -> Optional[int]:
+        slots = np.flatnonzero(self._keys == key_hash)
+        return int(slots[0]) if len(slots) else None
+
+    def get(self, key: str) -> Optional[bytes]:
+        """The value of ``key``, or None on a miss."""
+        key_hash = self.hash_key(key)
+        with self._lock:
+            slot = self._find(key_hash)
+            if slot is None:
+                return None
+            self._clock[0] += 1
+            self._last_uses[slot] = self._clock[0]
+            return self._data[slot, :self._lengths[slot]].tobytes()
+
+    def put(self, key: str, value: bytes) -> bool:
+        """Cache ``value`` under ``key``, evicting the least recently used
+        value when full. Returns whether the value was cached."""
+        if len(value) > self.slot_bytes:
+            return False
+        key_hash = self.hash_key(key)
+        with self._lock:
+            slot = self._find(key_hash)
+            if slot is None:
+                slot = int(np.argmin(self._last_uses))
+            self._keys[slot] = 0
+            self._data[slot, :len(value)] = np.frombuffer(value, np.uint8)
+            self._lengths[slot] = len(value)
+            self._clock[0] += 1
+            self._last_uses[slot] = self._clock[0]
+            self._keys[slot] = key_hash
+        return True
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._keys))
+
+    def __getstate__(self):
+        raise RuntimeError(
+            'SharedMemoryLRU is shared by forking and can not be pickled, '
+            'use the fork start method for the dataloader workers')
+
+
+_IMMUTABLE_TYPES = (str, bytes, int, float, bool, type(None))
+
+
+def _dumps(obj) -> bytes:
+    return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+@TRANSFORMS.register_module()
+class CachedPipeline(BaseTransform):
+    """A transform wrapper caching the outputs of deterministic transforms,
+    e.g. image decoding and resizing, in shared memory.
+
+    The results added, replaced or modified in place (e.g. the
+    ``gt_bboxes`` rescaled by ``Resize``) by the wrapped transforms are
+    cached per ``key`` in a :class:`SharedMemoryLRU` shared by all the
+    dataloader workers, which requires the fork start method. On a hit they are
+    restored from the cache instead of running the wrapped transforms, so
+    decoding and resizing the images drop out of the epochs after the first
+    one when the cache holds the dataset. The wrapped transforms must not be
+    random.
+
+    Args:
+        transforms (list[dict | callable]): Sequence of deterministic
+            transform object or config dict to be wrapped.
+        max_bytes (int): Size of the cache in bytes, mapped when the
+            wrapper is built and checked against the available memory.
+            Defaults to 1 GiB, raise it to hold larger datasets.
+        slot_bytes (int): Maximum size of the cached results of an image,
+            larger results are not cached. Defaults to 1 MiB, which holds a
+            640x480 color image.
+        key (str): The key of the results identifying an image.
+            Defaults to 'img_path'.
+
+    Examples:
+        >>> pipeline = [
+        >>>     dict(
+        >>>         type='CachedPipeline',
+        >>>         transforms=[
+        >>>             dict(type='LoadImageFromFile'),
+        >>>             dict(type='LoadAnnotationsPhocal', with_bbox=True,
+        >>>                  with_pose=True),
+        >>>             dict(type='Resize', scale=(640, 480),
+        >>>                  keep_ratio=True),
+        >>>         ]),
+        >>>     dict(type='PackDetInputs')]
+    """
+
+    def __init__(self,
+                 transforms: List[Union[dict, Callable]],
+                 max_bytes: int = 1 << 30,
+                 slot_bytes: int = 1 << 20,
+                 key: str = 'img_path') -> None:
+        self.transforms = Compose(transforms)
+        self.key = key
+        if max_bytes < slot_bytes:
+            raise ValueError(f'max_bytes ({max_bytes}) must be at least '
+                             f'slot_bytes ({slot_bytes})')
+        self.cache = SharedMemoryLRU(max_bytes // slot_bytes, slot_bytes)
+
+    def transform(self, results: dict) -> Optional[dict]:
+        """Restore the outputs of the wrapped transforms from the cache, or
+        apply them and cache their outputs.
+
+        Args:
+            results (dict): Result dict from loading pipeline.
+
+        Returns:
+            dict or None: Transformed results.
+        """
+        key = str(results[self.key])
+        cached = self.cache.get(key)
+        if cached is not None:
+            results.update(pickle.loads(cached))
+            return results
+
+        inputs = dict(results)
+        # the inputs modified in place are found from their pickled state
+        snapshots = {
+            k: _dumps(v)
+            for k, v in inputs.items() if not isinstance(v, _IMMUTABLE_TYPES)
+        }
+        results = self.transforms(results)
+        if results is None:
+            return None
+        outputs = {
+            k: v
+            for k, v in results.items()
+            if k not in inputs or v is not inputs[k] or (
+                k in snapshots and _dumps(v) != snapshots[k])
+        }
+        self.cache.put(key, _dumps(outputs))
+        return results
+
+    def __repr__(self) -> str:
+        repr_str = self.__class__.__name__
+        repr_str += f'(transforms={self.transforms}, '
+        repr_str += f'num_slots={self.cache.num_slots}, '
+        repr_str += f'slot_bytes={self.cache.slot_bytes}, '
+        repr_str += f"key='{self.key}')"
+        return repr_str
@@ -16,6 +16,9 @@ from .nocs_utils import compute_mAP,plot_mAP,compute_mAP_nocs,plot_mAP_nocs,comp
                         plot_mAP_phocal,compute_mAP_sunrgbd,plot_mAP_sunrgbd,\
                         compute_mAP_objectron,plot_mAP_objectron,compute_mAP_omni3d,plot_mAP_omni3d
 from .wild6d_utils import compute_mAP_wild6d
+from .pose_gt_index import PoseGTIndex
+from .pose_eval import (PoseEvalDataset, PoseMAPAccumulator, StageTimer,
+                        compute_pose_mAP, get_pose_eval_dataset)
 from .cppf_utils import compute_degree_cm_mAP
 from .box import *
 from .iou import *
@@ -31,5 +34,7 @@ __all__ = [
     'calc_rotation_error','calc_translation_error','eval_pose','eval_rotation_error',
     'compute_mAP','plot_mAP','compute_mAP_nocs','plot_mAP_nocs','compute_mAP_phocal','plot_mAP_phocal',
     'compute_mAP_wild6d','compute_mAP_sunrgbd','plot_mAP_sunrgbd','compute_mAP_objectron','plot_mAP_objectron',
-    'compute_mAP_omni3d','plot_mAP_omni3d' ,'compute_degree_cm_mAP'
+    'compute_mAP_omni3d','plot_mAP_omni3d' ,'compute_degree_cm_mAP',
+    'PoseEvalDataset', 'PoseMAPAccumulator', 'StageTimer', 'compute_pose_mAP',
+    'get_pose_eval_dataset', 'PoseGTIndex'
 ]
@@ -22,8 +22,8 @@ import torch
 
 import matplotlib.pyplot as plt
 import math
-from .box import Box
-from .iou import IoU
+from .depth_io import backproject, backproject_batch
+from .pose_eval import compute_pose_mAP, get_pose_eval_dataset
 
 
 typename2shapenetid = {
@@ -170,83 +170,6 @@ def prob2real(prob, max_val, num_bins, circular=False):
         return res
 
 
-def compute_3d_iou(RT_1, RT_2, scales_1, scales_2, up_sym, class_name_1, class_name_2):
-    '''Computes IoU overlaps between two 3d bboxes.
-       bbox_3d_1, bbox_3d_1: [3, 8]
-    '''
-    
-    def asymmetric_3d_iou(RT_1, RT_2, scales_1, scales_2):
-        try:
-            RT_1[:3, :3] = RT_1[:3, :3] / np.cbrt(np.linalg.det(RT_1[:3, :3]))
-            RT_2[:3, :3] = RT_2[:3, :3] / np.cbrt(np.linalg.det(RT_2[:3, :3]))
-            box1 = Box.from_transformation(RT_1[:3, :3], RT_1[:3, -1], scales_1)
-            box2 = Box.from_transformation(RT_2[:3, :3], RT_2[:3, -1], scales_2)
-            return IoU(box1, box2).iou()
-        except:
-            return 0
-
-
-    if RT_1 is None or RT_2 is None:
-        return -1
-
-    if (class_name_1 == class_name_2 and up_sym):
-        def y_rotation_matrix(theta):
-            return np.array([[np.cos(theta), 0, np.sin(theta), 0],
-                             [0, 1, 0 , 0], 
-                             [-np.sin(theta), 0, np.cos(theta), 0],
-                             [0, 0, 0 , 1]])
-
-        n = 20
-        max_iou = 0
-        for i in range(n):
-            rotated_RT_1 = RT_1 @ y_rotation_matrix(2*math.pi*i/float(n))
-            max_iou = max(max_iou, asymmetric_3d_iou(rotated_RT_1, RT_2, scales_1, scales_2))
-    else:
-        max_iou = asymmetric_3d_iou(RT_1, RT_2, scales_1, scales_2)
-    
-    
-    return max_iou
-
-
-def compute_RT_degree_cm_symmetry(RT_1, RT_2, up_sym):
-    '''
-    :param RT_1: [4, 4]. homogeneous affine transformation
-    :param RT_2: [4, 4]. homogeneous affine transformation
-    :return: theta: angle difference of R in degree, shift: l2 difference of T in centimeter
-    '''
-
-    ## make sure the last row is [0, 0, 0, 1]
-    if RT_1 is None or RT_2 is None:
-        return -1
-    try:
-        assert np.array_equal(RT_1[3, :], RT_2[3, :])
-        assert np.array_equal(RT_1[3, :], np.array([0, 0, 0, 1]))
-    except AssertionError:
-        print(RT_1[3, :], RT_2[3, :])
-        exit()
-
-    R1 = RT_1[:3, :3] / np.cbrt(np.linalg.det(RT_1[:3, :3]))
-    T1 = RT_1[:3, 3]
-
-    R2 = RT_2[:3, :3] / np.cbrt(np.linalg.det(RT_2[:3, :3]))
-    T2 = RT_2[:3, 3]
-
-    if up_sym:  ## symmetric when rotating around y-axis
-        y = np.array([0, 1, 0])
-        y1 = R1 @ y
-        y2 = R2 @ y
-        theta = np.arccos(y1.dot(y2) / (np.linalg.norm(y1) * np.linalg.norm(y2)))
-    else:
-        R = R1 @ R2.transpose()
-        theta = np.arccos((np.trace(R) - 1) / 2)
-
-    theta *= 180 / np.pi
-    shift = np.linalg.norm(T1 - T2) * 100
-    result = np.array([theta, shift])
-
-    return result
-
-
 def get_3d_bbox(scale, shift = 0):
     """
     Input: 
@@ -316,208 +239,6 @@ def calculate_2d_projections(coordinates_3d, intrinsics):
 #  Evaluation
 ############################################################
 
-def trim_zeros(x):
-    """It's common to have tensors larger than the available data and
-    pad with zeros. This function removes rows that are all zeros.
-    x: [rows, columns].
-    """
-
-    pre_shape = x.shape
-    assert len(x.shape) == 2, x.shape
-    new_x = x[~np.all(x == 0, axis=1)]
-    post_shape = new_x.shape
-    assert pre_shape[0] == post_shape[0]
-    assert pre_shape[1] == post_shape[1]
-
-    return new_x
-
-def compute_3d_matches(gt_class_ids, gt_RTs, gt_scales, gt_up_syms, synset_names,
-                       pred_boxes, pred_class_ids, pred_scores, pred_RTs, pred_scales,
-                       iou_3d_thresholds, score_threshold=0):
-    """Finds matches between prediction and ground truth instances.
-    Returns:
-        gt_matches: 2-D array. For each GT box it has the index of the matched
-                  predicted box.
-        pred_matches: 2-D array. For each predicted box, it has the index of
-                    the matched ground truth box.
-        overlaps: [pred_boxes, gt_boxes] IoU overlaps.
-    """
-    # Trim zero padding
-    # TODO: cleaner to do zero unpadding upstream
-    num_pred = len(pred_class_ids)
-    num_gt = len(gt_class_ids)
-    indices = np.zeros(0)
-    
-    if num_pred:
-        if len(pred_boxes.shape) == 2:
-            pred_boxes = trim_zeros(pred_boxes).copy()
-        pred_scores = pred_scores[:pred_boxes.shape[0]].copy()
-
-        # Sort predictions by score from high to low
-        indices = np.argsort(pred_scores)[::-1]
-        
-        pred_boxes = pred_boxes[indices].copy()
-        pred_class_ids = pred_class_ids[indices].copy()
-        pred_scores = pred_scores[indices].copy()
-        pred_scales = pred_scales[indices].copy()
-        pred_RTs = pred_RTs[indices].copy()
-
-    # Compute IoU overlaps [pred_bboxs gt_bboxs]
-    #overlaps = [[0 for j in range(num_gt)] for i in range(num_pred)]
-    overlaps = np.zeros((num_pred, num_gt), dtype=np.float32)
-    for i in range(num_pred):
-        for j in range(num_gt):
-            #overlaps[i, j] = compute_3d_iou(pred_3d_bboxs[i], gt_3d_bboxs[j], gt_handle_visibility[j], 
-            #    synset_names[pred_class_ids[i]], synset_names[gt_class_ids[j]])
-            overlaps[i, j] = compute_3d_iou(pred_RTs[i], gt_RTs[j], pred_scales[i, :], gt_scales[j], gt_up_syms[j], synset_names[pred_class_ids[i]], synset_names[gt_class_ids[j]])
-
-    # Loop through predictions and find matching ground truth boxes
-    num_iou_3d_thres = len(iou_3d_thresholds)
-    pred_matches = -1 * np.ones([num_iou_3d_thres, num_pred])
-    gt_matches = -1 * np.ones([num_iou_3d_thres, num_gt])
-
-    for s, iou_thres in enumerate(iou_3d_thresholds):
-        for i in range(len(pred_boxes)):
-            # Find best matching ground truth box
-            # 1. Sort matches by score
-            sorted_ixs = np.argsort(overlaps[i])[::-1]
-            # 2. Remove low scores
-            low_score_idx = np.where(overlaps[i, sorted_ixs] < score_threshold)[0]
-            if low_score_idx.size > 0:
-                sorted_ixs = sorted_ixs[:low_score_idx[0]]
-            # 3. Find the match
-            for j in sorted_ixs:
-                # If ground truth box is already matched, go to next one
-                #print('gt_match: ', gt_match[j])
-                if gt_matches[s, j] > -1:
-                    continue
-                # If we reach IoU smaller than the threshold, end the loop
-                iou = overlaps[i, j]
-                #print('iou: ', iou)
-                if iou < iou_thres:
-                    break
-                # Do we have a match?
-                if not pred_class_ids[i] == gt_class_ids[j]:
-                    continue
-
-                if iou > iou_thres:
-                    gt_matches[s, j] = i
-                    pred_matches[s, i] = j
-                    break
-
-    return gt_matches, pred_matches, overlaps, indices
-
-
-def compute_ap_from_matches_scores(pred_match, pred_scores, gt_match):
-    # sort the scores from high to low
-    # print(pred_match.shape, pred_scores.shape)
-    assert pred_match.shape[0] == pred_scores.shape[0]
-
-    score_indices = np.argsort(pred_scores)[::-1]
-    pred_scores = pred_scores[score_indices]
-    pred_match  = pred_match[score_indices]
-
-    precisions = np.cumsum(pred_match > -1) / (np.arange(len(pred_match)) + 1)
-    recalls = np.cumsum(pred_match > -1).astype(np.float32) / len(gt_match)
-
-    # Pad with start and end values to simplify the math
-    precisions = np.concatenate([[0], precisions, [0]])
-    recalls = np.concatenate([[0], recalls, [1]])
-
-    # Ensure precision values decrease but don't increase. This way, the
-    # precision value at each recall threshold is the maximum it can be
-    # for all following recall thresholds, as specified by the VOC paper.
-    for i in range(len(precisions) - 2, -1, -1):
-        precisions[i] = np.maximum(precisions[i], precisions[i + 1])
-
-    # Compute mean AP over recall range
-    indices = np.where(recalls[:-1] != recalls[1:])[0] + 1
-    ap = np.sum((recalls[indices] - recalls[indices - 1]) * precisions[indices])
-    return ap
-
-
-def compute_RT_overlaps(gt_class_ids, gt_RTs, gt_up_syms,
-                        pred_class_ids, pred_RTs):
-    """Finds overlaps between prediction and ground truth instances.
-    Returns:
-        overlaps: [pred_boxes, gt_boxes] IoU overlaps.
-    """
-    # print('num of gt instances: {}, num of pred instances: {}'.format(len(gt_class_ids), len(gt_class_ids)))
-    num_pred = len(pred_class_ids)
-    num_gt = len(gt_class_ids)
-
-    # Compute IoU overlaps [pred_bboxs gt_bboxs]
-    #overlaps = [[0 for j in range(num_gt)] for i in range(num_pred)]
-    overlaps = np.zeros((num_pred, num_gt, 2))
-
-    for i in range(num_pred):
-        for j in range(num_gt):
-            overlaps[i, j, :] = compute_RT_degree_cm_symmetry(pred_RTs[i], 
-                                                              gt_RTs[j], 
-                                                              gt_up_syms[j])
-            
-    return overlaps
-
-
-def compute_match_from_degree_cm(overlaps, pred_class_ids, gt_class_ids, degree_thres_list, shift_thres_list):
-    num_degree_thres = len(degree_thres_list)
-    num_shift_thres = len(shift_thres_list)
-
-
-    num_pred = len(pred_class_ids)
-    num_gt = len(gt_class_ids)
-
-    pred_matches = -1 * np.ones((num_degree_thres, num_shift_thres, num_pred))
-    gt_matches = -1 * np.ones((num_degree_thres, num_shift_thres, num_gt))
-
-    if num_pred == 0 or num_gt == 0:
-        return gt_matches, pred_matches
-
-
-    assert num_pred == overlaps.shape[0]
-    assert num_gt == overlaps.shape[1]
-    assert overlaps.shape[2] == 2
-    
-
-    for d, degree_thres in enumerate(degree_thres_list):                
-        for s, shift_thres in enumerate(shift_thres_list):
-            for i in range(num_pred):
-                # Find best matching ground truth box
-                # 1. Sort matches by scores from low to high
-                sum_degree_shift = np.sum(overlaps[i, :, :], axis=-1)
-                sorted_ixs = np.argsort(sum_degree_shift)
-                # 2. Remove low scores
-                # low_score_idx = np.where(sum_degree_shift >= 100)[0]
-                # if low_score_idx.size > 0:
-                #     sorted_ixs = sorted_ixs[:low_score_idx[0]]
-                # 3. Find the match
-                for j in sorted_ixs:
-                    # If ground truth box is already matched, go to next one
-                    #print(j, len(gt_match), len(pred_class_ids), len(gt_class_ids))
-                    if gt_matches[d, s, j] > -1 or pred_class_ids[i] != gt_class_ids[j]:
-                        continue
-                    # If we reach IoU smaller than the threshold, end the loop
-                    if overlaps[i, j, 0] > degree_thres or overlaps[i, j, 1] > shift_thres:
-                        continue
-
-                    gt_matches[d, s, j] = i
-                    pred_matches[d, s, i] = j
-                    break
-
-    return gt_matches, pred_matches
-
-
-
-
-
-
-
-
-
-############################################################
-#  Miscellaneous
-############################################################
-
 def draw(img, imgpts, axes, color):
     imgpts = np.int32(imgpts).reshape(-1, 2)
 
@@ -587,191 +308,31 @@ def draw_text(draw_image, bbox, text, draw_box=False):
     return draw_image
     
 
-def backproject(depth, intrinsics, instance_mask):
-    intrinsics_inv = np.linalg.inv(intrinsics)
-    image_shape = depth.shape
-    width = image_shape[1]
-    height = image_shape[0]
-
-    x = np.arange(width)
-    y = np.arange(height)
-
-    #non_zero_mask = np.logical_and(depth > 0, depth < 5000)
-    non_zero_mask = (depth > 0)
-    final_instance_mask = np.logical_and(instance_mask, non_zero_mask)
-    
-    idxs = np.where(final_instance_mask)
-    grid = np.array([idxs[1], idxs[0]])
-
-    # shape: height * width
-    # mesh_grid = np.meshgrid(x, y) #[height, width, 2]
-    # mesh_grid = np.reshape(mesh_grid, [2, -1])
-    length = grid.shape[1]
-    ones = np.ones([1, length])
-    uv_grid = np.concatenate((grid, ones), axis=0) # [3, num_pixel]
-
-    xyz = intrinsics_inv @ uv_grid # [3, num_pixel]
-    xyz = np.transpose(xyz) #[num_pixel, 3]
-
-    z = depth[idxs[0], idxs[1]]
-
-    # print(np.amax(z), np.amin(z))
-    pts = xyz * z[:, np.newaxis]/xyz[:, -1:]
-    pts[:, 0] = -pts[:, 0]
-    pts[:, 1] = -pts[:, 1]
-
-    return pts, idxs
-
-
-def compute_degree_cm_mAP(final_results, synset_names, log_dir, degree_thresholds=[360], shift_thresholds=[100], iou_3d_thresholds=[0.1], iou_pose_thres=0.1, use_matches_for_pose=False):
-    """Compute Average Precision at a set IoU threshold (default 0.5).
+def compute_degree_cm_mAP(final_results, synset_names, log_dir, degree_thresholds=[360], shift_thresholds=[100], iou_3d_thresholds=[0.1], iou_pose_thres=0.1, use_matches_for_pose=False,
+                          num_workers=0, timer=None):
+    """Compute 3D IoU and pose Average Precision of CPPF results.
+    The images are matched by pose_eval.compute_pose_mAP with the cppf
+    descriptor, degree_thresholds and shift_thresholds end with the 360 degree
+    and 100 cm thresholds plotted as the rotation and translation only curves.
+    num_workers: number of processes matching images in parallel
+    timer: None or pose_eval.StageTimer, times the iou_matrix, iou_matching,
+        rt_errors, rt_matching and ap_integration stages
     Returns:
-    mAP: Mean Average Precision
-    precisions: List of precisions at different class score thresholds.
-    recalls: List of recall values at different class score thresholds.
-    overlaps: [pred_boxes, gt_boxes] IoU overlaps.
+    iou_3d_aps: [num_classes + 1, num_iou_thres], the last row is the mean
+    pose_aps: [num_classes + 1, num_degree_thres, num_shift_thres]
     """
     os.makedirs(log_dir, exist_ok=True)
     
     num_classes = len(synset_names)
     degree_thres_list = list(degree_thresholds)
-    num_degree_thres = len(degree_thres_list)
-
     shift_thres_list = list(shift_thresholds)
-    num_shift_thres = len(shift_thres_list)
-
     iou_thres_list = list(iou_3d_thresholds)
-    num_iou_thres = len(iou_thres_list)
-
-    if use_matches_for_pose:
-        assert iou_pose_thres in iou_thres_list
 
-    iou_3d_aps = np.zeros((num_classes + 1, num_iou_thres))
-    iou_pred_matches_all = [np.zeros((num_iou_thres, 0)) for _ in range(num_classes)]
-    iou_pred_scores_all  = [np.zeros((num_iou_thres, 0)) for _ in range(num_classes)]
-    iou_gt_matches_all   = [np.zeros((num_iou_thres, 0)) for _ in range(num_classes)]
-    
-    pose_aps = np.zeros((num_classes + 1, num_degree_thres, num_shift_thres))
-    pose_pred_matches_all = [np.zeros((num_degree_thres, num_shift_thres, 0)) for _  in range(num_classes)]
-    pose_gt_matches_all  = [np.zeros((num_degree_thres, num_shift_thres, 0)) for _  in range(num_classes)]
-    pose_pred_scores_all = [np.zeros((num_degree_thres, num_shift_thres, 0)) for _  in range(num_classes)]
-
-    # loop over results to gather pred matches and gt matches for iou and pose metrics
-    progress = 0
-    
-    pose_gt_matches = np.full((num_degree_thres, num_shift_thres, len(final_results), 20), -1, dtype=int)
-    pose_pred_matches = np.full((num_degree_thres, num_shift_thres, len(final_results), 20), -1, dtype=int)
-    for progress, result in tqdm(enumerate(final_results), total=len(final_results)):
-        try:
-            # print(progress, len(final_results))
-            gt_class_ids = result['gt_class_ids'].astype(np.int32)
-            # normalize RTs and scales
-            gt_RTs = np.array(result['gt_RTs'])
-            gt_scales = np.array(result['gt_scales'])
-            gt_up_syms = result['gt_up_syms']
-            norm_gt_scales = np.stack([np.cbrt(np.linalg.det(gt_RT[:3, :3])) for gt_RT in gt_RTs])
-            gt_RTs[:, :3, :3] = gt_RTs[:, :3, :3] / norm_gt_scales[:, None, None]
-            gt_scales = gt_scales * norm_gt_scales[:, None]
-        
-            pred_bboxes = np.array(result['pred_bboxes'])
-            pred_class_ids = result['pred_class_ids']
-            pred_scales = result['pred_scales']
-            pred_scores = result['pred_scores']
-            pred_RTs = np.array(result['pred_RTs'])
-            pred_bboxes[...] = 1
-            if len(pred_RTs) > 0:
-                norm_pred_scales = np.stack([np.cbrt(np.linalg.det(pred_RT[:3, :3])) for pred_RT in pred_RTs])
-                pred_RTs[:, :3, :3] = pred_RTs[:, :3, :3] / (norm_pred_scales[:, None, None] + 1e-9)
-                pred_scales = pred_scales * norm_pred_scales[:, None]
-            #print(pred_bboxes.shape[0], pred_class_ids.shape[0], pred_scores.shape[0], pred_RTs.shape[0])
-
-            if len(gt_class_ids) == 0 and len(pred_class_ids) == 0:
-                continue
-
-
-            for cls_id in range(1, num_classes):
-                # get gt and predictions in this class
-                if len(gt_class_ids) > 0:
-                    gt_idx_mapping = dict([(i, j) for i, j in enumerate(np.where(gt_class_ids==cls_id)[0])])
-                else:
-                    gt_idx_mapping = dict([(i, j) for i, j in enumerate(range(20))])
-                cls_gt_class_ids = gt_class_ids[gt_class_ids==cls_id] if len(gt_class_ids) else np.zeros(0)
-                cls_gt_scales = gt_scales[gt_class_ids==cls_id] if len(gt_class_ids) else np.zeros((0, 3))
-                cls_gt_RTs = gt_RTs[gt_class_ids==cls_id] if len(gt_class_ids) else np.zeros((0, 4, 4))
-
-                if len(pred_class_ids) > 0:
-                    pred_idx_mapping = dict([(i, j) for i, j in enumerate(np.where(pred_class_ids==cls_id)[0])])
-                else:
-                    pred_idx_mapping = dict([(i, j) for i, j in enumerate(range(20))])
-                cls_pred_class_ids = pred_class_ids[pred_class_ids==cls_id] if len(pred_class_ids) else np.zeros(0)
-                cls_pred_bboxes =  pred_bboxes[pred_class_ids==cls_id] if len(pred_class_ids) else np.zeros((0, 4))
-                cls_pred_scores = pred_scores[pred_class_ids==cls_id] if len(pred_class_ids) else np.zeros(0)
-                cls_pred_RTs = pred_RTs[pred_class_ids==cls_id] if len(pred_class_ids) else np.zeros((0, 4, 4))
-                cls_pred_scales = pred_scales[pred_class_ids==cls_id] if len(pred_class_ids) else np.zeros((0, 3))
-
-                # calculate the overlap between each gt instance and pred instance
-                cls_gt_up_syms = gt_up_syms[gt_class_ids==cls_id] if len(gt_class_ids) else np.ones(0)
-
-
-                iou_cls_gt_match, iou_cls_pred_match, _, iou_pred_indices = compute_3d_matches(cls_gt_class_ids, cls_gt_RTs, cls_gt_scales, cls_gt_up_syms, synset_names,
-                                                                                            cls_pred_bboxes, cls_pred_class_ids, cls_pred_scores, cls_pred_RTs, cls_pred_scales,
-                                                                                            iou_thres_list)
-                if len(iou_pred_indices):
-                    pred_idx_mapping = dict([(i, pred_idx_mapping[j]) for i, j in enumerate(iou_pred_indices)])
-                    cls_pred_class_ids = cls_pred_class_ids[iou_pred_indices]
-                    cls_pred_RTs = cls_pred_RTs[iou_pred_indices]
-                    cls_pred_scores = cls_pred_scores[iou_pred_indices]
-                    cls_pred_bboxes = cls_pred_bboxes[iou_pred_indices]
-
-
-                iou_pred_matches_all[cls_id] = np.concatenate((iou_pred_matches_all[cls_id], iou_cls_pred_match), axis=-1)
-                cls_pred_scores_tile = np.tile(cls_pred_scores, (num_iou_thres, 1))
-                iou_pred_scores_all[cls_id] = np.concatenate((iou_pred_scores_all[cls_id], cls_pred_scores_tile), axis=-1)
-                assert iou_pred_matches_all[cls_id].shape[1] == iou_pred_scores_all[cls_id].shape[1]
-                iou_gt_matches_all[cls_id] = np.concatenate((iou_gt_matches_all[cls_id], iou_cls_gt_match), axis=-1)
-
-                if use_matches_for_pose:
-                    thres_ind = list(iou_thres_list).index(iou_pose_thres)
-
-                    iou_thres_pred_match = iou_cls_pred_match[thres_ind, :]
-
-                    if len(iou_thres_pred_match) > 0 and pred_idx_mapping is not None:
-                        pred_idx_mapping = dict([(i, pred_idx_mapping[j]) for i, j in enumerate(np.where(iou_thres_pred_match > -1)[0])])
-                    cls_pred_class_ids = cls_pred_class_ids[iou_thres_pred_match > -1] if len(iou_thres_pred_match) > 0 else np.zeros(0)
-                    cls_pred_RTs = cls_pred_RTs[iou_thres_pred_match > -1] if len(iou_thres_pred_match) > 0 else np.zeros((0, 4, 4))
-                    cls_pred_scores = cls_pred_scores[iou_thres_pred_match > -1] if len(iou_thres_pred_match) > 0 else np.zeros(0)
-                    cls_pred_bboxes = cls_pred_bboxes[iou_thres_pred_match > -1] if len(iou_thres_pred_match) > 0 else np.zeros((0, 4))
-
-                    iou_thres_gt_match = iou_cls_gt_match[thres_ind, :]
-                    
-                    if len(iou_thres_gt_match) > 0 and gt_idx_mapping is not None:
-                        gt_idx_mapping = dict([(i, gt_idx_mapping[j]) for i, j in enumerate(np.where(iou_thres_gt_match > -1)[0])])
-                    cls_gt_class_ids = cls_gt_class_ids[iou_thres_gt_match > -1] if len(iou_thres_gt_match) > 0 else np.zeros(0)
-                    cls_gt_RTs = cls_gt_RTs[iou_thres_gt_match > -1] if len(iou_thres_gt_match) > 0 else np.zeros((0, 4, 4))
-                    cls_gt_up_syms = cls_gt_up_syms[iou_thres_gt_match > -1] if len(iou_thres_gt_match) > 0 else np.zeros(0)
-                
-                RT_overlaps = compute_RT_overlaps(cls_gt_class_ids, cls_gt_RTs, cls_gt_up_syms, 
-                                                cls_pred_class_ids, cls_pred_RTs)
-
-
-                pose_cls_gt_match, pose_cls_pred_match = compute_match_from_degree_cm(RT_overlaps, 
-                                                                                    cls_pred_class_ids, 
-                                                                                    cls_gt_class_ids, 
-                                                                                    degree_thres_list, 
-                                                                                    shift_thres_list)
-                for i in range(pose_cls_pred_match.shape[2]):
-                    pose_pred_matches[:, :, progress, pred_idx_mapping[i]] = np.vectorize(lambda k: gt_idx_mapping[k] if k != -1 else -1)(pose_cls_pred_match[:, :, i])
-                for i in range(pose_cls_gt_match.shape[2]):
-                    pose_gt_matches[:, :, progress, gt_idx_mapping[i]] = np.vectorize(lambda k: pred_idx_mapping[k] if k != -1 else -1)(pose_cls_gt_match[:, :, i])
-                pose_pred_matches_all[cls_id] = np.concatenate((pose_pred_matches_all[cls_id], pose_cls_pred_match), axis=-1)
-                
-                cls_pred_scores_tile = np.tile(cls_pred_scores, (num_degree_thres, num_shift_thres, 1))
-                pose_pred_scores_all[cls_id]  = np.concatenate((pose_pred_scores_all[cls_id], cls_pred_scores_tile), axis=-1)
-                assert pose_pred_scores_all[cls_id].shape[2] == pose_pred_matches_all[cls_id].shape[2], '{} vs. {}'.format(pose_pred_scores_all[cls_id].shape, pose_pred_matches_all[cls_id].shape)
-                pose_gt_matches_all[cls_id] = np.concatenate((pose_gt_matches_all[cls_id], pose_cls_gt_match), axis=-1)
-        except:
-            continue
-    
+    dataset = get_pose_eval_dataset('cppf').replace(synset_names=synset_names, cat_names=synset_names)
+    iou_3d_aps, pose_aps, _, _ = compute_pose_mAP(final_results, None, dataset, degree_thres_list, shift_thres_list, iou_thres_list,
+                                                  iou_pose_thres, use_matches_for_pose, num_workers=num_workers, timer=timer)
+    # compute_pose_mAP appends its own 360 degree and 100 cm thresholds
+    pose_aps = pose_aps[:, :-1, :-1]
     
     # draw iou 3d AP vs. iou thresholds
     fig_iou = plt.figure()
@@ -787,13 +348,8 @@ def compute_degree_cm_mAP(final_results, synset_names, log_dir, degree_threshold
     for cls_id in range(1, num_classes):
         class_name = synset_names[cls_id]
         # print(class_name)
-        for s, iou_thres in enumerate(iou_thres_list):
-            iou_3d_aps[cls_id, s] = compute_ap_from_matches_scores(iou_pred_matches_all[cls_id][s, :],
-                                                                   iou_pred_scores_all[cls_id][s, :],
-                                                                   iou_gt_matches_all[cls_id][s, :])    
         ax_iou.plot(iou_thres_list, iou_3d_aps[cls_id, :], label=class_name)
         
-    iou_3d_aps[-1, :] = np.mean(iou_3d_aps[1:-1, :], axis=0)
     ax_iou.plot(iou_thres_list, iou_3d_aps[-1, :], label='mean')
     ax_iou.legend()
     fig_iou.savefig(iou_output_path)
@@ -817,20 +373,6 @@ def compute_degree_cm_mAP(final_results, synset_names, log_dir, degree_threshold
     pose_dict['degree_thres'] = degree_thres_list
     pose_dict['shift_thres_list'] = shift_thres_list
 
-    for i, degree_thres in enumerate(degree_thres_list):                
-        for j, shift_thres in enumerate(shift_thres_list):
-            # print(i, j)
-            for cls_id in range(1, num_classes):
-                cls_pose_pred_matches_all = pose_pred_matches_all[cls_id][i, j, :]
-                cls_pose_gt_matches_all = pose_gt_matches_all[cls_id][i, j, :]
-                cls_pose_pred_scores_all = pose_pred_scores_all[cls_id][i, j, :]
-
-                pose_aps[cls_id, i, j] = compute_ap_from_matches_scores(cls_pose_pred_matches_all, 
-                                                                        cls_pose_pred_scores_all, 
-                                                                        cls_pose_gt_matches_all)
-
-            pose_aps[-1, i, j] = np.mean(pose_aps[1:-1, i, j])
-    
     pose_dict['aps'] = pose_aps
     with open(pose_dict_pkl_path, 'wb') as f:
         pickle.dump(pose_dict, f)
@@ -907,5 +449,5 @@ def compute_degree_cm_mAP(final_results, synset_names, log_dir, degree_threshold
     fig_trans.savefig(output_path)
     plt.close(fig_trans)
 
-    return iou_3d_aps, pose_aps, pose_pred_matches, pose_gt_matches
+    return iou_3d_aps, pose_aps
 
@@ -0,0 +1,195 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+"""
+    Depth loading and back-projection shared by the RGB-D pose benchmarks
+    (NOCS, Wild6D, CPPF, CO3D).
+
+    Depth images are decoded with whole-image integer operations and can be
+    kept in a DepthCache, which stores them as uint16 ``.npy`` files that
+    are memory mapped back on later reads. The rays of the pixels are cached
+    per intrinsics and image size, so that back-projecting the instances of
+    an image only gathers and scales them.
+"""
+import hashlib
+import os
+import os.path as osp
+from functools import lru_cache
+
+import cv2
+import numpy as np
+from PIL import Image
+
+
+def decode_depth(depth):
+    """ Decode a depth image read by cv2.imread(path, -1) to uint16.
+
+    Args:
+        depth: [H, W] uint16 depth, or [H, W, 3] depth encoded in the G and
+            R channels (BGR order of opencv), where 32001 marks no depth
+
+    Returns:
+        depth16: [H, W] uint16
+
+    """
+    if depth.ndim == 3:
+        # This is encoded depth image, let's convert
+        depth16 = (depth[:, :, 1].astype(np.uint16) << 8) | depth[:, :, 2]
+        depth16[depth16 == 32001] = 0
+    elif depth.ndim == 2 and depth.dtype == 'uint16':
+        depth16 = depth
+    else:
+        assert False, '[ Error ]: Unsupported depth type.'
+    return depth16
+
+
+class DepthCache:
+    """ Decoded depth images stored as uint16 ``.npy`` files and memory
+    mapped back, so that later passes over a test set skip the png decoding.
+
+    Entries are keyed by the path, the modification time and the size of
+    the depth image and written atomically, so that concurrent workers
+    never read partial entries.
+
+    Args:
+        cache_dir: root directory of the cache
+
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def cache_file(self, depth_path):
+        stat = os.stat(depth_path)
+        key = f'{osp.abspath(depth_path)}:{stat.st_mtime_ns}:{stat.st_size}'
+        key = hashlib.sha1(key.encode()).hexdigest()
+        return osp.join(self.cache_dir, key[:2], f'{key}.npy')
+
+    def load(self, depth_path, decode=decode_depth):
+        """ Depth of depth_path, read by cv2 and decoded on a miss. """
+        cache_file = self.cache_file(depth_path)
+        if osp.exists(cache_file):
+            return np.load(cache_file, mmap_mode='r')
+        depth = decode(cv2.imread(depth_path, -1))
+        os.makedirs(osp.dirname(cache_file), exist_ok=True)
+        tmp_file = f'{cache_file}.{os.getpid()}.tmp'
+        with open(tmp_file, 'wb') as f:
+            np.save(f, np.ascontiguousarray(depth, dtype=np.uint16))
+        os.replace(tmp_file, cache_file)
+        return depth
+
+
+def load_depth(img_path, depth_cache=None):
+    """ Load depth image from img_path.
+
+    Args:
+        img_path: path of the image, without the '_depth.png' suffix
+        depth_cache: None or DepthCache, memory maps the decoded depth
+
+    Returns:
+        depth16: [H, W] uint16, read-only if memory mapped
+
+    """
+    depth_path = img_path + '_depth.png'
+    if depth_cache is not None:
+        return depth_cache.load(depth_path)
+    return decode_depth(cv2.imread(depth_path, -1))
+
+
+def _load_16big_png_depth(depth_png):
+    # the image is stored with 16-bit depth, reinterpreted as float16, then
+    # cast to float32
+    depth = cv2.imread(depth_png, cv2.IMREAD_UNCHANGED)
+    if depth is None or depth.dtype != np.uint16 or depth.ndim != 2:
+        with Image.open(depth_png) as depth_pil:
+            depth = np.array(depth_pil, dtype=np.uint16)
+    return np.ascontiguousarray(depth).view(np.float16).astype(np.float32)
+
+
+def load_depth_co3d(path, scale_adjustment):
+    if not path.lower().endswith(".jpg.geometric.png"):
+        raise ValueError('unsupported depth file name "%s"' % path)
+
+    d = _load_16big_png_depth(path) * scale_adjustment
+    d[~np.isfinite(d)] = 0.0
+    return d  # fake feature channel
+
+
+@lru_cache(maxsize=16)
+def _get_ray_grid(intrinsics, height, width):
+    intrinsics_inv = np.linalg.inv(np.array(intrinsics).reshape(3, 3))
+    u, v = np.meshgrid(np.arange(width), np.arange(height))
+    uv_grid = np.stack((u, v, np.ones_like(u)), axis=-1).astype(np.float64)
+    xyz = uv_grid @ intrinsics_inv.T
+    rays = xyz / xyz[..., -1:]
+    rays[..., :2] = -rays[..., :2]
+    rays.setflags(write=False)
+    return rays
+
+
+def get_ray_grid(intrinsics, image_shape):
+    """ Rays of the pixels, with z = 1 and x, y flipped as by backproject.
+
+    Cached per intrinsics and image size.
+
+    Args:
+        intrinsics: [3, 3]
+        image_shape: (height, width, ...)
+
+    Returns:
+        rays: [H, W, 3] read-only
+
+    """
+    intrinsics = tuple(
+        np.asarray(intrinsics, dtype=np.float64).ravel().tolist())
+    return _get_ray_grid(intrinsics, int(image_shape[0]), int(image_shape[1]))
+
+
+def backproject(depth, intrinsics, instance_mask):
+    """ Back-project the pixels of an instance with a valid depth.
+
+    Args:
+        depth: [H, W]
+        intrinsics: [3, 3]
+        instance_mask: [H, W] bool
+
+    Returns:
+        pts: [num_pixel, 3]
+        idxs: (rows, cols) of the pixels
+
+    """
+    pts, rows, cols, _ = _backproject_flat(depth, intrinsics, instance_mask)
+    return pts, (rows, cols)
+
+
+def _backproject_flat(depth, intrinsics, instance_masks):
+    # the pixels of the masks first, the depth of these pixels only then
+    height, width = depth.shape[:2]
+    depth = depth.ravel()
+    pixels = np.flatnonzero(instance_masks)
+    pixels = pixels[depth[pixels % depth.size] > 0]
+    inst_ids, pixels = np.divmod(pixels, depth.size)
+    rows, cols = np.divmod(pixels, width)
+    rays = get_ray_grid(intrinsics, (height, width)).reshape(-1, 3)
+    pts = rays[pixels] * depth[pixels][:, np.newaxis]
+    return pts, rows, cols, inst_ids
+
+
+def backproject_batch(depth, intrinsics, instance_masks):
+    """ Back-project the pixels of many instances of an image at once.
+
+    Args:
+        depth: [H, W]
+        intrinsics: [3, 3]
+        instance_masks: [N, H, W] bool
+
+    Returns:
+        list of (pts, idxs) of each instance, as returned by backproject
+
+    """
+    instance_masks = np.asarray(instance_masks, dtype=bool)
+    pts, rows, cols, inst_ids = _backproject_flat(depth, intrinsics,
+                                                  instance_masks)
+    num_pixels = np.bincount(inst_ids, minlength=len(instance_masks))
+    splits = np.cumsum(num_pixels)[:-1]
+    pts, rows, cols = [np.split(x, splits) for x in (pts, rows, cols)]
+    return [(inst_pts, (inst_rows, inst_cols))
+            for inst_pts, inst_rows, inst_cols in zip(pts, rows, cols)]
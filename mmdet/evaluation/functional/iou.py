@@ -8,14 +8,37 @@ from . import box as Box
 
 import torch
 import torch.nn.functional as F
-# from pytorch3d import _C
-# from pytorch3d.ops.iou_box3d import _box_planes, _box_triangles
 
 _PLANE_THICKNESS_EPSILON = 0.000001
 _POINT_IN_FRONT_OF_PLANE = 1
 _POINT_ON_PLANE = 0
 _POINT_BEHIND_PLANE = -1
 
+# faces of a box given by the 8 corners in the order of omni3d_box3d_overlap,
+# the vertices of each plane are listed along its boundary (as in pytorch3d)
+_box_planes = [
+    [0, 1, 2, 3],
+    [3, 2, 6, 7],
+    [0, 1, 5, 4],
+    [0, 3, 7, 4],
+    [1, 2, 6, 5],
+    [4, 5, 6, 7],
+]
+_box_triangles = [
+    [0, 1, 2],
+    [0, 3, 2],
+    [4, 5, 6],
+    [4, 6, 7],
+    [1, 5, 6],
+    [1, 6, 2],
+    [0, 4, 7],
+    [0, 7, 3],
+    [3, 2, 6],
+    [3, 6, 7],
+    [0, 1, 5],
+    [0, 4, 5],
+]
+
 
 class IoU(object):
     """General Intersection Over Union cost for Oriented 3D bounding boxes."""
@@ -310,7 +333,7 @@ def omni3d_box3d_overlap(
     invalid_coplanar = ~_check_coplanar(boxes_dt, eps=eps_coplanar)
     invalid_nonzero  = ~_check_nonzero(boxes_dt, eps=eps_nonzero)
 
-    ious = _C.iou_box3d(boxes_dt, boxes_gt)[1]
+    ious = box3d_overlap_batch(boxes_dt, boxes_gt)
 
     # Offending boxes are set to zero IoU
     if invalid_coplanar.any():
@@ -321,4 +344,132 @@ def omni3d_box3d_overlap(
         ious[invalid_nonzero] = 0
         print('Warning: skipping {:d} zero volume boxes at eval.'.format(int(invalid_nonzero.float().sum())))
 
-    return ious
\ No newline at end of file
+    return ious
+
+
+def _box_faces(boxes):
+    """Face polygons [B, 6, 4, 3], outward unit normals [B, 6, 3] and plane
+    offsets [B, 6] of boxes given by their corners [B, 8, 3]."""
+    planes = torch.tensor(_box_planes, dtype=torch.int64, device=boxes.device)
+    faces = boxes[:, planes]
+    v0, v1, _, v3 = faces.unbind(2)
+    normals = F.normalize(torch.cross(v1 - v0, v3 - v0, dim=-1), dim=-1)
+    # flip the normals pointing inward
+    outward = ((faces.mean(2) - boxes.mean(1, keepdim=True)) * normals).sum(-1)
+    normals = torch.where(outward[..., None] < 0, -normals, normals)
+    offsets = (normals * v0).sum(-1)
+    return faces, normals, offsets
+
+
+def _clip_polygons(polys, normals, offsets, eps):
+    """Clips convex polygons with half spaces using the Sutherland-Hodgman
+    algorithm, see IoU._clip_poly.
+
+    Args:
+        polys: [P, K, 3] vertices along the boundary of each polygon. Shorter
+            polygons repeat their last vertex, empty ones are all zero.
+        normals: [P, 3] outward normals of the half spaces
+        offsets: [P] the half spaces are normals . x <= offsets, vertices
+            closer than ``eps`` to a plane are kept as they are
+
+    Returns:
+        clipped polygons [P, K + 1, 3] in the same layout
+    """
+    num_verts = polys.shape[1]
+    dist = (polys * normals[:, None]).sum(-1) - offsets[:, None]
+    inside = dist <= eps
+    next_polys = polys.roll(-1, 1)
+    next_dist = dist.roll(-1, 1)
+    crossing = inside != next_dist.le(eps)
+    denom = torch.where(crossing, dist - next_dist, torch.ones_like(dist))
+    alpha = torch.where(crossing, dist / denom, torch.zeros_like(dist))
+    alpha = alpha.clamp(0, 1)
+    intersections = polys + alpha[..., None] * (next_polys - polys)
+
+    # each vertex emits itself if it is inside and the intersection of its
+    # outgoing edge if the edge crosses the plane, a convex polygon gains at
+    # most one vertex
+    candidates = torch.stack([polys, intersections], 2).flatten(1, 2)
+    valid = torch.stack([inside, crossing], 2).flatten(1, 2)
+    order = torch.sort((~valid).to(torch.uint8), dim=1, stable=True)[1]
+    num_valid = valid.sum(1, keepdim=True)
+    slots = torch.arange(num_verts + 1, device=polys.device)[None]
+    order = order.gather(1, torch.minimum(slots, (num_valid - 1).clamp(min=0)))
+    clipped = candidates.gather(1, order[..., None].expand(-1, -1, 3))
+    return clipped * (num_valid > 0)[..., None]
+
+
+def _clipped_face_volumes(faces, normals, offsets, planes_normals,
+                          planes_offsets, origins, eps):
+    """Signed volumes of the cones from ``origins`` to the faces of the first
+    boxes clipped by the half spaces of the second boxes, for [P] pairs."""
+    num_pairs = faces.shape[0]
+    polys = faces.flatten(0, 1)
+    for plane in range(6):
+        polys = _clip_polygons(
+            polys, planes_normals[:, None, plane].expand(-1, 6, -1).flatten(0, 1),
+            planes_offsets[:, None, plane].expand(-1, 6).flatten(0, 1), eps)
+    polys = polys.view(num_pairs, 6, -1, 3)
+    vector_areas = torch.cross(polys, polys.roll(-1, 2), dim=-1).sum(2) / 2
+    areas = (vector_areas * normals).sum(-1).abs()
+    heights = offsets - (normals * origins[:, None]).sum(-1)
+    return areas * heights / 3
+
+
+def box3d_overlap_batch(boxes_1, boxes_2, eps=_PLANE_THICKNESS_EPSILON,
+                        chunk_size=4096):
+    """Exact IoU of oriented 3D bboxes, batched over all pairs.
+
+    The intersection of two boxes is a convex polytope whose faces are the
+    faces of each box clipped by the 6 half spaces of the other one, its
+    volume is the sum of the cones from a reference point to those faces.
+    Faces of the second box lying on a face of the first one with the same
+    orientation are only counted once. Only pairs whose axis aligned bounds
+    overlap are evaluated, ``chunk_size`` pairs at a time.
+
+    Args:
+        boxes_1: tensor of shape (N, 8, 3), corners ordered as in
+            omni3d_box3d_overlap
+        boxes_2: tensor of shape (M, 8, 3)
+        eps: tolerance of the plane tests
+        chunk_size: number of pairs evaluated together
+
+    Returns:
+        iou: (N, M) tensor
+    """
+    num_1, num_2 = boxes_1.shape[0], boxes_2.shape[0]
+    ious = boxes_1.new_zeros((num_1, num_2))
+    if num_1 == 0 or num_2 == 0:
+        return ious
+
+    faces_1, normals_1, offsets_1 = _box_faces(boxes_1)
+    faces_2, normals_2, offsets_2 = _box_faces(boxes_2)
+    volumes_1 = torch.linalg.det(boxes_1[:, [1, 3, 4]] - boxes_1[:, :1]).abs()
+    volumes_2 = torch.linalg.det(boxes_2[:, [1, 3, 4]] - boxes_2[:, :1]).abs()
+
+    min_1, max_1 = boxes_1.amin(1), boxes_1.amax(1)
+    min_2, max_2 = boxes_2.amin(1), boxes_2.amax(1)
+    candidates = ((min_1[:, None] <= max_2[None] + eps) &
+                  (min_2[None] <= max_1[:, None] + eps)).all(-1)
+    idx_1, idx_2 = candidates.nonzero(as_tuple=True)
+
+    for start in range(0, len(idx_1), chunk_size):
+        i = idx_1[start:start + chunk_size]
+        j = idx_2[start:start + chunk_size]
+        origins = boxes_1[i].mean(1)
+        volumes = _clipped_face_volumes(
+            faces_1[i], normals_1[i], offsets_1[i], normals_2[j],
+            offsets_2[j], origins, eps)
+        volumes_2_in_1 = _clipped_face_volumes(
+            faces_2[j], normals_2[j], offsets_2[j], normals_1[i],
+            offsets_1[i], origins, eps)
+        # faces of box 2 on a face of box 1 are already counted
+        coplanar = (((normals_2[j][:, :, None] * normals_1[i][:, None]).sum(-1)
+                     > 1 - eps) &
+                    ((offsets_2[j][:, :, None] - offsets_1[i][:, None]).abs()
+                     <= eps)).any(-1)
+        volumes_2_in_1 = volumes_2_in_1.masked_fill(coplanar, 0)
+        intersections = (volumes.sum(-1) + volumes_2_in_1.sum(-1)).clamp(min=0)
+        unions = volumes_1[i] + volumes_2[j] - intersections
+        ious[i, j] = intersections / unions
+    return ious
@@ -0,0 +1,166 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+"""
+    Mesh loading shared by the pose benchmarks, e.g. for the object models
+    of NOCS and Wild6D.
+
+    OBJ files are parsed with bulk NumPy conversions. The parsed vertices,
+    faces and face areas are saved in a binary ``.npz`` sidecar next to the
+    OBJ file, valid as long as the modification time and the size of the OBJ
+    file match, and kept in memory for the rest of the process.
+"""
+import os
+import os.path as osp
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+from .point_sampling import sample_points_from_mesh_arrays
+
+Mesh = namedtuple('Mesh', ['vertices', 'faces', 'face_areas'])
+
+SPHERE_TEMPLATE = 'assets/sphere_mesh_template.obj'
+
+
+def parse_obj(path_to_file):
+    """ Parse the vertices and the faces of an obj file.
+
+    Args:
+        path_to_file: path
+
+    Returns:
+        vertices: [V, 3] ndarray
+        faces: [F, 3] ndarray, index of triangle vertices
+
+    """
+    with open(path_to_file, 'r') as f:
+        lines = f.read().splitlines()
+    vertex_lines = [line[2:] for line in lines if line[:2] == 'v ']
+    face_lines = [line[1:] for line in lines if line[:1] == 'f']
+
+    vertices = np.array(' '.join(vertex_lines).split(), dtype=np.float64)
+    if vertex_lines:
+        vertices = vertices.reshape(len(vertex_lines), -1)
+    else:
+        vertices = np.zeros((0, 3))
+    # vertex indices only, drop the texture and normal indices of v/vt/vn
+    face_text = ' '.join(face_lines)
+    if '/' in face_text:
+        faces = [idx.split('/')[0] for idx in face_text.split()]
+    else:
+        faces = face_text.split()
+    faces = np.array(faces, dtype=np.int64)
+    if face_lines:
+        faces = faces.reshape(len(face_lines), -1) - 1
+    else:
+        faces = np.zeros((0, 3), dtype=np.int64)
+    return vertices, faces
+
+
+def get_face_areas(vertices, faces):
+    """ Area of each triangle of a mesh. Returns [F] """
+    faces = vertices[faces]
+    vec_cross = np.cross(faces[:, 1, :] - faces[:, 0, :],
+                         faces[:, 2, :] - faces[:, 0, :])
+    return 0.5 * np.linalg.norm(vec_cross, axis=1)
+
+
+def get_mesh_cache_file(path_to_file):
+    """ Path of the binary sidecar of an obj file. """
+    return path_to_file + '.npz'
+
+
+@lru_cache(maxsize=256)
+def _load_mesh(path_to_file, mtime_ns, size, cache):
+    cache_file = get_mesh_cache_file(path_to_file)
+    mesh = None
+    if cache and osp.exists(cache_file):
+        with np.load(cache_file) as data:
+            if int(data['mtime_ns']) == mtime_ns and int(data['size']) == size:
+                mesh = Mesh(data['vertices'], data['faces'],
+                            data['face_areas'])
+    if mesh is None:
+        vertices, faces = parse_obj(path_to_file)
+        mesh = Mesh(vertices, faces, get_face_areas(vertices, faces))
+        if cache:
+            # written atomically, the directory may also be read-only
+            tmp_file = f'{cache_file}.{os.getpid()}.tmp.npz'
+            try:
+                np.savez(
+                    tmp_file, mtime_ns=mtime_ns, size=size, **mesh._asdict())
+                os.replace(tmp_file, cache_file)
+            except OSError:
+                if osp.exists(tmp_file):
+                    os.remove(tmp_file)
+    # shared by all the callers
+    for array in mesh:
+        array.setflags(write=False)
+    return mesh
+
+
+def load_mesh(path_to_file, cache=True):
+    """ Load an obj file, from its binary sidecar or memory if up to date.
+
+    Args:
+        path_to_file: path
+        cache: whether to read and write the binary sidecar
+
+    Returns:
+        Mesh: read-only vertices [V, 3], faces [F, 3] and face_areas [F]
+
+    """
+    path_to_file = osp.abspath(path_to_file)
+    stat = os.stat(path_to_file)
+    return _load_mesh(path_to_file, stat.st_mtime_ns, stat.st_size, cache)
+
+
+def load_obj(path_to_file):
+    """ Load obj file.
+
+    Args:
+        path_to_file: path
+
+    Returns:
+        vertices: ndarray
+        faces: ndarray, index of triangle vertices
+
+    """
+    mesh = load_mesh(path_to_file)
+    return mesh.vertices, mesh.faces
+
+
+def create_sphere():
+    # 642 verts, 1280 faces,
+    verts, faces = load_obj(SPHERE_TEMPLATE)
+    return verts, faces
+
+
+def sample_points_from_mesh(path,
+                            n_pts,
+                            with_normal=False,
+                            fps=False,
+                            ratio=2):
+    """ Uniformly sampling points from mesh model.
+
+    Args:
+        path: path to OBJ file.
+        n_pts: int, number of points being sampled.
+        with_normal: return points with normal, approximated by mesh
+            triangle normal
+        fps: whether to use fps for post-processing, default False.
+        ratio: int, if use fps, sample ratio*n_pts first, then use fps to
+            sample final output.
+
+    Returns:
+        points: n_pts x 3, n_pts x 6 if with_normal = True
+
+    """
+    mesh = load_mesh(path)
+    return sample_points_from_mesh_arrays(
+        mesh.vertices,
+        mesh.faces,
+        n_pts,
+        with_normal,
+        fps,
+        ratio,
+        face_areas=mesh.face_areas)
@@ -13,6 +13,13 @@ from tqdm import tqdm
 from .box import Box
 from .iou import IoU
 from .iou import omni3d_box3d_overlap
+from .depth_io import load_depth
+from .mesh_io import create_sphere, load_obj, sample_points_from_mesh
+from .point_sampling import (farthest_point_sampling, pairwise_distance, random_point,
+                             uniform_sample)
+from .pose_eval import (compute_3d_IoU_batch, compute_IoU_matches_from_overlaps, compute_pose_mAP,
+                        compute_RT_errors_batch, compute_RT_matches, get_pose_eval_dataset, get_symmetry_flags)
+from .pose_vis import ImageWriter, draw_bboxes, draw_detections
 import torch
 
 
@@ -29,150 +36,6 @@ def setup_logger(logger_name, log_file, level=logging.INFO):
     return logger
 
 
-def load_obj(path_to_file):
-    """ Load obj file.
-
-    Args:
-        path_to_file: path
-
-    Returns:
-        vertices: ndarray
-        faces: ndarray, index of triangle vertices
-
-    """
-    vertices = []
-    faces = []
-    with open(path_to_file, 'r') as f:
-        for line in f:
-            if line[:2] == 'v ':
-                vertex = line[2:].strip().split(' ')
-                vertex = [float(xyz) for xyz in vertex]
-                vertices.append(vertex)
-            elif line[0] == 'f':
-                face = line[1:].replace('//', '/').strip().split(' ')
-                face = [int(idx.split('/')[0])-1 for idx in face]
-                faces.append(face)
-            else:
-                continue
-    vertices = np.asarray(vertices)
-    faces = np.asarray(faces)
-    return vertices, faces
-
-
-def create_sphere():
-    # 642 verts, 1280 faces,
-    verts, faces = load_obj('assets/sphere_mesh_template.obj')
-    return verts, faces
-
-
-def random_point(face_vertices):
-    """ Sampling point using Barycentric coordiante.
-
-    """
-    r1, r2 = np.random.random(2)
-    sqrt_r1 = np.sqrt(r1)
-    point = (1 - sqrt_r1) * face_vertices[0, :] + \
-        sqrt_r1 * (1 - r2) * face_vertices[1, :] + \
-        sqrt_r1 * r2 * face_vertices[2, :]
-
-    return point
-
-
-def pairwise_distance(A, B):
-    """ Compute pairwise distance of two point clouds.point
-
-    Args:
-        A: n x 3 numpy array
-        B: m x 3 numpy array
-
-    Return:
-        C: n x m numpy array
-
-    """
-    diff = A[:, :, None] - B[:, :, None].T
-    C = np.sqrt(np.sum(diff**2, axis=1))
-
-    return C
-
-
-def uniform_sample(vertices, faces, n_samples, with_normal=False):
-    """ Sampling points according to the area of mesh surface.
-
-    """
-    sampled_points = np.zeros((n_samples, 3), dtype=float)
-    normals = np.zeros((n_samples, 3), dtype=float)
-    faces = vertices[faces]
-    vec_cross = np.cross(faces[:, 1, :] - faces[:, 0, :],
-                         faces[:, 2, :] - faces[:, 0, :])
-    face_area = 0.5 * np.linalg.norm(vec_cross, axis=1)
-    cum_area = np.cumsum(face_area)
-    for i in range(n_samples):
-        face_id = np.searchsorted(cum_area, np.random.random() * cum_area[-1])
-        sampled_points[i] = random_point(faces[face_id, :, :])
-        normals[i] = vec_cross[face_id]
-    normals = normals / np.linalg.norm(normals, axis=1, keepdims=True)
-    if with_normal:
-        sampled_points = np.concatenate((sampled_points, normals), axis=1)
-    return sampled_points
-
-
-def farthest_point_sampling(points, n_samples):
-    """ Farthest point sampling.
-
-    """
-    selected_pts = np.zeros((n_samples,), dtype=int)
-    dist_mat = pairwise_distance(points, points)
-    # start from first point
-    pt_idx = 0
-    dist_to_set = dist_mat[:, pt_idx]
-    for i in range(n_samples):
-        selected_pts[i] = pt_idx
-        dist_to_set = np.minimum(dist_to_set, dist_mat[:, pt_idx])
-        pt_idx = np.argmax(dist_to_set)
-    return selected_pts
-
-
-def sample_points_from_mesh(path, n_pts, with_normal=False, fps=False, ratio=2):
-    """ Uniformly sampling points from mesh model.
-
-    Args:
-        path: path to OBJ file.
-        n_pts: int, number of points being sampled.
-        with_normal: return points with normal, approximated by mesh triangle normal
-        fps: whether to use fps for post-processing, default False.
-        ratio: int, if use fps, sample ratio*n_pts first, then use fps to sample final output.
-
-    Returns:
-        points: n_pts x 3, n_pts x 6 if with_normal = True
-
-    """
-    vertices, faces = load_obj(path)
-    if fps:
-        points = uniform_sample(vertices, faces, ratio*n_pts, with_normal)
-        pts_idx = farthest_point_sampling(points[:, :3], n_pts)
-        points = points[pts_idx]
-    else:
-        points = uniform_sample(vertices, faces, n_pts, with_normal)
-    return points
-
-
-def load_depth(img_path):
-    """ Load depth image from img_path. """
-    depth_path = img_path + '_depth.png'
-    depth = cv2.imread(depth_path, -1)
-    if len(depth.shape) == 3:
-        # This is encoded depth image, let's convert
-        # NOTE: RGB is actually BGR in opencv
-        depth16 = depth[:, :, 1]*256 + depth[:, :, 2]
-        depth16 = np.where(depth16==32001, 0, depth16)
-        depth16 = depth16.astype(np.uint16)
-    elif len(depth.shape) == 2 and depth.dtype == 'uint16':
-        depth16 = depth
-    else:
-        assert False, '[ Error ]: Unsupported depth type.'
-    return depth16
-
-
 def get_bbox(bbox):
     """ Compute square image crop window. """
     y1, x1, y2, x2 = bbox
@@ -394,39 +257,13 @@ def compute_IoU_matches(gt_class_ids, gt_sRT, gt_size, gt_handle_visibility,
         pred_sRT = pred_sRT[indices].copy()
     # compute IoU overlaps [pred_bboxs gt_bboxs]
     overlaps = np.zeros((num_pred, num_gt), dtype=np.float32)
-    for i in range(num_pred):
-        for j in range(num_gt):
-            overlaps[i, j] = compute_3d_IoU(pred_sRT[i], gt_sRT[j], pred_size[i, :], gt_size[j],
-                synset_names[pred_class_ids[i]], synset_names[gt_class_ids[j]], gt_handle_visibility[j])
+    if num_pred and num_gt:
+        gt_symmetric = get_symmetry_flags(gt_class_ids, gt_handle_visibility, synset_names)
+        symmetric = (np.asarray(pred_class_ids)[:, None] == np.asarray(gt_class_ids)[None, :]) & gt_symmetric[None, :]
+        overlaps[:] = compute_3d_IoU_batch(pred_sRT, gt_sRT, pred_size, gt_size, symmetric)
     # loop through predictions and find matching ground truth boxes
-    num_iou_3d_thres = len(iou_3d_thresholds)
-    pred_matches = -1 * np.ones([num_iou_3d_thres, num_pred])
-    gt_matches = -1 * np.ones([num_iou_3d_thres, num_gt])
-    for s, iou_thres in enumerate(iou_3d_thresholds):
-        for i in range(indices.shape[0]):
-            # Find best matching ground truth box
-            # 1. Sort matches by score
-            sorted_ixs = np.argsort(overlaps[i])[::-1]
-            # 2. Remove low scores
-            low_score_idx = np.where(overlaps[i, sorted_ixs] < score_threshold)[0]
-            if low_score_idx.size > 0:
-                sorted_ixs = sorted_ixs[:low_score_idx[0]]
-            # 3. Find the match
-            for j in sorted_ixs:
-                # If ground truth box is already matched, go to next one
-                if gt_matches[s, j] > -1:
-                    continue
-                # If we reach IoU smaller than the threshold, end the loop
-                iou = overlaps[i, j]
-                if iou < iou_thres:
-                    break
-                # Do we have a match?
-                if not pred_class_ids[i] == gt_class_ids[j]:
-                    continue
-                if iou > iou_thres:
-                    gt_matches[s, j] = i
-                    pred_matches[s, i] = j
-                    break
+    gt_matches, pred_matches = compute_IoU_matches_from_overlaps(overlaps, pred_class_ids, gt_class_ids,
+                                                                 iou_3d_thresholds, score_threshold)
     return gt_matches, pred_matches, overlaps, indices
 
 
@@ -439,16 +276,18 @@ def compute_RT_errors(sRT_1, sRT_2, class_id, handle_visibility, synset_names):
     Returns:
         theta: angle difference of R in degree
         shift: l2 difference of T in centimeter
+
+    Raises:
+        ValueError: if the last row of a transformation is not [0, 0, 0, 1]
     """
     # make sure the last row is [0, 0, 0, 1]
     if sRT_1 is None or sRT_2 is None:
         return -1
-    try:
-        assert np.array_equal(sRT_1[3, :], sRT_2[3, :])
-        assert np.array_equal(sRT_1[3, :], np.array([0, 0, 0, 1]))
-    except AssertionError:
-        print(sRT_1[3, :], sRT_2[3, :])
-        exit()
+    if not (np.array_equal(sRT_1[3, :], [0, 0, 0, 1])
+            and np.array_equal(sRT_2[3, :], [0, 0, 0, 1])):
+        raise ValueError('the last row of the transformations must be '
+                         f'[0, 0, 0, 1], got {sRT_1[3, :].tolist()} and '
+                         f'{sRT_2[3, :].tolist()}')
 
     R1 = sRT_1[:3, :3] / np.cbrt(np.linalg.det(sRT_1[:3, :3]))
     T1 = sRT_1[:3, 3]
@@ -476,56 +315,16 @@ def compute_RT_overlaps(gt_class_ids, gt_sRT, gt_handle_visibility, pred_class_i
     """ Finds overlaps between prediction and ground truth instances.
 
     Returns:
-        overlaps:
+        overlaps: [num_pred, num_gt, 2], degree and cm errors
 
     """
     num_pred = len(pred_class_ids)
     num_gt = len(gt_class_ids)
-    overlaps = np.zeros((num_pred, num_gt, 2))
-
-    for i in range(num_pred):
-        for j in range(num_gt):
-            overlaps[i, j, :] = compute_RT_errors(pred_sRT[i], gt_sRT[j], gt_class_ids[j],
-                                                  gt_handle_visibility[j], synset_names)
-    return overlaps
-
-
-def compute_RT_matches(overlaps, pred_class_ids, gt_class_ids, degree_thres_list, shift_thres_list):
-    num_degree_thres = len(degree_thres_list)
-    num_shift_thres = len(shift_thres_list)
-    num_pred = len(pred_class_ids)
-    num_gt = len(gt_class_ids)
-
-    pred_matches = -1 * np.ones((num_degree_thres, num_shift_thres, num_pred))
-    gt_matches = -1 * np.ones((num_degree_thres, num_shift_thres, num_gt))
-
     if num_pred == 0 or num_gt == 0:
-        return gt_matches, pred_matches
-
-    assert num_pred == overlaps.shape[0]
-    assert num_gt == overlaps.shape[1]
-    assert overlaps.shape[2] == 2
-
-    for d, degree_thres in enumerate(degree_thres_list):
-        for s, shift_thres in enumerate(shift_thres_list):
-            for i in range(num_pred):
-                # Find best matching ground truth box
-                # 1. Sort matches by scores from low to high
-                sum_degree_shift = np.sum(overlaps[i, :, :], axis=-1)
-                sorted_ixs = np.argsort(sum_degree_shift)
-                # 2. Find the match
-                for j in sorted_ixs:
-                    # If ground truth box is already matched, go to next one
-                    if gt_matches[d, s, j] > -1 or pred_class_ids[i] != gt_class_ids[j]:
-                        continue
-                    # If we reach IoU smaller than the threshold, end the loop
-                    if overlaps[i, j, 0] > degree_thres or overlaps[i, j, 1] > shift_thres:
-                        continue
-                    gt_matches[d, s, j] = i
-                    pred_matches[d, s, i] = j
-                    break
-
-    return gt_matches, pred_matches
+        return np.zeros((num_pred, num_gt, 2))
+    gt_symmetric = get_symmetry_flags(gt_class_ids, gt_handle_visibility, synset_names)
+    overlaps = compute_RT_errors_batch(pred_sRT, gt_sRT, gt_symmetric)
+    return overlaps
 
 
 def compute_ap_and_acc(pred_matches, pred_scores, gt_matches):
@@ -554,8 +353,12 @@ def compute_ap_and_acc(pred_matches, pred_scores, gt_matches):
 
 
 def compute_mAP(pred_results, out_dir, degree_thresholds=[180], shift_thresholds=[100],
-                iou_3d_thresholds=[0.1], iou_pose_thres=0.1, use_matches_for_pose=False):
-    """ Compute mean Average Precision.
+                iou_3d_thresholds=[0.1], iou_pose_thres=0.1, use_matches_for_pose=False, num_workers=0):
+    """ Compute mean Average Precision on PhoCAL, see pose_eval.compute_pose_mAP.
+
+    Args:
+        num_workers: number of processes matching images in parallel,
+            0 evaluates in the main process.
 
     Returns:
         iou_aps:
@@ -564,169 +367,8 @@ def compute_mAP(pred_results, out_dir, degree_thresholds=[180], shift_thresholds
         pose_acc:
 
     """
-    #synset_names = ['BG', 'bottle', 'bowl', 'camera', 'can', 'laptop', 'mug'] #for nocs
-    synset_names = ['BG', 'bottle', 'box', 'can', 'cup', 'remote', 'teapot', 'cutlery', 'glass'] #on phocal
-    #synset_names = ['BG', 'bottle', 'box', 'remote', 'teapot', 'glass'] #my split
-    num_classes = len(synset_names)
-    degree_thres_list = list(degree_thresholds) + [360]
-    num_degree_thres = len(degree_thres_list)
-    shift_thres_list = list(shift_thresholds) + [100]
-    num_shift_thres = len(shift_thres_list)
-    iou_thres_list = list(iou_3d_thresholds)
-    num_iou_thres = len(iou_thres_list)
-
-    if use_matches_for_pose:
-        assert iou_pose_thres in iou_thres_list
-
-    # pre-allocate more than enough memory
-    iou_aps = np.zeros((num_classes + 1, num_iou_thres))
-    iou_acc = np.zeros((num_classes + 1, num_iou_thres))
-    iou_pred_matches_all = [np.zeros((num_iou_thres, 30000)) for _ in range(num_classes)]
-    iou_pred_scores_all = [np.zeros((num_iou_thres, 30000)) for _ in range(num_classes)]
-    iou_gt_matches_all = [np.zeros((num_iou_thres, 30000)) for _ in range(num_classes)]
-    iou_pred_count = [0 for _ in range(num_classes)]
-    iou_gt_count = [0 for _ in range(num_classes)]
-
-    pose_aps = np.zeros((num_classes + 1, num_degree_thres, num_shift_thres))
-    pose_acc = np.zeros((num_classes + 1, num_degree_thres, num_shift_thres))
-    pose_pred_matches_all = [np.zeros((num_degree_thres, num_shift_thres, 30000)) for _ in range(num_classes)]
-    pose_pred_scores_all = [np.zeros((num_degree_thres, num_shift_thres, 30000)) for _ in range(num_classes)]
-    pose_gt_matches_all = [np.zeros((num_degree_thres, num_shift_thres, 30000)) for _ in range(num_classes)]
-    pose_pred_count = [0 for _ in range(num_classes)]
-    pose_gt_count = [0 for _ in range(num_classes)]
-
-    # loop over results to gather pred matches and gt matches for iou and pose metrics
-    progress = 0
-    for progress, result in enumerate(tqdm(pred_results)):
-        gt_class_ids = result['gt_class_ids'].astype(np.int32) #和synset对齐
-        gt_sRT = np.array(result['gt_RTs'])
-        gt_size = np.array(result['gt_scales'])
-        gt_handle_visibility = result['gt_handle_visibility']
-
-        pred_class_ids = result['pred_class_ids']
-        pred_sRT = np.array(result['pred_RTs'])
-        pred_size = result['pred_scales']
-        pred_scores = result['pred_scores']
-
-        if len(gt_class_ids) == 0 and len(pred_class_ids) == 0:
-            continue
-        else:
-            gt_class_ids=np.array([class_id+1 for class_id in gt_class_ids]).astype(np.int32)
-            pred_class_ids=np.array([class_id+1 for class_id in pred_class_ids]).astype(np.int32)
-
-        for cls_id in range(1, num_classes):
-            # get gt and predictions in this class
-            cls_gt_class_ids = gt_class_ids[gt_class_ids==cls_id] if len(gt_class_ids) else np.zeros(0)
-            cls_gt_sRT = gt_sRT[gt_class_ids==cls_id] if len(gt_class_ids) else np.zeros((0, 4, 4))
-            cls_gt_size = gt_size[gt_class_ids==cls_id] if len(gt_class_ids) else np.zeros((0, 3))
-            if synset_names[cls_id] != 'mug':
-                cls_gt_handle_visibility = np.ones_like(cls_gt_class_ids)
-            else:
-                cls_gt_handle_visibility = gt_handle_visibility[gt_class_ids==cls_id] if len(gt_class_ids) else np.ones(0)
-
-            cls_pred_class_ids = pred_class_ids[pred_class_ids==cls_id] if len(pred_class_ids) else np.zeros(0)
-            cls_pred_sRT = pred_sRT[pred_class_ids==cls_id] if len(pred_class_ids) else np.zeros((0, 4, 4))
-            cls_pred_size = pred_size[pred_class_ids==cls_id] if len(pred_class_ids) else np.zeros((0, 3))
-            cls_pred_scores = pred_scores[pred_class_ids==cls_id] if len(pred_class_ids) else np.zeros(0)
-
-            # calculate the overlap between each gt instance and pred instance
-            iou_cls_gt_match, iou_cls_pred_match, _, iou_pred_indices = \
-                compute_IoU_matches(cls_gt_class_ids, cls_gt_sRT, cls_gt_size, cls_gt_handle_visibility,
-                                    cls_pred_class_ids, cls_pred_sRT, cls_pred_size, cls_pred_scores,
-                                    synset_names, iou_thres_list)
-            if len(iou_pred_indices):
-                cls_pred_class_ids = cls_pred_class_ids[iou_pred_indices]
-                cls_pred_sRT = cls_pred_sRT[iou_pred_indices]
-                cls_pred_scores = cls_pred_scores[iou_pred_indices]
-
-            num_pred = iou_cls_pred_match.shape[1]
-            pred_start = iou_pred_count[cls_id]
-            pred_end = pred_start + num_pred
-            iou_pred_count[cls_id] = pred_end
-            iou_pred_matches_all[cls_id][:, pred_start:pred_end] = iou_cls_pred_match
-            cls_pred_scores_tile = np.tile(cls_pred_scores, (num_iou_thres, 1))
-            assert cls_pred_scores_tile.shape[1] == num_pred
-            iou_pred_scores_all[cls_id][:, pred_start:pred_end] = cls_pred_scores_tile
-            num_gt = iou_cls_gt_match.shape[1]
-            gt_start = iou_gt_count[cls_id]
-            gt_end = gt_start + num_gt
-            iou_gt_count[cls_id] = gt_end
-            iou_gt_matches_all[cls_id][:, gt_start:gt_end] = iou_cls_gt_match
-
-            if use_matches_for_pose:
-                thres_ind = list(iou_thres_list).index(iou_pose_thres)
-                iou_thres_pred_match = iou_cls_pred_match[thres_ind, :]
-                cls_pred_class_ids = cls_pred_class_ids[iou_thres_pred_match > -1] if len(iou_thres_pred_match) > 0 else np.zeros(0)
-                cls_pred_sRT = cls_pred_sRT[iou_thres_pred_match > -1] if len(iou_thres_pred_match) > 0 else np.zeros((0, 4, 4))
-                cls_pred_scores = cls_pred_scores[iou_thres_pred_match > -1] if len(iou_thres_pred_match) > 0 else np.zeros(0)
-                iou_thres_gt_match = iou_cls_gt_match[thres_ind, :]
-                cls_gt_class_ids = cls_gt_class_ids[iou_thres_gt_match > -1] if len(iou_thres_gt_match) > 0 else np.zeros(0)
-                cls_gt_sRT = cls_gt_sRT[iou_thres_gt_match > -1] if len(iou_thres_gt_match) > 0 else np.zeros((0, 4, 4))
-                cls_gt_handle_visibility = cls_gt_handle_visibility[iou_thres_gt_match > -1] if len(iou_thres_gt_match) > 0 else np.zeros(0)
-
-            RT_overlaps = compute_RT_overlaps(cls_gt_class_ids, cls_gt_sRT, cls_gt_handle_visibility,
-                                              cls_pred_class_ids, cls_pred_sRT, synset_names)
-            pose_cls_gt_match, pose_cls_pred_match = compute_RT_matches(RT_overlaps, cls_pred_class_ids, cls_gt_class_ids,
-                                                                        degree_thres_list, shift_thres_list)
-            num_pred = pose_cls_pred_match.shape[2]
-            pred_start = pose_pred_count[cls_id]
-            pred_end = pred_start + num_pred
-            pose_pred_count[cls_id] = pred_end
-            pose_pred_matches_all[cls_id][:, :, pred_start:pred_end] = pose_cls_pred_match
-            cls_pred_scores_tile = np.tile(cls_pred_scores, (num_degree_thres, num_shift_thres, 1))
-            assert cls_pred_scores_tile.shape[2] == num_pred
-            pose_pred_scores_all[cls_id][:, :, pred_start:pred_end] = cls_pred_scores_tile
-            num_gt = pose_cls_gt_match.shape[2]
-            gt_start = pose_gt_count[cls_id]
-            gt_end = gt_start + num_gt
-            pose_gt_count[cls_id] = gt_end
-            pose_gt_matches_all[cls_id][:, :, gt_start:gt_end] = pose_cls_gt_match
-
-    # trim zeros
-    for cls_id in range(num_classes):
-        # IoU
-        iou_pred_matches_all[cls_id] = iou_pred_matches_all[cls_id][:, :iou_pred_count[cls_id]]
-        iou_pred_scores_all[cls_id] = iou_pred_scores_all[cls_id][:, :iou_pred_count[cls_id]]
-        iou_gt_matches_all[cls_id] = iou_gt_matches_all[cls_id][:, :iou_gt_count[cls_id]]
-        # pose
-        pose_pred_matches_all[cls_id] = pose_pred_matches_all[cls_id][:, :, :pose_pred_count[cls_id]]
-        pose_pred_scores_all[cls_id] = pose_pred_scores_all[cls_id][:, :, :pose_pred_count[cls_id]]
-        pose_gt_matches_all[cls_id] = pose_gt_matches_all[cls_id][:, :, :pose_gt_count[cls_id]]
-
-    # compute 3D IoU mAP
-    for cls_id in range(1, num_classes):
-        for s, iou_thres in enumerate(iou_thres_list):
-            iou_aps[cls_id, s], iou_acc[cls_id, s] = compute_ap_and_acc(iou_pred_matches_all[cls_id][s, :],
-                                                                        iou_pred_scores_all[cls_id][s, :],
-                                                                        iou_gt_matches_all[cls_id][s, :])
-    iou_aps[-1, :] = np.mean(iou_aps[1:-1, :], axis=0)
-    iou_acc[-1, :] = np.mean(iou_acc[1:-1, :], axis=0)
-    # compute pose mAP
-    for i, degree_thres in enumerate(degree_thres_list):
-        for j, shift_thres in enumerate(shift_thres_list):
-            for cls_id in range(1, num_classes):
-                cls_pose_pred_matches_all = pose_pred_matches_all[cls_id][i, j, :]
-                cls_pose_gt_matches_all = pose_gt_matches_all[cls_id][i, j, :]
-                cls_pose_pred_scores_all = pose_pred_scores_all[cls_id][i, j, :]
-                pose_aps[cls_id, i, j], pose_acc[cls_id, i, j] = compute_ap_and_acc(cls_pose_pred_matches_all,
-                                                                                    cls_pose_pred_scores_all,
-                                                                                    cls_pose_gt_matches_all)
-            pose_aps[-1, i, j] = np.mean(pose_aps[1:-1, i, j])
-            pose_acc[-1, i, j] = np.mean(pose_acc[1:-1, i, j])
-
-    # save results to pkl
-    result_dict = {}
-    result_dict['iou_thres_list'] = iou_thres_list
-    result_dict['degree_thres_list'] = degree_thres_list
-    result_dict['shift_thres_list'] = shift_thres_list
-    result_dict['iou_aps'] = iou_aps
-    result_dict['pose_aps'] = pose_aps
-    result_dict['iou_acc'] = iou_acc
-    result_dict['pose_acc'] = pose_acc
-    pkl_path = os.path.join(out_dir, 'mAP_Acc.pkl')
-    with open(pkl_path, 'wb') as f:
-        cPickle.dump(result_dict, f)
-    return iou_aps, pose_aps, iou_acc, pose_acc
+    return compute_pose_mAP(pred_results, out_dir, 'phocal', degree_thresholds, shift_thresholds,
+                            iou_3d_thresholds, iou_pose_thres, use_matches_for_pose, num_workers)
 
 
 def plot_mAP(iou_aps, pose_aps, out_dir, iou_thres_list, degree_thres_list, shift_thres_list):
@@ -783,8 +425,12 @@ def plot_mAP(iou_aps, pose_aps, out_dir, iou_thres_list, degree_thres_list, shif
     return
 
 def compute_mAP_phocal(pred_results, out_dir, degree_thresholds=[180], shift_thresholds=[100],
-                iou_3d_thresholds=[0.1], iou_pose_thres=0.1, use_matches_for_pose=False):
-    """ Compute mean Average Precision.
+                iou_3d_thresholds=[0.1], iou_pose_thres=0.1, use_matches_for_pose=False, num_workers=0):
+    """ Compute mean Average Precision on PhoCAL, see pose_eval.compute_pose_mAP.
+
+    Args:
+        num_workers: number of processes matching images in parallel,
+            0 evaluates in the main process.
 
     Returns:
         iou_aps:
@@ -793,169 +439,8 @@ def compute_mAP_phocal(pred_results, out_dir, degree_thresholds=[180], shift_thr
         pose_acc:
 
     """
-    #synset_names = ['BG', 'bottle', 'bowl', 'camera', 'can', 'laptop', 'mug'] #for nocs
-    synset_names = ['BG', 'bottle', 'box', 'can', 'cup', 'remote', 'teapot', 'cutlery', 'glass'] #on phocal
-    #synset_names = ['BG', 'bottle', 'box', 'remote', 'teapot', 'glass'] #my split
-    num_classes = len(synset_names)
-    degree_thres_list = list(degree_thresholds) + [360]
-    num_degree_thres = len(degree_thres_list)
-    shift_thres_list = list(shift_thresholds) + [100]
-    num_shift_thres = len(shift_thres_list)
-    iou_thres_list = list(iou_3d_thresholds)
-    num_iou_thres = len(iou_thres_list)
-
-    if use_matches_for_pose:
-        assert iou_pose_thres in iou_thres_list
-
-    # pre-allocate more than enough memory
-    iou_aps = np.zeros((num_classes + 1, num_iou_thres))
-    iou_acc = np.zeros((num_classes + 1, num_iou_thres))
-    iou_pred_matches_all = [np.zeros((num_iou_thres, 30000)) for _ in range(num_classes)]
-    iou_pred_scores_all = [np.zeros((num_iou_thres, 30000)) for _ in range(num_classes)]
-    iou_gt_matches_all = [np.zeros((num_iou_thres, 30000)) for _ in range(num_classes)]
-    iou_pred_count = [0 for _ in range(num_classes)]
-    iou_gt_count = [0 for _ in range(num_classes)]
-
-    pose_aps = np.zeros((num_classes + 1, num_degree_thres, num_shift_thres))
-    pose_acc = np.zeros((num_classes + 1, num_degree_thres, num_shift_thres))
-    pose_pred_matches_all = [np.zeros((num_degree_thres, num_shift_thres, 30000)) for _ in range(num_classes)]
-    pose_pred_scores_all = [np.zeros((num_degree_thres, num_shift_thres, 30000)) for _ in range(num_classes)]
-    pose_gt_matches_all = [np.zeros((num_degree_thres, num_shift_thres, 30000)) for _ in range(num_classes)]
-    pose_pred_count = [0 for _ in range(num_classes)]
-    pose_gt_count = [0 for _ in range(num_classes)]
-
-    # loop over results to gather pred matches and gt matches for iou and pose metrics
-    progress = 0
-    for progress, result in enumerate(tqdm(pred_results)):
-        gt_class_ids = result['gt_class_ids'].astype(np.int32) #和synset对齐
-        gt_sRT = np.array(result['gt_RTs'])
-        gt_size = np.array(result['gt_scales'])
-        gt_handle_visibility = result['gt_handle_visibility']
-
-        pred_class_ids = result['pred_class_ids']
-        pred_sRT = np.array(result['pred_RTs'])
-        pred_size = result['pred_scales']
-        pred_scores = result['pred_scores']
-
-        if len(gt_class_ids) == 0 and len(pred_class_ids) == 0:
-            continue
-        else:
-            gt_class_ids=np.array([class_id+1 for class_id in gt_class_ids]).astype(np.int32)
-            pred_class_ids=np.array([class_id+1 for class_id in pred_class_ids]).astype(np.int32)
-
-        for cls_id in range(1, num_classes):
-            # get gt and predictions in this class
-            cls_gt_class_ids = gt_class_ids[gt_class_ids==cls_id] if len(gt_class_ids) else np.zeros(0)
-            cls_gt_sRT = gt_sRT[gt_class_ids==cls_id] if len(gt_class_ids) else np.zeros((0, 4, 4))
-            cls_gt_size = gt_size[gt_class_ids==cls_id] if len(gt_class_ids) else np.zeros((0, 3))
-            if synset_names[cls_id] != 'mug':
-                cls_gt_handle_visibility = np.ones_like(cls_gt_class_ids)
-            else:
-                cls_gt_handle_visibility = gt_handle_visibility[gt_class_ids==cls_id] if len(gt_class_ids) else np.ones(0)
-
-            cls_pred_class_ids = pred_class_ids[pred_class_ids==cls_id] if len(pred_class_ids) else np.zeros(0)
-            cls_pred_sRT = pred_sRT[pred_class_ids==cls_id] if len(pred_class_ids) else np.zeros((0, 4, 4))
-            cls_pred_size = pred_size[pred_class_ids==cls_id] if len(pred_class_ids) else np.zeros((0, 3))
-            cls_pred_scores = pred_scores[pred_class_ids==cls_id] if len(pred_class_ids) else np.zeros(0)
-
-            # calculate the overlap between each gt instance and pred instance
-            iou_cls_gt_match, iou_cls_pred_match, _, iou_pred_indices = \
-                compute_IoU_matches(cls_gt_class_ids, cls_gt_sRT, cls_gt_size, cls_gt_handle_visibility,
-                                    cls_pred_class_ids, cls_pred_sRT, cls_pred_size, cls_pred_scores,
-                                    synset_names, iou_thres_list)
-            if len(iou_pred_indices):
-                cls_pred_class_ids = cls_pred_class_ids[iou_pred_indices]
-                cls_pred_sRT = cls_pred_sRT[iou_pred_indices]
-                cls_pred_scores = cls_pred_scores[iou_pred_indices]
-
-            num_pred = iou_cls_pred_match.shape[1]
-            pred_start = iou_pred_count[cls_id]
-            pred_end = pred_start + num_pred
-            iou_pred_count[cls_id] = pred_end
-            iou_pred_matches_all[cls_id][:, pred_start:pred_end] = iou_cls_pred_match
-            cls_pred_scores_tile = np.tile(cls_pred_scores, (num_iou_thres, 1))
-            assert cls_pred_scores_tile.shape[1] == num_pred
-            iou_pred_scores_all[cls_id][:, pred_start:pred_end] = cls_pred_scores_tile
-            num_gt = iou_cls_gt_match.shape[1]
-            gt_start = iou_gt_count[cls_id]
-            gt_end = gt_start + num_gt
-            iou_gt_count[cls_id] = gt_end
-            iou_gt_matches_all[cls_id][:, gt_start:gt_end] = iou_cls_gt_match
-
-            if use_matches_for_pose:
-                thres_ind = list(iou_thres_list).index(iou_pose_thres)
-                iou_thres_pred_match = iou_cls_pred_match[thres_ind, :]
-                cls_pred_class_ids = cls_pred_class_ids[iou_thres_pred_match > -1] if len(iou_thres_pred_match) > 0 else np.zeros(0)
-                cls_pred_sRT = cls_pred_sRT[iou_thres_pred_match > -1] if len(iou_thres_pred_match) > 0 else np.zeros((0, 4, 4))
-                cls_pred_scores = cls_pred_scores[iou_thres_pred_match > -1] if len(iou_thres_pred_match) > 0 else np.zeros(0)
-                iou_thres_gt_match = iou_cls_gt_match[thres_ind, :]
-                cls_gt_class_ids = cls_gt_class_ids[iou_thres_gt_match > -1] if len(iou_thres_gt_match) > 0 else np.zeros(0)
-                cls_gt_sRT = cls_gt_sRT[iou_thres_gt_match > -1] if len(iou_thres_gt_match) > 0 else np.zeros((0, 4, 4))
-                cls_gt_handle_visibility = cls_gt_handle_visibility[iou_thres_gt_match > -1] if len(iou_thres_gt_match) > 0 else np.zeros(0)
-
-            RT_overlaps = compute_RT_overlaps(cls_gt_class_ids, cls_gt_sRT, cls_gt_handle_visibility,
-                                              cls_pred_class_ids, cls_pred_sRT, synset_names)
-            pose_cls_gt_match, pose_cls_pred_match = compute_RT_matches(RT_overlaps, cls_pred_class_ids, cls_gt_class_ids,
-                                                                        degree_thres_list, shift_thres_list)
-            num_pred = pose_cls_pred_match.shape[2]
-            pred_start = pose_pred_count[cls_id]
-            pred_end = pred_start + num_pred
-            pose_pred_count[cls_id] = pred_end
-            pose_pred_matches_all[cls_id][:, :, pred_start:pred_end] = pose_cls_pred_match
-            cls_pred_scores_tile = np.tile(cls_pred_scores, (num_degree_thres, num_shift_thres, 1))
-            assert cls_pred_scores_tile.shape[2] == num_pred
-            pose_pred_scores_all[cls_id][:, :, pred_start:pred_end] = cls_pred_scores_tile
-            num_gt = pose_cls_gt_match.shape[2]
-            gt_start = pose_gt_count[cls_id]
-            gt_end = gt_start + num_gt
-            pose_gt_count[cls_id] = gt_end
-            pose_gt_matches_all[cls_id][:, :, gt_start:gt_end] = pose_cls_gt_match
-
-    # trim zeros
-    for cls_id in range(num_classes):
-        # IoU
-        iou_pred_matches_all[cls_id] = iou_pred_matches_all[cls_id][:, :iou_pred_count[cls_id]]
-        iou_pred_scores_all[cls_id] = iou_pred_scores_all[cls_id][:, :iou_pred_count[cls_id]]
-        iou_gt_matches_all[cls_id] = iou_gt_matches_all[cls_id][:, :iou_gt_count[cls_id]]
-        # pose
-        pose_pred_matches_all[cls_id] = pose_pred_matches_all[cls_id][:, :, :pose_pred_count[cls_id]]
-        pose_pred_scores_all[cls_id] = pose_pred_scores_all[cls_id][:, :, :pose_pred_count[cls_id]]
-        pose_gt_matches_all[cls_id] = pose_gt_matches_all[cls_id][:, :, :pose_gt_count[cls_id]]
-
-    # compute 3D IoU mAP
-    for cls_id in range(1, num_classes):
-        for s, iou_thres in enumerate(iou_thres_list):
-            iou_aps[cls_id, s], iou_acc[cls_id, s] = compute_ap_and_acc(iou_pred_matches_all[cls_id][s, :],
-                                                                        iou_pred_scores_all[cls_id][s, :],
-                                                                        iou_gt_matches_all[cls_id][s, :])
-    iou_aps[-1, :] = np.mean(iou_aps[1:-1, :], axis=0)
-    iou_acc[-1, :] = np.mean(iou_acc[1:-1, :], axis=0)
-    # compute pose mAP
-    for i, degree_thres in enumerate(degree_thres_list):
-        for j, shift_thres in enumerate(shift_thres_list):
-            for cls_id in range(1, num_classes):
-                cls_pose_pred_matches_all = pose_pred_matches_all[cls_id][i, j, :]
-                cls_pose_gt_matches_all = pose_gt_matches_all[cls_id][i, j, :]
-                cls_pose_pred_scores_all = pose_pred_scores_all[cls_id][i, j, :]
-                pose_aps[cls_id, i, j], pose_acc[cls_id, i, j] = compute_ap_and_acc(cls_pose_pred_matches_all,
-                                                                                    cls_pose_pred_scores_all,
-                                                                                    cls_pose_gt_matches_all)
-            pose_aps[-1, i, j] = np.mean(pose_aps[1:-1, i, j])
-            pose_acc[-1, i, j] = np.mean(pose_acc[1:-1, i, j])
-
-    # save results to pkl
-    result_dict = {}
-    result_dict['iou_thres_list'] = iou_thres_list
-    result_dict['degree_thres_list'] = degree_thres_list
-    result_dict['shift_thres_list'] = shift_thres_list
-    result_dict['iou_aps'] = iou_aps
-    result_dict['pose_aps'] = pose_aps
-    result_dict['iou_acc'] = iou_acc
-    result_dict['pose_acc'] = pose_acc
-    pkl_path = os.path.join(out_dir, 'mAP_Acc.pkl')
-    with open(pkl_path, 'wb') as f:
-        cPickle.dump(result_dict, f)
-    return iou_aps, pose_aps, iou_acc, pose_acc
+    return compute_pose_mAP(pred_results, out_dir, 'phocal', degree_thresholds, shift_thresholds,
+                            iou_3d_thresholds, iou_pose_thres, use_matches_for_pose, num_workers)
 
 
 def plot_mAP_phocal(iou_aps, pose_aps, out_dir, iou_thres_list, degree_thres_list, shift_thres_list):
@@ -1012,8 +497,14 @@ def plot_mAP_phocal(iou_aps, pose_aps, out_dir, iou_thres_list, degree_thres_lis
     return
 
 def compute_mAP_nocs(pred_results, out_dir, degree_thresholds=[180], shift_thresholds=[100],
-                iou_3d_thresholds=[0.1], iou_pose_thres=0.1, use_matches_for_pose=False):
-    """ Compute mean Average Precision.
+                iou_3d_thresholds=[0.1], iou_pose_thres=0.1, use_matches_for_pose=False, num_workers=0,
+                timer=None):
+    """ Compute mean Average Precision on NOCS, see pose_eval.compute_pose_mAP.
+
+    Args:
+        num_workers: number of processes matching images in parallel,
+            0 evaluates in the main process.
+        timer: None or pose_eval.StageTimer timing the evaluation stages
 
     Returns:
         iou_aps:
@@ -1022,172 +513,9 @@ def compute_mAP_nocs(pred_results, out_dir, degree_thresholds=[180], shift_thres
         pose_acc:
 
     """
-    
-    #synset_names = ['BG', 'bicycle','books','bottle','camera','cereal box','chair','cup','laptop','shoes']  #for objectron
-    synset_names = ['BG', 'bottle', 'bowl', 'camera', 'can', 'laptop', 'mug'] #for nocs
-    num_classes = len(synset_names)
-    degree_thres_list = list(degree_thresholds) + [360]
-    num_degree_thres = len(degree_thres_list)
-    shift_thres_list = list(shift_thresholds) + [100]
-    num_shift_thres = len(shift_thres_list)
-    iou_thres_list = list(iou_3d_thresholds)
-    num_iou_thres = len(iou_thres_list)
-
-    if use_matches_for_pose:
-        assert iou_pose_thres in iou_thres_list
-
-    # pre-allocate more than enough memory
-    iou_aps = np.zeros((num_classes + 1, num_iou_thres))
-    iou_acc = np.zeros((num_classes + 1, num_iou_thres))
-    iou_pred_matches_all = [np.zeros((num_iou_thres, 30000)) for _ in range(num_classes)]
-    iou_pred_scores_all = [np.zeros((num_iou_thres, 30000)) for _ in range(num_classes)]
-    iou_gt_matches_all = [np.zeros((num_iou_thres, 30000)) for _ in range(num_classes)]
-    iou_pred_count = [0 for _ in range(num_classes)]
-    iou_gt_count = [0 for _ in range(num_classes)]
-
-    pose_aps = np.zeros((num_classes + 1, num_degree_thres, num_shift_thres))
-    pose_acc = np.zeros((num_classes + 1, num_degree_thres, num_shift_thres))
-    pose_pred_matches_all = [np.zeros((num_degree_thres, num_shift_thres, 30000)) for _ in range(num_classes)]
-    pose_pred_scores_all = [np.zeros((num_degree_thres, num_shift_thres, 30000)) for _ in range(num_classes)]
-    pose_gt_matches_all = [np.zeros((num_degree_thres, num_shift_thres, 30000)) for _ in range(num_classes)]
-    pose_pred_count = [0 for _ in range(num_classes)]
-    pose_gt_count = [0 for _ in range(num_classes)]
-
-    # loop over results to gather pred matches and gt matches for iou and pose metrics
-    progress = 0
-    for progress, result in enumerate(tqdm(pred_results)): 
-        try:
-            gt_class_ids = result['gt_class_ids'] #和synset对齐
-            gt_sRT = np.array(result['gt_RTs'])
-            gt_size = np.array(result['gt_scales'])
-            gt_handle_visibility = result['gt_handle_visibility']
-
-            pred_class_ids = result['pred_class_ids']
-            pred_sRT = np.array(result['pred_RTs'])
-            pred_size = result['pred_scales']
-            pred_scores = result['pred_scores']
-        except:
-            continue
-
-        if len(gt_class_ids) == 0 and len(pred_class_ids) == 0:
-            continue
-        else:
-            gt_class_ids=np.array([class_id+1 for class_id in gt_class_ids]).astype(np.int32) #将标签和synset 对齐
-            pred_class_ids=np.array([class_id+1 for class_id in pred_class_ids]).astype(np.int32)
-
-        for cls_id in range(1, num_classes):
-            # get gt and predictions in this class
-            cls_gt_class_ids = gt_class_ids[gt_class_ids==cls_id] if len(gt_class_ids) else np.zeros(0)
-            cls_gt_sRT = gt_sRT[gt_class_ids==cls_id] if len(gt_class_ids) else np.zeros((0, 4, 4))
-            cls_gt_size = gt_size[gt_class_ids==cls_id] if len(gt_class_ids) else np.zeros((0, 3))
-            if synset_names[cls_id] != 'mug':
-                cls_gt_handle_visibility = np.ones_like(cls_gt_class_ids)
-            else:
-                cls_gt_handle_visibility = gt_handle_visibility[gt_class_ids==cls_id] if len(gt_class_ids) else np.ones(0)
-
-            cls_pred_class_ids = pred_class_ids[pred_class_ids==cls_id] if len(pred_class_ids) else np.zeros(0)
-            cls_pred_sRT = pred_sRT[pred_class_ids==cls_id] if len(pred_class_ids) else np.zeros((0, 4, 4))
-            cls_pred_size = pred_size[pred_class_ids==cls_id] if len(pred_class_ids) else np.zeros((0, 3))
-            cls_pred_scores = pred_scores[pred_class_ids==cls_id] if len(pred_class_ids) else np.zeros(0)
-
-            # calculate the overlap between each gt instance and pred instance
-            iou_cls_gt_match, iou_cls_pred_match, _, iou_pred_indices = \
-                compute_IoU_matches(cls_gt_class_ids, cls_gt_sRT, cls_gt_size, cls_gt_handle_visibility,
-                                    cls_pred_class_ids, cls_pred_sRT, cls_pred_size, cls_pred_scores,
-                                    synset_names, iou_thres_list)
-            if len(iou_pred_indices):
-                cls_pred_class_ids = cls_pred_class_ids[iou_pred_indices]
-                cls_pred_sRT = cls_pred_sRT[iou_pred_indices]
-                cls_pred_scores = cls_pred_scores[iou_pred_indices]
-
-            num_pred = iou_cls_pred_match.shape[1]
-            pred_start = iou_pred_count[cls_id]
-            pred_end = pred_start + num_pred
-            iou_pred_count[cls_id] = pred_end
-            iou_pred_matches_all[cls_id][:, pred_start:pred_end] = iou_cls_pred_match
-            cls_pred_scores_tile = np.tile(cls_pred_scores, (num_iou_thres, 1))
-            assert cls_pred_scores_tile.shape[1] == num_pred
-            iou_pred_scores_all[cls_id][:, pred_start:pred_end] = cls_pred_scores_tile
-            num_gt = iou_cls_gt_match.shape[1]
-            gt_start = iou_gt_count[cls_id]
-            gt_end = gt_start + num_gt
-            iou_gt_count[cls_id] = gt_end
-            iou_gt_matches_all[cls_id][:, gt_start:gt_end] = iou_cls_gt_match
-
-            if use_matches_for_pose:
-                thres_ind = list(iou_thres_list).index(iou_pose_thres)
-                iou_thres_pred_match = iou_cls_pred_match[thres_ind, :]
-                cls_pred_class_ids = cls_pred_class_ids[iou_thres_pred_match > -1] if len(iou_thres_pred_match) > 0 else np.zeros(0)
-                cls_pred_sRT = cls_pred_sRT[iou_thres_pred_match > -1] if len(iou_thres_pred_match) > 0 else np.zeros((0, 4, 4))
-                cls_pred_scores = cls_pred_scores[iou_thres_pred_match > -1] if len(iou_thres_pred_match) > 0 else np.zeros(0)
-                iou_thres_gt_match = iou_cls_gt_match[thres_ind, :]
-                cls_gt_class_ids = cls_gt_class_ids[iou_thres_gt_match > -1] if len(iou_thres_gt_match) > 0 else np.zeros(0)
-                cls_gt_sRT = cls_gt_sRT[iou_thres_gt_match > -1] if len(iou_thres_gt_match) > 0 else np.zeros((0, 4, 4))
-                cls_gt_handle_visibility = cls_gt_handle_visibility[iou_thres_gt_match > -1] if len(iou_thres_gt_match) > 0 else np.zeros(0)
-
-            RT_overlaps = compute_RT_overlaps(cls_gt_class_ids, cls_gt_sRT, cls_gt_handle_visibility,
-                                              cls_pred_class_ids, cls_pred_sRT, synset_names)
-            pose_cls_gt_match, pose_cls_pred_match = compute_RT_matches(RT_overlaps, cls_pred_class_ids, cls_gt_class_ids,
-                                                                        degree_thres_list, shift_thres_list)
-            num_pred = pose_cls_pred_match.shape[2]
-            pred_start = pose_pred_count[cls_id]
-            pred_end = pred_start + num_pred
-            pose_pred_count[cls_id] = pred_end
-            pose_pred_matches_all[cls_id][:, :, pred_start:pred_end] = pose_cls_pred_match
-            cls_pred_scores_tile = np.tile(cls_pred_scores, (num_degree_thres, num_shift_thres, 1))
-            assert cls_pred_scores_tile.shape[2] == num_pred
-            pose_pred_scores_all[cls_id][:, :, pred_start:pred_end] = cls_pred_scores_tile
-            num_gt = pose_cls_gt_match.shape[2]
-            gt_start = pose_gt_count[cls_id]
-            gt_end = gt_start + num_gt
-            pose_gt_count[cls_id] = gt_end
-            pose_gt_matches_all[cls_id][:, :, gt_start:gt_end] = pose_cls_gt_match
-
-    # trim zeros
-    for cls_id in range(num_classes):
-        # IoU
-        iou_pred_matches_all[cls_id] = iou_pred_matches_all[cls_id][:, :iou_pred_count[cls_id]]
-        iou_pred_scores_all[cls_id] = iou_pred_scores_all[cls_id][:, :iou_pred_count[cls_id]]
-        iou_gt_matches_all[cls_id] = iou_gt_matches_all[cls_id][:, :iou_gt_count[cls_id]]
-        # pose
-        pose_pred_matches_all[cls_id] = pose_pred_matches_all[cls_id][:, :, :pose_pred_count[cls_id]]
-        pose_pred_scores_all[cls_id] = pose_pred_scores_all[cls_id][:, :, :pose_pred_count[cls_id]]
-        pose_gt_matches_all[cls_id] = pose_gt_matches_all[cls_id][:, :, :pose_gt_count[cls_id]]
-
-    # compute 3D IoU mAP
-    for cls_id in range(1, num_classes):
-        for s, iou_thres in enumerate(iou_thres_list):
-            iou_aps[cls_id, s], iou_acc[cls_id, s] = compute_ap_and_acc(iou_pred_matches_all[cls_id][s, :],
-                                                                        iou_pred_scores_all[cls_id][s, :],
-                                                                        iou_gt_matches_all[cls_id][s, :])
-    iou_aps[-1, :] = np.mean(iou_aps[1:-1, :], axis=0)
-    iou_acc[-1, :] = np.mean(iou_acc[1:-1, :], axis=0)
-    # compute pose mAP
-    for i, degree_thres in enumerate(degree_thres_list):
-        for j, shift_thres in enumerate(shift_thres_list):
-            for cls_id in range(1, num_classes):
-                cls_pose_pred_matches_all = pose_pred_matches_all[cls_id][i, j, :]
-                cls_pose_gt_matches_all = pose_gt_matches_all[cls_id][i, j, :]
-                cls_pose_pred_scores_all = pose_pred_scores_all[cls_id][i, j, :]
-                pose_aps[cls_id, i, j], pose_acc[cls_id, i, j] = compute_ap_and_acc(cls_pose_pred_matches_all,
-                                                                                    cls_pose_pred_scores_all,
-                                                                                    cls_pose_gt_matches_all)
-            pose_aps[-1, i, j] = np.mean(pose_aps[1:-1, i, j])
-            pose_acc[-1, i, j] = np.mean(pose_acc[1:-1, i, j])
-
-    # save results to pkl
-    result_dict = {}
-    result_dict['iou_thres_list'] = iou_thres_list
-    result_dict['degree_thres_list'] = degree_thres_list
-    result_dict['shift_thres_list'] = shift_thres_list
-    result_dict['iou_aps'] = iou_aps
-    result_dict['pose_aps'] = pose_aps
-    result_dict['iou_acc'] = iou_acc
-    result_dict['pose_acc'] = pose_acc
-    pkl_path = os.path.join(out_dir, 'mAP_Acc.pkl')
-    with open(pkl_path, 'wb') as f:
-        cPickle.dump(result_dict, f)
-    return iou_aps, pose_aps, iou_acc, pose_acc
+    return compute_pose_mAP(pred_results, out_dir, 'nocs', degree_thresholds, shift_thresholds,
+                            iou_3d_thresholds, iou_pose_thres, use_matches_for_pose, num_workers,
+                            timer)
 
 
 def plot_mAP_nocs(iou_aps, pose_aps, out_dir, iou_thres_list, degree_thres_list, shift_thres_list):
@@ -1245,8 +573,15 @@ def plot_mAP_nocs(iou_aps, pose_aps, out_dir, iou_thres_list, degree_thres_list,
     return
 
 def compute_mAP_omni3d(pred_results, out_dir, degree_thresholds=[180], shift_thresholds=[100],
-                iou_3d_thresholds=[0.1], iou_pose_thres=0.1, use_matches_for_pose=False):
-    """ Compute mean Average Precision.
+                iou_3d_thresholds=[0.1], iou_pose_thres=0.1, use_matches_for_pose=False, num_workers=0,
+                iou_kernel='aabb'):
+    """ Compute mean Average Precision on Omni3D, see pose_eval.compute_pose_mAP.
+
+    Args:
+        num_workers: number of processes matching images in parallel,
+            0 evaluates in the main process.
+        iou_kernel: 'aabb' for the NOCS 3D IoU, 'exact' for the IoU of the
+            oriented boxes
 
     Returns:
         iou_aps:
@@ -1255,190 +590,23 @@ def compute_mAP_omni3d(pred_results, out_dir, degree_thresholds=[180], shift_thr
         pose_acc:
 
     """
-    
-    # synset_names = ['BG', 'chair', 'table', 'cabinet', 'car', 'lamp', 'books', 'sofa', 'pedestrian', 'picture', 'window', 'pillow', 'truck', 'door', 
-    #     'blinds', 'sink', 'shelves', 'television', 'shoes', 'cup', 'bottle', 'bookcase', 'laptop', 'desk', 'cereal box', 'floor mat', 
-    #     'traffic cone', 'mirror', 'barrier', 'counter', 'camera', 'bicycle', 'toilet', 'bus', 'bed', 'refrigerator', 'trailer', 'box', 'oven', 
-    #     'clothes', 'van', 'towel', 'motorcycle', 'night stand', 'stove', 'machine', 'stationery', 'bathtub', 'cyclist', 'curtain', 'bin']  #for omni3d 50
-    synset_names = ['BG', "pedestrian", "car", "dontcare", "cyclist", "van", "truck", "tram", "person", "traffic cone", "barrier", "motorcycle", 
-    "bicycle", "bus", "trailer", "books", "bottle", "camera", "cereal box", "chair", "cup", "laptop", "shoes", "towel", "blinds", "window", "lamp", 
-    "shelves", "mirror", "sink", "cabinet", "bathtub", "door", "toilet", "desk", "box", "bookcase", "picture", "table", "counter", "bed", "night stand", 
-    "dresser", "pillow", "sofa", "television", "floor mat", "curtain", "clothes", "stationery", "refrigerator", "board", "kitchen pan", 
-    "bin", "stove", "microwave", "plates", "bowl", "oven", "vase", "faucet", "tissues", "machine", "printer", "monitor", "podium", "cart", 
-    "projector", "electronics", "computer", "air conditioner", "drawers", "coffee maker", "toaster", "potted plant", "painting", "bag", "tray", 
-    "keyboard", "blanket", "rack", "phone", "mouse", "fire extinguisher", "toys", "ladder", "fan", "glass", "clock", "toilet paper", "closet", "fume hood", 
-    "utensils", "soundsystem", "fire place", "shower curtain", "remote", "pen", "fireplace"]  #for omni3d 98
-    #synset_names = ['BG', 'bottle', 'bowl', 'camera', 'can', 'laptop', 'mug'] #for nocs
-    num_classes = len(synset_names)
-    degree_thres_list = list(degree_thresholds) + [360]
-    num_degree_thres = len(degree_thres_list)
-    shift_thres_list = list(shift_thresholds) + [100]
-    num_shift_thres = len(shift_thres_list)
-    iou_thres_list = list(iou_3d_thresholds)
-    num_iou_thres = len(iou_thres_list)
-
-    if use_matches_for_pose:
-        assert iou_pose_thres in iou_thres_list
-
-    # pre-allocate more than enough memory
-    iou_aps = np.zeros((num_classes + 1, num_iou_thres))
-    iou_acc = np.zeros((num_classes + 1, num_iou_thres))
-    iou_pred_matches_all = [np.zeros((num_iou_thres, 300000)) for _ in range(num_classes)]
-    iou_pred_scores_all = [np.zeros((num_iou_thres, 300000)) for _ in range(num_classes)]
-    iou_gt_matches_all = [np.zeros((num_iou_thres, 300000)) for _ in range(num_classes)]
-    iou_pred_count = [0 for _ in range(num_classes)]
-    iou_gt_count = [0 for _ in range(num_classes)]
-
-    pose_aps = np.zeros((num_classes + 1, num_degree_thres, num_shift_thres))
-    pose_acc = np.zeros((num_classes + 1, num_degree_thres, num_shift_thres))
-    pose_pred_matches_all = [np.zeros((num_degree_thres, num_shift_thres, 300000)) for _ in range(num_classes)]
-    pose_pred_scores_all = [np.zeros((num_degree_thres, num_shift_thres, 300000)) for _ in range(num_classes)]
-    pose_gt_matches_all = [np.zeros((num_degree_thres, num_shift_thres, 300000)) for _ in range(num_classes)]
-    pose_pred_count = [0 for _ in range(num_classes)]
-    pose_gt_count = [0 for _ in range(num_classes)]
-
-    # loop over results to gather pred matches and gt matches for iou and pose metrics
-    progress = 0
-    for progress, result in enumerate(tqdm(pred_results)): 
-        try:
-            gt_class_ids = result['gt_class_ids'] #和synset对齐
-            gt_sRT = np.array(result['gt_RTs'])
-            gt_size = np.array(result['gt_scales'])
-            gt_handle_visibility = result['gt_handle_visibility']
-
-            pred_class_ids = result['pred_class_ids']
-            pred_sRT = np.array(result['pred_RTs'])
-            pred_size = result['pred_scales']
-            pred_scores = result['pred_scores']
-        except:
-            continue
-
-        if len(gt_class_ids) == 0 and len(pred_class_ids) == 0:
-            continue
-        else:
-            gt_class_ids=np.array([class_id+1 for class_id in gt_class_ids]).astype(np.int32) #将标签和synset 对齐
-            pred_class_ids=np.array([class_id+1 for class_id in pred_class_ids]).astype(np.int32)
-
-        for cls_id in range(1, num_classes):
-            # get gt and predictions in this class
-            cls_gt_class_ids = gt_class_ids[gt_class_ids==cls_id] if len(gt_class_ids) else np.zeros(0)
-            cls_gt_sRT = gt_sRT[gt_class_ids==cls_id] if len(gt_class_ids) else np.zeros((0, 4, 4))
-            cls_gt_size = gt_size[gt_class_ids==cls_id] if len(gt_class_ids) else np.zeros((0, 3))
-            if synset_names[cls_id] != 'mug':
-                cls_gt_handle_visibility = np.ones_like(cls_gt_class_ids)
-            else:
-                cls_gt_handle_visibility = gt_handle_visibility[gt_class_ids==cls_id] if len(gt_class_ids) else np.ones(0)
-
-            cls_pred_class_ids = pred_class_ids[pred_class_ids==cls_id] if len(pred_class_ids) else np.zeros(0)
-            cls_pred_sRT = pred_sRT[pred_class_ids==cls_id] if len(pred_class_ids) else np.zeros((0, 4, 4))
-            cls_pred_size = pred_size[pred_class_ids==cls_id] if len(pred_class_ids) else np.zeros((0, 3))
-            cls_pred_scores = pred_scores[pred_class_ids==cls_id] if len(pred_class_ids) else np.zeros(0)
-
-            # calculate the overlap between each gt instance and pred instance
-            iou_cls_gt_match, iou_cls_pred_match, _, iou_pred_indices = \
-                compute_IoU_matches(cls_gt_class_ids, cls_gt_sRT, cls_gt_size, cls_gt_handle_visibility,
-                                    cls_pred_class_ids, cls_pred_sRT, cls_pred_size, cls_pred_scores,
-                                    synset_names, iou_thres_list)
-            if len(iou_pred_indices):
-                cls_pred_class_ids = cls_pred_class_ids[iou_pred_indices]
-                cls_pred_sRT = cls_pred_sRT[iou_pred_indices]
-                cls_pred_scores = cls_pred_scores[iou_pred_indices]
-
-            num_pred = iou_cls_pred_match.shape[1]
-            pred_start = iou_pred_count[cls_id]
-            pred_end = pred_start + num_pred
-            iou_pred_count[cls_id] = pred_end
-            iou_pred_matches_all[cls_id][:, pred_start:pred_end] = iou_cls_pred_match
-            cls_pred_scores_tile = np.tile(cls_pred_scores, (num_iou_thres, 1))
-            assert cls_pred_scores_tile.shape[1] == num_pred
-            iou_pred_scores_all[cls_id][:, pred_start:pred_end] = cls_pred_scores_tile
-            num_gt = iou_cls_gt_match.shape[1]
-            gt_start = iou_gt_count[cls_id]
-            gt_end = gt_start + num_gt
-            iou_gt_count[cls_id] = gt_end
-            iou_gt_matches_all[cls_id][:, gt_start:gt_end] = iou_cls_gt_match
-
-            if use_matches_for_pose:
-                thres_ind = list(iou_thres_list).index(iou_pose_thres)
-                iou_thres_pred_match = iou_cls_pred_match[thres_ind, :]
-                cls_pred_class_ids = cls_pred_class_ids[iou_thres_pred_match > -1] if len(iou_thres_pred_match) > 0 else np.zeros(0)
-                cls_pred_sRT = cls_pred_sRT[iou_thres_pred_match > -1] if len(iou_thres_pred_match) > 0 else np.zeros((0, 4, 4))
-                cls_pred_scores = cls_pred_scores[iou_thres_pred_match > -1] if len(iou_thres_pred_match) > 0 else np.zeros(0)
-                iou_thres_gt_match = iou_cls_gt_match[thres_ind, :]
-                cls_gt_class_ids = cls_gt_class_ids[iou_thres_gt_match > -1] if len(iou_thres_gt_match) > 0 else np.zeros(0)
-                cls_gt_sRT = cls_gt_sRT[iou_thres_gt_match > -1] if len(iou_thres_gt_match) > 0 else np.zeros((0, 4, 4))
-                cls_gt_handle_visibility = cls_gt_handle_visibility[iou_thres_gt_match > -1] if len(iou_thres_gt_match) > 0 else np.zeros(0)
-
-            RT_overlaps = compute_RT_overlaps(cls_gt_class_ids, cls_gt_sRT, cls_gt_handle_visibility,
-                                              cls_pred_class_ids, cls_pred_sRT, synset_names)
-            pose_cls_gt_match, pose_cls_pred_match = compute_RT_matches(RT_overlaps, cls_pred_class_ids, cls_gt_class_ids,
-                                                                        degree_thres_list, shift_thres_list)
-            num_pred = pose_cls_pred_match.shape[2]
-            pred_start = pose_pred_count[cls_id]
-            pred_end = pred_start + num_pred
-            pose_pred_count[cls_id] = pred_end
-            pose_pred_matches_all[cls_id][:, :, pred_start:pred_end] = pose_cls_pred_match
-            cls_pred_scores_tile = np.tile(cls_pred_scores, (num_degree_thres, num_shift_thres, 1))
-            assert cls_pred_scores_tile.shape[2] == num_pred
-            pose_pred_scores_all[cls_id][:, :, pred_start:pred_end] = cls_pred_scores_tile
-            num_gt = pose_cls_gt_match.shape[2]
-            gt_start = pose_gt_count[cls_id]
-            gt_end = gt_start + num_gt
-            pose_gt_count[cls_id] = gt_end
-            pose_gt_matches_all[cls_id][:, :, gt_start:gt_end] = pose_cls_gt_match
-
-    # trim zeros
-    for cls_id in range(num_classes):
-        # IoU
-        iou_pred_matches_all[cls_id] = iou_pred_matches_all[cls_id][:, :iou_pred_count[cls_id]]
-        iou_pred_scores_all[cls_id] = iou_pred_scores_all[cls_id][:, :iou_pred_count[cls_id]]
-        iou_gt_matches_all[cls_id] = iou_gt_matches_all[cls_id][:, :iou_gt_count[cls_id]]
-        # pose
-        pose_pred_matches_all[cls_id] = pose_pred_matches_all[cls_id][:, :, :pose_pred_count[cls_id]]
-        pose_pred_scores_all[cls_id] = pose_pred_scores_all[cls_id][:, :, :pose_pred_count[cls_id]]
-        pose_gt_matches_all[cls_id] = pose_gt_matches_all[cls_id][:, :, :pose_gt_count[cls_id]]
-
-    # compute 3D IoU mAP
-    for cls_id in range(1, num_classes):
-        for s, iou_thres in enumerate(iou_thres_list):
-            iou_aps[cls_id, s], iou_acc[cls_id, s] = compute_ap_and_acc(iou_pred_matches_all[cls_id][s, :],
-                                                                        iou_pred_scores_all[cls_id][s, :],
-                                                                        iou_gt_matches_all[cls_id][s, :])
-    iou_aps[-1, :] = np.mean(iou_aps[1:-1, :], axis=0)
-    iou_acc[-1, :] = np.mean(iou_acc[1:-1, :], axis=0)
-    # compute pose mAP
-    for i, degree_thres in enumerate(degree_thres_list):
-        for j, shift_thres in enumerate(shift_thres_list):
-            for cls_id in range(1, num_classes):
-                cls_pose_pred_matches_all = pose_pred_matches_all[cls_id][i, j, :]
-                cls_pose_gt_matches_all = pose_gt_matches_all[cls_id][i, j, :]
-                cls_pose_pred_scores_all = pose_pred_scores_all[cls_id][i, j, :]
-                pose_aps[cls_id, i, j], pose_acc[cls_id, i, j] = compute_ap_and_acc(cls_pose_pred_matches_all,
-                                                                                    cls_pose_pred_scores_all,
-                                                                                    cls_pose_gt_matches_all)
-            pose_aps[-1, i, j] = np.mean(pose_aps[1:-1, i, j])
-            pose_acc[-1, i, j] = np.mean(pose_acc[1:-1, i, j])
-
-    # save results to pkl
-    result_dict = {}
-    result_dict['iou_thres_list'] = iou_thres_list
-    result_dict['degree_thres_list'] = degree_thres_list
-    result_dict['shift_thres_list'] = shift_thres_list
-    result_dict['iou_aps'] = iou_aps
-    result_dict['pose_aps'] = pose_aps
-    result_dict['iou_acc'] = iou_acc
-    result_dict['pose_acc'] = pose_acc
-    pkl_path = os.path.join(out_dir, 'mAP_Acc.pkl')
-    with open(pkl_path, 'wb') as f:
-        cPickle.dump(result_dict, f)
-    return iou_aps, pose_aps, iou_acc, pose_acc
+    dataset = get_pose_eval_dataset('omni3d').replace(iou_kernel=iou_kernel)
+    return compute_pose_mAP(pred_results, out_dir, dataset, degree_thresholds, shift_thresholds,
+                            iou_3d_thresholds, iou_pose_thres, use_matches_for_pose, num_workers)
 
 def plot_mAP_omni3d(iou_aps, pose_aps, out_dir, iou_thres_list, degree_thres_list, shift_thres_list):
     pass
 
 def compute_mAP_objectron(pred_results, out_dir, degree_thresholds=[180], shift_thresholds=[100],
-                iou_3d_thresholds=[0.1], iou_pose_thres=0.1, use_matches_for_pose=False):
-    """ Compute mean Average Precision.
+                iou_3d_thresholds=[0.1], iou_pose_thres=0.1, use_matches_for_pose=False, num_workers=0,
+                iou_kernel='aabb'):
+    """ Compute mean Average Precision on Objectron, see pose_eval.compute_pose_mAP.
+
+    Args:
+        num_workers: number of processes matching images in parallel,
+            0 evaluates in the main process.
+        iou_kernel: 'aabb' for the NOCS 3D IoU, 'exact' for the IoU of the
+            oriented boxes
 
     Returns:
         iou_aps:
@@ -1447,172 +615,9 @@ def compute_mAP_objectron(pred_results, out_dir, degree_thresholds=[180], shift_
         pose_acc:
 
     """
-    
-    synset_names = ['BG', 'bicycle','books','bottle','camera','cereal box','chair','cup','laptop','shoes']  #for objectron
-    #synset_names = ['BG', 'bottle', 'bowl', 'camera', 'can', 'laptop', 'mug'] #for nocs
-    num_classes = len(synset_names)
-    degree_thres_list = list(degree_thresholds) + [360]
-    num_degree_thres = len(degree_thres_list)
-    shift_thres_list = list(shift_thresholds) + [100]
-    num_shift_thres = len(shift_thres_list)
-    iou_thres_list = list(iou_3d_thresholds)
-    num_iou_thres = len(iou_thres_list)
-
-    if use_matches_for_pose:
-        assert iou_pose_thres in iou_thres_list
-
-    # pre-allocate more than enough memory
-    iou_aps = np.zeros((num_classes + 1, num_iou_thres))
-    iou_acc = np.zeros((num_classes + 1, num_iou_thres))
-    iou_pred_matches_all = [np.zeros((num_iou_thres, 30000)) for _ in range(num_classes)]
-    iou_pred_scores_all = [np.zeros((num_iou_thres, 30000)) for _ in range(num_classes)]
-    iou_gt_matches_all = [np.zeros((num_iou_thres, 30000)) for _ in range(num_classes)]
-    iou_pred_count = [0 for _ in range(num_classes)]
-    iou_gt_count = [0 for _ in range(num_classes)]
-
-    pose_aps = np.zeros((num_classes + 1, num_degree_thres, num_shift_thres))
-    pose_acc = np.zeros((num_classes + 1, num_degree_thres, num_shift_thres))
-    pose_pred_matches_all = [np.zeros((num_degree_thres, num_shift_thres, 30000)) for _ in range(num_classes)]
-    pose_pred_scores_all = [np.zeros((num_degree_thres, num_shift_thres, 30000)) for _ in range(num_classes)]
-    pose_gt_matches_all = [np.zeros((num_degree_thres, num_shift_thres, 30000)) for _ in range(num_classes)]
-    pose_pred_count = [0 for _ in range(num_classes)]
-    pose_gt_count = [0 for _ in range(num_classes)]
-
-    # loop over results to gather pred matches and gt matches for iou and pose metrics
-    progress = 0
-    for progress, result in enumerate(tqdm(pred_results)): 
-        try:
-            gt_class_ids = result['gt_class_ids'] #和synset对齐
-            gt_sRT = np.array(result['gt_RTs'])
-            gt_size = np.array(result['gt_scales'])
-            gt_handle_visibility = result['gt_handle_visibility']
-
-            pred_class_ids = result['pred_class_ids']
-            pred_sRT = np.array(result['pred_RTs'])
-            pred_size = result['pred_scales']
-            pred_scores = result['pred_scores']
-        except:
-            continue
-
-        if len(gt_class_ids) == 0 and len(pred_class_ids) == 0:
-            continue
-        else:
-            gt_class_ids=np.array([class_id+1 for class_id in gt_class_ids]).astype(np.int32) #将标签和synset 对齐
-            pred_class_ids=np.array([class_id+1 for class_id in pred_class_ids]).astype(np.int32)
-
-        for cls_id in range(1, num_classes):
-            # get gt and predictions in this class
-            cls_gt_class_ids = gt_class_ids[gt_class_ids==cls_id] if len(gt_class_ids) else np.zeros(0)
-            cls_gt_sRT = gt_sRT[gt_class_ids==cls_id] if len(gt_class_ids) else np.zeros((0, 4, 4))
-            cls_gt_size = gt_size[gt_class_ids==cls_id] if len(gt_class_ids) else np.zeros((0, 3))
-            if synset_names[cls_id] != 'mug':
-                cls_gt_handle_visibility = np.ones_like(cls_gt_class_ids)
-            else:
-                cls_gt_handle_visibility = gt_handle_visibility[gt_class_ids==cls_id] if len(gt_class_ids) else np.ones(0)
-
-            cls_pred_class_ids = pred_class_ids[pred_class_ids==cls_id] if len(pred_class_ids) else np.zeros(0)
-            cls_pred_sRT = pred_sRT[pred_class_ids==cls_id] if len(pred_class_ids) else np.zeros((0, 4, 4))
-            cls_pred_size = pred_size[pred_class_ids==cls_id] if len(pred_class_ids) else np.zeros((0, 3))
-            cls_pred_scores = pred_scores[pred_class_ids==cls_id] if len(pred_class_ids) else np.zeros(0)
-
-            # calculate the overlap between each gt instance and pred instance
-            iou_cls_gt_match, iou_cls_pred_match, _, iou_pred_indices = \
-                compute_IoU_matches(cls_gt_class_ids, cls_gt_sRT, cls_gt_size, cls_gt_handle_visibility,
-                                    cls_pred_class_ids, cls_pred_sRT, cls_pred_size, cls_pred_scores,
-                                    synset_names, iou_thres_list)
-            if len(iou_pred_indices):
-                cls_pred_class_ids = cls_pred_class_ids[iou_pred_indices]
-                cls_pred_sRT = cls_pred_sRT[iou_pred_indices]
-                cls_pred_scores = cls_pred_scores[iou_pred_indices]
-
-            num_pred = iou_cls_pred_match.shape[1]
-            pred_start = iou_pred_count[cls_id]
-            pred_end = pred_start + num_pred
-            iou_pred_count[cls_id] = pred_end
-            iou_pred_matches_all[cls_id][:, pred_start:pred_end] = iou_cls_pred_match
-            cls_pred_scores_tile = np.tile(cls_pred_scores, (num_iou_thres, 1))
-            assert cls_pred_scores_tile.shape[1] == num_pred
-            iou_pred_scores_all[cls_id][:, pred_start:pred_end] = cls_pred_scores_tile
-            num_gt = iou_cls_gt_match.shape[1]
-            gt_start = iou_gt_count[cls_id]
-            gt_end = gt_start + num_gt
-            iou_gt_count[cls_id] = gt_end
-            iou_gt_matches_all[cls_id][:, gt_start:gt_end] = iou_cls_gt_match
-
-            if use_matches_for_pose:
-                thres_ind = list(iou_thres_list).index(iou_pose_thres)
-                iou_thres_pred_match = iou_cls_pred_match[thres_ind, :]
-                cls_pred_class_ids = cls_pred_class_ids[iou_thres_pred_match > -1] if len(iou_thres_pred_match) > 0 else np.zeros(0)
-                cls_pred_sRT = cls_pred_sRT[iou_thres_pred_match > -1] if len(iou_thres_pred_match) > 0 else np.zeros((0, 4, 4))
-                cls_pred_scores = cls_pred_scores[iou_thres_pred_match > -1] if len(iou_thres_pred_match) > 0 else np.zeros(0)
-                iou_thres_gt_match = iou_cls_gt_match[thres_ind, :]
-                cls_gt_class_ids = cls_gt_class_ids[iou_thres_gt_match > -1] if len(iou_thres_gt_match) > 0 else np.zeros(0)
-                cls_gt_sRT = cls_gt_sRT[iou_thres_gt_match > -1] if len(iou_thres_gt_match) > 0 else np.zeros((0, 4, 4))
-                cls_gt_handle_visibility = cls_gt_handle_visibility[iou_thres_gt_match > -1] if len(iou_thres_gt_match) > 0 else np.zeros(0)
-
-            RT_overlaps = compute_RT_overlaps(cls_gt_class_ids, cls_gt_sRT, cls_gt_handle_visibility,
-                                              cls_pred_class_ids, cls_pred_sRT, synset_names)
-            pose_cls_gt_match, pose_cls_pred_match = compute_RT_matches(RT_overlaps, cls_pred_class_ids, cls_gt_class_ids,
-                                                                        degree_thres_list, shift_thres_list)
-            num_pred = pose_cls_pred_match.shape[2]
-            pred_start = pose_pred_count[cls_id]
-            pred_end = pred_start + num_pred
-            pose_pred_count[cls_id] = pred_end
-            pose_pred_matches_all[cls_id][:, :, pred_start:pred_end] = pose_cls_pred_match
-            cls_pred_scores_tile = np.tile(cls_pred_scores, (num_degree_thres, num_shift_thres, 1))
-            assert cls_pred_scores_tile.shape[2] == num_pred
-            pose_pred_scores_all[cls_id][:, :, pred_start:pred_end] = cls_pred_scores_tile
-            num_gt = pose_cls_gt_match.shape[2]
-            gt_start = pose_gt_count[cls_id]
-            gt_end = gt_start + num_gt
-            pose_gt_count[cls_id] = gt_end
-            pose_gt_matches_all[cls_id][:, :, gt_start:gt_end] = pose_cls_gt_match
-
-    # trim zeros
-    for cls_id in range(num_classes):
-        # IoU
-        iou_pred_matches_all[cls_id] = iou_pred_matches_all[cls_id][:, :iou_pred_count[cls_id]]
-        iou_pred_scores_all[cls_id] = iou_pred_scores_all[cls_id][:, :iou_pred_count[cls_id]]
-        iou_gt_matches_all[cls_id] = iou_gt_matches_all[cls_id][:, :iou_gt_count[cls_id]]
-        # pose
-        pose_pred_matches_all[cls_id] = pose_pred_matches_all[cls_id][:, :, :pose_pred_count[cls_id]]
-        pose_pred_scores_all[cls_id] = pose_pred_scores_all[cls_id][:, :, :pose_pred_count[cls_id]]
-        pose_gt_matches_all[cls_id] = pose_gt_matches_all[cls_id][:, :, :pose_gt_count[cls_id]]
-
-    # compute 3D IoU mAP
-    for cls_id in range(1, num_classes):
-        for s, iou_thres in enumerate(iou_thres_list):
-            iou_aps[cls_id, s], iou_acc[cls_id, s] = compute_ap_and_acc(iou_pred_matches_all[cls_id][s, :],
-                                                                        iou_pred_scores_all[cls_id][s, :],
-                                                                        iou_gt_matches_all[cls_id][s, :])
-    iou_aps[-1, :] = np.mean(iou_aps[1:-1, :], axis=0)
-    iou_acc[-1, :] = np.mean(iou_acc[1:-1, :], axis=0)
-    # compute pose mAP
-    for i, degree_thres in enumerate(degree_thres_list):
-        for j, shift_thres in enumerate(shift_thres_list):
-            for cls_id in range(1, num_classes):
-                cls_pose_pred_matches_all = pose_pred_matches_all[cls_id][i, j, :]
-                cls_pose_gt_matches_all = pose_gt_matches_all[cls_id][i, j, :]
-                cls_pose_pred_scores_all = pose_pred_scores_all[cls_id][i, j, :]
-                pose_aps[cls_id, i, j], pose_acc[cls_id, i, j] = compute_ap_and_acc(cls_pose_pred_matches_all,
-                                                                                    cls_pose_pred_scores_all,
-                                                                                    cls_pose_gt_matches_all)
-            pose_aps[-1, i, j] = np.mean(pose_aps[1:-1, i, j])
-            pose_acc[-1, i, j] = np.mean(pose_acc[1:-1, i, j])
-
-    # save results to pkl
-    result_dict = {}
-    result_dict['iou_thres_list'] = iou_thres_list
-    result_dict['degree_thres_list'] = degree_thres_list
-    result_dict['shift_thres_list'] = shift_thres_list
-    result_dict['iou_aps'] = iou_aps
-    result_dict['pose_aps'] = pose_aps
-    result_dict['iou_acc'] = iou_acc
-    result_dict['pose_acc'] = pose_acc
-    pkl_path = os.path.join(out_dir, 'mAP_Acc.pkl')
-    with open(pkl_path, 'wb') as f:
-        cPickle.dump(result_dict, f)
-    return iou_aps, pose_aps, iou_acc, pose_acc
+    dataset = get_pose_eval_dataset('objectron').replace(iou_kernel=iou_kernel)
+    return compute_pose_mAP(pred_results, out_dir, dataset, degree_thresholds, shift_thresholds,
+                            iou_3d_thresholds, iou_pose_thres, use_matches_for_pose, num_workers)
 
 
 def plot_mAP_objectron(iou_aps, pose_aps, out_dir, iou_thres_list, degree_thres_list, shift_thres_list):
@@ -1670,8 +675,12 @@ def plot_mAP_objectron(iou_aps, pose_aps, out_dir, iou_thres_list, degree_thres_
     return
 
 def compute_mAP_sunrgbd(pred_results, out_dir, degree_thresholds=[180], shift_thresholds=[100],
-                iou_3d_thresholds=[0.1], iou_pose_thres=0.1, use_matches_for_pose=False):
-    """ Compute mean Average Precision.
+                iou_3d_thresholds=[0.1], iou_pose_thres=0.1, use_matches_for_pose=False, num_workers=0):
+    """ Compute mean Average Precision on SUN RGB-D, see pose_eval.compute_pose_mAP.
+
+    Args:
+        num_workers: number of processes matching images in parallel,
+            0 evaluates in the main process.
 
     Returns:
         iou_aps:
@@ -1680,167 +689,8 @@ def compute_mAP_sunrgbd(pred_results, out_dir, degree_thresholds=[180], shift_th
         pose_acc:
 
     """
-    synset_names = ['BG', 'bed','table','sofa','chair','toilet','desk','dresser','night_stand','bookshelf','bathtub'] #for nocs
-    num_classes = len(synset_names)
-    degree_thres_list = list(degree_thresholds) + [360]
-    num_degree_thres = len(degree_thres_list)
-    shift_thres_list = list(shift_thresholds) + [100]
-    num_shift_thres = len(shift_thres_list)
-    iou_thres_list = list(iou_3d_thresholds)
-    num_iou_thres = len(iou_thres_list)
-
-    if use_matches_for_pose:
-        assert iou_pose_thres in iou_thres_list
-
-    # pre-allocate more than enough memory
-    iou_aps = np.zeros((num_classes + 1, num_iou_thres))
-    iou_acc = np.zeros((num_classes + 1, num_iou_thres))
-    iou_pred_matches_all = [np.zeros((num_iou_thres, 300000)) for _ in range(num_classes)]
-    iou_pred_scores_all = [np.zeros((num_iou_thres, 300000)) for _ in range(num_classes)]
-    iou_gt_matches_all = [np.zeros((num_iou_thres, 300000)) for _ in range(num_classes)]
-    iou_pred_count = [0 for _ in range(num_classes)]
-    iou_gt_count = [0 for _ in range(num_classes)]
-
-    pose_aps = np.zeros((num_classes + 1, num_degree_thres, num_shift_thres))
-    pose_acc = np.zeros((num_classes + 1, num_degree_thres, num_shift_thres))
-    pose_pred_matches_all = [np.zeros((num_degree_thres, num_shift_thres, 300000)) for _ in range(num_classes)]
-    pose_pred_scores_all = [np.zeros((num_degree_thres, num_shift_thres, 300000)) for _ in range(num_classes)]
-    pose_gt_matches_all = [np.zeros((num_degree_thres, num_shift_thres, 300000)) for _ in range(num_classes)]
-    pose_pred_count = [0 for _ in range(num_classes)]
-    pose_gt_count = [0 for _ in range(num_classes)]
-
-    # loop over results to gather pred matches and gt matches for iou and pose metrics
-    progress = 0
-    for progress, result in enumerate(tqdm(pred_results)): 
-        gt_class_ids = result['gt_class_ids'] #和synset对齐
-        gt_sRT = np.array(result['gt_RTs'])
-        gt_size = np.array(result['gt_scales'])
-        gt_handle_visibility = result['gt_handle_visibility']
-
-        pred_class_ids = result['pred_class_ids']
-        pred_sRT = np.array(result['pred_RTs'])
-        pred_size = result['pred_scales']
-        pred_scores = result['pred_scores']
-
-        if len(gt_class_ids) == 0 and len(pred_class_ids) == 0:
-            continue
-        else:
-            gt_class_ids=np.array([class_id+1 for class_id in gt_class_ids]).astype(np.int32) #将标签和synset 对齐
-            pred_class_ids=np.array([class_id+1 for class_id in pred_class_ids]).astype(np.int32)
-
-        for cls_id in range(1, num_classes):
-            # get gt and predictions in this class
-            cls_gt_class_ids = gt_class_ids[gt_class_ids==cls_id] if len(gt_class_ids) else np.zeros(0)
-            cls_gt_sRT = gt_sRT[gt_class_ids==cls_id] if len(gt_class_ids) else np.zeros((0, 4, 4))
-            cls_gt_size = gt_size[gt_class_ids==cls_id] if len(gt_class_ids) else np.zeros((0, 3))
-            if synset_names[cls_id] != 'mug':
-                cls_gt_handle_visibility = np.ones_like(cls_gt_class_ids)
-            else:
-                cls_gt_handle_visibility = gt_handle_visibility[gt_class_ids==cls_id] if len(gt_class_ids) else np.ones(0)
-
-            cls_pred_class_ids = pred_class_ids[pred_class_ids==cls_id] if len(pred_class_ids) else np.zeros(0)
-            cls_pred_sRT = pred_sRT[pred_class_ids==cls_id] if len(pred_class_ids) else np.zeros((0, 4, 4))
-            cls_pred_size = pred_size[pred_class_ids==cls_id] if len(pred_class_ids) else np.zeros((0, 3))
-            cls_pred_scores = pred_scores[pred_class_ids==cls_id] if len(pred_class_ids) else np.zeros(0)
-
-            # calculate the overlap between each gt instance and pred instance
-            iou_cls_gt_match, iou_cls_pred_match, _, iou_pred_indices = \
-                compute_IoU_matches(cls_gt_class_ids, cls_gt_sRT, cls_gt_size, cls_gt_handle_visibility,
-                                    cls_pred_class_ids, cls_pred_sRT, cls_pred_size, cls_pred_scores,
-                                    synset_names, iou_thres_list)
-            if len(iou_pred_indices):
-                cls_pred_class_ids = cls_pred_class_ids[iou_pred_indices]
-                cls_pred_sRT = cls_pred_sRT[iou_pred_indices]
-                cls_pred_scores = cls_pred_scores[iou_pred_indices]
-
-            num_pred = iou_cls_pred_match.shape[1]
-            pred_start = iou_pred_count[cls_id]
-            pred_end = pred_start + num_pred
-            iou_pred_count[cls_id] = pred_end
-            iou_pred_matches_all[cls_id][:, pred_start:pred_end] = iou_cls_pred_match
-            cls_pred_scores_tile = np.tile(cls_pred_scores, (num_iou_thres, 1))
-            assert cls_pred_scores_tile.shape[1] == num_pred
-            iou_pred_scores_all[cls_id][:, pred_start:pred_end] = cls_pred_scores_tile
-            num_gt = iou_cls_gt_match.shape[1]
-            gt_start = iou_gt_count[cls_id]
-            gt_end = gt_start + num_gt
-            iou_gt_count[cls_id] = gt_end
-            iou_gt_matches_all[cls_id][:, gt_start:gt_end] = iou_cls_gt_match
-
-            if use_matches_for_pose:
-                thres_ind = list(iou_thres_list).index(iou_pose_thres)
-                iou_thres_pred_match = iou_cls_pred_match[thres_ind, :]
-                cls_pred_class_ids = cls_pred_class_ids[iou_thres_pred_match > -1] if len(iou_thres_pred_match) > 0 else np.zeros(0)
-                cls_pred_sRT = cls_pred_sRT[iou_thres_pred_match > -1] if len(iou_thres_pred_match) > 0 else np.zeros((0, 4, 4))
-                cls_pred_scores = cls_pred_scores[iou_thres_pred_match > -1] if len(iou_thres_pred_match) > 0 else np.zeros(0)
-                iou_thres_gt_match = iou_cls_gt_match[thres_ind, :]
-                cls_gt_class_ids = cls_gt_class_ids[iou_thres_gt_match > -1] if len(iou_thres_gt_match) > 0 else np.zeros(0)
-                cls_gt_sRT = cls_gt_sRT[iou_thres_gt_match > -1] if len(iou_thres_gt_match) > 0 else np.zeros((0, 4, 4))
-                cls_gt_handle_visibility = cls_gt_handle_visibility[iou_thres_gt_match > -1] if len(iou_thres_gt_match) > 0 else np.zeros(0)
-
-            RT_overlaps = compute_RT_overlaps(cls_gt_class_ids, cls_gt_sRT, cls_gt_handle_visibility,
-                                              cls_pred_class_ids, cls_pred_sRT, synset_names)
-            pose_cls_gt_match, pose_cls_pred_match = compute_RT_matches(RT_overlaps, cls_pred_class_ids, cls_gt_class_ids,
-                                                                        degree_thres_list, shift_thres_list)
-            num_pred = pose_cls_pred_match.shape[2]
-            pred_start = pose_pred_count[cls_id]
-            pred_end = pred_start + num_pred
-            pose_pred_count[cls_id] = pred_end
-            pose_pred_matches_all[cls_id][:, :, pred_start:pred_end] = pose_cls_pred_match
-            cls_pred_scores_tile = np.tile(cls_pred_scores, (num_degree_thres, num_shift_thres, 1))
-            assert cls_pred_scores_tile.shape[2] == num_pred
-            pose_pred_scores_all[cls_id][:, :, pred_start:pred_end] = cls_pred_scores_tile
-            num_gt = pose_cls_gt_match.shape[2]
-            gt_start = pose_gt_count[cls_id]
-            gt_end = gt_start + num_gt
-            pose_gt_count[cls_id] = gt_end
-            pose_gt_matches_all[cls_id][:, :, gt_start:gt_end] = pose_cls_gt_match
-
-    # trim zeros
-    for cls_id in range(num_classes):
-        # IoU
-        iou_pred_matches_all[cls_id] = iou_pred_matches_all[cls_id][:, :iou_pred_count[cls_id]]
-        iou_pred_scores_all[cls_id] = iou_pred_scores_all[cls_id][:, :iou_pred_count[cls_id]]
-        iou_gt_matches_all[cls_id] = iou_gt_matches_all[cls_id][:, :iou_gt_count[cls_id]]
-        # pose
-        pose_pred_matches_all[cls_id] = pose_pred_matches_all[cls_id][:, :, :pose_pred_count[cls_id]]
-        pose_pred_scores_all[cls_id] = pose_pred_scores_all[cls_id][:, :, :pose_pred_count[cls_id]]
-        pose_gt_matches_all[cls_id] = pose_gt_matches_all[cls_id][:, :, :pose_gt_count[cls_id]]
-
-    # compute 3D IoU mAP
-    for cls_id in range(1, num_classes):
-        for s, iou_thres in enumerate(iou_thres_list):
-            iou_aps[cls_id, s], iou_acc[cls_id, s] = compute_ap_and_acc(iou_pred_matches_all[cls_id][s, :],
-                                                                        iou_pred_scores_all[cls_id][s, :],
-                                                                        iou_gt_matches_all[cls_id][s, :])
-    iou_aps[-1, :] = np.mean(iou_aps[1:-1, :], axis=0)
-    iou_acc[-1, :] = np.mean(iou_acc[1:-1, :], axis=0)
-    # compute pose mAP
-    for i, degree_thres in enumerate(degree_thres_list):
-        for j, shift_thres in enumerate(shift_thres_list):
-            for cls_id in range(1, num_classes):
-                cls_pose_pred_matches_all = pose_pred_matches_all[cls_id][i, j, :]
-                cls_pose_gt_matches_all = pose_gt_matches_all[cls_id][i, j, :]
-                cls_pose_pred_scores_all = pose_pred_scores_all[cls_id][i, j, :]
-                pose_aps[cls_id, i, j], pose_acc[cls_id, i, j] = compute_ap_and_acc(cls_pose_pred_matches_all,
-                                                                                    cls_pose_pred_scores_all,
-                                                                                    cls_pose_gt_matches_all)
-            pose_aps[-1, i, j] = np.mean(pose_aps[1:-1, i, j])
-            pose_acc[-1, i, j] = np.mean(pose_acc[1:-1, i, j])
-
-    # save results to pkl
-    result_dict = {}
-    result_dict['iou_thres_list'] = iou_thres_list
-    result_dict['degree_thres_list'] = degree_thres_list
-    result_dict['shift_thres_list'] = shift_thres_list
-    result_dict['iou_aps'] = iou_aps
-    result_dict['pose_aps'] = pose_aps
-    result_dict['iou_acc'] = iou_acc
-    result_dict['pose_acc'] = pose_acc
-    pkl_path = os.path.join(out_dir, 'mAP_Acc.pkl')
-    with open(pkl_path, 'wb') as f:
-        cPickle.dump(result_dict, f)
-    return iou_aps, pose_aps, iou_acc, pose_acc
+    return compute_pose_mAP(pred_results, out_dir, 'sunrgbd', degree_thresholds, shift_thresholds,
+                            iou_3d_thresholds, iou_pose_thres, use_matches_for_pose, num_workers)
 
 
 def plot_mAP_sunrgbd(iou_aps, pose_aps, out_dir, iou_thres_list, degree_thres_list, shift_thres_list):
@@ -1932,64 +782,3 @@ def align_rotation(sRT):
     aligned_sRT[:3, :3] = s * rotation
     aligned_sRT[:3, 3] = T
     return aligned_sRT
-
-
-def draw_bboxes(img, img_pts, color):
-    img_pts = np.int32(img_pts).reshape(-1, 2)
-    # draw ground layer in darker color
-    color_ground = (int(color[0]*0.3), int(color[1]*0.3), int(color[2]*0.3))
-    for i, j in zip([4, 5, 6, 7], [5, 7, 4, 6]):
-        img = cv2.line(img, tuple(img_pts[i]), tuple(img_pts[j]), color_ground, 2)
-    # draw pillars in minor darker color
-    color_pillar = (int(color[0]*0.6), int(color[1]*0.6), int(color[2]*0.6))
-    for i, j in zip(range(4), range(4, 8)):
-        img = cv2.line(img, tuple(img_pts[i]), tuple(img_pts[j]), color_pillar, 2)
-    # draw top layer in original color
-    for i, j in zip([0, 1, 2, 3], [1, 3, 0, 2]):
-        img = cv2.line(img, tuple(img_pts[i]), tuple(img_pts[j]), color, 2)
-
-    return img
-
-
-def draw_detections(img, out_dir, data_name, img_id, intrinsics, pred_sRT, pred_size, pred_class_ids,
-                    gt_sRT, gt_size, gt_class_ids, nocs_sRT, nocs_size, nocs_class_ids, draw_gt=True, draw_nocs=True):
-    """ Visualize pose predictions.
-    """
-    out_path = os.path.join(out_dir, '{}_{}_pred.png'.format(data_name, img_id))
-
-    # draw nocs results - BLUE color
-    if draw_nocs:
-        for i in range(nocs_sRT.shape[0]):
-            if nocs_class_ids[i] in [1, 2, 4]:
-                sRT = align_rotation(nocs_sRT[i, :, :])
-            else:
-                sRT = nocs_sRT[i, :, :]
-            bbox_3d = get_3d_bbox(nocs_size[i, :], 0)
-            transformed_bbox_3d = transform_coordinates_3d(bbox_3d, sRT)
-            projected_bbox = calculate_2d_projections(transformed_bbox_3d, intrinsics)
-            img = draw_bboxes(img, projected_bbox, (255, 0, 0))
-    # darw ground truth - GREEN color
-    if draw_gt:
-        for i in range(gt_sRT.shape[0]):
-            if gt_class_ids[i] in [1, 2, 4]:
-                sRT = align_rotation(gt_sRT[i, :, :])
-            else:
-                sRT = gt_sRT[i, :, :]
-            bbox_3d = get_3d_bbox(gt_size[i, :], 0)
-            transformed_bbox_3d = transform_coordinates_3d(bbox_3d, sRT)
-            projected_bbox = calculate_2d_projections(transformed_bbox_3d, intrinsics)
-            img = draw_bboxes(img, projected_bbox, (0, 255, 0))
-    # darw prediction - RED color
-    for i in range(pred_sRT.shape[0]):
-        if pred_class_ids[i] in [1, 2, 4]:
-            sRT = align_rotation(pred_sRT[i, :, :])
-        else:
-            sRT = pred_sRT[i, :, :]
-        bbox_3d = get_3d_bbox(pred_size[i, :], 0)
-        transformed_bbox_3d = transform_coordinates_3d(bbox_3d, sRT)
-        projected_bbox = calculate_2d_projections(transformed_bbox_3d, intrinsics)
-        img = draw_bboxes(img, projected_bbox, (0, 0, 255))
-
-    cv2.imwrite(out_path, img)
-    # cv2.imshow('vis', img)
-    # cv2.waitKey(0)
@@ -0,0 +1,241 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+"""
+    Point sampling of mesh surfaces and point clouds shared by the pose
+    benchmarks, e.g. to build shape priors and point cloud metrics from the
+    object models.
+
+    All the points of a mesh are drawn in one pass and farthest point
+    sampling keeps a single distance vector per cloud. The batched variants
+    spread many meshes or clouds over threads, NumPy releases the GIL in the
+    array operations.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+
+
+def random_point(face_vertices, r1=None, r2=None):
+    """ Sampling points using Barycentric coordinates.
+
+    Args:
+        face_vertices: [3, 3] or [N, 3, 3], vertices of the faces
+        r1, r2: None or [N], uniform random numbers, drawn by np.random if None
+
+    Returns:
+        points: [3] or [N, 3], a point on each face
+
+    """
+    face_vertices = np.asarray(face_vertices)
+    if r1 is None:
+        r1, r2 = np.random.random((2, ) + face_vertices.shape[:-2])
+    sqrt_r1 = np.sqrt(r1)[..., None]
+    r2 = np.asarray(r2)[..., None]
+    point = (1 - sqrt_r1) * face_vertices[..., 0, :] + \
+        sqrt_r1 * (1 - r2) * face_vertices[..., 1, :] + \
+        sqrt_r1 * r2 * face_vertices[..., 2, :]
+    return point
+
+
+def pairwise_distance(A, B):
+    """ Compute pairwise distance of two point clouds.
+
+    Args:
+        A: n x 3 numpy array
+        B: m x 3 numpy array
+
+    Return:
+        C: n x m numpy array
+
+    """
+    diff = A[:, :, None] - B[:, :, None].T
+    C = np.sqrt(np.sum(diff**2, axis=1))
+
+    return C
+
+
+def uniform_sample(vertices,
+                   faces,
+                   n_samples,
+                   with_normal=False,
+                   rng=None,
+                   face_areas=None):
+    """ Sampling points according to the area of mesh surface.
+
+    Args:
+        vertices: [V, 3]
+        faces: [F, 3], index of triangle vertices
+        n_samples: int, number of points being sampled
+        with_normal: return points with normal, approximated by mesh
+            triangle normal
+        rng: np.random.Generator or RandomState, np.random if None
+        face_areas: None or [F], precomputed area of each face
+
+    Returns:
+        points: n_samples x 3, n_samples x 6 if with_normal = True
+
+    """
+    faces = np.asarray(vertices)[np.asarray(faces)]
+    if face_areas is None:
+        vec_cross = np.cross(faces[:, 1, :] - faces[:, 0, :],
+                             faces[:, 2, :] - faces[:, 0, :])
+        face_areas = 0.5 * np.linalg.norm(vec_cross, axis=1)
+    cum_area = np.cumsum(face_areas)
+    rng = np.random if rng is None else rng
+    face_ids = np.searchsorted(cum_area, rng.random(n_samples) * cum_area[-1])
+    r1, r2 = rng.random((2, n_samples))
+    sampled_faces = faces[face_ids]
+    sampled_points = random_point(sampled_faces, r1, r2).astype(float)
+    if with_normal:
+        # normals of the sampled faces only
+        normals = np.cross(sampled_faces[:, 1, :] - sampled_faces[:, 0, :],
+                           sampled_faces[:, 2, :] - sampled_faces[:, 0, :])
+        normals = normals / np.linalg.norm(normals, axis=1, keepdims=True)
+        sampled_points = np.concatenate((sampled_points, normals), axis=1)
+    return sampled_points
+
+
+def farthest_point_sampling(points, n_samples):
+    """ Farthest point sampling, starting from the first point.
+
+    Only the distances of the points to the selected set are kept, O(n)
+    memory instead of the full distance matrix.
+
+    Args:
+        points: [N, 3]
+        n_samples: int
+
+    Returns:
+        selected_pts: [n_samples] int, indices of the sampled points
+
+    """
+    points = np.asarray(points, dtype=np.float64)
+    selected_pts = np.zeros((n_samples, ), dtype=int)
+    # squared distances, same order as the distances
+    dist_to_set = np.full(len(points), np.inf)
+    diff = np.empty_like(points)
+    pt_idx = 0
+    for i in range(n_samples):
+        selected_pts[i] = pt_idx
+        np.subtract(points, points[pt_idx], out=diff)
+        np.minimum(
+            dist_to_set, np.einsum('ij,ij->i', diff, diff), out=dist_to_set)
+        pt_idx = np.argmax(dist_to_set)
+    return selected_pts
+
+
+def _map(func, args_list, num_workers):
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    num_workers = min(num_workers, len(args_list))
+    if num_workers <= 1:
+        return [func(*args) for args in args_list]
+    with ThreadPoolExecutor(num_workers) as executor:
+        return list(executor.map(lambda args: func(*args), args_list))
+
+
+def farthest_point_sampling_batch(points_list, n_samples, num_workers=None):
+    """ Farthest point sampling of many point clouds in threads.
+
+    Args:
+        points_list: list of [N_i, 3]
+        n_samples: int
+        num_workers: number of threads, None for the number of CPUs
+
+    Returns:
+        list of [n_samples] int, indices of the sampled points of each cloud
+
+    """
+    return _map(farthest_point_sampling,
+                [(points, n_samples) for points in points_list], num_workers)
+
+
+def sample_points_from_mesh_arrays(vertices,
+                                   faces,
+                                   n_pts,
+                                   with_normal=False,
+                                   fps=False,
+                                   ratio=2,
+                                   rng=None,
+                                   face_areas=None):
+    """ Uniformly sampling points from a mesh, see sample_points_from_mesh. """
+    if fps:
+        points = uniform_sample(vertices, faces, ratio * n_pts, with_normal,
+                                rng, face_areas)
+        pts_idx = farthest_point_sampling(points[:, :3], n_pts)
+        points = points[pts_idx]
+    else:
+        points = uniform_sample(vertices, faces, n_pts, with_normal, rng,
+                                face_areas)
+    return points
+
+
+def sample_points_from_meshes(meshes,
+                              n_pts,
+                              with_normal=False,
+                              fps=False,
+                              ratio=2,
+                              num_workers=None):
+    """ Uniformly sampling points from many meshes in threads.
+
+    Args:
+        meshes: list of (vertices, faces)
+        n_pts: int, number of points being sampled from each mesh.
+        with_normal: return points with normal, approximated by mesh
+            triangle normal
+        fps: whether to use fps for post-processing, default False.
+        ratio: int, if use fps, sample ratio*n_pts first, then use fps to
+            sample final output.
+        num_workers: number of threads, None for the number of CPUs
+
+    Returns:
+        list of n_pts x 3, n_pts x 6 if with_normal = True
+
+    """
+    # one generator per mesh, seeded from the global state, so that the
+    # results do not depend on the threads
+    seeds = np.random.randint(0, 2**31, size=len(meshes))
+    args_list = [(vertices, faces, n_pts, with_normal, fps, ratio,
+                  np.random.default_rng(seed))
+                 for (vertices, faces), seed in zip(meshes, seeds)]
+    return _map(sample_points_from_mesh_arrays, args_list, num_workers)
+
+
+def sample_farthest_points(points, num_samples, return_index=False):
+    """ Farthest point sampling of a batch of point clouds on their device,
+    starting from a random point.
+
+    Args:
+        points: [B, C, N] tensor
+        num_samples: int
+        return_index: whether to return the indices of the sampled points
+
+    Returns:
+        sampled: [B, C, num_samples]
+        indexes: [B, num_samples], if return_index
+
+    """
+    b, c, n = points.shape
+    batch_inds = torch.arange(b, device=points.device)
+    indexes = torch.zeros((b, num_samples),
+                          device=points.device,
+                          dtype=torch.int64)
+    index = torch.randint(n, [b], device=points.device)
+    dists = torch.full((b, n),
+                       float('inf'),
+                       device=points.device,
+                       dtype=points.dtype)
+    # iteratively sample farthest points, squared distances to the sampled set
+    for i in range(num_samples):
+        indexes[:, i] = index
+        diff = points - points[batch_inds, :, index][:, :, None]
+        dists = torch.minimum(dists, (diff * diff).sum(dim=1))
+        index = dists.argmax(dim=1)
+    gather_indexes = indexes[:, None].expand(b, c, num_samples)
+    sampled = torch.gather(points, 2, gather_indexes)
+
+    if return_index:
+        return sampled, indexes
+    else:
+        return sampled
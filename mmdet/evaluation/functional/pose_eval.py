@@ -0,0 +1,978 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+"""
+    Pose evaluation engine shared by the category-level pose benchmarks
+    (NOCS, PhoCAL, Wild6D, SUN RGB-D, Objectron, Omni3D, CPPF).
+
+    A benchmark is described by a PoseEvalDataset: its synset names, how
+    result labels map onto them, which instances are symmetric and which
+    3D IoU kernel is used. compute_pose_mAP runs the matching and mAP
+    computation for any of them.
+"""
+import math
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from functools import partial
+
+import _pickle as cPickle
+import numpy as np
+import torch
+from tqdm import tqdm
+
+from .iou import box3d_overlap_batch
+
+
+def get_symmetry_flags(class_ids, handle_visibility, synset_names):
+    """ Flags instances that are symmetric when rotating around y-axis.
+
+    Args:
+        class_ids: [N], index into synset_names
+        handle_visibility: [N], only used for mug
+        synset_names: list of class names
+
+    Returns:
+        flags: [N] bool
+
+    """
+    class_ids = np.asarray(class_ids, dtype=np.int64).reshape(-1)
+    handle_visibility = np.asarray(handle_visibility).reshape(-1)
+    sym_ids = [
+        i for i, name in enumerate(synset_names)
+        if name in ['bottle', 'bowl', 'can']
+    ]
+    mug_ids = [i for i, name in enumerate(synset_names) if name == 'mug']
+    flags = np.isin(class_ids, sym_ids)
+    if len(mug_ids) and len(class_ids):
+        flags |= np.isin(class_ids, mug_ids) & (handle_visibility == 0)
+    return flags
+
+
+def get_3d_bbox_batch(size):
+    """
+    Args:
+        size: [N, 3]
+    Returns:
+        bbox_3d: [N, 3, 8], same corner order as get_3d_bbox
+
+    """
+    signs = np.array([[+1, +1, +1], [+1, +1, -1], [-1, +1, +1], [-1, +1, -1],
+                      [+1, -1, +1], [+1, -1, -1], [-1, -1, +1], [-1, -1, -1]],
+                     dtype=np.float64)
+    size = np.asarray(size, dtype=np.float64).reshape(-1, 1, 3)
+    bbox_3d = signs[None] * (size / 2)
+    return bbox_3d.transpose(0, 2, 1)
+
+
+def get_y_rotations(n):
+    """ n homogeneous rotations around y-axis evenly spaced over 2 pi, the
+    first one is the identity. Returns [n, 4, 4] """
+    theta = 2 * math.pi * np.arange(n) / float(n)
+    y_rotations = np.zeros((n, 4, 4))
+    y_rotations[:, 0, 0] = np.cos(theta)
+    y_rotations[:, 0, 2] = np.sin(theta)
+    y_rotations[:, 1, 1] = 1
+    y_rotations[:, 2, 0] = -np.sin(theta)
+    y_rotations[:, 2, 2] = np.cos(theta)
+    y_rotations[:, 3, 3] = 1
+    return y_rotations
+
+
+def compute_3d_IoU_batch(sRT_1,
+                         sRT_2,
+                         size_1,
+                         size_2,
+                         symmetric,
+                         n_rotations=20):
+    """ Computes IoU overlaps between two sets of 3D bboxes in one pass.
+
+    Vectorized version of compute_3d_IoU. Pairs flagged in ``symmetric`` take
+    the best IoU over ``n_rotations`` y-axis rotations of the first box.
+
+    Args:
+        sRT_1: [N, 4, 4]. homogeneous affine transformations
+        sRT_2: [M, 4, 4]. homogeneous affine transformations
+        size_1: [N, 3]
+        size_2: [M, 3]
+        symmetric: [N, M] bool, or broadcastable to it
+
+    Returns:
+        overlaps: [N, M]
+
+    """
+    sRT_1 = np.asarray(sRT_1, dtype=np.float64).reshape(-1, 4, 4)
+    sRT_2 = np.asarray(sRT_2, dtype=np.float64).reshape(-1, 4, 4)
+    num_1, num_2 = sRT_1.shape[0], sRT_2.shape[0]
+    if num_1 == 0 or num_2 == 0:
+        return np.zeros((num_1, num_2))
+    symmetric = np.broadcast_to(
+        np.asarray(symmetric, dtype=bool), (num_1, num_2))
+
+    n = n_rotations if symmetric.any() else 1
+    rotated_sRT_1 = sRT_1[:, None] @ get_y_rotations(n)[None]  # N n 4 4
+
+    def to_homogeneous(bbox_3d):
+        ones = np.ones(bbox_3d.shape[:-2] + (1, 8))
+        return np.concatenate([bbox_3d, ones], axis=-2)
+
+    bbox_3d_1 = rotated_sRT_1 @ to_homogeneous(
+        get_3d_bbox_batch(size_1))[:, None]  # N n 4 8
+    bbox_3d_1 = bbox_3d_1[..., :3, :] / bbox_3d_1[..., 3:, :]
+    bbox_3d_2 = sRT_2 @ to_homogeneous(get_3d_bbox_batch(size_2))  # M 4 8
+    bbox_3d_2 = bbox_3d_2[..., :3, :] / bbox_3d_2[..., 3:, :]
+
+    bbox_1_max = np.amax(bbox_3d_1, axis=-1)[:, :, None]  # N n 1 3
+    bbox_1_min = np.amin(bbox_3d_1, axis=-1)[:, :, None]
+    bbox_2_max = np.amax(bbox_3d_2, axis=-1)[None, None]  # 1 1 M 3
+    bbox_2_min = np.amin(bbox_3d_2, axis=-1)[None, None]
+
+    overlap_min = np.maximum(bbox_1_min, bbox_2_min)
+    overlap_max = np.minimum(bbox_1_max, bbox_2_max)
+    overlap_size = overlap_max - overlap_min
+
+    # intersections and union
+    intersections = np.where(
+        np.amin(overlap_size, axis=-1) < 0, 0, np.prod(overlap_size, axis=-1))
+    volume_1 = np.prod(bbox_1_max - bbox_1_min, axis=-1)
+    volume_2 = np.prod(bbox_2_max - bbox_2_min, axis=-1)
+    union = volume_1 + volume_2 - intersections
+    overlaps = intersections / union  # N n M
+
+    # keep the running-max semantics of compute_3d_IoU (start at 0, skip nan)
+    max_overlaps = np.fmax.reduce(overlaps, axis=1, initial=0)
+    return np.where(symmetric, max_overlaps, overlaps[:, 0])
+
+
+def get_box_corners_batch(sRT, size):
+    """
+    Args:
+        sRT: [..., 4, 4]
+        size: [..., 3]
+    Returns:
+        corners: [..., 8, 3], in the order of iou.omni3d_box3d_overlap
+
+    """
+    signs = np.array([[-1, -1, -1], [+1, -1, -1], [+1, +1, -1], [-1, +1, -1],
+                      [-1, -1, +1], [+1, -1, +1], [+1, +1, +1], [-1, +1, +1]],
+                     dtype=np.float64)
+    corners = signs * (np.asarray(size, dtype=np.float64)[..., None, :] / 2)
+    corners = corners @ np.swapaxes(sRT[..., :3, :3], -1, -2)
+    corners = corners + sRT[..., None, :3, 3]
+    return corners / sRT[..., None, 3:, 3]
+
+
+def compute_3d_IoU_exact_batch(sRT_1,
+                               sRT_2,
+                               size_1,
+                               size_2,
+                               symmetric,
+                               n_rotations=20):
+    """ Computes exact IoU overlaps between two sets of oriented 3D bboxes.
+
+    Same interface as compute_3d_IoU_batch, but the boxes are intersected as
+    oriented boxes (iou.box3d_overlap_batch) instead of their axis aligned
+    bounds, as in the Objectron and Omni3D protocols. Only the rows with a
+    symmetric pair are evaluated for the extra y-axis rotations.
+
+    Returns:
+        overlaps: [N, M]
+
+    """
+    sRT_1 = np.asarray(sRT_1, dtype=np.float64).reshape(-1, 4, 4)
+    sRT_2 = np.asarray(sRT_2, dtype=np.float64).reshape(-1, 4, 4)
+    size_1 = np.asarray(size_1, dtype=np.float64).reshape(-1, 3)
+    size_2 = np.asarray(size_2, dtype=np.float64).reshape(-1, 3)
+    num_1, num_2 = sRT_1.shape[0], sRT_2.shape[0]
+    if num_1 == 0 or num_2 == 0:
+        return np.zeros((num_1, num_2))
+    symmetric = np.broadcast_to(
+        np.asarray(symmetric, dtype=bool), (num_1, num_2))
+
+    corners_2 = torch.from_numpy(get_box_corners_batch(sRT_2, size_2))
+    overlaps = box3d_overlap_batch(
+        torch.from_numpy(get_box_corners_batch(sRT_1, size_1)),
+        corners_2).numpy()
+
+    sym_rows = np.flatnonzero(symmetric.any(axis=1))
+    if len(sym_rows) and n_rotations > 1:
+        sym_cols = np.flatnonzero(symmetric[sym_rows].any(axis=0))
+        y_rotations = get_y_rotations(n_rotations)[1:]
+        rotated_sRT_1 = sRT_1[sym_rows, None] @ y_rotations[None]  # S n-1 4 4
+        rotated_size_1 = np.broadcast_to(size_1[sym_rows, None],
+                                         rotated_sRT_1.shape[:2] + (3, ))
+        rotated_overlaps = box3d_overlap_batch(
+            torch.from_numpy(
+                get_box_corners_batch(rotated_sRT_1,
+                                      rotated_size_1).reshape(-1, 8, 3)),
+            corners_2[sym_cols]).numpy().reshape(
+                len(sym_rows), n_rotations - 1, len(sym_cols))
+        block = np.ix_(sym_rows, sym_cols)
+        max_overlaps = np.fmax(overlaps[block], rotated_overlaps.max(axis=1))
+        overlaps[block] = np.where(symmetric[block], max_overlaps,
+                                   overlaps[block])
+    return overlaps
+
+
+def compute_IoU_matches_from_overlaps(overlaps,
+                                      pred_class_ids,
+                                      gt_class_ids,
+                                      iou_3d_thresholds,
+                                      score_threshold=0):
+    """ Greedily matches predictions sorted by score to ground truths.
+
+    Args:
+        overlaps: [num_pred, num_gt] IoU overlaps, predictions sorted by
+            score from high to low
+        pred_class_ids: [num_pred]
+        gt_class_ids: [num_gt]
+        iou_3d_thresholds: list of IoU thresholds
+
+    Returns:
+        gt_matches: [num_thres, num_gt], index of the matched prediction or -1
+        pred_matches: [num_thres, num_pred], index of the matched gt or -1
+
+    """
+    num_pred, num_gt = overlaps.shape
+    num_iou_3d_thres = len(iou_3d_thresholds)
+    pred_matches = -1 * np.ones([num_iou_3d_thres, num_pred])
+    gt_matches = -1 * np.ones([num_iou_3d_thres, num_gt])
+    # all IoU thresholds are matched at once, see compute_RT_matches
+    iou_thres = np.asarray(iou_3d_thresholds, dtype=overlaps.dtype)[:, None]
+    pred_class_ids = np.asarray(pred_class_ids)
+    gt_class_ids = np.asarray(gt_class_ids)
+    gt_matched = np.zeros((num_iou_3d_thres, num_gt), dtype=bool)
+    for i in range(num_pred):
+        # Find best matching ground truth box
+        # 1. Sort matches by score
+        sorted_ixs = np.argsort(overlaps[i])[::-1]
+        # 2. Remove low scores
+        low_score_idx = np.where(overlaps[i, sorted_ixs] < score_threshold)[0]
+        if low_score_idx.size > 0:
+            sorted_ixs = sorted_ixs[:low_score_idx[0]]
+        if sorted_ixs.size == 0:
+            continue
+        # 3. Find the match: skipping matched ground truth boxes, the loop
+        # ends at the first IoU below the threshold or at a match
+        ious = overlaps[i, sorted_ixs]
+        same_class = pred_class_ids[i] == gt_class_ids[sorted_ixs]
+        stops = (ious < iou_thres) | (same_class & (ious > iou_thres))
+        stops &= ~gt_matched[:, sorted_ixs]
+        s = np.nonzero(stops.any(axis=-1))[0]
+        k = np.argmax(stops[s], axis=-1)
+        is_match = ious[k] > iou_thres[s, 0]
+        s, j = s[is_match], sorted_ixs[k[is_match]]
+        gt_matched[s, j] = True
+        gt_matches[s, j] = i
+        pred_matches[s, i] = j
+    return gt_matches, pred_matches
+
+
+def compute_RT_errors_batch(sRT_1, sRT_2, symmetric):
+    """ Vectorized version of compute_RT_errors.
+
+    Args:
+        sRT_1: [N, 4, 4]. homogeneous affine transformations
+        sRT_2: [M, 4, 4]. homogeneous affine transformations
+        symmetric: [M] bool, instances of sRT_2 symmetric around y-axis
+
+    Returns:
+        errors: [N, M, 2]. angle difference of R in degree and
+            l2 difference of T in centimeter for every pair
+
+    Raises:
+        ValueError: if the last row of a transformation is not [0, 0, 0, 1]
+    """
+    sRT_1 = np.asarray(sRT_1).reshape(-1, 4, 4)
+    sRT_2 = np.asarray(sRT_2).reshape(-1, 4, 4)
+    num_1, num_2 = sRT_1.shape[0], sRT_2.shape[0]
+    errors = np.zeros((num_1, num_2, 2))
+    if num_1 == 0 or num_2 == 0:
+        return errors
+    # make sure the last row is [0, 0, 0, 1]
+    last_rows = np.concatenate([sRT_1[:, 3, :], sRT_2[:, 3, :]])
+    invalid = np.any(last_rows != np.array([0, 0, 0, 1]), axis=1)
+    if invalid.any():
+        raise ValueError('the last row of the transformations must be '
+                         f'[0, 0, 0, 1], got {last_rows[invalid].tolist()}')
+
+    s1 = np.cbrt(np.linalg.det(sRT_1[:, :3, :3]))
+    R1 = sRT_1[:, :3, :3] / s1[:, None, None]
+    T1 = sRT_1[:, :3, 3]
+    s2 = np.cbrt(np.linalg.det(sRT_2[:, :3, :3]))
+    R2 = sRT_2[:, :3, :3] / s2[:, None, None]
+    T2 = sRT_2[:, :3, 3]
+    R = R1[:, None] @ R2.transpose(0, 2, 1)[None]  # N M 3 3
+    cos_theta = (np.trace(R, axis1=-2, axis2=-1) - 1) / 2
+    # symmetric when rotating around y-axis, compare the y axes only
+    symmetric = np.asarray(symmetric, dtype=bool).reshape(-1)
+    if symmetric.any():
+        y1 = R1[:, :, 1].astype(np.float64)
+        y2 = R2[:, :, 1].astype(np.float64)
+        cos_y = (y1 @ y2.T) / (
+            np.linalg.norm(y1, axis=1)[:, None] *
+            np.linalg.norm(y2, axis=1)[None, :])
+        cos_theta = np.where(symmetric[None, :], cos_y, cos_theta)
+
+    errors[..., 0] = np.arccos(np.clip(cos_theta, -1.0, 1.0)) * 180 / np.pi
+    errors[..., 1] = np.linalg.norm(
+        T1[:, None, :] - T2[None, :, :], axis=-1) * 100
+    return errors
+
+
+def compute_RT_matches(overlaps, pred_class_ids, gt_class_ids,
+                       degree_thres_list, shift_thres_list):
+    num_degree_thres = len(degree_thres_list)
+    num_shift_thres = len(shift_thres_list)
+    num_pred = len(pred_class_ids)
+    num_gt = len(gt_class_ids)
+
+    pred_matches = -1 * np.ones((num_degree_thres, num_shift_thres, num_pred))
+    gt_matches = -1 * np.ones((num_degree_thres, num_shift_thres, num_gt))
+
+    if num_pred == 0 or num_gt == 0:
+        return gt_matches, pred_matches
+
+    assert num_pred == overlaps.shape[0]
+    assert num_gt == overlaps.shape[1]
+    assert overlaps.shape[2] == 2
+
+    # every (degree, shift) threshold pair is matched at once, greedily in
+    # prediction order, same as looping over the thresholds one by one
+    degree_thres = np.asarray(degree_thres_list)[:, None, None]
+    shift_thres = np.asarray(shift_thres_list)[None, :, None]
+    pred_class_ids = np.asarray(pred_class_ids)
+    gt_class_ids = np.asarray(gt_class_ids)
+    gt_matched = np.zeros((num_degree_thres, num_shift_thres, num_gt),
+                          dtype=bool)
+    for i in range(num_pred):
+        # Find best matching ground truth box
+        # 1. Sort matches by scores from low to high, once for all thresholds
+        sum_degree_shift = np.sum(overlaps[i, :, :], axis=-1)
+        sorted_ixs = np.argsort(sum_degree_shift)
+        # 2. Candidates: unmatched, same class and within the thresholds
+        sorted_overlaps = overlaps[i, sorted_ixs]
+        candidates = ~gt_matched[:, :, sorted_ixs]
+        candidates &= (pred_class_ids[i] == gt_class_ids[sorted_ixs])
+        candidates &= ~(sorted_overlaps[:, 0] > degree_thres)
+        candidates &= ~(sorted_overlaps[:, 1] > shift_thres)
+        # 3. Take the first candidate for every threshold pair
+        d, s = np.nonzero(candidates.any(axis=-1))
+        j = sorted_ixs[np.argmax(candidates[d, s], axis=-1)]
+        gt_matched[d, s, j] = True
+        gt_matches[d, s, j] = i
+        pred_matches[d, s, i] = j
+
+    return gt_matches, pred_matches
+
+
+class MatchAccumulator(object):
+    """ Growable storage of the pred matches and gt counts of one class.
+
+    Replaces the fixed ``np.zeros((*thres_shape, 30000))`` buffers of the
+    compute_mAP* routines. Only whether a prediction is matched matters for
+    AP, so matches are kept as bool flags per threshold, the scores (shared
+    by every threshold) once per prediction as float32 and the gts as a
+    count. Storage grows in chunks with amortized doubling.
+
+    Args:
+        thres_shape: shape of the threshold grid, e.g. (num_iou_thres,) or
+            (num_degree_thres, num_shift_thres)
+        capacity: number of predictions allocated up front
+    """
+
+    def __init__(self, thres_shape, capacity=1024):
+        self.thres_shape = tuple(thres_shape)
+        self.num_thres = int(np.prod(self.thres_shape))
+        self.num_pred = 0
+        self.num_gt = 0
+        self._matched = np.zeros((capacity, self.num_thres), dtype=bool)
+        self._scores = np.zeros(capacity, dtype=np.float32)
+
+    def _reserve(self, size):
+        capacity = self._scores.shape[0]
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity)
+        matched = np.zeros((capacity, self.num_thres), dtype=bool)
+        matched[:self.num_pred] = self._matched[:self.num_pred]
+        scores = np.zeros(capacity, dtype=np.float32)
+        scores[:self.num_pred] = self._scores[:self.num_pred]
+        self._matched, self._scores = matched, scores
+
+    def append(self, pred_matches, pred_scores, gt_matches):
+        """ Appends the matches of one image.
+
+        Args:
+            pred_matches: [*thres_shape, num_pred], matched gt index or -1
+            pred_scores: [num_pred]
+            gt_matches: [*thres_shape, num_gt]
+        """
+        pred_matches = np.asarray(pred_matches)
+        self.append_matched(pred_matches > -1, pred_scores,
+                            np.shape(gt_matches)[-1])
+
+    def append_matched(self, pred_matched, pred_scores, num_gt):
+        """ Same as append, with the bool flags of matched predictions and
+        the number of gts, see compact_image_matches. """
+        num_pred = pred_matched.shape[-1]
+        assert len(pred_scores) == num_pred
+        self._reserve(self.num_pred + num_pred)
+        end = self.num_pred + num_pred
+        self._matched[self.num_pred:end] = pred_matched.reshape(
+            self.num_thres, num_pred).T
+        self._scores[self.num_pred:end] = pred_scores
+        self.num_pred = end
+        self.num_gt += num_gt
+
+    def merge(self, other):
+        """ Appends everything gathered by another accumulator. """
+        assert other.thres_shape == self.thres_shape
+        end = self.num_pred + other.num_pred
+        self._reserve(end)
+        self._matched[self.num_pred:end] = other.pred_matched
+        self._scores[self.num_pred:end] = other.pred_scores
+        self.num_pred = end
+        self.num_gt += other.num_gt
+
+    @property
+    def pred_matched(self):
+        """ [num_pred, num_thres] bool """
+        return self._matched[:self.num_pred]
+
+    @property
+    def pred_scores(self):
+        """ [num_pred] float32 """
+        return self._scores[:self.num_pred]
+
+    def compute_ap_and_acc(self, chunk_size=2**22):
+        """ Same as nocs_utils.compute_ap_and_acc, for every threshold at once.
+
+        The score order is shared by all thresholds, so predictions are
+        sorted once and precision/recall are integrated column-wise, in
+        chunks of thresholds to bound the temporary memory.
+
+        Returns:
+            ap: [*thres_shape]
+            acc: [*thres_shape]
+        """
+        num_pred = self.num_pred
+        ap = np.zeros(self.num_thres)
+        acc = np.zeros(self.num_thres)
+        # sort the scores from high to low, in float64 as the original buffers
+        score_indices = np.argsort(self.pred_scores.astype(np.float64))[::-1]
+        ranks = (np.arange(num_pred) + 1)[:, None]
+        step = max(1, chunk_size // max(num_pred, 1))
+        for start in range(0, self.num_thres, step):
+            end = start + step
+            pred_matched = self.pred_matched[score_indices, start:end]
+            num_tp = np.cumsum(pred_matched, axis=0)
+            precisions = num_tp / ranks
+            recalls = num_tp.astype(np.float32) / self.num_gt
+            # Pad with start and end values to simplify the math
+            zeros = np.zeros((1, precisions.shape[1]))
+            precisions = np.concatenate([zeros, precisions, zeros])
+            recalls = np.concatenate([zeros, recalls, zeros + 1])
+            # Ensure precision values decrease but don't increase
+            precisions = np.maximum.accumulate(precisions[::-1], axis=0)[::-1]
+            # compute mean AP over recall range
+            changed = recalls[:-1] != recalls[1:]
+            areas = (recalls[1:] - recalls[:-1]) * precisions[1:]
+            ap[start:end] = np.sum(np.where(changed, areas, 0), axis=0)
+            # accuracy
+            acc[start:end] = num_tp[-1] / num_pred if num_pred else np.nan
+        return ap.reshape(self.thres_shape), acc.reshape(self.thres_shape)
+
+
+def nocs_symmetry(cat_names, gt_class_ids, result):
+    """ bottle, bowl and can are symmetric around y-axis, mugs too when the
+    handle is not visible. """
+    handle_visibility = result.get('gt_handle_visibility')
+    if handle_visibility is None:
+        handle_visibility = np.ones(len(gt_class_ids))
+    return get_symmetry_flags(gt_class_ids, handle_visibility, cat_names)
+
+
+def up_axis_symmetry(cat_names, gt_class_ids, result):
+    """ Per-instance flags stored in ``gt_up_syms`` (CPPF results). """
+    return np.asarray(result['gt_up_syms'], dtype=bool).reshape(-1)
+
+
+def no_symmetry(cat_names, gt_class_ids, result):
+    return np.zeros(len(gt_class_ids), dtype=bool)
+
+
+IOU_KERNELS = {
+    # NOCS 3D IoU: axis-aligned overlap of the transformed boxes
+    'aabb': compute_3d_IoU_batch,
+    # Objectron/Omni3D 3D IoU: overlap of the oriented boxes
+    'exact': compute_3d_IoU_exact_batch,
+}
+
+
+class PoseEvalDataset(object):
+    """ Describes how the pose mAP of one benchmark is evaluated.
+
+    Args:
+        synset_names: evaluated class names, 'BG' first
+        cat_names: names indexed by the labels of the results, defaults to
+            synset_names
+        label_offset: added to the labels of the results before looking
+            them up in cat_names, 1 when the results use 0-based labels
+            and cat_names starts with 'BG'
+        symmetry: callable (cat_names, gt_class_ids, result) returning the
+            [num_gt] bool flags of instances symmetric around y-axis
+        iou_kernel: key of IOU_KERNELS or a callable
+            (sRT_1, sRT_2, size_1, size_2, symmetric) -> [N, M] overlaps
+        pose_key: key of the predicted poses in the results
+    """
+
+    def __init__(self,
+                 synset_names,
+                 cat_names=None,
+                 label_offset=0,
+                 symmetry=nocs_symmetry,
+                 iou_kernel='aabb',
+                 pose_key='pred_RTs'):
+        self.synset_names = list(synset_names)
+        if cat_names is None:
+            cat_names = synset_names
+        self.cat_names = list(cat_names)
+        self.label_offset = label_offset
+        self.symmetry = symmetry
+        self.iou_kernel = iou_kernel
+        self.pose_key = pose_key
+        assert self.synset_names[0] == 'BG'
+        assert all(name in self.cat_names for name in self.synset_names)
+
+    @property
+    def num_classes(self):
+        return len(self.synset_names)
+
+    def cat_id(self, cls_id):
+        """ Label of the results for the cls_id-th synset. """
+        return self.cat_names.index(self.synset_names[cls_id])
+
+    def get_iou_kernel(self):
+        if callable(self.iou_kernel):
+            return self.iou_kernel
+        return IOU_KERNELS[self.iou_kernel]
+
+    def replace(self, **kwargs):
+        """ Returns a copy with some fields replaced, e.g. evaluating a
+        single class with ``replace(synset_names=['BG', 'mug'])``. """
+        fields = dict(
+            synset_names=self.synset_names,
+            cat_names=self.cat_names,
+            label_offset=self.label_offset,
+            symmetry=self.symmetry,
+            iou_kernel=self.iou_kernel,
+            pose_key=self.pose_key)
+        fields.update(kwargs)
+        return PoseEvalDataset(**fields)
+
+
+NOCS_SYNSETS = ['BG', 'bottle', 'bowl', 'camera', 'can', 'laptop', 'mug']
+PHOCAL_SYNSETS = [
+    'BG', 'bottle', 'box', 'can', 'cup', 'remote', 'teapot', 'cutlery', 'glass'
+]
+OBJECTRON_SYNSETS = [
+    'BG', 'bicycle', 'books', 'bottle', 'camera', 'cereal box', 'chair', 'cup',
+    'laptop', 'shoes'
+]
+SUNRGBD_SYNSETS = [
+    'BG', 'bed', 'table', 'sofa', 'chair', 'toilet', 'desk', 'dresser',
+    'night_stand', 'bookshelf', 'bathtub'
+]
+OMNI3D_SYNSETS = [
+    'BG', "pedestrian", "car", "dontcare", "cyclist", "van", "truck", "tram",
+    "person", "traffic cone", "barrier", "motorcycle", "bicycle", "bus",
+    "trailer", "books", "bottle", "camera", "cereal box", "chair", "cup",
+    "laptop", "shoes", "towel", "blinds", "window", "lamp", "shelves",
+    "mirror", "sink", "cabinet", "bathtub", "door", "toilet", "desk", "box",
+    "bookcase", "picture", "table", "counter", "bed", "night stand", "dresser",
+    "pillow", "sofa", "television", "floor mat", "curtain", "clothes",
+    "stationery", "refrigerator", "board", "kitchen pan", "bin", "stove",
+    "microwave", "plates", "bowl", "oven", "vase", "faucet", "tissues",
+    "machine", "printer", "monitor", "podium", "cart", "projector",
+    "electronics", "computer", "air conditioner", "drawers", "coffee maker",
+    "toaster", "potted plant", "painting", "bag", "tray", "keyboard",
+    "blanket", "rack", "phone", "mouse", "fire extinguisher", "toys", "ladder",
+    "fan", "glass", "clock", "toilet paper", "closet", "fume hood", "utensils",
+    "soundsystem", "fire place", "shower curtain", "remote", "pen", "fireplace"
+]  # omni3d 98
+
+POSE_EVAL_DATASETS = {
+    # labels of the mmdet results are 0-based, synsets start with 'BG'
+    'nocs': PoseEvalDataset(NOCS_SYNSETS, label_offset=1),
+    'phocal': PoseEvalDataset(PHOCAL_SYNSETS, label_offset=1),
+    'objectron': PoseEvalDataset(OBJECTRON_SYNSETS, label_offset=1),
+    'sunrgbd': PoseEvalDataset(SUNRGBD_SYNSETS, label_offset=1),
+    'omni3d': PoseEvalDataset(OMNI3D_SYNSETS, label_offset=1),
+    # labels of the Wild6D and CPPF results already index the synsets
+    'wild6d': PoseEvalDataset(NOCS_SYNSETS),
+    # CPPF intersects the oriented boxes
+    'cppf': PoseEvalDataset(
+        NOCS_SYNSETS, symmetry=up_axis_symmetry, iou_kernel='exact'),
+}
+
+
+def get_pose_eval_dataset(dataset):
+    """ Looks up a PoseEvalDataset by name, instances are returned as is. """
+    if isinstance(dataset, PoseEvalDataset):
+        return dataset
+    if dataset not in POSE_EVAL_DATASETS:
+        raise KeyError(f'Unknown pose evaluation dataset {dataset}, '
+                       f'expected one of {list(POSE_EVAL_DATASETS)}')
+    return POSE_EVAL_DATASETS[dataset]
+
+
+class StageTimer(object):
+    """ Accumulates the wall time spent in the stages of an evaluation.
+
+    Passed as ``timer`` to compute_pose_mAP or compute_degree_cm_mAP, which
+    time their stages with ``with timer(stage):`` in the calling process.
+
+    Attributes:
+        times: dict, seconds spent in each stage
+    """
+
+    def __init__(self):
+        self.times = defaultdict(float)
+
+    @contextmanager
+    def __call__(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.times[stage] += time.perf_counter() - start
+
+
+def time_stage(timer, stage):
+    """ timer(stage), or a context doing nothing if timer is None. """
+    return nullcontext() if timer is None else timer(stage)
+
+
+def compute_image_matches(result,
+                          dataset,
+                          iou_thres_list,
+                          degree_thres_list,
+                          shift_thres_list,
+                          iou_pose_thres=0.1,
+                          use_matches_for_pose=False,
+                          timer=None):
+    """ Gathers pred matches and gt matches of one image for iou and pose
+    metrics.
+
+    Args:
+        result: dict, predictions and ground truths of one image
+        dataset: PoseEvalDataset
+        timer: None or StageTimer, times the iou_matrix, iou_matching,
+            rt_errors and rt_matching stages
+
+    Returns:
+        image_matches: list indexed by class id (None for BG) of tuples
+            (iou_pred_match, iou_pred_scores, iou_gt_match,
+             pose_pred_match, pose_pred_scores, pose_gt_match),
+            or None if the image has nothing to evaluate.
+
+    """
+    try:
+        gt_class_ids = np.asarray(result['gt_class_ids'])
+        gt_sRT = np.array(result['gt_RTs']).reshape(-1, 4, 4)
+        gt_size = np.array(result['gt_scales']).reshape(-1, 3)
+
+        pred_class_ids = np.asarray(result['pred_class_ids'])
+        pred_sRT = np.array(result[dataset.pose_key]).reshape(-1, 4, 4)
+        pred_size = np.asarray(result['pred_scales']).reshape(-1, 3)
+        pred_scores = np.asarray(result['pred_scores'])
+    except KeyError:
+        # images without annotations are stored as empty dicts
+        return None
+
+    if len(gt_class_ids) == 0 and len(pred_class_ids) == 0:
+        return None
+    # align the labels with cat_names
+    gt_class_ids = gt_class_ids.astype(np.int32) + dataset.label_offset
+    pred_class_ids = pred_class_ids.astype(np.int32) + dataset.label_offset
+    gt_symmetric = dataset.symmetry(dataset.cat_names, gt_class_ids, result)
+    iou_kernel = dataset.get_iou_kernel()
+
+    # the overlaps of all classes are computed by a single kernel call, the
+    # exact kernel costs about as much for one pair as for a whole image
+    image_overlaps = np.zeros((len(pred_class_ids), len(gt_class_ids)),
+                              dtype=np.float32)
+    with time_stage(timer, 'iou_matrix'):
+        same_class = pred_class_ids[:, None] == gt_class_ids[None, :]
+        pred_idx = np.flatnonzero(same_class.any(axis=1))
+        gt_idx = np.flatnonzero(same_class.any(axis=0))
+        if len(pred_idx) and len(gt_idx):
+            image_overlaps[np.ix_(pred_idx, gt_idx)] = iou_kernel(
+                pred_sRT[pred_idx], gt_sRT[gt_idx], pred_size[pred_idx],
+                gt_size[gt_idx],
+                same_class[np.ix_(pred_idx, gt_idx)] & gt_symmetric[gt_idx])
+
+    image_matches = [None]
+    for cls_id in range(1, dataset.num_classes):
+        cat_id = dataset.cat_id(cls_id)
+        # get gt and predictions in this class
+        gt_mask = gt_class_ids == cat_id
+        cls_gt_class_ids = gt_class_ids[gt_mask]
+        cls_gt_sRT = gt_sRT[gt_mask]
+        cls_gt_symmetric = gt_symmetric[gt_mask]
+
+        # sort predictions by score from high to low
+        pred_mask = pred_class_ids == cat_id
+        indices = np.argsort(pred_scores[pred_mask])[::-1]
+        cls_pred_class_ids = pred_class_ids[pred_mask][indices]
+        cls_pred_sRT = pred_sRT[pred_mask][indices]
+        cls_pred_scores = pred_scores[pred_mask][indices]
+
+        # overlap between each pred instance and gt instance of this class
+        overlaps = image_overlaps[np.flatnonzero(pred_mask)[indices]][:,
+                                                                      gt_mask]
+        with time_stage(timer, 'iou_matching'):
+            iou_cls_gt_match, iou_cls_pred_match = \
+                compute_IoU_matches_from_overlaps(overlaps,
+                                                  cls_pred_class_ids,
+                                                  cls_gt_class_ids,
+                                                  iou_thres_list)
+        iou_cls_pred_scores = cls_pred_scores
+
+        if use_matches_for_pose:
+            thres_ind = list(iou_thres_list).index(iou_pose_thres)
+            pred_matched = iou_cls_pred_match[thres_ind, :] > -1
+            cls_pred_class_ids = cls_pred_class_ids[pred_matched]
+            cls_pred_sRT = cls_pred_sRT[pred_matched]
+            cls_pred_scores = cls_pred_scores[pred_matched]
+            gt_matched = iou_cls_gt_match[thres_ind, :] > -1
+            cls_gt_class_ids = cls_gt_class_ids[gt_matched]
+            cls_gt_sRT = cls_gt_sRT[gt_matched]
+            cls_gt_symmetric = cls_gt_symmetric[gt_matched]
+
+        with time_stage(timer, 'rt_errors'):
+            RT_overlaps = compute_RT_errors_batch(cls_pred_sRT, cls_gt_sRT,
+                                                  cls_gt_symmetric)
+        with time_stage(timer, 'rt_matching'):
+            pose_cls_gt_match, pose_cls_pred_match = compute_RT_matches(
+                RT_overlaps, cls_pred_class_ids, cls_gt_class_ids,
+                degree_thres_list, shift_thres_list)
+        image_matches.append(
+            (iou_cls_pred_match, iou_cls_pred_scores, iou_cls_gt_match,
+             pose_cls_pred_match, cls_pred_scores, pose_cls_gt_match))
+    return image_matches
+
+
+def imap_pred_results(func, pred_results, num_workers=0):
+    """ Applies func to every image result, optionally in a process pool.
+
+    Results are yielded in the order of pred_results, so merging them is
+    deterministic regardless of num_workers.
+
+    Args:
+        func: picklable callable taking one image result
+        pred_results: list of image results
+        num_workers: number of processes, 0 or 1 runs in the main process
+
+    """
+    if num_workers is None or num_workers <= 1 or len(pred_results) <= 1:
+        for result in tqdm(pred_results):
+            yield func(result)
+        return
+    num_workers = min(num_workers, multiprocessing.cpu_count(),
+                      len(pred_results))
+    chunksize = max(1, len(pred_results) // (num_workers * 8))
+    with multiprocessing.Pool(processes=num_workers) as pool:
+        yield from tqdm(
+            pool.imap(func, pred_results, chunksize=chunksize),
+            total=len(pred_results))
+
+
+def compact_image_matches(image_matches):
+    """ Keeps what the AP integration needs from compute_image_matches.
+
+    Returns:
+        image_matches: list indexed by class id (None for BG) of tuples
+            (iou_pred_matched, iou_pred_scores, iou_num_gt,
+             pose_pred_matched, pose_pred_scores, pose_num_gt), with bool
+            match flags and float32 scores, or None.
+
+    """
+    if image_matches is None:
+        return None
+    compact = [None]
+    for cls_matches in image_matches[1:]:
+        iou_pred_match, iou_pred_scores, iou_gt_match, \
+            pose_pred_match, pose_pred_scores, pose_gt_match = cls_matches
+        iou_matches = (np.asarray(iou_pred_match) > -1,
+                       np.asarray(iou_pred_scores, dtype=np.float32),
+                       np.shape(iou_gt_match)[-1])
+        pose_matches = (np.asarray(pose_pred_match) > -1,
+                        np.asarray(pose_pred_scores, dtype=np.float32),
+                        np.shape(pose_gt_match)[-1])
+        compact.append(iou_matches + pose_matches)
+    return compact
+
+
+def compute_compact_image_matches(result, **kwargs):
+    """ compute_image_matches followed by compact_image_matches. """
+    return compact_image_matches(compute_image_matches(result, **kwargs))
+
+
+class PoseMAPAccumulator(object):
+    """ Accumulates the matches of every class image by image and computes
+    the 3D IoU and pose mAP from them.
+
+    compute_pose_mAP feeds it a whole list of results. Metrics can instead
+    match each image as its batch arrives (``match_image``), keep only the
+    compact matches, and ``update`` the accumulator at the end.
+
+    Args:
+        dataset: PoseEvalDataset or a key of POSE_EVAL_DATASETS
+        degree_thresholds, shift_thresholds, iou_3d_thresholds,
+        iou_pose_thres, use_matches_for_pose, timer: see compute_pose_mAP
+    """
+
+    def __init__(self,
+                 dataset,
+                 degree_thresholds=[180],
+                 shift_thresholds=[100],
+                 iou_3d_thresholds=[0.1],
+                 iou_pose_thres=0.1,
+                 use_matches_for_pose=False,
+                 timer=None):
+        self.dataset = get_pose_eval_dataset(dataset)
+        self.timer = timer
+        self.degree_thres_list = list(degree_thresholds) + [360]
+        self.shift_thres_list = list(shift_thresholds) + [100]
+        self.iou_thres_list = list(iou_3d_thresholds)
+        if use_matches_for_pose:
+            assert iou_pose_thres in self.iou_thres_list
+        # picklable, so it can be sent to worker processes
+        self.match_image = partial(
+            compute_compact_image_matches,
+            dataset=self.dataset,
+            iou_thres_list=self.iou_thres_list,
+            degree_thres_list=self.degree_thres_list,
+            shift_thres_list=self.shift_thres_list,
+            iou_pose_thres=iou_pose_thres,
+            use_matches_for_pose=use_matches_for_pose,
+            timer=timer)
+        num_classes = self.dataset.num_classes
+        self.iou_matches_all = [
+            MatchAccumulator((len(self.iou_thres_list), ))
+            for _ in range(num_classes)
+        ]
+        self.pose_matches_all = [
+            MatchAccumulator(
+                (len(self.degree_thres_list), len(self.shift_thres_list)))
+            for _ in range(num_classes)
+        ]
+
+    def update(self, image_matches):
+        """ Adds the output of match_image for one image. """
+        if image_matches is None:
+            return
+        for cls_id in range(1, self.dataset.num_classes):
+            iou_pred_matched, iou_pred_scores, iou_num_gt, \
+                pose_pred_matched, pose_pred_scores, pose_num_gt = \
+                image_matches[cls_id]
+            self.iou_matches_all[cls_id].append_matched(
+                iou_pred_matched, iou_pred_scores, iou_num_gt)
+            self.pose_matches_all[cls_id].append_matched(
+                pose_pred_matched, pose_pred_scores, pose_num_gt)
+
+    def compute(self, out_dir=None):
+        """ Integrates the APs, mAP_Acc.pkl is saved to out_dir if given.
+
+        Returns:
+            iou_aps: [num_classes + 1, num_iou_thres], the last row is the mean
+            pose_aps: [num_classes + 1, num_degree_thres, num_shift_thres]
+            iou_acc:
+            pose_acc:
+        """
+        with time_stage(self.timer, 'ap_integration'):
+            return self._compute(out_dir)
+
+    def _compute(self, out_dir):
+        num_classes = self.dataset.num_classes
+        iou_aps = np.zeros((num_classes + 1, len(self.iou_thres_list)))
+        iou_acc = np.zeros((num_classes + 1, len(self.iou_thres_list)))
+        pose_aps = np.zeros((num_classes + 1, len(self.degree_thres_list),
+                             len(self.shift_thres_list)))
+        pose_acc = np.zeros((num_classes + 1, len(self.degree_thres_list),
+                             len(self.shift_thres_list)))
+
+        # compute 3D IoU mAP
+        for cls_id in range(1, num_classes):
+            iou_aps[cls_id], iou_acc[cls_id] = self.iou_matches_all[
+                cls_id].compute_ap_and_acc()
+        iou_aps[-1, :] = np.mean(iou_aps[1:-1, :], axis=0)
+        iou_acc[-1, :] = np.mean(iou_acc[1:-1, :], axis=0)
+        # compute pose mAP
+        for cls_id in range(1, num_classes):
+            pose_aps[cls_id], pose_acc[cls_id] = self.pose_matches_all[
+                cls_id].compute_ap_and_acc()
+        pose_aps[-1] = np.mean(pose_aps[1:-1], axis=0)
+        pose_acc[-1] = np.mean(pose_acc[1:-1], axis=0)
+
+        # save results to pkl
+        if out_dir is not None:
+            result_dict = {}
+            result_dict['iou_thres_list'] = self.iou_thres_list
+            result_dict['degree_thres_list'] = self.degree_thres_list
+            result_dict['shift_thres_list'] = self.shift_thres_list
+            result_dict['iou_aps'] = iou_aps
+            result_dict['pose_aps'] = pose_aps
+            result_dict['iou_acc'] = iou_acc
+            result_dict['pose_acc'] = pose_acc
+            pkl_path = os.path.join(out_dir, 'mAP_Acc.pkl')
+            with open(pkl_path, 'wb') as f:
+                cPickle.dump(result_dict, f)
+        return iou_aps, pose_aps, iou_acc, pose_acc
+
+
+def compute_pose_mAP(pred_results,
+                     out_dir,
+                     dataset,
+                     degree_thresholds=[180],
+                     shift_thresholds=[100],
+                     iou_3d_thresholds=[0.1],
+                     iou_pose_thres=0.1,
+                     use_matches_for_pose=False,
+                     num_workers=0,
+                     timer=None):
+    """ Compute mean Average Precision of 3D IoU and pose for any benchmark.
+
+    Args:
+        pred_results: list of per-image dicts with gt_class_ids, gt_RTs,
+            gt_scales, pred_class_ids, pred_RTs, pred_scales, pred_scores
+            and the fields used by the symmetry rule of the dataset
+        out_dir: mAP_Acc.pkl is saved there, skipped if None
+        dataset: PoseEvalDataset or a key of POSE_EVAL_DATASETS
+        num_workers: number of processes matching images in parallel,
+            0 evaluates in the main process.
+        timer: None or StageTimer, times the stages of compute_image_matches
+            and the ap_integration stage. Requires num_workers <= 1.
+
+    Returns:
+        iou_aps: [num_classes + 1, num_iou_thres], the last row is the mean
+        pose_aps: [num_classes + 1, num_degree_thres, num_shift_thres]
+        iou_acc:
+        pose_acc:
+
+    """
+    if timer is not None and num_workers is not None and num_workers > 1:
+        raise ValueError('the stages can only be timed in the main process, '
+                         f'got num_workers={num_workers}')
+    accumulator = PoseMAPAccumulator(dataset, degree_thresholds,
+                                     shift_thresholds, iou_3d_thresholds,
+                                     iou_pose_thres, use_matches_for_pose,
+                                     timer)
+    # loop over results to gather pred matches and gt matches for iou and
+    # pose metrics
+    for image_matches in imap_pred_results(accumulator.match_image,
+                                           pred_results, num_workers):
+        accumulator.update(image_matches)
+    return accumulator.compute(out_dir)
@@ -0,0 +1,176 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+"""
+    Columnar index of the ground truth poses of a COCO style annotation file.
+
+    The pose metrics used to walk get_ann_ids/load_anns and rebuild the gt
+    arrays of every image on each evaluation. PoseGTIndex parses the
+    annotations once into contiguous arrays plus per-image offsets, so the
+    gts of an image are slices of them. The index can be persisted to an
+    .npz file beside the annotation file and is reused while the annotation
+    file is unchanged.
+"""
+import os
+import os.path as osp
+import warnings
+
+import numpy as np
+
+
+class PoseGTIndex:
+    """Ground truth poses of all images in contiguous arrays.
+
+    The annotations of the i-th image are rows ``offsets[i]:offsets[i+1]``
+    of ``RTs`` (4x4 homogeneous poses), ``scales`` (3D sizes), ``bboxes``
+    (xyxy), ``class_ids`` (category ids), ``handle_visibility`` (1 when
+    missing) and ``iscrowd``. Ignored annotations are dropped, but an image
+    whose annotations are all ignored still counts as annotated, like the
+    per-image loops of the metrics did.
+    """
+    version = 1
+    columns = ('RTs', 'scales', 'bboxes', 'class_ids', 'handle_visibility',
+               'iscrowd')
+
+    def __init__(self, img_ids, offsets, num_anns, **columns):
+        self.img_ids = np.asarray(img_ids, dtype=np.int64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        # number of annotations before dropping the ignored ones
+        self.num_anns = np.asarray(num_anns, dtype=np.int64)
+        for key in self.columns:
+            setattr(self, key, columns[key])
+        self._img_idx = {
+            img_id: i for i, img_id in enumerate(self.img_ids.tolist())}
+
+    def __len__(self):
+        return len(self.img_ids)
+
+    @classmethod
+    def from_coco(cls, coco):
+        """Build the index from a COCO api instance."""
+        img_ids = coco.get_img_ids()
+        offsets = [0]
+        num_anns = []
+        rots, poss, scales, bboxes, class_ids, vis, iscrowd = \
+            [], [], [], [], [], [], []
+        for img_id in img_ids:
+            ann_info = coco.imgToAnns[img_id]
+            num_anns.append(len(ann_info))
+            for ann in ann_info:
+                if ann.get('ignore', False):
+                    continue
+                rots.append(ann['relative_pose'].get('rotation'))
+                poss.append(ann['relative_pose'].get('position'))
+                x1, y1, w, h = ann['bbox']
+                bboxes.append([x1, y1, x1 + w, y1 + h])
+                scales.append(ann['bbox_3d_size'])
+                class_ids.append(ann['category_id'])
+                vis.append(ann.get('handle_visibility', 1))
+                iscrowd.append(ann.get('iscrowd', 0))
+            offsets.append(len(class_ids))
+
+        num_gts = len(class_ids)
+        RTs = np.zeros((num_gts, 4, 4), dtype=np.float32)
+        RTs[:, :3, :3] = np.array(rots, dtype=np.float32).reshape(-1, 3, 3)
+        RTs[:, :3, 3] = np.array(poss, dtype=np.float32).reshape(-1, 3)
+        RTs[:, 3, 3] = 1
+        return cls(
+            img_ids,
+            offsets,
+            num_anns,
+            RTs=RTs,
+            scales=np.array(scales, dtype=np.float32).reshape(-1, 3),
+            bboxes=np.array(bboxes, dtype=np.float64).reshape(-1, 4),
+            class_ids=np.array(class_ids, dtype=np.int32),
+            handle_visibility=np.array(vis, dtype=np.int64),
+            iscrowd=np.array(iscrowd, dtype=bool))
+
+    @classmethod
+    def load(cls, cache_file, ann_file=None):
+        """Load an index saved by :meth:`save`.
+
+        Returns None when the cache is missing, of another version or older
+        than ``ann_file``.
+        """
+        if not osp.isfile(cache_file):
+            return None
+        with np.load(cache_file) as data:
+            if int(data['version']) != cls.version:
+                return None
+            if ann_file is not None and \
+                    tuple(data['source_stat']) != _file_stat(ann_file):
+                return None
+            return cls(data['img_ids'], data['offsets'], data['num_anns'],
+                       **{key: data[key] for key in cls.columns})
+
+    def save(self, cache_file, ann_file=None):
+        """Save the index to ``cache_file``, stamped with the size and mtime
+        of ``ann_file`` so that a changed annotation file invalidates it."""
+        source_stat = _file_stat(ann_file) if ann_file is not None else (0, 0)
+        # write to a temporary file first, other ranks may read the cache
+        tmp_file = f'{cache_file}.{os.getpid()}.tmp.npz'
+        np.savez(
+            tmp_file,
+            version=self.version,
+            source_stat=np.array(source_stat, dtype=np.int64),
+            img_ids=self.img_ids,
+            offsets=self.offsets,
+            num_anns=self.num_anns,
+            **{key: getattr(self, key) for key in self.columns})
+        os.replace(tmp_file, cache_file)
+
+    @classmethod
+    def from_ann_file(cls, coco, ann_file, cache=False):
+        """Build the index of ``coco`` loaded from ``ann_file``.
+
+        Args:
+            coco (COCO): COCO api of ``ann_file``.
+            ann_file (str): Path of the annotation file.
+            cache (bool): Whether to persist the index to an .npz file
+                beside a local ``ann_file`` and reuse it while the
+                annotation file is unchanged. Defaults to False.
+
+        Returns:
+            PoseGTIndex: The index.
+        """
+        if not cache or not osp.isfile(ann_file):
+            return cls.from_coco(coco)
+        cache_file = get_pose_gt_index_file(ann_file)
+        index = cls.load(cache_file, ann_file)
+        if index is None:
+            index = cls.from_coco(coco)
+            try:
+                index.save(cache_file, ann_file)
+            except OSError as e:
+                warnings.warn(f'Failed to save the pose gt index to '
+                              f'{cache_file}: {e}')
+        return index
+
+    def slice(self, img_id):
+        """Rows of the annotations of ``img_id``, or None when the image has
+        no annotations."""
+        i = self._img_idx.get(img_id)
+        if i is None or self.num_anns[i] == 0:
+            return None
+        return slice(self.offsets[i], self.offsets[i + 1])
+
+    def get(self, img_id):
+        """Ground truths of ``img_id`` in the format of object-deformnet
+        pred_results, or None when the image has no annotations."""
+        rows = self.slice(img_id)
+        if rows is None:
+            return None
+        return dict(
+            gt_class_ids=self.class_ids[rows],
+            gt_bboxes=self.bboxes[rows].astype(np.int32),
+            gt_RTs=self.RTs[rows],
+            gt_scales=self.scales[rows],
+            gt_handle_visibility=self.handle_visibility[rows])
+
+
+def get_pose_gt_index_file(ann_file):
+    """Path of the cached PoseGTIndex of ``ann_file``."""
+    return osp.splitext(ann_file)[0] + '.pose_gt_index.npz'
+
+
+def _file_stat(path):
+    stat = os.stat(path)
+    return (stat.st_size, stat.st_mtime_ns)
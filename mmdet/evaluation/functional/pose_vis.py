@@ -0,0 +1,205 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+"""
+    Visualization of pose predictions shared by the pose benchmarks.
+
+    The 3D boxes of an image, or of a whole batch, are aligned, transformed
+    and projected in a few batched matrix operations, each box is drawn in
+    three polyline calls and the images can be encoded and written by the
+    threads of an ImageWriter while the evaluation goes on.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from .pose_eval import get_3d_bbox_batch
+
+# edges of the boxes of get_3d_bbox, ground layer, pillars and top layer
+GROUND_EDGES = ([4, 5], [5, 7], [6, 4], [7, 6])
+PILLAR_EDGES = ([0, 4], [1, 5], [2, 6], [3, 7])
+TOP_EDGES = ([0, 1], [1, 3], [2, 0], [3, 2])
+
+
+def align_rotation_batch(sRT):
+    """ Align rotations for symmetric objects, vectorized align_rotation.
+
+    Args:
+        sRT: [N, 4, 4]
+
+    Returns:
+        aligned_sRT: [N, 4, 4] float32
+    """
+    sRT = np.asarray(sRT).reshape(-1, 4, 4)
+    s = np.cbrt(np.linalg.det(sRT[:, :3, :3]))
+    R = sRT[:, :3, :3] / s[:, None, None]
+
+    theta_x = R[:, 0, 0] + R[:, 2, 2]
+    theta_y = R[:, 0, 2] - R[:, 2, 0]
+    r_norm = np.sqrt(theta_x**2 + theta_y**2)
+    s_map = np.zeros((len(sRT), 3, 3))
+    s_map[:, 0, 0] = theta_x / r_norm
+    s_map[:, 0, 2] = -theta_y / r_norm
+    s_map[:, 1, 1] = 1.0
+    s_map[:, 2, 0] = theta_y / r_norm
+    s_map[:, 2, 2] = theta_x / r_norm
+    aligned_sRT = np.tile(np.identity(4, dtype=np.float32), (len(sRT), 1, 1))
+    aligned_sRT[:, :3, :3] = s[:, None, None] * (R @ s_map)
+    aligned_sRT[:, :3, 3] = sRT[:, :3, 3]
+    return aligned_sRT
+
+
+def project_3d_bboxes(sRT, size, intrinsics, symmetric=None):
+    """ Project the corners of 3D boxes to the image.
+
+    Args:
+        sRT: [N, 4, 4]
+        size: [N, 3]
+        intrinsics: [3, 3]
+        symmetric: None or [N] bool, boxes whose rotation is aligned first
+
+    Returns:
+        projected_bboxes: [N, 8, 2] int32, corners in the order of get_3d_bbox
+    """
+    sRT = np.array(sRT, dtype=np.float64).reshape(-1, 4, 4)
+    if symmetric is not None and np.any(symmetric):
+        symmetric = np.asarray(symmetric, dtype=bool)
+        sRT[symmetric] = align_rotation_batch(sRT[symmetric])
+    bbox_3d = get_3d_bbox_batch(size)  # N 3 8
+    bbox_3d = np.concatenate([bbox_3d, np.ones_like(bbox_3d[:, :1])], axis=1)
+    transformed = sRT @ bbox_3d
+    transformed = transformed[:, :3] / transformed[:, 3:]
+    projected = np.asarray(intrinsics) @ transformed
+    projected = projected[:, :2] / projected[:, 2:]
+    return np.array(projected.transpose(0, 2, 1), dtype=np.int32)
+
+
+def draw_bboxes(img, img_pts, color):
+    img_pts = np.int32(img_pts).reshape(-1, 2)
+    # draw ground layer in darker color
+    color_ground = tuple(int(c * 0.3) for c in color)
+    img = cv2.polylines(img, list(img_pts[list(GROUND_EDGES)]), False,
+                        color_ground, 2)
+    # draw pillars in minor darker color
+    color_pillar = tuple(int(c * 0.6) for c in color)
+    img = cv2.polylines(img, list(img_pts[list(PILLAR_EDGES)]), False,
+                        color_pillar, 2)
+    # draw top layer in original color
+    img = cv2.polylines(img, list(img_pts[list(TOP_EDGES)]), False, color, 2)
+
+    return img
+
+
+class ImageWriter:
+    """ Writes images with cv2.imwrite in background threads.
+
+    The images are copied when submitted, at most max_pending images wait
+    to be written. Errors are raised by the next write or by close.
+
+    Args:
+        num_workers: number of threads, None for min(4, number of CPUs)
+        max_pending: number of images waiting to be written before write
+            blocks
+    """
+
+    def __init__(self, num_workers=None, max_pending=32):
+        if num_workers is None:
+            num_workers = min(4, os.cpu_count() or 1)
+        self._executor = ThreadPoolExecutor(
+            num_workers, thread_name_prefix='image_writer')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._futures = []
+
+    def _write(self, path, img):
+        try:
+            if not cv2.imwrite(path, img):
+                raise IOError(f'failed to write {path}')
+        finally:
+            self._slots.release()
+
+    def _check(self, wait=False):
+        pending = []
+        for future in self._futures:
+            if wait or future.done():
+                future.result()
+            else:
+                pending.append(future)
+        self._futures = pending
+
+    def write(self, path, img):
+        self._check()
+        self._slots.acquire()
+        self._futures.append(
+            self._executor.submit(self._write, path, img.copy()))
+
+    def close(self):
+        """ Wait for all the images to be written. """
+        try:
+            self._check(wait=True)
+        finally:
+            self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def draw_detections(img,
+                    out_dir,
+                    data_name,
+                    img_id,
+                    intrinsics,
+                    pred_sRT,
+                    pred_size,
+                    pred_class_ids,
+                    gt_sRT,
+                    gt_size,
+                    gt_class_ids,
+                    nocs_sRT,
+                    nocs_size,
+                    nocs_class_ids,
+                    draw_gt=True,
+                    draw_nocs=True,
+                    writer=None):
+    """ Visualize pose predictions.
+
+    The boxes of the nocs results, the ground truths and the predictions are
+    projected at once. Pass an ImageWriter as writer to write the image in
+    the background.
+    """
+    out_path = os.path.join(out_dir,
+                            '{}_{}_pred.png'.format(data_name, img_id))
+
+    # nocs results - BLUE color, ground truth - GREEN color,
+    # prediction - RED color
+    groups = []
+    if draw_nocs:
+        groups.append((nocs_sRT, nocs_size, nocs_class_ids, (255, 0, 0)))
+    if draw_gt:
+        groups.append((gt_sRT, gt_size, gt_class_ids, (0, 255, 0)))
+    groups.append((pred_sRT, pred_size, pred_class_ids, (0, 0, 255)))
+    sRT, size, class_ids, colors = [], [], [], []
+    for group_sRT, group_size, group_class_ids, color in groups:
+        group_sRT = np.asarray(group_sRT).reshape(-1, 4, 4)
+        num = len(group_sRT)
+        sRT.append(group_sRT)
+        size.append(np.asarray(group_size).reshape(-1, 3)[:num])
+        class_ids.append(np.asarray(group_class_ids).reshape(-1)[:num])
+        colors += [color] * num
+    sRT = np.concatenate(sRT)
+    size = np.concatenate(size)
+    class_ids = np.concatenate(class_ids)
+    projected_bboxes = project_3d_bboxes(sRT, size, intrinsics,
+                                         np.isin(class_ids, [1, 2, 4]))
+    for projected_bbox, color in zip(projected_bboxes, colors):
+        img = draw_bboxes(img, projected_bbox, color)
+
+    if writer is not None:
+        writer.write(out_path, img)
+    else:
+        cv2.imwrite(out_path, img)
+    # cv2.imshow('vis', img)
+    # cv2.waitKey(0)
@@ -18,6 +18,7 @@ from mmdet.datasets.api_wrappers import COCO, COCOeval
 from mmdet.registry import METRICS
 from mmdet.structures.mask import encode_mask_results
 from ..functional import eval_recalls
+from ..functional import PoseGTIndex
 from ..functional import compute_degree_cm_mAP
 import _pickle as cPickle
 import os
@@ -73,6 +74,10 @@ class CocoMetricCPPF(BaseMetric):
             will be used instead. Defaults to None.
         sort_categories (bool): Whether sort categories in annotations. Only
             used for `Objects365V1Dataset`. Defaults to False.
+        cache_gt_index (bool): Whether to persist the ground truth pose
+            index built from ``ann_file`` to an .npz file beside it and
+            reuse it while the annotation file is unchanged.
+            Defaults to False.
     """
     default_prefix: Optional[str] = 'coco'
 
@@ -92,7 +97,8 @@ class CocoMetricCPPF(BaseMetric):
                  
                  dataset_name: str = 'nocs',
                  full_rot: Optional[str] = None,
-                 synset_names: List = ['BG','bottle', 'bowl', 'camera', 'can', 'laptop', 'mug']) -> None:
+                 synset_names: List = ['BG','bottle', 'bowl', 'camera', 'can', 'laptop', 'mug'],
+                 cache_gt_index: bool = False) -> None:
         super().__init__(collect_device=collect_device, prefix=prefix)
         # coco evaluation metrics
         self.metrics = metric if isinstance(metric, list) else [metric]
@@ -142,8 +148,11 @@ class CocoMetricCPPF(BaseMetric):
                     sorted_categories = sorted(
                         categories, key=lambda i: i['id'])
                     self._coco_api.dataset['categories'] = sorted_categories
+            self._gt_index = PoseGTIndex.from_ann_file(
+                self._coco_api, ann_file, cache=cache_gt_index)
         else:
             self._coco_api = None
+            self._gt_index = None
 
         # handle dataset lazy init
         self.cat_ids = None
@@ -440,6 +449,7 @@ class CocoMetricCPPF(BaseMetric):
             coco_json_path = self.gt_to_coco_json(
                 gt_dicts=gts, outfile_prefix=outfile_prefix)
             self._coco_api = COCO(coco_json_path)
+            self._gt_index = PoseGTIndex.from_coco(self._coco_api)
 
         # handle lazy init
         if self.cat_ids is None:
@@ -514,35 +524,15 @@ class CocoMetricCPPF(BaseMetric):
                 #print(len(self.img_ids),len(preds))
                 #print(type(preds))
                 #preds=preds['scores']>0.3
-                for i,result in zip(range(len(self.img_ids)),preds):
-                    pred_result={} #存储一张图的gt和pred
-                    ann_ids = self._coco_api.get_ann_ids(img_ids=self.img_ids[i])
-                    ann_info = self._coco_api.load_anns(ann_ids)
-                    #logger.info(f"TEST ann_ids {ann_ids} ann_info {ann_info}")
-                    if len(ann_info) == 0:
-                        pred_results.append(pred_result)
+                for result in preds:
+                    #paired by img_id, the results may not follow self.img_ids
+                    pred_result = self._gt_index.get(result['img_id']) #存储一张图的gt和pred
+                    if pred_result is None:
+                        pred_results.append({})
                         continue
-                    gt_rot = [] #一张图片里的GT
-                    gt_pos = []
-                    gt_label = []
-                    gt_bbox = []
-                    gt_size = []
-                    gt_handle_visibility = []
-                    for ann in ann_info:
-                        if ann.get('ignore', False):
-                            continue
-                        gt_rot.append(ann['relative_pose'].get('rotation'))
-                        gt_pos.append(ann['relative_pose'].get('position'))
-                        x1, y1, w, h = ann['bbox']
-                        gt_bbox.append([x1, y1, x1 + w, y1 + h])
-                        gt_size.append(ann['bbox_3d_size'])
-                        gt_label.append(ann['category_id'])
-                        if 'handle_visibility' in ann:
-                            gt_handle_visibility.append(ann['handle_visibility'])
-                        else:
-                            gt_handle_visibility.append(1)
-                    #print(result)
-                    
+                    gt_label = pred_result['gt_class_ids'] + 1
+                    pred_result['gt_class_ids'] = gt_label
+                    gt_handle_visibility = pred_result['gt_handle_visibility']
                     score_ids=result['scores']>0.2 #只取置信度大于0.3的结果
                     pred_rot = result['rots'][score_ids]
                     pred_pos = result['poses'][score_ids]
@@ -560,11 +550,6 @@ class CocoMetricCPPF(BaseMetric):
 
                     #concat R and T
                     homo_axis=[0,0,0,1]
-                    gt_rot=np.array(gt_rot,dtype=np.float32).reshape(-1,3,3)
-                    gt_pos=np.array(gt_pos,dtype=np.float32).reshape(-1,3,1)
-                    homo_array=np.array(homo_axis*gt_rot.shape[0],dtype=np.float32).reshape(-1,1,4)
-                    gt_RT=np.concatenate([gt_rot,gt_pos],axis=2)
-                    gt_RT=np.concatenate([gt_RT,homo_array],axis=1)
 
                     pred_rot=np.array(pred_rot,dtype=np.float32).reshape(-1,3,3)
                     pred_pos=np.array(pred_pos,dtype=np.float32).reshape(-1,3,1)
@@ -572,10 +557,6 @@ class CocoMetricCPPF(BaseMetric):
                     pred_RT=np.concatenate([pred_rot,pred_pos],axis=2)
                     pred_RT=np.concatenate([pred_RT,homo_array],axis=1)
                     #np.array other list
-                    gt_label=np.array([class_id+1 for class_id in gt_label],np.int32)
-                    gt_bbox=np.array(gt_bbox,dtype=np.int32)
-                    gt_size=np.array(gt_size,dtype=np.float32)
-                    gt_handle_visibility=np.array(gt_handle_visibility)
                     pred_label=np.array([class_id+1 for class_id in pred_label],dtype=np.int32)
                     pred_bbox=np.array(pred_bbox,dtype=np.int32)
                     pred_size=np.array(pred_size,dtype=np.float32)
@@ -603,11 +584,6 @@ class CocoMetricCPPF(BaseMetric):
                             gt_up_syms=np.ones_like(gt_label,dtype=bool)
 
                     #generate pred_result
-                    pred_result['gt_class_ids']=gt_label
-                    pred_result['gt_bboxes']=gt_bbox
-                    pred_result['gt_RTs']=gt_RT
-                    pred_result['gt_scales']=gt_size
-                    pred_result['gt_handle_visibility']=gt_handle_visibility
                     pred_result['pred_class_ids']=pred_label
                     pred_result['pred_bboxes']=pred_bbox
                     pred_result['pred_scores']=pred_score
@@ -782,7 +758,7 @@ def evaluate_cppf(pred_results=None,pred_results_dir=None,synset_names=None,logg
     # To be consistent with NOCS, set use_matches_for_pose=True for mAP evaluation
 
 
-    iou_aps,pose_aps,_,_=compute_degree_cm_mAP(pred_results, synset_names, result_dir + 'cppf_map', 
+    iou_aps,pose_aps=compute_degree_cm_mAP(pred_results, synset_names, result_dir + 'cppf_map', 
                             iou_3d_thresholds=np.linspace(0, 1, 101),
                             degree_thresholds = degree_thres_list, 
                             shift_thresholds = shift_thres_list,
@@ -18,7 +18,9 @@ from mmdet.datasets.api_wrappers import COCO, COCOeval
 from mmdet.registry import METRICS
 from mmdet.structures.mask import encode_mask_results
 from ..functional import eval_recalls
-from ..functional import compute_mAP_nocs,plot_mAP_nocs
+from ..functional import PoseGTIndex
+from ..functional import PoseMAPAccumulator, compute_pose_mAP
+from ..functional import plot_mAP_nocs
 from ..functional import compute_mAP_objectron,plot_mAP_objectron
 from ..functional import compute_mAP_omni3d,plot_mAP_omni3d
 import _pickle as cPickle
@@ -31,6 +33,11 @@ from tools.train import parse_args as train_args
 #from tools.test import parse_args as test_args
 from mmengine.config import Config
 
+# thresholds of the NOCS pose metric
+NOCS_DEGREE_THRES = list(range(0, 61, 1))
+NOCS_SHIFT_THRES = [i / 2 for i in range(21)]
+NOCS_IOU_THRES = [i / 100 for i in range(101)]
+
 
 @METRICS.register_module()
 class CocoMetricNOCS(BaseMetric):
@@ -75,6 +82,17 @@ class CocoMetricNOCS(BaseMetric):
             will be used instead. Defaults to None.
         sort_categories (bool): Whether sort categories in annotations. Only
             used for `Objects365V1Dataset`. Defaults to False.
+        num_workers (int): Number of processes used to match predictions
+            and ground truths of the pose metric. Defaults to 0, which
+            evaluates in the main process.
+        online_pose_eval (bool): Whether to match the poses of each image in
+            ``process`` as batches arrive and only keep compact per-class
+            matches, so that ``compute_metrics`` just integrates the APs.
+            Requires ``ann_file``. Defaults to False.
+        cache_gt_index (bool): Whether to persist the ground truth pose
+            index built from ``ann_file`` to an .npz file beside it and
+            reuse it while the annotation file is unchanged.
+            Defaults to False.
     """
     default_prefix: Optional[str] = 'coco'
 
@@ -90,8 +108,13 @@ class CocoMetricNOCS(BaseMetric):
                  file_client_args: dict = dict(backend='disk'),
                  collect_device: str = 'cpu',
                  prefix: Optional[str] = None,
-                 sort_categories: bool = False) -> None:
+                 sort_categories: bool = False,
+                 num_workers: int = 0,
+                 online_pose_eval: bool = False,
+                 cache_gt_index: bool = False) -> None:
         super().__init__(collect_device=collect_device, prefix=prefix)
+        self.num_workers = num_workers
+        self.online_pose_eval = online_pose_eval
         # coco evaluation metrics
         self.metrics = metric if isinstance(metric, list) else [metric]
         allowed_metrics = ['bbox', 'segm', 'proposal', 'proposal_fast' ,'pose']
@@ -140,13 +163,71 @@ class CocoMetricNOCS(BaseMetric):
                     sorted_categories = sorted(
                         categories, key=lambda i: i['id'])
                     self._coco_api.dataset['categories'] = sorted_categories
+            self._gt_index = PoseGTIndex.from_ann_file(
+                self._coco_api, ann_file, cache=cache_gt_index)
         else:
             self._coco_api = None
+            self._gt_index = None
 
         # handle dataset lazy init
         self.cat_ids = None
         self.img_ids = None
 
+        if self.online_pose_eval:
+            assert self._coco_api is not None, \
+                '`ann_file` is required by online_pose_eval'
+            self._match_pose = self._new_pose_accumulator().match_image
+
+    @staticmethod
+    def _new_pose_accumulator() -> PoseMAPAccumulator:
+        # To be consistent with NOCS, set use_matches_for_pose=True for mAP evaluation
+        return PoseMAPAccumulator('nocs', NOCS_DEGREE_THRES, NOCS_SHIFT_THRES,
+                                  NOCS_IOU_THRES, iou_pose_thres=0.1,
+                                  use_matches_for_pose=True)
+
+    def _get_pose_result(self, img_id: int, result: dict) -> dict:
+        """Gather the gt and predicted poses of one image in the format of
+        object-deformnet pred_results."""
+        pred_result = self._gt_index.get(img_id) #存储一张图的gt和pred
+        if pred_result is None:
+            return {}
+        score_ids=result['scores']>0.3 #只取置信度大于0.3的结果
+        pred_rot = result['rots'][score_ids]
+        pred_pos = result['poses'][score_ids]
+        pred_size = result['sizes'][score_ids]
+        pred_score = result['scores'][score_ids]
+        pred_label = result['labels'][score_ids]
+        pred_bbox = result['bboxes'][score_ids]
+
+        # pred_rot = result['rots'] #把所有预测结果用来评估不会提升ap 会使acc降低很多
+        # pred_pos = result['poses']
+        # pred_size = result['sizes']
+        # pred_score = result['scores']
+        # pred_label = result['labels']
+        # pred_bbox = result['bboxes']
+
+        #concat R and T
+        homo_axis=[0,0,0,1]
+
+        pred_rot=np.array(pred_rot,dtype=np.float32).reshape(-1,3,3)
+        pred_pos=np.array(pred_pos,dtype=np.float32).reshape(-1,3,1)
+        homo_array=np.array(homo_axis*pred_rot.shape[0],dtype=np.float32).reshape(-1,1,4) #gt和pred之间的长度不等
+        pred_RT=np.concatenate([pred_rot,pred_pos],axis=2)
+        pred_RT=np.concatenate([pred_RT,homo_array],axis=1)
+        #np.array other list
+        pred_label=np.array(pred_label,dtype=np.int32)
+        pred_bbox=np.array(pred_bbox,dtype=np.int32)
+        pred_size=np.array(pred_size,dtype=np.float32)
+        pred_score=np.array(pred_score,np.float32)
+
+        #generate pred_result
+        pred_result['pred_class_ids']=pred_label
+        pred_result['pred_bboxes']=pred_bbox
+        pred_result['pred_scores']=pred_score
+        pred_result['pred_RTs']=pred_RT
+        pred_result['pred_scales']=pred_size
+        return pred_result
+
     def fast_eval_recall(self,
                          results: List[dict],
                          proposal_nums: Sequence[int],
@@ -384,6 +465,14 @@ class CocoMetricNOCS(BaseMetric):
             if 'mask_scores' in pred:
                 result['mask_scores'] = pred['mask_scores'].cpu().numpy()
 
+            if self.online_pose_eval:
+                # match the poses now and only keep the compact matches,
+                # they are gathered from all ranks with the results
+                pose_result = self._get_pose_result(result['img_id'], result)
+                result['pose_matches'] = self._match_pose(pose_result)
+                for key in ('rots', 'poses', 'sizes'):
+                    result.pop(key)
+
             # parse gt
             gt = dict()
             gt['width'] = data_sample['ori_shape'][1]
@@ -433,6 +522,7 @@ class CocoMetricNOCS(BaseMetric):
             coco_json_path = self.gt_to_coco_json(
                 gt_dicts=gts, outfile_prefix=outfile_prefix)
             self._coco_api = COCO(coco_json_path)
+            self._gt_index = PoseGTIndex.from_coco(self._coco_api)
 
         # handle lazy init
         if self.cat_ids is None:
@@ -498,88 +588,17 @@ class CocoMetricNOCS(BaseMetric):
                 #print(len(self.img_ids),len(preds))
                 #print(type(preds))
                 #preds=preds['scores']>0.3
-                for i,result in zip(range(len(self.img_ids)),preds):
-                    pred_result={} #存储一张图的gt和pred
-                    ann_ids = self._coco_api.get_ann_ids(img_ids=self.img_ids[i])
-                    ann_info = self._coco_api.load_anns(ann_ids)
-                    #logger.info(f"TEST ann_ids {ann_ids} ann_info {ann_info}")
-                    if len(ann_info) == 0:
-                        pred_results.append(pred_result)
-                        continue
-                    gt_rot = [] #一张图片里的GT
-                    gt_pos = []
-                    gt_label = []
-                    gt_bbox = []
-                    gt_size = []
-                    gt_handle_visibility = []
-                    for ann in ann_info:
-                        if ann.get('ignore', False):
-                            continue
-                        gt_rot.append(ann['relative_pose'].get('rotation'))
-                        gt_pos.append(ann['relative_pose'].get('position'))
-                        x1, y1, w, h = ann['bbox']
-                        gt_bbox.append([x1, y1, x1 + w, y1 + h])
-                        gt_size.append(ann['bbox_3d_size'])
-                        gt_label.append(ann['category_id'])
-                        if 'handle_visibility' in ann:
-                            gt_handle_visibility.append(ann['handle_visibility'])
-                        else:
-                            gt_handle_visibility.append(1)
-                    #print(result)
-                    
-                    score_ids=result['scores']>0.3 #只取置信度大于0.3的结果
-                    pred_rot = result['rots'][score_ids]
-                    pred_pos = result['poses'][score_ids]
-                    pred_size = result['sizes'][score_ids]
-                    pred_score = result['scores'][score_ids]
-                    pred_label = result['labels'][score_ids]
-                    pred_bbox = result['bboxes'][score_ids]
-
-                    # pred_rot = result['rots'] #把所有预测结果用来评估不会提升ap 会使acc降低很多
-                    # pred_pos = result['poses']
-                    # pred_size = result['sizes']
-                    # pred_score = result['scores']
-                    # pred_label = result['labels']
-                    # pred_bbox = result['bboxes']
-
-                    #concat R and T
-                    homo_axis=[0,0,0,1]
-                    gt_rot=np.array(gt_rot,dtype=np.float32).reshape(-1,3,3)
-                    gt_pos=np.array(gt_pos,dtype=np.float32).reshape(-1,3,1)
-                    homo_array=np.array(homo_axis*gt_rot.shape[0],dtype=np.float32).reshape(-1,1,4)
-                    gt_RT=np.concatenate([gt_rot,gt_pos],axis=2)
-                    gt_RT=np.concatenate([gt_RT,homo_array],axis=1)
-
-                    pred_rot=np.array(pred_rot,dtype=np.float32).reshape(-1,3,3)
-                    pred_pos=np.array(pred_pos,dtype=np.float32).reshape(-1,3,1)
-                    homo_array=np.array(homo_axis*pred_rot.shape[0],dtype=np.float32).reshape(-1,1,4) #gt和pred之间的长度不等
-                    pred_RT=np.concatenate([pred_rot,pred_pos],axis=2)
-                    pred_RT=np.concatenate([pred_RT,homo_array],axis=1)
-                    #np.array other list
-                    gt_label=np.array(gt_label,np.int32)
-                    gt_bbox=np.array(gt_bbox,dtype=np.int32)
-                    gt_size=np.array(gt_size,dtype=np.float32)
-                    gt_handle_visibility=np.array(gt_handle_visibility)
-                    pred_label=np.array(pred_label,dtype=np.int32)
-                    pred_bbox=np.array(pred_bbox,dtype=np.int32)
-                    pred_size=np.array(pred_size,dtype=np.float32)
-                    pred_score=np.array(pred_score,np.float32)
-
-                    #generate pred_result
-                    pred_result['gt_class_ids']=gt_label
-                    pred_result['gt_bboxes']=gt_bbox
-                    pred_result['gt_RTs']=gt_RT
-                    pred_result['gt_scales']=gt_size
-                    pred_result['gt_handle_visibility']=gt_handle_visibility
-                    pred_result['pred_class_ids']=pred_label
-                    pred_result['pred_bboxes']=pred_bbox
-                    pred_result['pred_scores']=pred_score
-                    pred_result['pred_RTs']=pred_RT
-                    pred_result['pred_scales']=pred_size
-
-                    #print(pred_result)
-                    #add each img result to list
-                    pred_results.append(pred_result)
+                if self.online_pose_eval:
+                    pose_accumulator = self._new_pose_accumulator()
+                    for result in preds:
+                        pose_accumulator.update(result['pose_matches'])
+                    evaluate_nocs(None,pred_results_dir,logger,pose_accumulator=pose_accumulator)
+                    continue
+
+                for result in preds:
+                    #add each img result to list, paired by img_id like the
+                    #online evaluation, the results may not follow self.img_ids
+                    pred_results.append(self._get_pose_result(result['img_id'], result))
 
                 #store the result
                 # with open(pred_results_dir+'/pred_results.txt','w') as f:
@@ -588,7 +607,7 @@ class CocoMetricNOCS(BaseMetric):
                 #     cPickle.dump(pred_results, f)
                 
                 #comupte mAP
-                evaluate_nocs(pred_results,pred_results_dir,logger)
+                evaluate_nocs(pred_results,pred_results_dir,logger,num_workers=self.num_workers)
                 
                 continue
 
@@ -717,12 +736,16 @@ class CocoMetricNOCS(BaseMetric):
         return eval_results
 
 
-def evaluate_nocs(pred_results=None,pred_results_dir=None,logger=None):
-    degree_thres_list = list(range(0, 61, 1))
-    shift_thres_list = [i / 2 for i in range(21)]
-    iou_thres_list = [i / 100 for i in range(101)]
+def evaluate_nocs(pred_results=None,pred_results_dir=None,logger=None,num_workers=0,pose_accumulator=None):
+    """pose_accumulator: PoseMAPAccumulator already fed with the matches of
+    every image, pred_results is not used then."""
+    degree_thres_list = list(NOCS_DEGREE_THRES)
+    shift_thres_list = list(NOCS_SHIFT_THRES)
+    iou_thres_list = list(NOCS_IOU_THRES)
     #load predictions
-    if pred_results==None:
+    if pose_accumulator is not None:
+        pass
+    elif pred_results==None:
         result_pkl_path='/root/userfolder/github/mmdetection/pred_results/nocs/pred_results.pkl'
         with open(result_pkl_path, 'rb') as f:
             pred_results = cPickle.load(f)
@@ -735,8 +758,12 @@ def evaluate_nocs(pred_results=None,pred_results_dir=None,logger=None):
         result_dir=pred_results_dir
 
     # To be consistent with NOCS, set use_matches_for_pose=True for mAP evaluation
-    iou_aps, pose_aps, iou_acc, pose_acc = compute_mAP_nocs(pred_results, result_dir, degree_thres_list, shift_thres_list,
-                                                       iou_thres_list, iou_pose_thres=0.1, use_matches_for_pose=True)
+    if pose_accumulator is not None:
+        iou_aps, pose_aps, iou_acc, pose_acc = pose_accumulator.compute(result_dir)
+    else:
+        iou_aps, pose_aps, iou_acc, pose_acc = compute_pose_mAP(pred_results, result_dir, 'nocs', degree_thres_list,
+                                                                shift_thres_list, iou_thres_list, iou_pose_thres=0.1,
+                                                                use_matches_for_pose=True, num_workers=num_workers)
     # metric
     fw = open('{0}/eval_logs.txt'.format(result_dir), 'a')
     iou_25_idx = iou_thres_list.index(0.25)
@@ -18,7 +18,9 @@ from mmdet.datasets.api_wrappers import COCO, COCOeval
 from mmdet.registry import METRICS
 from mmdet.structures.mask import encode_mask_results
 from ..functional import eval_recalls
-from ..functional import compute_mAP_phocal,plot_mAP_phocal
+from ..functional import PoseGTIndex
+from ..functional import compute_pose_mAP
+from ..functional import plot_mAP_phocal
 import _pickle as cPickle
 import os
 
@@ -68,6 +70,13 @@ class CocoMetricPhocal(BaseMetric):
             will be used instead. Defaults to None.
         sort_categories (bool): Whether sort categories in annotations. Only
             used for `Objects365V1Dataset`. Defaults to False.
+        num_workers (int): Number of processes used to match predictions
+            and ground truths of the pose metric. Defaults to 0, which
+            evaluates in the main process.
+        cache_gt_index (bool): Whether to persist the ground truth pose
+            index built from ``ann_file`` to an .npz file beside it and
+            reuse it while the annotation file is unchanged.
+            Defaults to False.
     """
     default_prefix: Optional[str] = 'coco'
 
@@ -83,8 +92,11 @@ class CocoMetricPhocal(BaseMetric):
                  file_client_args: dict = dict(backend='disk'),
                  collect_device: str = 'cpu',
                  prefix: Optional[str] = None,
-                 sort_categories: bool = False) -> None:
+                 sort_categories: bool = False,
+                 num_workers: int = 0,
+                 cache_gt_index: bool = False) -> None:
         super().__init__(collect_device=collect_device, prefix=prefix)
+        self.num_workers = num_workers
         # coco evaluation metrics
         self.metrics = metric if isinstance(metric, list) else [metric]
         allowed_metrics = ['bbox', 'segm', 'proposal', 'proposal_fast' ,'pose']
@@ -133,8 +145,11 @@ class CocoMetricPhocal(BaseMetric):
                     sorted_categories = sorted(
                         categories, key=lambda i: i['id'])
                     self._coco_api.dataset['categories'] = sorted_categories
+            self._gt_index = PoseGTIndex.from_ann_file(
+                self._coco_api, ann_file, cache=cache_gt_index)
         else:
             self._coco_api = None
+            self._gt_index = None
 
         # handle dataset lazy init
         self.cat_ids = None
@@ -426,6 +441,7 @@ class CocoMetricPhocal(BaseMetric):
             coco_json_path = self.gt_to_coco_json(
                 gt_dicts=gts, outfile_prefix=outfile_prefix)
             self._coco_api = COCO(coco_json_path)
+            self._gt_index = PoseGTIndex.from_coco(self._coco_api)
 
         # handle lazy init
         if self.cat_ids is None:
@@ -474,34 +490,14 @@ class CocoMetricPhocal(BaseMetric):
                 print(len(self.img_ids),len(preds))
                 #print(type(preds))
                 #preds=preds['scores']>0.3
-                for i,result in zip(range(len(self.img_ids)),preds):
-                    pred_result={} #存储一张图的gt和pred
-                    ann_ids = self._coco_api.get_ann_ids(img_ids=self.img_ids[i])
-                    ann_info = self._coco_api.load_anns(ann_ids)
-                    #logger.info(f"TEST ann_ids {ann_ids} ann_info {ann_info}")
-                    if len(ann_info) == 0:
-                        pred_results.append(pred_result)
+                for result in preds:
+                    #paired by img_id, the results may not follow self.img_ids
+                    pred_result = self._gt_index.get(result['img_id']) #存储一张图的gt和pred
+                    if pred_result is None:
+                        pred_results.append({})
                         continue
-                    gt_rot = [] #一张图片里的GT
-                    gt_pos = []
-                    gt_label = []
-                    gt_bbox = []
-                    gt_size = []
-                    gt_crowed = []
-                    for ann in ann_info:
-                        if ann.get('ignore', False):
-                            continue
-                        gt_rot.append(ann['relative_pose'].get('rotation'))
-                        gt_pos.append(ann['relative_pose'].get('position'))
-                        x1, y1, w, h = ann['bbox']
-                        gt_bbox.append([x1, y1, x1 + w, y1 + h])
-                        gt_size.append(ann['bbox_3d_size'])
-                        gt_label.append(ann['category_id'])
-                        if ann['iscrowd']:
-                            gt_crowed.append(0)
-                        else:
-                            gt_crowed.append(1)
-                    #print(result)
+                    gt_rows = self._gt_index.slice(result['img_id'])
+                    pred_result['gt_handle_visibility'] = np.where(self._gt_index.iscrowd[gt_rows], 0, 1)
                     score_ids=result['scores']>0.3 #只取置信度大于0.3的结果
                     #print(score_ids)
                     pred_rot = result['rots'][score_ids]
@@ -515,11 +511,6 @@ class CocoMetricPhocal(BaseMetric):
 
                     #concat R and T
                     homo_axis=[0,0,0,1]
-                    gt_rot=np.array(gt_rot,dtype=np.float32).reshape(-1,3,3)
-                    gt_pos=np.array(gt_pos,dtype=np.float32).reshape(-1,3,1)
-                    homo_array=np.array(homo_axis*gt_rot.shape[0],dtype=np.float32).reshape(-1,1,4)
-                    gt_RT=np.concatenate([gt_rot,gt_pos],axis=2)
-                    gt_RT=np.concatenate([gt_RT,homo_array],axis=1)
 
                     pred_rot=np.array(pred_rot,dtype=np.float32).reshape(-1,3,3)
                     pred_pos=np.array(pred_pos,dtype=np.float32).reshape(-1,3,1)
@@ -527,21 +518,12 @@ class CocoMetricPhocal(BaseMetric):
                     pred_RT=np.concatenate([pred_rot,pred_pos],axis=2)
                     pred_RT=np.concatenate([pred_RT,homo_array],axis=1)
                     #np.array other list
-                    gt_label=np.array(gt_label,np.int32)
-                    gt_bbox=np.array(gt_bbox,dtype=np.int32)
-                    gt_size=np.array(gt_size,dtype=np.float32)
-                    gt_crowed=np.array(gt_crowed)
                     pred_label=np.array(pred_label,dtype=np.int32)
                     pred_bbox=np.array(pred_bbox,dtype=np.int32)
                     pred_size=np.array(pred_size,dtype=np.float32)
                     pred_score=np.array(pred_score,np.float32)
 
                     #generate pred_result
-                    pred_result['gt_class_ids']=gt_label
-                    pred_result['gt_bboxes']=gt_bbox
-                    pred_result['gt_RTs']=gt_RT
-                    pred_result['gt_scales']=gt_size
-                    pred_result['gt_handle_visibility']=gt_crowed
                     pred_result['pred_class_ids']=pred_label
                     pred_result['pred_bboxes']=pred_bbox
                     pred_result['pred_scores']=pred_score
@@ -559,7 +541,7 @@ class CocoMetricPhocal(BaseMetric):
                     cPickle.dump(pred_results, f)
                 
                 #comupte mAP
-                evaluate_nocs(pred_results,pred_results_dir,logger)
+                evaluate_nocs(pred_results,pred_results_dir,logger,num_workers=self.num_workers)
                 
                 continue
 
@@ -688,7 +670,7 @@ class CocoMetricPhocal(BaseMetric):
         return eval_results
 
 
-def evaluate_nocs(pred_results=None,pred_results_dir=None,logger=None):
+def evaluate_nocs(pred_results=None,pred_results_dir=None,logger=None,num_workers=0):
     degree_thres_list = list(range(0, 61, 1))
     shift_thres_list = [i / 2 for i in range(21)]
     iou_thres_list = [i / 100 for i in range(101)]
@@ -706,8 +688,9 @@ def evaluate_nocs(pred_results=None,pred_results_dir=None,logger=None):
         result_dir=pred_results_dir
 
     # To be consistent with NOCS, set use_matches_for_pose=True for mAP evaluation
-    iou_aps, pose_aps, iou_acc, pose_acc = compute_mAP_phocal(pred_results, result_dir, degree_thres_list, shift_thres_list,
-                                                       iou_thres_list, iou_pose_thres=0.1, use_matches_for_pose=True)
+    iou_aps, pose_aps, iou_acc, pose_acc = compute_pose_mAP(pred_results, result_dir, 'phocal', degree_thres_list,
+                                                            shift_thres_list, iou_thres_list, iou_pose_thres=0.1,
+                                                            use_matches_for_pose=True, num_workers=num_workers)
     # metric
     fw = open('{0}/eval_logs.txt'.format(result_dir), 'a')
     iou_25_idx = iou_thres_list.index(0.25)
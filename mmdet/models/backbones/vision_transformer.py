@@ -10,8 +10,8 @@ from mmengine.model.weight_init import trunc_normal_
 
 from mmdet.registry import MODELS
 from ...utils import get_root_logger
-from ..utils import (MultiheadAttention, SwiGLUFFNFused, build_norm_layer,
-                     resize_pos_embed, to_2tuple)
+from ..utils import (MultiheadAttention, PosEmbedCache, SwiGLUFFNFused,
+                     build_norm_layer, resize_pos_embed, to_2tuple)
 from .base_backbone import BaseBackbone
 from mmengine.visualization import Visualizer
 import numpy as np
@@ -326,6 +326,8 @@ class VisionTransformer(BaseBackbone):
             torch.zeros(1, num_patches + self.num_extra_tokens,
                         self.embed_dims))
         self._register_load_state_dict_pre_hook(self._prepare_pos_embed)
+        # the pos_embed resized to the input resolutions
+        self._pos_embed_cache = PosEmbedCache()
 
         self.drop_after_pos = nn.Dropout(p=drop_rate)
 
@@ -520,12 +522,14 @@ class VisionTransformer(BaseBackbone):
             cls_token = self.cls_token.expand(B, -1, -1)
             x = torch.cat((cls_token, x), dim=1)
 
-        x = x + resize_pos_embed(
-            self.pos_embed,
-            self.patch_resolution,
-            patch_resolution,
-            mode=self.interpolate_mode,
-            num_extra_tokens=self.num_extra_tokens)
+        x = x + self._pos_embed_cache(
+            tuple(patch_resolution), [self.pos_embed],
+            lambda: resize_pos_embed(
+                self.pos_embed,
+                self.patch_resolution,
+                patch_resolution,
+                mode=self.interpolate_mode,
+                num_extra_tokens=self.num_extra_tokens))
         x = self.drop_after_pos(x)
 
         x = self.pre_norm(x)
@@ -5,6 +5,8 @@
 # LICENSE file in the root directory of this source tree.
 
 import math
+from functools import lru_cache
+
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
@@ -12,6 +14,7 @@ from mmdet.registry import MODELS
 from typing import Optional, Tuple, Type
 #from mmcv.cnn import constant_init, trunc_normal_init
 from ...utils import get_root_logger
+from ..utils import PosEmbedCache
 from mmengine.visualization import Visualizer
 import numpy as np
 
@@ -69,6 +72,7 @@ class ImageEncoderViT(nn.Module):
         rel_pos_zero_init: bool = True,
         window_size: int = 0,
         global_attn_indexes: Tuple[int, ...] = (),
+        use_sdpa: bool = False,
         pretrained=None,
         init_cfg=None
     ) -> None:
@@ -89,6 +93,9 @@ class ImageEncoderViT(nn.Module):
             rel_pos_zero_init (bool): If True, zero initialize relative positional parameters.
             window_size (int): Window size for window attention blocks.
             global_attn_indexes (list): Indexes for blocks using global attention.
+            use_sdpa (bool): If True, compute the attention with
+                memory-efficient kernels instead of materializing the
+                attention maps.
         """
         super().__init__()
         self.img_size = img_size
@@ -107,6 +114,8 @@ class ImageEncoderViT(nn.Module):
             self.pos_embed = nn.Parameter(
                 torch.zeros(1, img_size // patch_size, img_size // patch_size, embed_dim)
             )
+            # the pos_embed resized to the token grids of the inputs
+            self._pos_embed_cache = PosEmbedCache()
            
 
         self.blocks = nn.ModuleList()
@@ -122,6 +131,7 @@ class ImageEncoderViT(nn.Module):
                 rel_pos_zero_init=rel_pos_zero_init,
                 window_size=window_size if i not in global_attn_indexes else 0,
                 input_size=(img_size // patch_size, img_size // patch_size),
+                use_sdpa=use_sdpa,
             )
             self.blocks.append(block)
 
@@ -216,8 +226,9 @@ class ImageEncoderViT(nn.Module):
         x = self.patch_embed(x)
         if self.pos_embed is not None:
             #x = x + self.pos_embed
-            x = x + get_abs_pos(
-                self.pos_embed, (x.shape[1], x.shape[2])
+            hw = (x.shape[1], x.shape[2])
+            x = x + self._pos_embed_cache(
+                hw, [self.pos_embed], lambda: get_abs_pos(self.pos_embed, hw)
             )
 
         for blk in self.blocks:
@@ -252,6 +263,7 @@ class Block(nn.Module):
         rel_pos_zero_init: bool = True,
         window_size: int = 0,
         input_size: Optional[Tuple[int, int]] = None,
+        use_sdpa: bool = False,
     ) -> None:
         """
         Args:
@@ -267,6 +279,7 @@ class Block(nn.Module):
                 use global attention.
             input_size (tuple(int, int) or None): Input resolution for calculating the relative
                 positional parameter size.
+            use_sdpa (bool): If True, use the memory-efficient attention.
         """
         super().__init__()
         self.norm1 = norm_layer(dim)
@@ -277,6 +290,7 @@ class Block(nn.Module):
             use_rel_pos=use_rel_pos,
             rel_pos_zero_init=rel_pos_zero_init,
             input_size=input_size if window_size == 0 else (window_size, window_size),
+            use_sdpa=use_sdpa,
         )
 
         self.norm2 = norm_layer(dim)
@@ -314,6 +328,8 @@ class Attention(nn.Module):
         use_rel_pos: bool = False,
         rel_pos_zero_init: bool = True,
         input_size: Optional[Tuple[int, int]] = None,
+        use_sdpa: bool = False,
+        sdpa_chunk_size: int = 1024,
     ) -> None:
         """
         Args:
@@ -324,6 +340,12 @@ class Attention(nn.Module):
             rel_pos_zero_init (bool): If True, zero initialize relative positional parameters.
             input_size (tuple(int, int) or None): Input resolution for calculating the relative
                 positional parameter size.
+            use_sdpa (bool): If True, compute the attention with
+                :func:`rel_pos_attention` instead of materializing the
+                attention map.
+            sdpa_chunk_size (int): Approximate number of queries per chunk of
+                :func:`rel_pos_attention`, bounds the size of the relative
+                position bias.
         """
         super().__init__()
         self.num_heads = num_heads
@@ -332,6 +354,8 @@ class Attention(nn.Module):
 
         self.qkv = nn.Linear(dim, dim * 3, bias=qkv_bias)
         self.proj = nn.Linear(dim, dim)
+        self.use_sdpa = use_sdpa
+        self.sdpa_chunk_size = sdpa_chunk_size
 
         self.use_rel_pos = use_rel_pos
         if self.use_rel_pos:
@@ -341,6 +365,22 @@ class Attention(nn.Module):
             # initialize relative positional embeddings
             self.rel_pos_h = nn.Parameter(torch.zeros(2 * input_size[0] - 1, head_dim))
             self.rel_pos_w = nn.Parameter(torch.zeros(2 * input_size[1] - 1, head_dim))
+            # the embeddings extracted for each query/key size
+            self._rel_pos_cache = PosEmbedCache()
+
+    def get_rel_pos(
+        self, q_size: Tuple[int, int], k_size: Tuple[int, int]
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Relative positional embeddings of the height and width axes, cached
+        per size."""
+        return self._rel_pos_cache(
+            (q_size, k_size),
+            [self.rel_pos_h, self.rel_pos_w],
+            lambda: (
+                get_rel_pos(q_size[0], k_size[0], self.rel_pos_h),
+                get_rel_pos(q_size[1], k_size[1], self.rel_pos_w),
+            ),
+        )
 
     def forward(self, x: torch.Tensor) -> torch.Tensor:
         B, H, W, _ = x.shape
@@ -349,10 +389,22 @@ class Attention(nn.Module):
         # q, k, v with shape (B * nHead, H * W, C)
         q, k, v = qkv.reshape(3, B * self.num_heads, H * W, -1).unbind(0)
 
+        if self.use_sdpa:
+            rel_pos = None
+            if self.use_rel_pos:
+                rel_pos = self.get_rel_pos((H, W), (H, W))
+            x = rel_pos_attention(q, k, v, (H, W), rel_pos, self.scale,
+                                  self.sdpa_chunk_size)
+            x = x.view(B, self.num_heads, H, W,
+                       -1).permute(0, 2, 3, 1, 4).reshape(B, H, W, -1)
+            return self.proj(x)
+
         attn = (q * self.scale) @ k.transpose(-2, -1)
 
         if self.use_rel_pos:
-            attn = add_decomposed_rel_pos(attn, q, self.rel_pos_h, self.rel_pos_w, (H, W), (H, W))
+            Rh, Rw = self.get_rel_pos((H, W), (H, W))
+            attn = add_decomposed_rel_pos_embeds(attn, q, Rh, Rw, (H, W),
+                                                 (H, W))
 
         attn = attn.softmax(dim=-1)
         x = (attn @ v).view(B, self.num_heads, H, W, -1).permute(0, 2, 3, 1, 4).reshape(B, H, W, -1)
@@ -462,12 +514,30 @@ def get_rel_pos(q_size: int, k_size: int, rel_pos: torch.Tensor) -> torch.Tensor
     else:
         rel_pos_resized = rel_pos
 
+    return rel_pos_resized[get_relative_coords(q_size, k_size, rel_pos.device)]
+
+
+@lru_cache(maxsize=32)
+def get_relative_coords(q_size: int, k_size: int,
+                        device: torch.device) -> torch.Tensor:
+    """
+    Get the indices of the relative positions of query and key sizes, cached
+        as they only depend on the sizes.
+    Args:
+        q_size (int): size of query q.
+        k_size (int): size of key k.
+        device (torch.device): device of the indices.
+
+    Returns:
+        Indices of the relative position embeddings with shape
+            (q_size, k_size).
+    """
     # Scale the coords with short length if shapes for q and k are different.
     q_coords = torch.arange(q_size)[:, None] * max(k_size / q_size, 1.0)
     k_coords = torch.arange(k_size)[None, :] * max(q_size / k_size, 1.0)
     relative_coords = (q_coords - k_coords) + (k_size - 1) * max(q_size / k_size, 1.0)
 
-    return rel_pos_resized[relative_coords.long()]
+    return relative_coords.long().to(device)
 
 
 def add_decomposed_rel_pos(
@@ -489,13 +559,41 @@ def add_decomposed_rel_pos(
         q_size (Tuple): spatial sequence size of query q with (q_h, q_w).
         k_size (Tuple): spatial sequence size of key k with (k_h, k_w).
 
+    Returns:
+        attn (Tensor): attention map with added relative positional embeddings.
+    """
+    Rh = get_rel_pos(q_size[0], k_size[0], rel_pos_h)
+    Rw = get_rel_pos(q_size[1], k_size[1], rel_pos_w)
+    return add_decomposed_rel_pos_embeds(attn, q, Rh, Rw, q_size, k_size)
+
+
+def add_decomposed_rel_pos_embeds(
+    attn: torch.Tensor,
+    q: torch.Tensor,
+    Rh: torch.Tensor,
+    Rw: torch.Tensor,
+    q_size: Tuple[int, int],
+    k_size: Tuple[int, int],
+) -> torch.Tensor:
+    """
+    Add the decomposed Relative Positional Embeddings extracted by
+        :func:`get_rel_pos`.
+    Args:
+        attn (Tensor): attention map.
+        q (Tensor): query q in the attention layer with shape
+            (B, q_h * q_w, C).
+        Rh (Tensor): relative position embeddings (q_h, k_h, C) for height
+            axis.
+        Rw (Tensor): relative position embeddings (q_w, k_w, C) for width
+            axis.
+        q_size (Tuple): spatial sequence size of query q with (q_h, q_w).
+        k_size (Tuple): spatial sequence size of key k with (k_h, k_w).
+
     Returns:
         attn (Tensor): attention map with added relative positional embeddings.
     """
     q_h, q_w = q_size
     k_h, k_w = k_size
-    Rh = get_rel_pos(q_h, k_h, rel_pos_h)
-    Rw = get_rel_pos(q_w, k_w, rel_pos_w)
 
     B, _, dim = q.shape
     r_q = q.reshape(B, q_h, q_w, dim)
@@ -509,6 +607,74 @@ def add_decomposed_rel_pos(
     return attn
 
 
+def rel_pos_attention(
+    q: torch.Tensor,
+    k: torch.Tensor,
+    v: torch.Tensor,
+    q_size: Tuple[int, int],
+    rel_pos: Optional[Tuple[torch.Tensor, torch.Tensor]],
+    scale: float,
+    chunk_size: int = 1024,
+) -> torch.Tensor:
+    """
+    Memory-efficient equivalent of the attention with decomposed relative
+        positional embeddings of :class:`Attention`, the attention map is
+        never materialized.
+    The queries are split into chunks of whole rows, whose relative position
+        bias is passed to
+        :func:`torch.nn.functional.scaled_dot_product_attention`, so that at
+        most (B, chunk_size, k_h * k_w) of bias is stored at a time.
+    Args:
+        q (Tensor): query q with shape (B, q_h * q_w, C).
+        k (Tensor): key k with shape (B, k_h * k_w, C).
+        v (Tensor): value v with shape (B, k_h * k_w, C).
+        q_size (Tuple): spatial sequence size of query q with (q_h, q_w),
+            also the size of key k.
+        rel_pos (Tuple or None): relative positional embeddings (Rh, Rw)
+            extracted by :func:`get_rel_pos`, None without relative
+            positional embeddings.
+        scale (float): scale of the attention logits.
+        chunk_size (int): approximate number of queries per chunk.
+
+    Returns:
+        Output of the attention with shape (B, q_h * q_w, C).
+    """
+    if rel_pos is None:
+        return _scaled_dot_product_attention(q, k, v, None, scale)
+
+    Rh, Rw = rel_pos
+    q_h, q_w = q_size
+    B, _, dim = q.shape
+    r_q = q.reshape(B, q_h, q_w, dim)
+    rel_h = torch.einsum("bhwc,hkc->bhwk", r_q, Rh)
+    rel_w = torch.einsum("bhwc,wkc->bhwk", r_q, Rw)
+    k_h, k_w = rel_h.shape[-1], rel_w.shape[-1]
+
+    rows = max(chunk_size // q_w, 1)
+    outs = []
+    for i in range(0, q_h, rows):
+        n = min(rows, q_h - i)
+        bias = (rel_h[:, i:i + n, :, :, None] +
+                rel_w[:, i:i + n, :, None, :]).reshape(B, n * q_w, k_h * k_w)
+        outs.append(
+            _scaled_dot_product_attention(q[:, i * q_w:(i + n) * q_w], k, v,
+                                          bias, scale))
+    return torch.cat(outs, dim=1) if len(outs) > 1 else outs[0]
+
+
+def _scaled_dot_product_attention(q, k, v, bias, scale):
+    if hasattr(F, "scaled_dot_product_attention"):
+        # the fused kernels use 1 / sqrt(C) as scale
+        if scale != q.shape[-1] ** -0.5:
+            q = q * (scale * q.shape[-1] ** 0.5)
+        return F.scaled_dot_product_attention(q, k, v, attn_mask=bias)
+    # PyTorch < 2.0
+    attn = (q * scale) @ k.transpose(-2, -1)
+    if bias is not None:
+        attn = attn + bias
+    return attn.softmax(dim=-1) @ v
+
+
 class PatchEmbed(nn.Module):
     """
     Image to Patch Embedding.
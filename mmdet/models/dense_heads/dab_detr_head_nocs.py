@@ -2,7 +2,8 @@
 __author__= 'fanxiaofeng'
 from typing import Dict, List, Tuple
 from mmengine.structures import InstanceData
-from ..utils import multi_apply
+from ..utils import (batched_detr_predictions, multi_apply,
+                     unbatch_instances)
 
 import torch
 import torch.nn as nn
@@ -533,93 +534,21 @@ class DABDETRHeadNOCS(ConditionalDETRHead):
         bbox_preds_T = layer_bbox_T_preds[-1]
         bbox_preds_size = layer_bbox_size_preds[-1]
 
-        result_list = []
-        for img_id in range(len(batch_img_metas)):
-            cls_score = cls_scores[img_id]
-            bbox_pred = bbox_preds[img_id]
-            bbox_pred_R = bbox_preds_R[img_id]
-            bbox_pred_T = bbox_preds_T[img_id]
-            bbox_pred_size = bbox_preds_size[img_id]
-            img_meta = batch_img_metas[img_id]
-            results = self._predict_by_feat_single(cls_score,bbox_pred, bbox_pred_R, bbox_pred_T, bbox_pred_size,
-                                                   img_meta, rescale)
-            result_list.append(results)
-        return result_list
-
-    def _predict_by_feat_single(self,
-                                cls_score: Tensor,
-                                bbox_pred: Tensor,
-                                bbox_pred_R: Tensor,
-                                bbox_pred_T: Tensor,
-                                bbox_pred_size: Tensor,
-                                img_meta: dict,
-                                rescale: bool = True) -> InstanceData:
-        """Transform outputs from the last decoder layer into bbox predictions
-        for each image.
-
-        Args:
-            cls_score (Tensor): Box score logits from the last decoder layer
-                for each image. Shape [num_queries, cls_out_channels].
-            bbox_pred (Tensor): Sigmoid outputs from the last decoder layer
-                for each image, with coordinate format (cx, cy, w, h) and
-                shape [num_queries, 4].
-            img_meta (dict): Image meta info.
-            rescale (bool): If True, return boxes in original image
-                space. Default True.
-
-        Returns:
-            :obj:`InstanceData`: Detection results of each image
-            after the post process.
-            Each item usually contains following keys.
-
-                - scores (Tensor): Classification scores, has a shape
-                  (num_instance, )
-                - labels (Tensor): Labels of bboxes, has a shape
-                  (num_instances, ).
-                - bboxes (Tensor): Has a shape (num_instances, 4),
-                  the last dimension 4 arrange as (x1, y1, x2, y2).
-        """
-        assert len(cls_score) == len(bbox_pred_R)  # num_queries
-        max_per_img = self.test_cfg.get('max_per_img', len(cls_score))
-        img_shape = img_meta['img_shape']
-        # exclude background
-        if self.loss_cls.use_sigmoid:
-            cls_score = cls_score.sigmoid()
-            scores, indexes = cls_score.view(-1).topk(max_per_img)
-            det_labels = indexes % self.num_classes
-            bbox_index = indexes // self.num_classes
-            bbox_pred = bbox_pred[bbox_index]
-            bbox_pred_R = bbox_pred_R[bbox_index]
-            bbox_pred_T = bbox_pred_T[bbox_index]
-            bbox_pred_size = bbox_pred_size[bbox_index]
-        else:
-            scores, det_labels = F.softmax(cls_score, dim=-1)[..., :-1].max(-1)
-            scores, bbox_index = scores.topk(max_per_img)
-            bbox_pred = bbox_pred[bbox_index]
-            bbox_pred_R = bbox_pred_R[bbox_index]
-            bbox_pred_T = bbox_pred_T[bbox_index]
-            bbox_pred_size = bbox_pred_size[bbox_index]
-            det_labels = det_labels[bbox_index]
-
-        det_bboxes = bbox_cxcywh_to_xyxy(bbox_pred)
-        det_bboxes[:, 0::2] = det_bboxes[:, 0::2] * img_shape[1]
-        det_bboxes[:, 1::2] = det_bboxes[:, 1::2] * img_shape[0]
-        det_bboxes[:, 0::2].clamp_(min=0, max=img_shape[1])
-        det_bboxes[:, 1::2].clamp_(min=0, max=img_shape[0])
-        if rescale:
-            assert img_meta.get('scale_factor') is not None
-            det_bboxes /= det_bboxes.new_tensor(
-                img_meta['scale_factor']).repeat((1, 2))
-        det_R = bbox_pred_R
-        det_T = bbox_pred_T
-        det_sizes = bbox_pred_size
-
-        results = InstanceData()
-        # results.bboxes = det_bboxes
-        results.rots = det_R
-        results.poses = det_T
-        results.bboxes = det_bboxes
-        results.scores = scores
-        results.labels = det_labels
-        results.sizes = det_sizes
-        return results
\ No newline at end of file
+        results = batched_detr_predictions(
+            cls_scores,
+            bbox_preds,
+            batch_img_metas,
+            self.num_classes,
+            self.loss_cls.use_sigmoid,
+            self.test_cfg.get('max_per_img', cls_scores.size(1)),
+            rescale,
+            rots=bbox_preds_R,
+            poses=bbox_preds_T,
+            sizes=bbox_preds_size)
+        return unbatch_instances(
+            rots=results['rots'],
+            poses=results['poses'],
+            bboxes=results['bboxes'],
+            scores=results['scores'],
+            labels=results['labels'],
+            sizes=results['sizes'])
@@ -1,8 +1,9 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 __author__= 'fanxiaofeng'
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 from mmengine.structures import InstanceData
-from ..utils import multi_apply
+from ..utils import (batched_detr_predictions, multi_apply,
+                     unbatch_instances)
 
 import torch
 import torch.nn as nn
@@ -190,6 +191,13 @@ class DABDETRHeadNOCSNorm(ConditionalDETRHead):
             f'{self.__class__.__name__} only supports ' \
             'for batch_gt_instances_ignore setting to None.'
 
+        # assign the queries of all decoder layers at once
+        all_layers_targets = self.get_targets_all_layers(
+            all_layers_cls_scores, all_layers_bbox_preds,
+            all_layers_bbox_preds_R, all_layers_bbox_preds_T,
+            all_layers_bbox_preds_size, all_layers_bbox_preds_scale,
+            batch_gt_instances, batch_img_metas)
+        num_layers = len(all_layers_targets)
         losses_cls, losses_bbox, losses_iou, losses_R, losses_T, losses_size, losses_RE ,losses_scale = multi_apply(
             self.loss_by_feat_single,
             all_layers_cls_scores,
@@ -198,8 +206,9 @@ class DABDETRHeadNOCSNorm(ConditionalDETRHead):
             all_layers_bbox_preds_T,
             all_layers_bbox_preds_size,
             all_layers_bbox_preds_scale,
-            batch_gt_instances=batch_gt_instances,
-            batch_img_metas=batch_img_metas)
+            [batch_gt_instances] * num_layers,
+            [batch_img_metas] * num_layers,
+            all_layers_targets)
 
         loss_dict = dict()
         # loss from the last decoder layer
@@ -229,7 +238,8 @@ class DABDETRHeadNOCSNorm(ConditionalDETRHead):
     def loss_by_feat_single(self, cls_scores: Tensor, bbox_preds: Tensor, bbox_R_preds: Tensor, bbox_T_preds: Tensor,
                             bbox_size_preds: Tensor, bbox_scale_preds: Tensor,
                             batch_gt_instances: InstanceList,
-                            batch_img_metas: List[dict]) -> Tuple[Tensor]:
+                            batch_img_metas: List[dict],
+                            cls_reg_targets: Optional[tuple] = None) -> Tuple[Tensor]:
         """Loss function for outputs from a single decoder layer of a single
         feature level.
 
@@ -244,21 +254,24 @@ class DABDETRHeadNOCSNorm(ConditionalDETRHead):
                 attributes.
             batch_img_metas (list[dict]): Meta information of each image, e.g.,
                 image size, scaling factor, etc.
+            cls_reg_targets (tuple, optional): The targets of the layer in
+                the format of :meth:`get_targets`, computed when None.
 
         Returns:
             Tuple[Tensor]: A tuple including `loss_cls`, `loss_box` and
             `loss_iou`.
         """
-        num_imgs = cls_scores.size(0)
-        cls_scores_list = [cls_scores[i] for i in range(num_imgs)]
-        bbox_preds_list = [bbox_preds[i] for i in range(num_imgs)]
-        bbox_R_preds_list = [bbox_R_preds[i] for i in range(num_imgs)]
-        bbox_T_preds_list = [bbox_T_preds[i] for i in range(num_imgs)]
-        bbox_size_preds_list = [bbox_size_preds[i] for i in range(num_imgs)]
-        bbox_scale_preds_list = [bbox_scale_preds[i] for i in range(num_imgs)]
-        cls_reg_targets = self.get_targets(cls_scores_list,bbox_preds_list, bbox_R_preds_list, bbox_T_preds_list,
-                                            bbox_size_preds_list,bbox_scale_preds_list,
-                                            batch_gt_instances, batch_img_metas)
+        if cls_reg_targets is None:
+            num_imgs = cls_scores.size(0)
+            cls_scores_list = [cls_scores[i] for i in range(num_imgs)]
+            bbox_preds_list = [bbox_preds[i] for i in range(num_imgs)]
+            bbox_R_preds_list = [bbox_R_preds[i] for i in range(num_imgs)]
+            bbox_T_preds_list = [bbox_T_preds[i] for i in range(num_imgs)]
+            bbox_size_preds_list = [bbox_size_preds[i] for i in range(num_imgs)]
+            bbox_scale_preds_list = [bbox_scale_preds[i] for i in range(num_imgs)]
+            cls_reg_targets = self.get_targets(cls_scores_list,bbox_preds_list, bbox_R_preds_list, bbox_T_preds_list,
+                                                bbox_size_preds_list,bbox_scale_preds_list,
+                                                batch_gt_instances, batch_img_metas)
         (labels_list, label_weights_list, bbox_targets_list, bbox_weights_list, 
         bbox_R_targets_list, bbox_R_weights_list,
         bbox_T_targets_list, bbox_T_weights_list,
@@ -407,6 +420,125 @@ class DABDETRHeadNOCSNorm(ConditionalDETRHead):
                 bbox_T_targets_list, bbox_T_weights_list, bbox_size_targets_list, bbox_size_weights_list, bbox_scale_targets_list, bbox_scale_weights_list,
                 num_total_pos, num_total_neg)
 
+    def get_targets_all_layers(self, all_layers_cls_scores: Tensor,
+                               all_layers_bbox_preds: Tensor,
+                               all_layers_bbox_preds_R: Tensor,
+                               all_layers_bbox_preds_T: Tensor,
+                               all_layers_bbox_preds_size: Tensor,
+                               all_layers_bbox_preds_scale: Tensor,
+                               batch_gt_instances: InstanceList,
+                               batch_img_metas: List[dict]) -> List[tuple]:
+        """Compute regression and classification targets of all decoder
+        layers at once.
+
+        The queries of every (layer, image) pair are assigned by a single
+        :meth:`HungarianAssigner.assign_batch` call, and the targets of all
+        pairs are scattered with one indexing per field, instead of one
+        :meth:`_get_targets_single` call per pair.
+
+        Args:
+            all_layers_cls_scores (Tensor): Classification outputs of each
+                decoder layers, has shape (num_decoder_layers, bs,
+                num_queries, cls_out_channels).
+            all_layers_bbox_preds (Tensor): Sigmoid regression outputs of each
+                decoder layers, with normalized coordinate (cx, cy, w, h) and
+                shape (num_decoder_layers, bs, num_queries, 4).
+            batch_gt_instances (list[:obj:`InstanceData`]): Batch of
+                gt_instance. It usually includes ``bboxes`` and ``labels``
+                attributes.
+            batch_img_metas (list[dict]): Meta information of each image, e.g.,
+                image size, scaling factor, etc.
+
+        Returns:
+            list[tuple]: The targets of each decoder layer, in the format of
+            :meth:`get_targets`.
+        """
+        num_layers, num_imgs, num_queries = all_layers_cls_scores.shape[:3]
+        all_layers_preds = (all_layers_bbox_preds, all_layers_bbox_preds_R,
+                            all_layers_bbox_preds_T, all_layers_bbox_preds_size,
+                            all_layers_bbox_preds_scale)
+        factors = all_layers_bbox_preds.new_tensor(
+            [[meta['img_shape'][1], meta['img_shape'][0]] * 2
+             for meta in batch_img_metas])
+        # convert bbox_pred from xywh, normalized to xyxy, unnormalized
+        all_layers_bboxes = bbox_cxcywh_to_xyxy(
+            all_layers_bbox_preds) * factors[:, None]
+
+        # assigner of all (layer, image) pairs
+        batch_pred_instances = [
+            InstanceData(
+                scores=all_layers_cls_scores[i, j],
+                bboxes=all_layers_bboxes[i, j],
+                rots=all_layers_bbox_preds_R[i, j],
+                poses=all_layers_bbox_preds_T[i, j],
+                sizes=all_layers_bbox_preds_size[i, j],
+                scales=all_layers_bbox_preds_scale[i, j])
+            for i in range(num_layers) for j in range(num_imgs)
+        ]
+        if hasattr(self.assigner, 'assign_batch'):
+            assign_results = self.assigner.assign_batch(
+                batch_pred_instances, batch_gt_instances * num_layers,
+                batch_img_metas * num_layers)
+        else:
+            assign_results = [
+                self.assigner.assign(
+                    pred_instances=pred_instances,
+                    gt_instances=gt_instances,
+                    img_meta=img_meta) for pred_instances, gt_instances,
+                img_meta in zip(batch_pred_instances, batch_gt_instances *
+                                num_layers, batch_img_metas * num_layers)
+            ]
+
+        # ground truths of all images, bboxes normalized to cxcywh
+        num_gts = [len(gt_instances) for gt_instances in batch_gt_instances]
+        gt_labels = torch.cat([gt.labels for gt in batch_gt_instances])
+        gt_bboxes = torch.cat([gt.bboxes for gt in batch_gt_instances])
+        gt_factors = factors.repeat_interleave(
+            factors.new_tensor(num_gts, dtype=torch.long), dim=0)
+        gt_fields = (bbox_xyxy_to_cxcywh(gt_bboxes / gt_factors),
+                     torch.cat([gt.rots_norm for gt in batch_gt_instances]),
+                     torch.cat([gt.poses for gt in batch_gt_instances]),
+                     torch.cat([gt.sizes for gt in batch_gt_instances]),
+                     torch.cat([gt.scales_norm
+                                for gt in batch_gt_instances]).unsqueeze(-1))
+
+        # positive queries of all pairs, and their gts in the batch
+        gt_inds = torch.stack([result.gt_inds for result in assign_results])
+        pair_inds, query_inds = torch.nonzero(gt_inds > 0, as_tuple=True)
+        gt_offsets = gt_inds.new_tensor([0] + num_gts[:-1]).cumsum(0)
+        pos_inds = pair_inds * num_queries + query_inds
+        pos_gt_inds = gt_inds[pair_inds, query_inds] - 1 + \
+            gt_offsets[pair_inds % num_imgs]
+        num_layers_pos = torch.bincount(
+            pair_inds // num_imgs, minlength=num_layers).tolist()
+
+        num_preds = num_layers * num_imgs * num_queries
+        labels = gt_bboxes.new_full((num_preds, ),
+                                    self.num_classes,
+                                    dtype=torch.long)
+        labels[pos_inds] = gt_labels[pos_gt_inds]
+        label_weights = gt_bboxes.new_ones(num_preds)
+        targets = [labels, label_weights]
+        for preds, gt_field in zip(all_layers_preds, gt_fields):
+            preds = preds.reshape(num_preds, -1)
+            field_targets = torch.zeros_like(preds)
+            field_weights = torch.zeros_like(preds)
+            field_targets[pos_inds] = gt_field[pos_gt_inds].to(preds.dtype)
+            field_weights[pos_inds] = 1.0
+            targets += [field_targets, field_weights]
+
+        all_layers_targets = []
+        for i in range(num_layers):
+            layer_targets = [
+                list(target.view(num_layers, num_imgs, num_queries,
+                                 *target.shape[1:])[i]) for target in targets
+            ]
+            num_total_pos = num_layers_pos[i]
+            num_total_neg = num_imgs * num_queries - num_total_pos
+            all_layers_targets.append(
+                (*layer_targets, num_total_pos, num_total_neg))
+        return all_layers_targets
+
     def _get_targets_single(self, cls_score: Tensor,bbox_pred: Tensor, rot_pred: Tensor, pos_pred: Tensor, size_pred: Tensor, scale_pred: Tensor,
                             gt_instances: InstanceData,
                             img_meta: dict) -> tuple:
@@ -564,103 +696,25 @@ class DABDETRHeadNOCSNorm(ConditionalDETRHead):
         bbox_preds_size = layer_bbox_size_preds[-1]
         bbox_preds_scale = layer_bbox_scale_preds[-1]
 
-        result_list = []
-        for img_id in range(len(batch_img_metas)):
-            cls_score = cls_scores[img_id]
-            bbox_pred = bbox_preds[img_id]
-            bbox_pred_R = bbox_preds_R[img_id]
-            bbox_pred_T = bbox_preds_T[img_id]
-            bbox_pred_size = bbox_preds_size[img_id]
-            bbox_pred_scale = bbox_preds_scale[img_id]
-            img_meta = batch_img_metas[img_id]
-            results = self._predict_by_feat_single(cls_score,bbox_pred, bbox_pred_R, bbox_pred_T, bbox_pred_size,bbox_pred_scale,
-                                                   img_meta, rescale)
-            result_list.append(results)
-        return result_list
-
-    def _predict_by_feat_single(self,
-                                cls_score: Tensor,
-                                bbox_pred: Tensor,
-                                bbox_pred_R: Tensor,
-                                bbox_pred_T: Tensor,
-                                bbox_pred_size: Tensor,
-                                bbox_pred_scale: Tensor,
-                                img_meta: dict,
-                                rescale: bool = True) -> InstanceData:
-        """Transform outputs from the last decoder layer into bbox predictions
-        for each image.
-
-        Args:
-            cls_score (Tensor): Box score logits from the last decoder layer
-                for each image. Shape [num_queries, cls_out_channels].
-            bbox_pred (Tensor): Sigmoid outputs from the last decoder layer
-                for each image, with coordinate format (cx, cy, w, h) and
-                shape [num_queries, 4].
-            img_meta (dict): Image meta info.
-            rescale (bool): If True, return boxes in original image
-                space. Default True.
-
-        Returns:
-            :obj:`InstanceData`: Detection results of each image
-            after the post process.
-            Each item usually contains following keys.
-
-                - scores (Tensor): Classification scores, has a shape
-                  (num_instance, )
-                - labels (Tensor): Labels of bboxes, has a shape
-                  (num_instances, ).
-                - bboxes (Tensor): Has a shape (num_instances, 4),
-                  the last dimension 4 arrange as (x1, y1, x2, y2).
-        """
-        assert len(cls_score) == len(bbox_pred_R)  # num_queries
-        max_per_img = self.test_cfg.get('max_per_img', len(cls_score))
-        img_shape = img_meta['img_shape']
-        # exclude background
-        if self.loss_cls.use_sigmoid:
-            cls_score = cls_score.sigmoid()
-            scores, indexes = cls_score.view(-1).topk(max_per_img)
-            det_labels = indexes % self.num_classes
-            bbox_index = indexes // self.num_classes
-            bbox_pred = bbox_pred[bbox_index]
-            bbox_pred_scale =bbox_pred_scale[bbox_index]
-            bbox_pred_R_norm = bbox_pred_R[bbox_index]
-            bbox_pred_R = bbox_pred_R[bbox_index] * bbox_pred_scale #预测的rotation需要乘以scale
-            bbox_pred_T = bbox_pred_T[bbox_index]
-            bbox_pred_size = bbox_pred_size[bbox_index]
-        else:
-            scores, det_labels = F.softmax(cls_score, dim=-1)[..., :-1].max(-1)
-            scores, bbox_index = scores.topk(max_per_img)
-            bbox_pred = bbox_pred[bbox_index]
-            bbox_pred_scale =bbox_pred_scale[bbox_index]
-            bbox_pred_R_norm = bbox_pred_R[bbox_index]
-            bbox_pred_R = bbox_pred_R[bbox_index] * bbox_pred_scale
-            bbox_pred_T = bbox_pred_T[bbox_index]
-            bbox_pred_size = bbox_pred_size[bbox_index]
-            det_labels = det_labels[bbox_index]
-
-        det_bboxes = bbox_cxcywh_to_xyxy(bbox_pred)
-        det_bboxes[:, 0::2] = det_bboxes[:, 0::2] * img_shape[1]
-        det_bboxes[:, 1::2] = det_bboxes[:, 1::2] * img_shape[0]
-        det_bboxes[:, 0::2].clamp_(min=0, max=img_shape[1])
-        det_bboxes[:, 1::2].clamp_(min=0, max=img_shape[0])
-        if rescale:
-            assert img_meta.get('scale_factor') is not None
-            det_bboxes /= det_bboxes.new_tensor(
-                img_meta['scale_factor']).repeat((1, 2))
-        det_R = bbox_pred_R
-        det_T = bbox_pred_T
-        det_sizes = bbox_pred_size
-        det_scales = bbox_pred_scale
-        det_R_norm = bbox_pred_R_norm
-
-        results = InstanceData()
-        # results.bboxes = det_bboxes
-        results.rots = det_R
-        results.poses = det_T
-        results.bboxes = det_bboxes
-        results.scores = scores
-        results.labels = det_labels
-        results.sizes = det_sizes
-        results.scales = det_scales
-        results.rots_norm = det_R_norm
-        return results
\ No newline at end of file
+        results = batched_detr_predictions(
+            cls_scores,
+            bbox_preds,
+            batch_img_metas,
+            self.num_classes,
+            self.loss_cls.use_sigmoid,
+            self.test_cfg.get('max_per_img', cls_scores.size(1)),
+            rescale,
+            rots_norm=bbox_preds_R,
+            poses=bbox_preds_T,
+            sizes=bbox_preds_size,
+            scales=bbox_preds_scale)
+        return unbatch_instances(
+            # the predicted rotation is scaled by the predicted scale
+            rots=results['rots_norm'] * results['scales'],
+            poses=results['poses'],
+            bboxes=results['bboxes'],
+            scores=results['scores'],
+            labels=results['labels'],
+            sizes=results['sizes'],
+            scales=results['scales'],
+            rots_norm=results['rots_norm'])
@@ -7,6 +7,7 @@ from torch import Tensor
 from mmdet.registry import MODELS
 from mmdet.structures import OptSampleList, SampleList
 from mmdet.utils import ConfigType, OptConfigType, OptMultiConfig
+from ..utils import FeatureCache
 from .base import BaseDetector
 
 
@@ -41,6 +42,10 @@ class DetectionTransformer(BaseDetector, metaclass=ABCMeta):
             config of :class:`BaseDataPreprocessor`.  it usually includes,
             ``pad_size_divisor``, ``pad_value``, ``mean`` and ``std``.
             Defaults to None.
+        feat_cache (:obj:`ConfigDict` or dict, optional): Config of the
+            :class:`FeatureCache` of the features of a frozen backbone, e.g.
+            ``dict(cache_dir='data/feat_cache', pipeline=train_pipeline)``.
+            Defaults to None.
         init_cfg (:obj:`ConfigDict` or dict, optional): the config to control
             the initialization. Defaults to None.
     """
@@ -56,6 +61,7 @@ class DetectionTransformer(BaseDetector, metaclass=ABCMeta):
                  train_cfg: OptConfigType = None,
                  test_cfg: OptConfigType = None,
                  data_preprocessor: OptConfigType = None,
+                 feat_cache: OptConfigType = None,
                  init_cfg: OptMultiConfig = None) -> None:
         super().__init__(
             data_preprocessor=data_preprocessor, init_cfg=init_cfg)
@@ -76,6 +82,14 @@ class DetectionTransformer(BaseDetector, metaclass=ABCMeta):
         self.bbox_head = MODELS.build(bbox_head)
         self._init_layers()
 
+        self.feat_cache = None
+        if feat_cache is not None:
+            cached_cfgs = dict(backbone=backbone)
+            if feat_cache.get('with_neck', False):
+                assert neck is not None, 'with_neck requires a neck'
+                cached_cfgs['neck'] = neck
+            self.feat_cache = FeatureCache(**feat_cache, **cached_cfgs)
+
     @abstractmethod
     def _init_layers(self) -> None:
         """Initialize layers except for backbone, neck and bbox_head."""
@@ -95,7 +109,7 @@ class DetectionTransformer(BaseDetector, metaclass=ABCMeta):
         Returns:
             dict: A dictionary of loss components
         """
-        img_feats = self.extract_feat(batch_inputs)
+        img_feats = self.extract_feat(batch_inputs, batch_data_samples)
         head_inputs_dict = self.forward_transformer(img_feats,
                                                     batch_data_samples)
         losses = self.bbox_head.loss(
@@ -130,7 +144,7 @@ class DetectionTransformer(BaseDetector, metaclass=ABCMeta):
             - bboxes (Tensor): Has a shape (num_instances, 4),
               the last dimension 4 arrange as (x1, y1, x2, y2).
         """
-        img_feats = self.extract_feat(batch_inputs)
+        img_feats = self.extract_feat(batch_inputs, batch_data_samples)
         head_inputs_dict = self.forward_transformer(img_feats,
                                                     batch_data_samples)
         results_list = self.bbox_head.predict(
@@ -158,7 +172,7 @@ class DetectionTransformer(BaseDetector, metaclass=ABCMeta):
         Returns:
             tuple[Tensor]: A tuple of features from ``bbox_head`` forward.
         """
-        img_feats = self.extract_feat(batch_inputs)
+        img_feats = self.extract_feat(batch_inputs, batch_data_samples)
         head_inputs_dict = self.forward_transformer(img_feats,
                                                     batch_data_samples)
         results = self.bbox_head.forward(**head_inputs_dict)
@@ -224,17 +238,34 @@ class DetectionTransformer(BaseDetector, metaclass=ABCMeta):
         head_inputs_dict.update(decoder_outputs_dict)
         return head_inputs_dict
 
-    def extract_feat(self, batch_inputs: Tensor) -> Tuple[Tensor]:
+    def extract_feat(self,
+                     batch_inputs: Tensor,
+                     batch_data_samples: OptSampleList = None
+                     ) -> Tuple[Tensor]:
         """Extract features.
 
         Args:
             batch_inputs (Tensor): Image tensor, has shape (bs, dim, H, W).
+            batch_data_samples (list[:obj:`DetDataSample`], optional): The
+                batch data samples, which identify the images in the feature
+                cache. The cache is bypassed without them. Defaults to None.
 
         Returns:
             tuple[Tensor]: Tuple of feature maps from neck. Each feature map
             has shape (bs, dim, H, W).
         """
-        x = self.backbone(batch_inputs)
+        if self.feat_cache is None or batch_data_samples is None:
+            x = self.backbone(batch_inputs)
+            if self.with_neck:
+                x = self.neck(x)
+            return x
+
+        if self.feat_cache.with_neck:
+            return self.feat_cache([self.backbone, self.neck],
+                                   lambda x: self.neck(self.backbone(x)),
+                                   batch_inputs, batch_data_samples)
+        x = self.feat_cache([self.backbone], self.backbone, batch_inputs,
+                            batch_data_samples)
         if self.with_neck:
             x = self.neck(x)
         return x
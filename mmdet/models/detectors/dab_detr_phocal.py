@@ -142,20 +142,23 @@ class DABDETRPhoCal(DETR):
             hidden_states=hidden_states, references=references)
         return head_inputs_dict
 
-    def extract_feat(self, batch_inputs: Tensor) -> Tuple[Tensor]:
+    def extract_feat(self,
+                     batch_inputs: Tensor,
+                     batch_data_samples: OptSampleList = None
+                     ) -> Tuple[Tensor]:
         """Extract features.
 
         Args:
             batch_inputs (Tensor): Image tensor, has shape (bs, dim, H, W).
+            batch_data_samples (list[:obj:`DetDataSample`], optional): The
+                batch data samples, which identify the images in the feature
+                cache. Defaults to None.
 
         Returns:
             tuple[Tensor]: Tuple of feature maps from neck. Each feature map
             has shape (bs, dim, H, W).
         """
-        x = self.backbone(batch_inputs)
-        img_feats = x
-        if self.with_neck:
-            x = self.neck(x)
+        x = super().extract_feat(batch_inputs, batch_data_samples)
 
         # print(img_feats[0].shape)
         # img = mmcv.imread(img_path, channel_order='rgb')
@@ -197,7 +200,7 @@ class DABDETRPhoCal(DETR):
               the last dimension 4 arrange as (x1, y1, x2, y2).
         """
         #image=batch_inputs
-        img_feats = self.extract_feat(batch_inputs)
+        img_feats = self.extract_feat(batch_inputs, batch_data_samples)
         head_inputs_dict = self.forward_transformer(img_feats,
                                                     batch_data_samples)
         results_list = self.bbox_head.predict(
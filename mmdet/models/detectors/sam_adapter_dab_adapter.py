@@ -296,20 +296,24 @@ class SAMADAPTER_DABADAPTER(DETR):
         decoder_inputs_dict = dict(memory_mask=masks, memory_pos=pos_embed)
         return decoder_inputs_dict,feat
 
-    def extract_feat(self, batch_inputs: Tensor) -> Tuple[Tensor]:
+    def extract_feat(self,
+                     batch_inputs: Tensor,
+                     batch_data_samples: OptSampleList = None
+                     ) -> Tuple[Tensor]:
         """Extract features.
 
         Args:
             batch_inputs (Tensor): Image tensor, has shape (bs, dim, H, W).
+            batch_data_samples (list[:obj:`DetDataSample`], optional): The
+                batch data samples, which identify the images in the feature
+                cache. Defaults to None.
 
         Returns:
             tuple[Tensor]: Tuple of feature maps from neck. Each feature map
             has shape (bs, dim, H, W).
         """
         # image=batch_inputs
-        x = self.backbone(batch_inputs)
-        if self.with_neck:
-            x = self.neck(x)
+        x = super().extract_feat(batch_inputs, batch_data_samples)
 
         # visualizer=Visualizer(image=np.array(image[0].cpu().permute(1,2,0)),
         #         vis_backends=[dict(type='LocalVisBackend')],
@@ -349,7 +353,7 @@ class SAMADAPTER_DABADAPTER(DETR):
               the last dimension 4 arrange as (x1, y1, x2, y2).
         """
         # image=batch_inputs
-        img_feats = self.extract_feat(batch_inputs)
+        img_feats = self.extract_feat(batch_inputs, batch_data_samples)
         head_inputs_dict = self.forward_transformer(img_feats,
                                                     batch_data_samples)
         results_list = self.bbox_head.predict(
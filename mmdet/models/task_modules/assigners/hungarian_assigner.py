@@ -1,6 +1,10 @@
 # Copyright (c) OpenMMLab. All rights reserved.
-from typing import List, Optional, Union
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Optional, Sequence, Union
 
+import numpy as np
 import torch
 from mmengine import ConfigDict
 from mmengine.structures import InstanceData
@@ -12,6 +16,13 @@ from .assign_result import AssignResult
 from .base_assigner import BaseAssigner
 
 
+@lru_cache(maxsize=None)
+def _get_executor(num_workers: int) -> ThreadPoolExecutor:
+    # shared by the assigners, which are deep copied with the models
+    return ThreadPoolExecutor(
+        num_workers, thread_name_prefix='hungarian_assigner')
+
+
 @TASK_UTILS.register_module()
 class HungarianAssigner(BaseAssigner):
     """Computes one-to-one matching between predictions and ground truth.
@@ -28,15 +39,24 @@ class HungarianAssigner(BaseAssigner):
     - 0: negative sample, no assigned gt
     - positive integer: positive sample, index (1-based) of assigned gt
 
+    :meth:`assign_batch` matches several pairs of predictions and ground
+    truths at once, e.g. the images of all decoder layers. The costs of the
+    pairs sharing their ground truths are computed in one call on their
+    stacked predictions, all the costs are copied to the CPU at once and
+    the matchings are solved in a thread pool.
+
     Args:
         match_costs (:obj:`ConfigDict` or dict or \
             List[Union[:obj:`ConfigDict`, dict]]): Match cost configs.
+        num_workers (int, optional): Number of threads solving the matchings
+            of :meth:`assign_batch`, 0 solves them in the calling thread.
+            Defaults to None, the number of CPUs up to 8.
     """
 
-    def __init__(
-        self, match_costs: Union[List[Union[dict, ConfigDict]], dict,
-                                 ConfigDict]
-    ) -> None:
+    def __init__(self,
+                 match_costs: Union[List[Union[dict, ConfigDict]], dict,
+                                    ConfigDict],
+                 num_workers: Optional[int] = None) -> None:
 
         if isinstance(match_costs, dict):
             match_costs = [match_costs]
@@ -47,6 +67,9 @@ class HungarianAssigner(BaseAssigner):
         self.match_costs = [
             TASK_UTILS.build(match_cost) for match_cost in match_costs
         ]
+        if num_workers is None:
+            num_workers = min(os.cpu_count() or 1, 8)
+        self.num_workers = num_workers
 
     def assign(self,
                pred_instances: InstanceData,
@@ -86,33 +109,15 @@ class HungarianAssigner(BaseAssigner):
         Returns:
             :obj:`AssignResult`: The assigned result.
         """
-        assert isinstance(gt_instances.labels, Tensor)
-        num_gts, num_preds = len(gt_instances), len(pred_instances)
-        gt_labels = gt_instances.labels
-        device = gt_labels.device
-
-        # 1. assign -1 by default
-        assigned_gt_inds = torch.full((num_preds, ),
-                                      -1,
-                                      dtype=torch.long,
-                                      device=device)
-        assigned_labels = torch.full((num_preds, ),
-                                     -1,
-                                     dtype=torch.long,
-                                     device=device)
-
-        if num_gts == 0 or num_preds == 0:
-            # No ground truth or boxes, return empty assignment
-            if num_gts == 0:
-                # No ground truth, assign all to background
-                assigned_gt_inds[:] = 0
-            return AssignResult(
-                num_gts=num_gts,
-                gt_inds=assigned_gt_inds,
-                max_overlaps=None,
-                labels=assigned_labels)
-
-        # 2. compute weighted cost
+        return self.assign_batch([pred_instances], [gt_instances],
+                                 [img_meta])[0]
+
+    def get_cost(self,
+                 pred_instances: InstanceData,
+                 gt_instances: InstanceData,
+                 img_meta: Optional[dict] = None) -> Tensor:
+        """Compute the weighted sum of the match costs, has shape
+        (num_preds, num_gts)."""
         cost_list = []
         for match_cost in self.match_costs:
             cost = match_cost(
@@ -120,26 +125,130 @@ class HungarianAssigner(BaseAssigner):
                 gt_instances=gt_instances,
                 img_meta=img_meta)
             cost_list.append(cost)
-        cost = torch.stack(cost_list).sum(dim=0)
-
-        # 3. do Hungarian matching on CPU using linear_sum_assignment
-        cost = cost.detach().cpu()
-        if linear_sum_assignment is None:
-            raise ImportError('Please run "pip install scipy" '
-                              'to install scipy first.')
-
-        matched_row_inds, matched_col_inds = linear_sum_assignment(cost)
-        matched_row_inds = torch.from_numpy(matched_row_inds).to(device)
-        matched_col_inds = torch.from_numpy(matched_col_inds).to(device)
-
-        # 4. assign backgrounds and foregrounds
-        # assign all indices to backgrounds first
-        assigned_gt_inds[:] = 0
-        # assign foregrounds based on matching results
-        assigned_gt_inds[matched_row_inds] = matched_col_inds + 1
-        assigned_labels[matched_row_inds] = gt_labels[matched_col_inds]
-        return AssignResult(
-            num_gts=num_gts,
-            gt_inds=assigned_gt_inds,
-            max_overlaps=None,
-            labels=assigned_labels)
+        return torch.stack(cost_list).sum(dim=0)
+
+    def assign_batch(
+        self,
+        batch_pred_instances: Sequence[InstanceData],
+        batch_gt_instances: Sequence[InstanceData],
+        batch_img_metas: Optional[Sequence[Optional[dict]]] = None
+    ) -> List[AssignResult]:
+        """Computes the one-to-one matchings of several pairs of predictions
+        and ground truths, see :meth:`assign`.
+
+        The pairs sharing the same ground truth and image meta objects, e.g.
+        the decoder layers of an image, are grouped: their predictions are
+        concatenated and the costs of the group are computed in a single
+        :meth:`get_cost` call, which holds as the match costs are computed
+        row by row of the predictions. The costs of all pairs are copied to
+        the CPU in a single transfer, the matchings are solved concurrently,
+        and the matched indices are copied back at once.
+
+        Args:
+            batch_pred_instances (Sequence[:obj:`InstanceData`]): Instances
+                of model predictions of each pair.
+            batch_gt_instances (Sequence[:obj:`InstanceData`]): Ground truth
+                of instance annotations of each pair.
+            batch_img_metas (Sequence[dict], optional): Image information of
+                each pair. Defaults to None.
+
+        Returns:
+            list[:obj:`AssignResult`]: The assigned result of each pair.
+        """
+        if batch_img_metas is None:
+            batch_img_metas = [None] * len(batch_pred_instances)
+        assert len(batch_pred_instances) == len(batch_gt_instances) == len(
+            batch_img_metas)
+
+        # 1. compute the weighted costs of the non empty pairs, once per
+        # group of pairs sharing their ground truths and image meta
+        groups = {}
+        for i, (pred_instances, gt_instances, img_meta) in enumerate(
+                zip(batch_pred_instances, batch_gt_instances,
+                    batch_img_metas)):
+            assert isinstance(gt_instances.labels, Tensor)
+            if len(gt_instances) > 0 and len(pred_instances) > 0:
+                key = (id(gt_instances), id(img_meta))
+                groups.setdefault(key, []).append(i)
+        costs = [None] * len(batch_pred_instances)
+        for inds in groups.values():
+            group_preds = [batch_pred_instances[i] for i in inds]
+            if len(group_preds) > 1:
+                pred_instances = InstanceData.cat(group_preds)
+            else:
+                pred_instances = group_preds[0]
+            cost = self.get_cost(pred_instances, batch_gt_instances[inds[0]],
+                                 batch_img_metas[inds[0]])
+            group_costs = cost.split([len(pred) for pred in group_preds])
+            for i, pair_cost in zip(inds, group_costs):
+                costs[i] = pair_cost
+
+        # 2. do Hungarian matching on CPU using linear_sum_assignment
+        matched = [cost for cost in costs if cost is not None]
+        if len(matched) > 0:
+            if linear_sum_assignment is None:
+                raise ImportError('Please run "pip install scipy" '
+                                  'to install scipy first.')
+            cpu_costs = torch.cat(
+                [cost.detach().flatten() for cost in matched]).cpu().numpy()
+            cpu_costs = np.split(
+                cpu_costs,
+                np.cumsum([cost.numel() for cost in matched])[:-1])
+            cpu_costs = [
+                cpu_cost.reshape(cost.shape)
+                for cpu_cost, cost in zip(cpu_costs, matched)
+            ]
+            num_workers = min(self.num_workers, len(cpu_costs))
+            if num_workers > 1:
+                matches = list(
+                    _get_executor(self.num_workers).map(
+                        linear_sum_assignment, cpu_costs))
+            else:
+                matches = [linear_sum_assignment(cost) for cost in cpu_costs]
+            num_matches = [len(row_inds) for row_inds, _ in matches]
+            device = matched[0].device
+            matched_inds = torch.from_numpy(
+                np.concatenate([
+                    np.concatenate([row_inds, col_inds])
+                    for row_inds, col_inds in matches
+                ])).to(device).split([2 * n for n in num_matches])
+            matched_inds = iter(ind.view(2, -1) for ind in matched_inds)
+
+        # 3. assign backgrounds and foregrounds
+        results = []
+        for pred_instances, gt_instances, cost in zip(batch_pred_instances,
+                                                      batch_gt_instances,
+                                                      costs):
+            num_gts, num_preds = len(gt_instances), len(pred_instances)
+            gt_labels = gt_instances.labels
+            device = gt_labels.device
+            # assign -1 by default
+            assigned_gt_inds = torch.full((num_preds, ),
+                                          -1,
+                                          dtype=torch.long,
+                                          device=device)
+            assigned_labels = torch.full((num_preds, ),
+                                         -1,
+                                         dtype=torch.long,
+                                         device=device)
+            if cost is None:
+                # No ground truth or boxes, return empty assignment
+                if num_gts == 0:
+                    # No ground truth, assign all to background
+                    assigned_gt_inds[:] = 0
+            else:
+                matched_row_inds, matched_col_inds = next(matched_inds)
+                matched_row_inds = matched_row_inds.to(device)
+                matched_col_inds = matched_col_inds.to(device)
+                # assign all indices to backgrounds first
+                assigned_gt_inds[:] = 0
+                # assign foregrounds based on matching results
+                assigned_gt_inds[matched_row_inds] = matched_col_inds + 1
+                assigned_labels[matched_row_inds] = gt_labels[matched_col_inds]
+            results.append(
+                AssignResult(
+                    num_gts=num_gts,
+                    gt_inds=assigned_gt_inds,
+                    max_overlaps=None,
+                    labels=assigned_labels))
+        return results
@@ -1,6 +1,6 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 from abc import abstractmethod
-from typing import Optional, Union
+from typing import Optional, Sequence, Union
 
 import torch
 import torch.nn.functional as F
@@ -461,3 +461,159 @@ class CrossEntropyLossCost(BaseMatchCost):
             raise NotImplementedError
 
         return cls_cost * self.weight
+
+
+@TASK_UTILS.register_module()
+class RotationCost(BaseMatchCost):
+    """Geodesic distance between predicted and ground truth rotations.
+
+    Rotations are flattened row-major 3x3 matrices. The cosine of the angle
+    between every pair is ``(trace(R_pred @ R_gt^T) - 1) / 2``, whose trace
+    is the dot product of the flattened matrices, so that the whole cost
+    matrix takes a single matrix product. The predictions are rescaled to
+    the Frobenius norm of a rotation as they are not orthonormal. The ground
+    truths of ``sym_labels``, symmetric around their y axis, only compare
+    the y axes of the rotations.
+
+    Args:
+        sym_labels (Sequence[int]): Labels of the classes symmetric around
+            the y axis, e.g. (0, 1, 3) for bottle, bowl and can of NOCS.
+            Defaults to ().
+        pred_key (str): Field of the predicted rotations. Defaults to
+            'rots'.
+        gt_key (str): Field of the ground truth rotations. Defaults to
+            'rots_norm'.
+        weight (Union[float, int]): Cost weight. Defaults to 1.
+    """
+
+    def __init__(self,
+                 sym_labels: Sequence[int] = (),
+                 pred_key: str = 'rots',
+                 gt_key: str = 'rots_norm',
+                 weight: Union[float, int] = 1.) -> None:
+        super().__init__(weight=weight)
+        self.sym_labels = tuple(sym_labels)
+        self.pred_key = pred_key
+        self.gt_key = gt_key
+
+    def __call__(self,
+                 pred_instances: InstanceData,
+                 gt_instances: InstanceData,
+                 img_meta: Optional[dict] = None,
+                 **kwargs) -> Tensor:
+        """Compute match cost.
+
+        Args:
+            pred_instances (:obj:`InstanceData`): Predicted instances which
+                must contain the rotations ``pred_key``, has shape (n, 9).
+            gt_instances (:obj:`InstanceData`): Ground truth which must
+                contain the rotations ``gt_key``, has shape (k, 9), and
+                ``labels``.
+            img_meta (Optional[dict]): Image information. Defaults to None.
+
+        Returns:
+            Tensor: Match Cost matrix of shape (num_preds, num_gts), the
+            angles in radians.
+        """
+        pred_rots = pred_instances.get(self.pred_key).reshape(-1, 9).float()
+        gt_rots = gt_instances.get(self.gt_key).reshape(-1, 9).float()
+        pred_rots = pred_rots * (3**0.5 / pred_rots.norm(dim=1).clamp(
+            min=1e-6)).unsqueeze(1)
+
+        cos_theta = (pred_rots @ gt_rots.T - 1) / 2
+        if len(self.sym_labels) > 0:
+            gt_labels = gt_instances.labels
+            sym = (gt_labels[:, None] == gt_labels.new_tensor(
+                self.sym_labels)).any(dim=1)
+            if sym.any():
+                # y axes, the second columns
+                pred_y = F.normalize(pred_rots[:, 1::3], dim=1)
+                gt_y = F.normalize(gt_rots[:, 1::3], dim=1)
+                cos_theta = torch.where(sym[None], pred_y @ gt_y.T,
+                                        cos_theta)
+        rot_cost = torch.acos(cos_theta.clamp(-1, 1))
+        return rot_cost * self.weight
+
+
+@TASK_UTILS.register_module()
+class TranslationCost(BaseMatchCost):
+    """L2 distance between predicted and ground truth translations.
+
+    Args:
+        pred_key (str): Field of the predicted translations. Defaults to
+            'poses'.
+        gt_key (str): Field of the ground truth translations. Defaults to
+            'poses'.
+        weight (Union[float, int]): Cost weight. Defaults to 1.
+    """
+
+    def __init__(self,
+                 pred_key: str = 'poses',
+                 gt_key: str = 'poses',
+                 weight: Union[float, int] = 1.) -> None:
+        super().__init__(weight=weight)
+        self.pred_key = pred_key
+        self.gt_key = gt_key
+
+    def __call__(self,
+                 pred_instances: InstanceData,
+                 gt_instances: InstanceData,
+                 img_meta: Optional[dict] = None,
+                 **kwargs) -> Tensor:
+        """Compute match cost.
+
+        Args:
+            pred_instances (:obj:`InstanceData`): Predicted instances which
+                must contain the translations ``pred_key``, has shape (n, 3).
+            gt_instances (:obj:`InstanceData`): Ground truth which must
+                contain the translations ``gt_key``, has shape (k, 3).
+            img_meta (Optional[dict]): Image information. Defaults to None.
+
+        Returns:
+            Tensor: Match Cost matrix of shape (num_preds, num_gts).
+        """
+        pred_poses = pred_instances.get(self.pred_key).reshape(-1, 3).float()
+        gt_poses = gt_instances.get(self.gt_key).reshape(-1, 3).float()
+        pos_cost = torch.cdist(pred_poses, gt_poses, p=2)
+        return pos_cost * self.weight
+
+
+@TASK_UTILS.register_module()
+class Size3DCost(BaseMatchCost):
+    """L1 distance between predicted and ground truth 3D box sizes.
+
+    Args:
+        pred_key (str): Field of the predicted sizes. Defaults to 'sizes'.
+        gt_key (str): Field of the ground truth sizes. Defaults to 'sizes'.
+        weight (Union[float, int]): Cost weight. Defaults to 1.
+    """
+
+    def __init__(self,
+                 pred_key: str = 'sizes',
+                 gt_key: str = 'sizes',
+                 weight: Union[float, int] = 1.) -> None:
+        super().__init__(weight=weight)
+        self.pred_key = pred_key
+        self.gt_key = gt_key
+
+    def __call__(self,
+                 pred_instances: InstanceData,
+                 gt_instances: InstanceData,
+                 img_meta: Optional[dict] = None,
+                 **kwargs) -> Tensor:
+        """Compute match cost.
+
+        Args:
+            pred_instances (:obj:`InstanceData`): Predicted instances which
+                must contain the sizes ``pred_key``, has shape (n, 3).
+            gt_instances (:obj:`InstanceData`): Ground truth which must
+                contain the sizes ``gt_key``, has shape (k, 3).
+            img_meta (Optional[dict]): Image information. Defaults to None.
+
+        Returns:
+            Tensor: Match Cost matrix of shape (num_preds, num_gts).
+        """
+        pred_sizes = pred_instances.get(self.pred_key).reshape(-1, 3).float()
+        gt_sizes = gt_instances.get(self.gt_key).reshape(-1, 3).float()
+        size_cost = torch.cdist(pred_sizes, gt_sizes, p=1)
+        return size_cost * self.weight
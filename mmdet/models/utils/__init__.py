@@ -3,13 +3,14 @@ from .gaussian_target import (gather_feat, gaussian_radius,
                               gen_gaussian_target, get_local_maximum,
                               get_topk_from_heatmap, transpose_and_gather_feat)
 from .make_divisible import make_divisible
-from .misc import (aligned_bilinear, center_of_mass, empty_instances,
-                   filter_gt_instances, filter_scores_and_topk, flip_tensor,
-                   generate_coordinate, images_to_levels, interpolate_as,
-                   levels_to_images, mask2ndarray, multi_apply,
-                   relative_coordinate_maps, rename_loss_dict,
-                   reweight_loss_dict, samplelist_boxtype2tensor,
-                   select_single_mlvl, sigmoid_geometric_mean,
+from .misc import (aligned_bilinear, batched_detr_predictions,
+                   center_of_mass, empty_instances, filter_gt_instances,
+                   filter_scores_and_topk, flip_tensor, generate_coordinate,
+                   images_to_levels, interpolate_as, levels_to_images,
+                   mask2ndarray, multi_apply, relative_coordinate_maps,
+                   rename_loss_dict, reweight_loss_dict,
+                   samplelist_boxtype2tensor, select_single_mlvl,
+                   sigmoid_geometric_mean, unbatch_instances,
                    unfold_wo_center, unmap, unpack_gt_instances)
 from .panoptic_gt_processing import preprocess_panoptic_gt
 from .point_sample import (get_uncertain_point_coords_with_randomness,
@@ -21,8 +22,9 @@ from .norm import GRN, LayerNorm2d, build_norm_layer
 from .layer_scale import LayerScale
 from .swiglu_ffn import SwiGLUFFN, SwiGLUFFNFused
 from .helpers import is_tracing, to_2tuple, to_3tuple, to_4tuple, to_ntuple
-from .embed import (HybridEmbed, PatchEmbed, PatchMerging, resize_pos_embed,
-                    resize_relative_position_bias_table)
+from .embed import (HybridEmbed, PatchEmbed, PatchMerging, PosEmbedCache,
+                    resize_pos_embed, resize_relative_position_bias_table)
+from .feat_cache import FeatureCache
 
 __all__ = [
     'gaussian_radius', 'gen_gaussian_target', 'make_divisible',
@@ -54,4 +56,8 @@ __all__ = [
     'HybridEmbed',
     'resize_pos_embed',
     'resize_relative_position_bias_table',
+    'PosEmbedCache',
+    'FeatureCache',
+    'batched_detr_predictions',
+    'unbatch_instances',
 ]
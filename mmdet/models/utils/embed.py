@@ -115,6 +115,46 @@ def resize_relative_position_bias_table(src_shape, dst_shape, table, num_head):
     return new_rel_pos_bias
 
 
+class PosEmbedCache:
+    """Cache of the tensors derived from positional embedding parameters,
+    such as their resized copies for a given input resolution.
+
+    An entry is computed by ``fn`` once per ``key`` and reused until any of
+    the parameters it derives from is modified in place (e.g. by an optimizer
+    step or loading a checkpoint), moved or replaced. Entries are never cached
+    while gradients flow to the parameters, as the result must then be part
+    of the autograd graph of every forward.
+
+    Args:
+        max_size (int): Maximum number of cached entries, the oldest entry is
+            dropped first. Defaults to 8.
+    """
+
+    def __init__(self, max_size: int = 8) -> None:
+        self.max_size = max_size
+        self._cache = {}
+
+    def __call__(self, key, params: Sequence[torch.Tensor], fn):
+        """Return ``fn()``, cached by ``key`` and the state of ``params``."""
+        if torch.is_grad_enabled() and any(p.requires_grad for p in params):
+            return fn()
+        state = tuple((p.data_ptr(), p._version, p.device, p.dtype)
+                      for p in params)
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] == state:
+            return entry[1]
+        value = fn()
+        self._cache.pop(key, None)
+        if len(self._cache) >= self.max_size:
+            self._cache.pop(next(iter(self._cache)))
+        self._cache[key] = (state, value)
+        return value
+
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        self._cache.clear()
+
+
 class PatchEmbed(BaseModule):
     """Image to Patch Embedding.
 
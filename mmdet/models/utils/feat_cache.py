@@ -0,0 +1,159 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import hashlib
+import json
+import os
+import os.path as osp
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+from torch import Tensor, nn
+
+from mmdet.structures import SampleList
+
+
+def hash_config(*cfgs) -> str:
+    """Stable short hash of json serializable configs."""
+    text = json.dumps(cfgs, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+class FeatureCache:
+    """Memory-mapped on-disk cache of the features of a frozen backbone.
+
+    The features of each image are stored once as ``.npy`` files, one per
+    feature level, and memory-mapped back on later epochs, so that training
+    only pays for the layers after the cached modules. Entries are keyed by
+    the image (``img_path`` and ``img_id``) and the metainfo describing what
+    the pipeline and the batching did to it (``meta_keys``), under a
+    directory named after the hash of ``pipeline`` and of the cached modules
+    configs.
+
+    Only deterministic pipelines are supported, features of randomly
+    augmented images would be stale on the next epoch. The cached modules
+    must not have trainable parameters, and are always cached as in eval
+    mode.
+
+    Args:
+        cache_dir (str): Root directory of the cache.
+        pipeline (list[dict], optional): Config of the data pipeline, hashed
+            into the cache directory. Defaults to None.
+        with_neck (bool): Whether to cache the outputs of the neck too,
+            which requires a frozen neck. Defaults to False.
+        dtype (str): Storage type of the features, 'float16' halves the disk
+            usage at the cost of precision. Defaults to 'float32'.
+        meta_keys (Sequence[str]): Metainfo of the data samples that are part
+            of the key of an image.
+        cfgs (dict): Configs of the cached modules, hashed into the cache
+            directory. Filled by the detector.
+    """
+
+    def __init__(self,
+                 cache_dir: str,
+                 pipeline: Optional[List[dict]] = None,
+                 with_neck: bool = False,
+                 dtype: str = 'float32',
+                 meta_keys: Sequence[str] = ('img_shape', 'pad_shape',
+                                             'batch_input_shape',
+                                             'scale_factor', 'flip',
+                                             'flip_direction'),
+                 **cfgs) -> None:
+        self.with_neck = with_neck
+        self.dtype = np.dtype(dtype)
+        self.meta_keys = tuple(meta_keys)
+        self.cache_dir = osp.join(
+            cache_dir, hash_config(pipeline, cfgs, self.dtype.name))
+        self._checked = False
+
+    def sample_key(self, data_sample) -> str:
+        """Key of the features of one image."""
+        metainfo = data_sample.metainfo
+        key = [metainfo.get('img_path'), metainfo.get('img_id')]
+        key += [metainfo.get(k) for k in self.meta_keys]
+        return hash_config(*key)
+
+    def _paths(self, key: str, num_levels: int) -> List[str]:
+        return [
+            osp.join(self.cache_dir, key[:2], f'{key}_{lvl}.npy')
+            for lvl in range(num_levels)
+        ]
+
+    def load(self, keys: Sequence[str]) -> Optional[List[np.ndarray]]:
+        """Stacked features of ``keys`` per level, or None on a miss."""
+        index_file = osp.join(self.cache_dir, 'num_levels')
+        if not osp.exists(index_file):
+            return None
+        with open(index_file) as f:
+            num_levels = int(f.read())
+        feats = [[] for _ in range(num_levels)]
+        for key in keys:
+            paths = self._paths(key, num_levels)
+            if not osp.exists(paths[-1]):
+                return None
+            for lvl, path in enumerate(paths):
+                feats[lvl].append(np.load(path, mmap_mode='r'))
+        return [np.stack(feat) for feat in feats]
+
+    def save(self, keys: Sequence[str], feats: Sequence[Tensor]) -> None:
+        """Writes the features of ``keys``, files are replaced atomically so
+        that other ranks never read partial entries."""
+        feats = [
+            feat.detach().cpu().numpy().astype(self.dtype) for feat in feats
+        ]
+        for i, key in enumerate(keys):
+            paths = self._paths(key, len(feats))
+            os.makedirs(osp.dirname(paths[0]), exist_ok=True)
+            # the last level marks a complete entry, write it last
+            for path, feat in zip(paths, feats):
+                tmp_path = f'{path}.{os.getpid()}.tmp'
+                with open(tmp_path, 'wb') as f:
+                    np.save(f, feat[i])
+                os.replace(tmp_path, path)
+        index_file = osp.join(self.cache_dir, 'num_levels')
+        if not osp.exists(index_file):
+            tmp_path = f'{index_file}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w') as f:
+                f.write(str(len(feats)))
+            os.replace(tmp_path, index_file)
+
+    def __call__(self, modules: Sequence[nn.Module],
+                 forward: Callable[[Tensor], Tuple[Tensor]],
+                 batch_inputs: Tensor,
+                 batch_data_samples: SampleList) -> Tuple[Tensor]:
+        """Features of ``batch_inputs``, read from the cache or computed by
+        ``forward`` and cached when any image of the batch misses.
+
+        Args:
+            modules (Sequence[nn.Module]): The cached modules, checked to be
+                frozen on the first call.
+            forward (Callable): Computes the features of a batch.
+            batch_inputs (Tensor): Inputs, has shape (bs, dim, H, W).
+            batch_data_samples (list[:obj:`DetDataSample`]): The batch data
+                samples, whose metainfo identifies the images.
+
+        Returns:
+            tuple[Tensor]: The features of each level.
+        """
+        if not self._checked:
+            assert not any(p.requires_grad for m in modules
+                           for p in m.parameters()), \
+                'the feature cache requires frozen cached modules'
+            self._checked = True
+
+        keys = [self.sample_key(s) for s in batch_data_samples]
+        feats = self.load(keys)
+        if feats is not None:
+            return tuple(
+                torch.from_numpy(feat).to(
+                    device=batch_inputs.device, dtype=batch_inputs.dtype)
+                for feat in feats)
+
+        training = [m.training for m in modules]
+        for m in modules:
+            m.eval()
+        with torch.no_grad():
+            feats = tuple(forward(batch_inputs))
+        for m, mode in zip(modules, training):
+            m.train(mode)
+        self.save(keys, feats)
+        return feats
@@ -12,7 +12,8 @@ from torch.autograd import Function
 from torch.nn import functional as F
 
 from mmdet.structures import SampleList
-from mmdet.structures.bbox import BaseBoxes, get_box_type, stack_boxes
+from mmdet.structures.bbox import (BaseBoxes, bbox_cxcywh_to_xyxy,
+                                   get_box_type, stack_boxes)
 from mmdet.structures.mask import BitmapMasks, PolygonMasks
 from mmdet.utils import OptInstanceList
 
@@ -650,3 +651,81 @@ def unfold_wo_center(x, kernel_size: int, dilation: int) -> Tensor:
         dim=2)
 
     return unfolded_x
+
+
+def batched_detr_predictions(cls_scores: Tensor,
+                             bbox_preds: Tensor,
+                             batch_img_metas: List[dict],
+                             num_classes: int,
+                             use_sigmoid: bool,
+                             max_per_img: int,
+                             rescale: bool = True,
+                             **preds: Tensor) -> dict:
+    """Select the top predictions of the queries of a DETR-like head for a
+    whole batch.
+
+    The batched equivalent of the ``_predict_by_feat_single`` of DETR heads:
+    the topk and the gathers of the boxes and of the other query predictions
+    are done once over the (bs, num_queries) tensors instead of per image.
+
+    Args:
+        cls_scores (Tensor): Box score logits of the last decoder layer, has
+            shape (bs, num_queries, cls_out_channels).
+        bbox_preds (Tensor): Sigmoid regression outputs of the last decoder
+            layer with normalized coordinate format (cx, cy, w, h), has shape
+            (bs, num_queries, 4).
+        batch_img_metas (list[dict]): Meta information of each image.
+        num_classes (int): Number of classes.
+        use_sigmoid (bool): Whether the scores are sigmoid based, otherwise
+            softmax based with a background class.
+        max_per_img (int): Number of predictions kept per image.
+        rescale (bool): If True, return boxes in original image space.
+            Defaults to True.
+        preds (Tensor): Other per query predictions, each has shape
+            (bs, num_queries, ...), gathered with the boxes.
+
+    Returns:
+        dict[str, Tensor]: ``scores``, ``labels``, ``bboxes`` (x1, y1, x2, y2)
+        and each of ``preds`` of the kept predictions, with shape
+        (bs, max_per_img, ...).
+    """
+    if use_sigmoid:
+        scores, indexes = cls_scores.sigmoid().flatten(1).topk(
+            max_per_img, dim=1)
+        labels = indexes % num_classes
+        bbox_index = indexes // num_classes
+    else:
+        scores, labels = F.softmax(cls_scores, dim=-1)[..., :-1].max(-1)
+        scores, bbox_index = scores.topk(max_per_img, dim=1)
+        labels = labels.gather(1, bbox_index)
+    batch_index = torch.arange(
+        len(bbox_index), device=bbox_index.device)[:, None]
+
+    bboxes = bbox_cxcywh_to_xyxy(bbox_preds[batch_index, bbox_index])
+    # (w, h, w, h) of each image
+    img_sizes = bboxes.new_tensor(
+        [[meta['img_shape'][1], meta['img_shape'][0]] * 2
+         for meta in batch_img_metas])[:, None]
+    bboxes = torch.minimum((bboxes * img_sizes).clamp(min=0), img_sizes)
+    if rescale:
+        assert all(
+            meta.get('scale_factor') is not None for meta in batch_img_metas)
+        bboxes /= bboxes.new_tensor(
+            [list(meta['scale_factor']) * 2
+             for meta in batch_img_metas])[:, None]
+
+    results = dict(scores=scores, labels=labels, bboxes=bboxes)
+    for key, pred in preds.items():
+        results[key] = pred[batch_index, bbox_index]
+    return results
+
+
+def unbatch_instances(**fields: Tensor) -> List[InstanceData]:
+    """Split the batched fields of shape (bs, ...) into the
+    :obj:`InstanceData` of each image."""
+    batch_size = len(next(iter(fields.values())))
+    return [
+        InstanceData(**{key: value[i]
+                        for key, value in fields.items()})
+        for i in range(batch_size)
+    ]
@@ -1,10 +1,11 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 from ._fast_stop_training_hook import FastStopTrainingHook  # noqa: F401,F403
 from ._utils import (demo_mm_inputs, demo_mm_proposals,
-                     demo_mm_sampling_results, get_detector_cfg,
-                     get_roi_head_cfg, replace_to_ceph)
+                     demo_mm_sampling_results, demo_pose_ann_file,
+                     get_detector_cfg, get_roi_head_cfg, replace_to_ceph)
 
 __all__ = [
     'demo_mm_inputs', 'get_detector_cfg', 'get_roi_head_cfg',
-    'demo_mm_proposals', 'demo_mm_sampling_results', 'replace_to_ceph'
+    'demo_mm_proposals', 'demo_mm_sampling_results', 'demo_pose_ann_file',
+    'replace_to_ceph'
 ]
@@ -2,6 +2,8 @@
 import copy
 from os.path import dirname, exists, join
 
+import mmcv
+import mmengine
 import numpy as np
 import torch
 from mmengine.config import Config
@@ -272,6 +274,64 @@ def demo_mm_sampling_results(proposals_list,
     return sampling_results
 
 
+def demo_pose_ann_file(ann_file, img_dir=None, num_images=5):
+    """Create a NOCS style annotation file of random poses.
+
+    The i-th image has ``i % 4`` annotations, the first annotation is out of
+    its image and the second one is ignored.
+
+    Args:
+        ann_file (str): Path of the json file to write.
+        img_dir (str, optional): Directory where random images named after
+            the ``file_name`` of the images are written. Defaults to None,
+            which writes no image.
+        num_images (int): Number of images. Defaults to 5.
+
+    Returns:
+        list[dict]: The annotations.
+    """
+    rng = np.random.default_rng(0)
+    images, anns = [], []
+    for img_id in range(1, num_images + 1):
+        images.append(
+            dict(id=img_id, file_name=f'{img_id}.png', width=64, height=48))
+        for _ in range(img_id % 4):
+            anns.append(
+                dict(
+                    id=len(anns) + 1,
+                    image_id=img_id,
+                    category_id=int(rng.integers(1, 8)),
+                    bbox=[float(x) for x in rng.uniform(0, 30, 4)],
+                    area=100,
+                    iscrowd=int(rng.random() < 0.2),
+                    relative_pose=dict(
+                        rotation=rng.normal(size=9).tolist(),
+                        position=rng.normal(size=3).tolist()),
+                    norm_pose=dict(
+                        rotation_norm=rng.normal(size=9).tolist(),
+                        scale_norm=float(rng.random())),
+                    bbox_3d_size=rng.random(3).tolist(),
+                    handle_visibility=int(img_id % 3 > 0)))
+    # out of the image and ignored annotations
+    anns[0]['bbox'] = [70, 0, 10, 10]
+    anns[1]['ignore'] = True
+    categories = [
+        dict(id=i + 1, name=name)
+        for i, name in enumerate(('bottle', 'bowl', 'camera', 'can', 'laptop',
+                                  'mug', 'other'))
+    ]
+    mmengine.dump(
+        dict(images=images, annotations=anns, categories=categories), ann_file)
+
+    if img_dir is not None:
+        img_rng = np.random.default_rng(1)
+        for image in images:
+            img = img_rng.integers(
+                0, 255, (image['height'], image['width'], 3), dtype=np.uint8)
+            mmcv.imwrite(img, join(img_dir, image['file_name']))
+    return anns
+
+
 # TODO: Support full ceph
 def replace_to_ceph(cfg):
     file_client_args = dict(
@@ -5,7 +5,8 @@ import numpy as np
 import pytest
 import torch
 
-from mmdet.apis import inference_detector, init_detector
+from mmdet.apis import (inference_detector, init_detector,
+                        iter_inference_detector)
 from mmdet.structures import DetDataSample
 from mmdet.utils import register_all_modules
 
@@ -74,3 +75,43 @@ def test_inference_detector(config, devices):
         assert isinstance(result, DetDataSample)
         result = inference_detector(model, [img1, img2])
         assert isinstance(result, list) and len(result) == 2
+
+
+@pytest.mark.parametrize('config', ['configs/detr/detr_r18_8xb2-500e_coco.py'])
+@pytest.mark.parametrize('device', ['cpu', 'cuda'])
+def test_batch_inference_detector(config, device):
+    if device == 'cuda' and not torch.cuda.is_available():
+        pytest.skip('test requires GPU and torch+cuda')
+
+    project_dir = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+    project_dir = os.path.join(project_dir, '..')
+
+    config_file = os.path.join(project_dir, config)
+
+    rng = np.random.RandomState(0)
+    imgs = [rng.randint(0, 255, (64, 64, 3), dtype=np.uint8) for _ in range(3)]
+
+    model = init_detector(config_file, device=device)
+    singles = [inference_detector(model, img) for img in imgs]
+
+    # batched, with the pipeline in worker threads
+    results = inference_detector(
+        model, imgs + imgs[:1], batch_size=2, num_workers=2)
+    assert isinstance(results, list) and len(results) == 4
+    for batched, single in zip(results, singles + singles[:1]):
+        assert batched.img_shape == single.img_shape
+        for key in ('scores', 'labels', 'bboxes'):
+            assert torch.allclose(
+                batched.pred_instances.get(key).float(),
+                single.pred_instances.get(key).float(),
+                atol=1e-4)
+
+    # a stream of images
+    results = list(
+        iter_inference_detector(model, (img for img in imgs), batch_size=2))
+    assert len(results) == 3
+    for streamed, single in zip(results, singles):
+        assert torch.allclose(
+            streamed.pred_instances.scores,
+            single.pred_instances.scores,
+            atol=1e-4)
@@ -0,0 +1,50 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import os.path as osp
+import tempfile
+import unittest
+
+import numpy as np
+
+from mmdet.datasets import CocoDatasetNOCS3D
+from mmdet.datasets.pose_ann_store import get_pose_ann_store_dir
+from mmdet.testing import demo_pose_ann_file
+
+
+class TestCocoDatasetNOCS3D(unittest.TestCase):
+
+    def test_ann_store(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            ann_file = osp.join(tmp_dir, 'train.json')
+            demo_pose_ann_file(ann_file)
+            kwargs = dict(
+                data_prefix=dict(img='imgs'),
+                ann_file=ann_file,
+                filter_cfg=dict(filter_empty_gt=True),
+                pipeline=[])
+            dataset = CocoDatasetNOCS3D(**kwargs)
+            store_dataset = CocoDatasetNOCS3D(ann_store=True, **kwargs)
+            self.assertTrue(osp.isdir(get_pose_ann_store_dir(ann_file)))
+            # reuses the saved store
+            store_dataset = CocoDatasetNOCS3D(ann_store=True, **kwargs)
+
+            self.assertEqual(len(store_dataset), len(dataset))
+            for i in range(len(dataset)):
+                data_info = dataset.get_data_info(i)
+                store_info = store_dataset.get_data_info(i)
+                for key in ('img_path', 'img_id', 'height', 'width'):
+                    self.assertEqual(store_info[key], data_info[key])
+                self.assertEqual(
+                    store_dataset.get_cat_ids(i), dataset.get_cat_ids(i))
+                ann_arrays = store_info['ann_arrays']
+                instances = data_info['instances']
+                for key, dtype in (('bbox', np.float32),
+                                   ('bbox_label', np.int64),
+                                   ('ignore_flag', bool),
+                                   ('rot', np.float32), ('pos', np.float32),
+                                   ('bbox_3d_size', np.float32),
+                                   ('rot_norm', np.float32),
+                                   ('scale_norm', np.float32)):
+                    expected = np.array([inst[key] for inst in instances],
+                                        dtype=dtype)
+                    np.testing.assert_array_equal(
+                        ann_arrays[key].reshape(expected.shape), expected)
@@ -0,0 +1,62 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import os.path as osp
+import tempfile
+import unittest
+
+import mmcv
+import numpy as np
+
+from mmdet.datasets import CocoDatasetNOCS3D, PackedPoseDataset
+from mmdet.datasets.packed_pose import pack_pose_dataset
+from mmdet.datasets.transforms import LoadImageFromBytes
+from mmdet.testing import demo_pose_ann_file
+
+
+class TestPackedPoseDataset(unittest.TestCase):
+
+    def test_packed_pose_dataset(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            ann_file = osp.join(tmp_dir, 'train.json')
+            img_root = osp.join(tmp_dir, 'imgs')
+            demo_pose_ann_file(ann_file, img_dir=img_root)
+            pack_dir = osp.join(tmp_dir, 'packed')
+            # small shards of two images
+            shard_bytes = osp.getsize(osp.join(img_root, '1.png')) * 2 + 1
+            num_shards = pack_pose_dataset(
+                ann_file, img_root, pack_dir, shard_bytes,
+                extra_keys=('area', ))
+            self.assertGreater(num_shards, 1)
+
+            dataset = CocoDatasetNOCS3D(
+                data_prefix=dict(img=img_root), ann_file=ann_file, pipeline=[])
+            packed = PackedPoseDataset(
+                data_prefix=dict(img=img_root), ann_file=pack_dir, pipeline=[])
+            self.assertEqual(len(packed), len(dataset))
+            self.assertEqual(packed.metainfo['classes'],
+                             dataset.metainfo['classes'])
+            self.assertEqual(len(np.unique(packed.shard_ids)), num_shards)
+
+            load = LoadImageFromBytes()
+            for i in range(len(dataset)):
+                data_info = dataset.get_data_info(i)
+                packed_info = packed.get_data_info(i)
+                self.assertEqual(packed_info['img_path'],
+                                 data_info['img_path'])
+                results = load(packed_info)
+                np.testing.assert_array_equal(
+                    results['img'], mmcv.imread(data_info['img_path']))
+                self.assertEqual(results['img_shape'], (48, 64))
+
+                ann_arrays = packed_info['ann_arrays']
+                instances = data_info['instances']
+                for key in ('bbox', 'bbox_label', 'rot', 'pos'):
+                    expected = np.array([inst[key] for inst in instances])
+                    np.testing.assert_allclose(
+                        ann_arrays[key].reshape(expected.shape), expected)
+                np.testing.assert_array_equal(
+                    ann_arrays['handle_visibility'],
+                    [i % 3 != 2] * len(instances))
+                # the packed extra keys are loaded
+                np.testing.assert_array_equal(ann_arrays['area'],
+                                              np.full((len(instances), 1),
+                                                      100))
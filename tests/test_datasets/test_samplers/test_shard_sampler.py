@@ -0,0 +1,51 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+
+from unittest import TestCase
+from unittest.mock import patch
+
+import numpy as np
+from torch.utils.data import Dataset
+
+from mmdet.datasets.samplers import ShardShuffleSampler
+
+
+class DummyDataset(Dataset):
+
+    def __init__(self, shard_sizes):
+        self.shard_ids = np.repeat(np.arange(len(shard_sizes)), shard_sizes)
+
+    def __len__(self):
+        return len(self.shard_ids)
+
+    def __getitem__(self, idx):
+        return self.shard_ids[idx]
+
+
+class TestShardShuffleSampler(TestCase):
+
+    @patch('mmengine.dataset.sampler.get_dist_info', return_value=(0, 1))
+    def test_shuffle(self, mock):
+        dataset = DummyDataset([7, 3, 5, 6])
+        sampler = ShardShuffleSampler(dataset, seed=0)
+        indices = list(sampler)
+        self.assertEqual(sorted(indices), list(range(len(dataset))))
+        # the samples of a shard are contiguous
+        shard_ids = dataset.shard_ids[indices]
+        self.assertEqual(
+            np.count_nonzero(np.diff(shard_ids)),
+            len(np.unique(shard_ids)) - 1)
+
+        sampler.set_epoch(1)
+        self.assertNotEqual(list(sampler), indices)
+        sampler.set_epoch(0)
+        self.assertEqual(list(sampler), indices)
+
+        sampler = ShardShuffleSampler(dataset, shuffle=False)
+        self.assertEqual(list(sampler), list(range(len(dataset))))
+
+    @patch('mmengine.dataset.sampler.get_dist_info', return_value=(1, 2))
+    def test_dist(self, mock):
+        dataset = DummyDataset([7, 3, 6])
+        sampler = ShardShuffleSampler(dataset, seed=0)
+        self.assertEqual(len(sampler), 8)
+        self.assertEqual(len(list(sampler)), 8)
@@ -10,6 +10,7 @@ import mmcv
 import numpy as np
 
 from mmdet.datasets.transforms import (FilterAnnotations, LoadAnnotations,
+                                       LoadAnnotationsPhocal,
                                        LoadEmptyAnnotations,
                                        LoadImageFromNDArray,
                                        LoadMultiChannelImageFromFiles,
@@ -125,6 +126,60 @@ class TestLoadAnnotations(unittest.TestCase):
                               'file_client_args=None)'))
 
 
+class TestLoadAnnotationsPhocal(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.results = {
+            'instances': [{
+                'bbox': [0, 0, 10, 20],
+                'bbox_label': i,
+                'ignore_flag': i % 2,
+                'rot': rng.normal(size=9).tolist(),
+                'pos': rng.normal(size=3).tolist(),
+                'bbox_3d_size': rng.random(3).tolist(),
+                'rot_norm': rng.normal(size=9).tolist(),
+                'scale_norm': float(rng.random())
+            } for i in range(3)]
+        }
+
+    def test_load_pose(self):
+        transform = LoadAnnotationsPhocal(
+            with_bbox=False, with_label=False, with_pose=True)
+        results = transform(copy.deepcopy(self.results))
+        instances = self.results['instances']
+        for key, field, shape in (('gt_pose_rots', 'rot', (3, 9)),
+                                  ('gt_pose_poses', 'pos', (3, 3)),
+                                  ('gt_pose_sizes', 'bbox_3d_size', (3, 3)),
+                                  ('gt_pose_rots_norm', 'rot_norm', (3, 9)),
+                                  ('gt_pose_scales_norm', 'scale_norm',
+                                   (3, ))):
+            self.assertEqual(results[key].dtype, np.float32)
+            self.assertEqual(results[key].shape, shape)
+            np.testing.assert_array_equal(
+                results[key],
+                np.array([inst[field] for inst in instances],
+                         dtype=np.float32))
+        self.assertEqual(results['gt_ignore_flags'].tolist(),
+                         [False, True, False])
+
+        # the columns of an annotation store give the same annotations
+        ann_arrays = {
+            key: np.array([inst[key] for inst in instances])
+            for key in instances[0]
+        }
+        store_results = transform(dict(ann_arrays=ann_arrays))
+        for key in results:
+            if key.startswith('gt_'):
+                np.testing.assert_array_equal(store_results[key],
+                                              results[key])
+
+        # no instance
+        results = transform(dict(instances=[]))
+        self.assertEqual(results['gt_pose_rots'].shape, (0, 9))
+        self.assertEqual(results['gt_pose_scales_norm'].shape, (0, ))
+
+
 class TestFilterAnnotations(unittest.TestCase):
 
     def setUp(self):
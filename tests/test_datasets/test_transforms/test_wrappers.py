@@ -1,10 +1,14 @@
 import copy
+import multiprocessing
 import os.path as osp
 import unittest
+from unittest.mock import patch
 
+import numpy as np
 from mmcv.transforms import Compose
 
-from mmdet.datasets.transforms import MultiBranch, RandomOrder
+from mmdet.datasets.transforms import (CachedPipeline, MultiBranch,
+                                       RandomOrder, SharedMemoryLRU)
 from mmdet.utils import register_all_modules
 from .utils import construct_toy_data
 
@@ -171,3 +175,99 @@ class TestRandomOrder(unittest.TestCase):
         self.assertEqual(
             repr(transform), ('RandomOrder(Sharpness, Contrast, '
                               'Brightness, Rotate, ShearX, TranslateY, )'))
+
+
+class _CountedLoad:
+
+    def __init__(self):
+        self.num_calls = 0
+
+    def __call__(self, results):
+        self.num_calls += 1
+        results['img'] = np.full((4, 6, 3), len(results['img_path']),
+                                 dtype=np.uint8)
+        results['img_shape'] = (4, 6)
+        return results
+
+
+def _scale_in_place(results):
+    results['gt_bboxes'] *= 2
+    results['scale_factor'] = (2., 2.)
+    return results
+
+
+def _load_in_child(pipeline, queue):
+    results = pipeline(dict(img_path='a.png'))
+    queue.put((results['img'].sum(), pipeline.transforms.transforms[0]
+               .num_calls))
+
+
+class TestCachedPipeline(unittest.TestCase):
+
+    def test_shared_memory_lru(self):
+        cache = SharedMemoryLRU(num_slots=2, slot_bytes=8)
+        self.assertTrue(cache.put('a', b'aa'))
+        self.assertTrue(cache.put('b', b'bbb'))
+        self.assertFalse(cache.put('c', b'c' * 9))
+        self.assertEqual(cache.get('a'), b'aa')
+        # evicts the least recently used value
+        cache.put('c', b'c')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), b'aa')
+        self.assertEqual(cache.get('c'), b'c')
+        cache.put('c', b'cc')
+        self.assertEqual(cache.get('c'), b'cc')
+        self.assertEqual(len(cache), 2)
+
+    def test_transform(self):
+        load = _CountedLoad()
+        pipeline = CachedPipeline(
+            transforms=[load], max_bytes=1 << 20, slot_bytes=1 << 10)
+        results = pipeline(dict(img_path='a.png', img_id=1))
+        self.assertEqual(load.num_calls, 1)
+        cached = pipeline(dict(img_path='a.png', img_id=1))
+        self.assertEqual(load.num_calls, 1)
+        np.testing.assert_array_equal(cached['img'], results['img'])
+        self.assertEqual(cached['img_shape'], (4, 6))
+        self.assertEqual(cached['img_id'], 1)
+        pipeline(dict(img_path='bb.png'))
+        self.assertEqual(load.num_calls, 2)
+
+        # the cache is shared with the forked processes
+        ctx = multiprocessing.get_context('fork')
+        queue = ctx.Queue()
+        process = ctx.Process(target=_load_in_child, args=(pipeline, queue))
+        process.start()
+        img_sum, num_calls = queue.get(timeout=30)
+        process.join()
+        self.assertEqual(img_sum, results['img'].sum())
+        # the child did not load the image again
+        self.assertEqual(num_calls, load.num_calls)
+
+    def test_transform_in_place(self):
+        pipeline = CachedPipeline(
+            transforms=[_scale_in_place],
+            max_bytes=1 << 20,
+            slot_bytes=1 << 10)
+        results = pipeline(
+            dict(img_path='a.png', gt_bboxes=np.ones((1, 4), np.float32)))
+        cached = pipeline(
+            dict(img_path='a.png', gt_bboxes=np.ones((1, 4), np.float32)))
+        # the inputs modified in place are restored from the cache
+        np.testing.assert_array_equal(cached['gt_bboxes'], [[2, 2, 2, 2]])
+        np.testing.assert_array_equal(cached['gt_bboxes'],
+                                      results['gt_bboxes'])
+        self.assertEqual(cached['scale_factor'], (2., 2.))
+
+    def test_init(self):
+        # the documented defaults fit in the memory of the host
+        pipeline = CachedPipeline(transforms=[dict(type='LoadImageFromFile')])
+        self.assertEqual(pipeline.cache.num_slots * pipeline.cache.slot_bytes,
+                         1 << 30)
+
+        with patch('mmdet.datasets.transforms.wrappers._available_memory',
+                   return_value=1 << 20):
+            with self.assertRaisesRegex(ValueError, 'available memory'):
+                CachedPipeline(transforms=[_CountedLoad()], max_bytes=2 << 20)
+        with self.assertRaisesRegex(ValueError, 'slot_bytes'):
+            CachedPipeline(transforms=[_CountedLoad()], max_bytes=1 << 10)
@@ -0,0 +1,86 @@
+import os.path as osp
+import tempfile
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from mmdet.evaluation.functional.depth_io import (DepthCache, backproject,
+                                                  backproject_batch,
+                                                  load_depth,
+                                                  load_depth_co3d)
+
+
+def _backproject(depth, intrinsics, instance_mask):
+    # reference implementation inverting the intrinsics on every call
+    intrinsics_inv = np.linalg.inv(intrinsics)
+    idxs = np.where(np.logical_and(instance_mask, depth > 0))
+    grid = np.array([idxs[1], idxs[0]])
+    uv_grid = np.concatenate((grid, np.ones([1, grid.shape[1]])), axis=0)
+    xyz = np.transpose(intrinsics_inv @ uv_grid)
+    z = depth[idxs[0], idxs[1]]
+    pts = xyz * z[:, np.newaxis] / xyz[:, -1:]
+    pts[:, 0] = -pts[:, 0]
+    pts[:, 1] = -pts[:, 1]
+    return pts, idxs
+
+
+class TestDepthIO(TestCase):
+
+    intrinsics = np.array([[591.0125, 0, 322.525], [0, 590.16775, 244.11084],
+                           [0, 0, 1]])
+
+    def test_load_depth(self):
+        rng = np.random.default_rng(0)
+        depth = rng.integers(0, 5000, (48, 64)).astype(np.uint16)
+        depth[0, :4] = 0
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            img_path = osp.join(tmp_dir, '0000')
+            cv2.imwrite(img_path + '_depth.png', depth)
+            np.testing.assert_array_equal(load_depth(img_path), depth)
+
+            # encoded in the G and R channels, 32001 is no depth
+            encoded = np.zeros((48, 64, 3), dtype=np.uint8)
+            encoded[..., 1], encoded[..., 2] = depth >> 8, depth & 255
+            encoded[0, 0, 1:] = (32001 >> 8, 32001 & 255)
+            cv2.imwrite(img_path + '_depth.png', encoded)
+            decoded = load_depth(img_path)
+            self.assertEqual(decoded.dtype, np.uint16)
+            np.testing.assert_array_equal(decoded, depth)
+
+            depth_cache = DepthCache(osp.join(tmp_dir, 'cache'))
+            np.testing.assert_array_equal(
+                load_depth(img_path, depth_cache), depth)
+            cached = load_depth(img_path, depth_cache)
+            self.assertIsInstance(cached, np.memmap)
+            np.testing.assert_array_equal(cached, depth)
+
+    def test_load_depth_co3d(self):
+        depth = np.array([[0.5, 1.25], [np.inf, 3.0]], dtype=np.float16)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = osp.join(tmp_dir, 'frame.jpg.geometric.png')
+            cv2.imwrite(path, depth.view(np.uint16))
+            np.testing.assert_array_equal(
+                load_depth_co3d(path, 2.0), [[1.0, 2.5], [0.0, 6.0]])
+            with self.assertRaises(ValueError):
+                load_depth_co3d(osp.join(tmp_dir, 'frame.png'), 1.0)
+
+    def test_backproject(self):
+        rng = np.random.default_rng(0)
+        depth = rng.integers(0, 3, (48, 64)).astype(np.uint16) * 500
+        masks = rng.random((3, 48, 64)) < 0.3
+        masks[2] = False
+        results = backproject_batch(depth, self.intrinsics, masks)
+        self.assertEqual(len(results), 3)
+        for mask, (pts, idxs) in zip(masks, results):
+            expected_pts, expected_idxs = _backproject(depth, self.intrinsics,
+                                                       mask)
+            single_pts, single_idxs = backproject(depth, self.intrinsics,
+                                                  mask)
+            np.testing.assert_allclose(pts, expected_pts)
+            np.testing.assert_allclose(single_pts, expected_pts)
+            for i in range(2):
+                np.testing.assert_array_equal(idxs[i], expected_idxs[i])
+                np.testing.assert_array_equal(single_idxs[i],
+                                              expected_idxs[i])
+        self.assertEqual(results[2][0].shape, (0, 3))
@@ -0,0 +1,60 @@
+from unittest import TestCase
+
+import numpy as np
+import torch
+
+from mmdet.evaluation.functional.box import Box
+from mmdet.evaluation.functional.iou import IoU, box3d_overlap_batch
+from .utils import random_rotation
+
+_SIGNS = np.array([[-1, -1, -1], [1, -1, -1], [1, 1, -1], [-1, 1, -1],
+                   [-1, -1, 1], [1, -1, 1], [1, 1, 1], [-1, 1, 1]])
+
+
+def _corners(rotation, translation, scale):
+    return (_SIGNS * np.asarray(scale) / 2) @ rotation.T + translation
+
+
+class TestBox3dOverlap(TestCase):
+
+    def test_box3d_overlap_batch(self):
+        rng = np.random.default_rng(0)
+        boxes = [[], []]
+        for k, num in enumerate((6, 5)):
+            for _ in range(num):
+                boxes[k].append((random_rotation(rng),
+                                 rng.normal(0, 0.3, size=3),
+                                 rng.uniform(0.3, 1, size=3)))
+        # an identical pair
+        boxes[1][0] = boxes[0][0]
+        corners_1, corners_2 = [
+            torch.from_numpy(np.stack([_corners(*b) for b in bs]))
+            for bs in boxes
+        ]
+
+        ious = box3d_overlap_batch(corners_1, corners_2)
+        self.assertEqual(ious.shape, (6, 5))
+        for i, box_1 in enumerate(boxes[0]):
+            for j, box_2 in enumerate(boxes[1]):
+                expected = IoU(
+                    Box.from_transformation(*box_1),
+                    Box.from_transformation(*box_2)).iou()
+                self.assertAlmostEqual(ious[i, j].item(), expected)
+        self.assertAlmostEqual(ious[0, 0].item(), 1)
+
+    def test_box3d_overlap_batch_axis_aligned(self):
+        eye = np.eye(3)
+        unit = torch.from_numpy(_corners(eye, np.zeros(3), np.ones(3)))[None]
+        others = torch.from_numpy(
+            np.stack([
+                _corners(eye, [0, 0, 0], [0.5, 0.5, 0.5]),  # inside
+                _corners(eye, [2, 0, 0], [1, 1, 1]),  # apart
+                _corners(eye, [1, 0, 0], [1, 1, 1]),  # touching
+                _corners(eye, [0.5, 0, 0], [1, 1, 1]),  # shared faces
+                _corners(eye[[1, 0, 2]], [0, 0, 0], [1, 1, 1]),  # same box
+            ]))
+        ious = box3d_overlap_batch(unit, others)
+        np.testing.assert_allclose(ious[0], [0.125, 0, 0, 1 / 3, 1])
+
+        self.assertEqual(
+            box3d_overlap_batch(unit, others[:0]).shape, (1, 0))
@@ -0,0 +1,77 @@
+import os
+import os.path as osp
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from mmdet.evaluation.functional import mesh_io
+from mmdet.evaluation.functional.mesh_io import (get_mesh_cache_file,
+                                                 load_mesh, load_obj,
+                                                 parse_obj,
+                                                 sample_points_from_mesh)
+
+OBJ = """# a unit square
+mtllib square.mtl
+v 0.0 0.0 0.0
+v 1.0 0.0 0.0
+v 1.0 1.0 0.0
+v 0.0  1.0 0.0
+vn 0.0 0.0 1.0
+vt 0.0 0.0
+f 1/1/1 2/1/1 3/1/1
+f 1//1 3//1 4//1
+"""
+
+
+class TestMeshIO(TestCase):
+
+    def test_parse_obj(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = osp.join(tmp_dir, 'square.obj')
+            with open(path, 'w') as f:
+                f.write(OBJ)
+            vertices, faces = parse_obj(path)
+            np.testing.assert_array_equal(
+                vertices, [[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0]])
+            np.testing.assert_array_equal(faces, [[0, 1, 2], [0, 2, 3]])
+
+            with open(path, 'w') as f:
+                f.write('v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3\n')
+            vertices, faces = parse_obj(path)
+            self.assertEqual(vertices.shape, (3, 3))
+            np.testing.assert_array_equal(faces, [[0, 1, 2]])
+
+    def test_load_mesh(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = osp.join(tmp_dir, 'square.obj')
+            with open(path, 'w') as f:
+                f.write(OBJ)
+            mesh = load_mesh(path)
+            np.testing.assert_allclose(mesh.face_areas, [0.5, 0.5])
+            self.assertFalse(mesh.vertices.flags.writeable)
+            self.assertTrue(osp.exists(get_mesh_cache_file(path)))
+            # memoized
+            self.assertIs(load_mesh(path), mesh)
+            vertices, faces = load_obj(path)
+            self.assertIs(vertices, mesh.vertices)
+
+            # read back from the sidecar by a new process
+            mesh_io._load_mesh.cache_clear()
+            cached = load_mesh(path)
+            self.assertIsNot(cached, mesh)
+            np.testing.assert_array_equal(cached.faces, mesh.faces)
+
+            # outdated once the obj file changes
+            with open(path, 'a') as f:
+                f.write('v 2.0 2.0 0.0\nf 1 3 5\n')
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+            mesh = load_mesh(path)
+            self.assertEqual(mesh.faces.shape, (3, 3))
+            mesh_io._load_mesh.cache_clear()
+            self.assertEqual(load_mesh(path).faces.shape, (3, 3))
+
+            points = sample_points_from_mesh(path, 50, with_normal=True)
+            self.assertEqual(points.shape, (50, 6))
+            np.testing.assert_allclose(points[:, 2], 0)
@@ -0,0 +1,143 @@
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from mmdet.evaluation.functional.nocs_utils import (compute_3d_IoU,
+                                                    compute_3d_IoU_batch,
+                                                    compute_mAP_nocs,
+                                                    compute_RT_errors,
+                                                    compute_RT_errors_batch,
+                                                    compute_RT_matches,
+                                                    get_symmetry_flags)
+from .utils import random_sRTs
+
+
+def _random_pred_results(num_imgs, rng):
+    pred_results = []
+    for _ in range(num_imgs):
+        num_gt, num_pred = rng.integers(0, 5), rng.integers(0, 8)
+        pred_results.append(
+            dict(
+                gt_class_ids=rng.integers(0, 6, num_gt),
+                gt_RTs=random_sRTs(num_gt, rng),
+                gt_scales=rng.uniform(0.5, 1.5, size=(num_gt, 3)),
+                gt_handle_visibility=rng.integers(0, 2, num_gt),
+                pred_class_ids=rng.integers(0, 6, num_pred),
+                pred_RTs=random_sRTs(num_pred, rng),
+                pred_scales=rng.uniform(0.5, 1.5, size=(num_pred, 3)),
+                pred_scores=rng.random(num_pred)))
+    # images without annotations are stored as empty dicts
+    pred_results.append(dict())
+    return pred_results
+
+
+class TestNOCSUtils(TestCase):
+
+    synset_names = ['BG', 'bottle', 'bowl', 'camera', 'can', 'laptop', 'mug']
+
+    def test_get_symmetry_flags(self):
+        flags = get_symmetry_flags([1, 2, 3, 4, 5, 6, 6],
+                                   [1, 1, 1, 1, 1, 1, 0], self.synset_names)
+        self.assertEqual(flags.tolist(),
+                         [True, True, False, True, False, False, True])
+
+    def test_compute_3d_IoU_batch(self):
+        rng = np.random.default_rng(0)
+        pred_sRT, gt_sRT = random_sRTs(5, rng), random_sRTs(4, rng)
+        gt_sRT[:2] = pred_sRT[:2]
+        pred_size = rng.uniform(0.5, 1.5, size=(5, 3))
+        gt_size = rng.uniform(0.5, 1.5, size=(4, 3))
+        pred_ids = np.array([1, 6, 3, 6, 1])
+        gt_ids = np.array([1, 6, 6, 3])
+        gt_handle_visibility = np.array([1, 0, 1, 1])
+
+        gt_symmetric = get_symmetry_flags(gt_ids, gt_handle_visibility,
+                                          self.synset_names)
+        symmetric = (pred_ids[:, None] == gt_ids[None]) & gt_symmetric[None]
+        overlaps = compute_3d_IoU_batch(pred_sRT, gt_sRT, pred_size, gt_size,
+                                        symmetric)
+        self.assertEqual(overlaps.shape, (5, 4))
+        for i in range(5):
+            for j in range(4):
+                expected = compute_3d_IoU(
+                    pred_sRT[i], gt_sRT[j], pred_size[i], gt_size[j],
+                    self.synset_names[pred_ids[i]],
+                    self.synset_names[gt_ids[j]], gt_handle_visibility[j])
+                self.assertAlmostEqual(overlaps[i, j], expected)
+
+        # empty inputs
+        self.assertEqual(
+            compute_3d_IoU_batch(pred_sRT, np.zeros((0, 4, 4)), pred_size,
+                                 np.zeros((0, 3)), False).shape, (5, 0))
+
+    def test_compute_RT_errors_batch(self):
+        rng = np.random.default_rng(0)
+        pred_sRT, gt_sRT = random_sRTs(6, rng), random_sRTs(3, rng)
+        gt_ids = np.array([1, 3, 6])
+        gt_handle_visibility = np.array([1, 1, 0])
+        gt_symmetric = get_symmetry_flags(gt_ids, gt_handle_visibility,
+                                          self.synset_names)
+
+        errors = compute_RT_errors_batch(pred_sRT, gt_sRT, gt_symmetric)
+        self.assertEqual(errors.shape, (6, 3, 2))
+        for i in range(6):
+            for j in range(3):
+                expected = compute_RT_errors(pred_sRT[i], gt_sRT[j],
+                                             gt_ids[j],
+                                             gt_handle_visibility[j],
+                                             self.synset_names)
+                np.testing.assert_allclose(errors[i, j], expected,
+                                           atol=1e-6)
+
+        self.assertEqual(
+            compute_RT_errors_batch(np.zeros((0, 4, 4)), gt_sRT,
+                                    gt_symmetric).shape, (0, 3, 2))
+
+        # not an affine transformation
+        pred_sRT[2, 3] = [0, 0, 1, 1]
+        with self.assertRaisesRegex(ValueError, r'\[0, 0, 0, 1\]'):
+            compute_RT_errors_batch(pred_sRT, gt_sRT, gt_symmetric)
+        with self.assertRaisesRegex(ValueError, r'\[0, 0, 0, 1\]'):
+            compute_RT_errors(pred_sRT[2], gt_sRT[0], gt_ids[0],
+                              gt_handle_visibility[0], self.synset_names)
+
+    def test_compute_RT_matches(self):
+        # [num_pred, num_gt, (degree, cm)]
+        overlaps = np.array([[[3., 1.], [20., 8.], [1., 1.]],
+                             [[4., 1.], [8., 3.], [50., 50.]]])
+        pred_class_ids = np.array([1, 1])
+        gt_class_ids = np.array([1, 1, 2])
+        gt_matches, pred_matches = compute_RT_matches(
+            overlaps, pred_class_ids, gt_class_ids, [5, 10, 360], [2, 5, 100])
+        self.assertEqual(gt_matches.shape, (3, 3, 3))
+        self.assertEqual(pred_matches.shape, (3, 3, 2))
+        # the third gt has another class and is never matched
+        self.assertTrue((gt_matches[..., 2] == -1).all())
+        # the first prediction always takes the first gt
+        self.assertTrue((pred_matches[..., 0] == 0).all())
+        # the second prediction needs 10 degree and 5 cm for the second gt
+        expected = -np.ones((3, 3))
+        expected[1:, 1:] = 1
+        np.testing.assert_array_equal(pred_matches[..., 1], expected)
+        np.testing.assert_array_equal(gt_matches[..., 1], expected)
+
+        gt_matches, pred_matches = compute_RT_matches(
+            np.zeros((0, 3, 2)), np.zeros(0), gt_class_ids, [5], [2])
+        self.assertTrue((gt_matches == -1).all())
+        self.assertEqual(pred_matches.shape, (1, 1, 0))
+
+    def test_compute_mAP_nocs_num_workers(self):
+        rng = np.random.default_rng(0)
+        pred_results = _random_pred_results(8, rng)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            kwargs = dict(
+                out_dir=tmp_dir,
+                degree_thresholds=[5, 10],
+                shift_thresholds=[2, 5],
+                iou_3d_thresholds=[0.1, 0.25, 0.5],
+                use_matches_for_pose=True)
+            single = compute_mAP_nocs(pred_results, **kwargs)
+            parallel = compute_mAP_nocs(pred_results, num_workers=2, **kwargs)
+        for x, y in zip(single, parallel):
+            np.testing.assert_array_equal(x, y)
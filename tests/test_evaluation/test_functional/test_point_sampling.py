@@ -0,0 +1,87 @@
+from unittest import TestCase
+
+import numpy as np
+import torch
+
+from mmdet.evaluation.functional.point_sampling import (
+    farthest_point_sampling, farthest_point_sampling_batch, pairwise_distance,
+    sample_farthest_points, sample_points_from_meshes, uniform_sample)
+
+
+def _farthest_point_sampling(points, n_samples):
+    # reference implementation on the full distance matrix
+    selected_pts = np.zeros((n_samples, ), dtype=int)
+    dist_mat = pairwise_distance(points, points)
+    pt_idx = 0
+    dist_to_set = dist_mat[:, pt_idx]
+    for i in range(n_samples):
+        selected_pts[i] = pt_idx
+        dist_to_set = np.minimum(dist_to_set, dist_mat[:, pt_idx])
+        pt_idx = np.argmax(dist_to_set)
+    return selected_pts
+
+
+def _box_mesh():
+    # the unit cube, 12 triangles facing outwards
+    vertices = np.array([[x, y, z] for x in (0, 1) for y in (0, 1)
+                         for z in (0, 1)], dtype=float)
+    faces = np.array([[0, 1, 3], [0, 3, 2], [4, 6, 7], [4, 7, 5], [0, 4, 5],
+                      [0, 5, 1], [2, 3, 7], [2, 7, 6], [0, 2, 6], [0, 6, 4],
+                      [1, 5, 7], [1, 7, 3]])
+    return vertices, faces
+
+
+class TestPointSampling(TestCase):
+
+    def test_uniform_sample(self):
+        vertices, faces = _box_mesh()
+        points = uniform_sample(
+            vertices, faces, 6000, with_normal=True,
+            rng=np.random.default_rng(0))
+        self.assertEqual(points.shape, (6000, 6))
+        xyz, normals = points[:, :3], points[:, 3:]
+        # on the surface of the cube
+        self.assertTrue(np.all((xyz > -1e-6) & (xyz < 1 + 1e-6)))
+        on_face = np.isclose(xyz, 0) | np.isclose(xyz, 1)
+        self.assertTrue(np.all(on_face.any(axis=1)))
+        np.testing.assert_allclose(np.linalg.norm(normals, axis=1), 1)
+        # evenly spread over the faces of the same area
+        counts = np.bincount(np.abs(normals).argmax(axis=1), minlength=3)
+        self.assertTrue(np.all(np.abs(counts - 2000) < 200))
+
+        # reproducible with a generator, also across threads
+        meshes = [_box_mesh()] * 3
+        np.random.seed(0)
+        points = sample_points_from_meshes(meshes, 100, num_workers=1)
+        np.random.seed(0)
+        threaded = sample_points_from_meshes(meshes, 100, num_workers=3)
+        for p, t in zip(points, threaded):
+            np.testing.assert_array_equal(p, t)
+        self.assertFalse(np.array_equal(points[0], points[1]))
+
+    def test_farthest_point_sampling(self):
+        rng = np.random.default_rng(0)
+        points_list = [rng.normal(size=(n, 3)) for n in (30, 200, 500)]
+        for points, inds in zip(
+                points_list,
+                farthest_point_sampling_batch(
+                    points_list, 20, num_workers=2)):
+            expected = _farthest_point_sampling(points, 20)
+            np.testing.assert_array_equal(
+                farthest_point_sampling(points, 20), expected)
+            np.testing.assert_array_equal(inds, expected)
+
+    def test_sample_farthest_points(self):
+        points = torch.rand(2, 3, 200, dtype=torch.float64)
+        sampled, indexes = sample_farthest_points(
+            points, 16, return_index=True)
+        self.assertEqual(sampled.shape, (2, 3, 16))
+        for b in range(2):
+            np.testing.assert_array_equal(
+                sampled[b].numpy(), points[b, :, indexes[b]].numpy())
+            # the same as the numpy version from the same start point
+            xyz = points[b].T.numpy()
+            start = int(indexes[b, 0])
+            order = np.r_[start, np.delete(np.arange(200), start)]
+            expected = order[_farthest_point_sampling(xyz[order], 16)]
+            np.testing.assert_array_equal(indexes[b].numpy(), expected)
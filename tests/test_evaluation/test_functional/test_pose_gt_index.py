@@ -0,0 +1,92 @@
+import os.path as osp
+import tempfile
+from unittest import TestCase
+
+import mmengine
+import numpy as np
+
+from mmdet.datasets.api_wrappers import COCO
+from mmdet.evaluation.functional.pose_gt_index import (PoseGTIndex,
+                                                       get_pose_gt_index_file)
+
+
+def _ann(ann_id, img_id, category_id, position, **kwargs):
+    ann = dict(
+        id=ann_id,
+        image_id=img_id,
+        category_id=category_id,
+        bbox=[10.5, 20, 30, 40],
+        area=1200,
+        iscrowd=0,
+        relative_pose=dict(
+            rotation=np.eye(3).reshape(-1).tolist(), position=position),
+        bbox_3d_size=[0.1, 0.2, 0.3])
+    ann.update(kwargs)
+    return ann
+
+
+def _create_ann_file(ann_file):
+    anns = [
+        _ann(1, 1, 1, [0, 0, 1]),
+        _ann(2, 1, 6, [0, 1, 1], handle_visibility=0),
+        _ann(3, 2, 2, [1, 0, 1], iscrowd=1),
+        _ann(4, 3, 3, [1, 1, 1], ignore=True),
+    ]
+    images = [
+        dict(id=i, file_name=f'{i}.png', width=640, height=480)
+        for i in range(1, 5)
+    ]
+    categories = [dict(id=i, name=str(i)) for i in range(1, 7)]
+    mmengine.dump(
+        dict(images=images, annotations=anns, categories=categories),
+        ann_file)
+
+
+class TestPoseGTIndex(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.ann_file = osp.join(self.tmp_dir.name, 'val.json')
+        _create_ann_file(self.ann_file)
+        self.coco = COCO(self.ann_file)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_get(self):
+        index = PoseGTIndex.from_coco(self.coco)
+        self.assertEqual(len(index), 4)
+
+        gt = index.get(1)
+        np.testing.assert_array_equal(gt['gt_class_ids'], [1, 6])
+        np.testing.assert_array_equal(gt['gt_handle_visibility'], [1, 0])
+        np.testing.assert_array_equal(gt['gt_bboxes'][0], [10, 20, 40, 60])
+        self.assertEqual(gt['gt_RTs'].shape, (2, 4, 4))
+        np.testing.assert_array_equal(gt['gt_RTs'][1, :, 3], [0, 1, 1, 1])
+        self.assertEqual(gt['gt_scales'].shape, (2, 3))
+        self.assertTrue(index.iscrowd[index.slice(2)].all())
+
+        # annotated, but all the annotations are ignored
+        self.assertEqual(len(index.get(3)['gt_class_ids']), 0)
+        # no annotation or unknown image
+        self.assertIsNone(index.get(4))
+        self.assertIsNone(index.get(5))
+
+    def test_cache(self):
+        cache_file = get_pose_gt_index_file(self.ann_file)
+        index = PoseGTIndex.from_ann_file(self.coco, self.ann_file)
+        self.assertFalse(osp.exists(cache_file))
+
+        index = PoseGTIndex.from_ann_file(
+            self.coco, self.ann_file, cache=True)
+        self.assertTrue(osp.exists(cache_file))
+        cached = PoseGTIndex.load(cache_file, self.ann_file)
+        np.testing.assert_array_equal(cached.offsets, index.offsets)
+        for key in PoseGTIndex.columns:
+            np.testing.assert_array_equal(
+                getattr(cached, key), getattr(index, key))
+
+        # a changed annotation file invalidates the cache
+        with open(self.ann_file, 'a') as f:
+            f.write(' ')
+        self.assertIsNone(PoseGTIndex.load(cache_file, self.ann_file))
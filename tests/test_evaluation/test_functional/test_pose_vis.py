@@ -0,0 +1,96 @@
+import os.path as osp
+import tempfile
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from mmdet.evaluation.functional.nocs_utils import (align_rotation,
+                                                    calculate_2d_projections,
+                                                    get_3d_bbox,
+                                                    transform_coordinates_3d)
+from mmdet.evaluation.functional.pose_vis import (ImageWriter,
+                                                  align_rotation_batch,
+                                                  draw_detections,
+                                                  project_3d_bboxes)
+from .utils import random_sRTs
+
+
+def _draw_bboxes(img, img_pts, color):
+    # reference drawing, one cv2.line per edge
+    color_ground = tuple(int(c * 0.3) for c in color)
+    color_pillar = tuple(int(c * 0.6) for c in color)
+    edges = (([4, 5, 6, 7], [5, 7, 4, 6], color_ground),
+             (range(4), range(4, 8), color_pillar),
+             ([0, 1, 2, 3], [1, 3, 0, 2], color))
+    for starts, ends, edge_color in edges:
+        for i, j in zip(starts, ends):
+            img = cv2.line(img, tuple(img_pts[i]), tuple(img_pts[j]),
+                           edge_color, 2)
+    return img
+
+
+class TestPoseVis(TestCase):
+
+    intrinsics = np.array([[591.0125, 0, 322.525], [0, 590.16775, 244.11084],
+                           [0, 0, 1]])
+
+    def test_project_3d_bboxes(self):
+        rng = np.random.default_rng(0)
+        sRT = random_sRTs(6, rng, offset=(0, 0, 1.5))
+        size = rng.uniform(0.5, 1.5, size=(6, 3))
+        symmetric = np.array([True, False] * 3)
+        aligned = align_rotation_batch(sRT)
+        projected = project_3d_bboxes(sRT, size, self.intrinsics, symmetric)
+        self.assertEqual(projected.shape, (6, 8, 2))
+        for i in range(6):
+            np.testing.assert_allclose(aligned[i], align_rotation(sRT[i]))
+            bbox_3d = transform_coordinates_3d(
+                get_3d_bbox(size[i], 0),
+                align_rotation(sRT[i]) if symmetric[i] else sRT[i])
+            np.testing.assert_array_equal(
+                projected[i],
+                calculate_2d_projections(bbox_3d, self.intrinsics))
+
+    def test_draw_detections(self):
+        rng = np.random.default_rng(0)
+        img = rng.integers(0, 255, (480, 640, 3), dtype=np.uint8)
+        args = []
+        for num in (3, 2, 0):
+            args += [
+                random_sRTs(num, rng, offset=(0, 0, 1.5)),
+                rng.uniform(0.2, 0.5, size=(num, 3)),
+                rng.integers(1, 7, num)
+            ]
+        expected = img.copy()
+        groups = zip((args[6:9], args[3:6], args[:3]),
+                     ((255, 0, 0), (0, 255, 0), (0, 0, 255)))
+        for (sRT, size, class_ids), color in groups:
+            for i in range(len(sRT)):
+                if class_ids[i] in [1, 2, 4]:
+                    bbox_sRT = align_rotation(sRT[i])
+                else:
+                    bbox_sRT = sRT[i]
+                bbox_3d = transform_coordinates_3d(
+                    get_3d_bbox(size[i], 0), bbox_sRT)
+                expected = _draw_bboxes(
+                    expected,
+                    calculate_2d_projections(bbox_3d, self.intrinsics),
+                    color)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            draw_detections(img.copy(), tmp_dir, 'real_test', 0,
+                            self.intrinsics, *args)
+            with ImageWriter(num_workers=2) as writer:
+                draw_detections(
+                    img.copy(),
+                    tmp_dir,
+                    'real_test',
+                    1,
+                    self.intrinsics,
+                    *args,
+                    writer=writer)
+            for img_id in range(2):
+                out = cv2.imread(
+                    osp.join(tmp_dir, f'real_test_{img_id}_pred.png'))
+                np.testing.assert_array_equal(out, expected)
@@ -0,0 +1,18 @@
+import numpy as np
+
+
+def random_rotation(rng):
+    q, _ = np.linalg.qr(rng.normal(size=(3, 3)))
+    if np.linalg.det(q) < 0:
+        q[:, 0] = -q[:, 0]
+    return q
+
+
+def random_sRTs(num, rng, offset=(0, 0, 0)):
+    """Random similarity transforms, [num, 4, 4], scales in [0.2, 0.5] and
+    translations within 0.2 of ``offset``."""
+    sRTs = np.tile(np.eye(4), (num, 1, 1))
+    for i in range(num):
+        sRTs[i, :3, :3] = random_rotation(rng) * rng.uniform(0.2, 0.5)
+        sRTs[i, :3, 3] = rng.uniform(-0.2, 0.2, size=3) + offset
+    return sRTs
@@ -0,0 +1,118 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import os
+import os.path as osp
+import pickle
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+import mmengine
+import numpy as np
+import torch
+
+from mmdet.evaluation.metrics import coco_metric_nocs
+from mmdet.evaluation.metrics.coco_metric_nocs import CocoMetricNOCS
+
+CLASSES = ('bottle', 'bowl', 'camera', 'can', 'laptop', 'mug')
+
+
+def _create_ann_file(ann_file):
+    rng = np.random.default_rng(0)
+    images, anns = [], []
+    for img_id in range(1, 5):
+        images.append(
+            dict(id=img_id, file_name=f'{img_id}.png', width=64, height=48))
+        # the last image has no annotation
+        for _ in range(img_id % 4):
+            anns.append(
+                dict(
+                    id=len(anns) + 1,
+                    image_id=img_id,
+                    category_id=int(rng.integers(len(CLASSES))),
+                    bbox=[10, 10, 20, 20],
+                    area=400,
+                    iscrowd=0,
+                    relative_pose=dict(
+                        rotation=np.eye(3).reshape(-1).tolist(),
+                        position=(rng.normal(scale=0.3, size=3) +
+                                  [0, 0, 1]).tolist()),
+                    bbox_3d_size=rng.uniform(0.1, 0.3, 3).tolist()))
+    categories = [dict(id=i, name=name) for i, name in enumerate(CLASSES)]
+    mmengine.dump(
+        dict(images=images, annotations=anns, categories=categories), ann_file)
+    return anns
+
+
+def _create_data_samples(anns):
+    """Noisy predictions of every gt, a false positive and a low scored
+    prediction per image, in the reverse order of the image ids."""
+    rng = np.random.default_rng(1)
+    data_samples = []
+    for img_id in range(4, 0, -1):
+        img_anns = [ann for ann in anns if ann['image_id'] == img_id]
+        labels = [ann['category_id'] for ann in img_anns] + [0, 1]
+        poses = [ann['relative_pose']['position'] for ann in img_anns]
+        poses = np.array(poses + [[0, 0, 1], [0.1, 0, 1]]).reshape(-1, 3)
+        poses = poses + rng.normal(scale=0.01, size=poses.shape)
+        sizes = [ann['bbox_3d_size'] for ann in img_anns]
+        sizes = np.array(sizes + [[0.2] * 3] * 2).reshape(-1, 3)
+        scores = rng.uniform(0.4, 1, len(labels))
+        scores[-1] = 0.1
+        data_samples.append(
+            dict(
+                img_id=img_id,
+                ori_shape=(48, 64),
+                pred_instances=dict(
+                    bboxes=torch.tensor([[10., 10., 30., 30.]] * len(labels)),
+                    scores=torch.tensor(scores, dtype=torch.float32),
+                    labels=torch.tensor(labels),
+                    rots=torch.eye(3).repeat(len(labels), 1, 1),
+                    poses=torch.tensor(poses, dtype=torch.float32),
+                    sizes=torch.tensor(sizes, dtype=torch.float32))))
+    return data_samples
+
+
+class TestCocoMetricNOCS(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.ann_file = osp.join(self.tmp_dir.name, 'val.json')
+        self.anns = _create_ann_file(self.ann_file)
+        # the pose results are written to pred_results/ under the cwd
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp_dir.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp_dir.cleanup()
+
+    def _evaluate(self, online_pose_eval):
+        metric = CocoMetricNOCS(
+            ann_file=self.ann_file,
+            metric='pose',
+            outfile_prefix=osp.join(self.tmp_dir.name, 'results'),
+            online_pose_eval=online_pose_eval)
+        metric.dataset_meta = dict(classes=CLASSES)
+        data_samples = _create_data_samples(self.anns)
+        # two batches
+        metric.process({}, data_samples[:2])
+        metric.process({}, data_samples[2:])
+        with patch.object(
+                coco_metric_nocs,
+                'evaluate_nocs',
+                wraps=coco_metric_nocs.evaluate_nocs) as evaluate_nocs:
+            metric.evaluate(size=len(data_samples))
+        result_dir = evaluate_nocs.call_args[0][1]
+        with open(osp.join(result_dir, 'mAP_Acc.pkl'), 'rb') as f:
+            return pickle.load(f)
+
+    def test_online_pose_eval(self):
+        offline = self._evaluate(online_pose_eval=False)
+        online = self._evaluate(online_pose_eval=True)
+        self.assertEqual(offline.keys(), online.keys())
+        for key in ('iou_aps', 'pose_aps', 'iou_acc', 'pose_acc'):
+            np.testing.assert_allclose(online[key], offline[key])
+        # every gt has a close prediction, the images are paired by img_id
+        iou_25 = offline['iou_thres_list'].index(0.25)
+        for cat_id in {ann['category_id'] for ann in self.anns}:
+            self.assertAlmostEqual(offline['iou_aps'][cat_id + 1, iou_25], 1)
@@ -0,0 +1,83 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import torch
+
+from mmdet.models.backbones import ImageEncoderViT
+from mmdet.models.backbones.vit_det import get_abs_pos
+
+
+def _clear_caches(model):
+    model._pos_embed_cache.clear()
+    for blk in model.blocks:
+        blk.attn._rel_pos_cache.clear()
+
+
+def test_image_encoder_vit_pos_cache():
+    model = ImageEncoderViT(
+        img_size=64,
+        patch_size=16,
+        embed_dim=32,
+        depth=2,
+        num_heads=2,
+        out_chans=16,
+        use_rel_pos=True,
+        window_size=2,
+        global_attn_indexes=(1, ))
+    for param in (model.pos_embed, model.blocks[1].attn.rel_pos_h,
+                  model.blocks[1].attn.rel_pos_w):
+        torch.nn.init.normal_(param)
+    model.eval()
+    # a non-square input needs resized embeddings
+    x = torch.rand(1, 3, 64, 48)
+
+    with torch.no_grad():
+        out = model(x)
+        assert len(model._pos_embed_cache._cache) == 1
+        assert torch.equal(model(x), out)
+        pos_embed = model._pos_embed_cache._cache[(4, 3)][1]
+        assert torch.equal(pos_embed, get_abs_pos(model.pos_embed, (4, 3)))
+
+        # in place updates of the parameters invalidate the caches
+        model.pos_embed.add_(1)
+        model.blocks[1].attn.rel_pos_h.mul_(2)
+        out = model(x)
+        _clear_caches(model)
+        assert torch.allclose(model(x), out)
+
+    # nothing is cached while the embeddings are trained
+    _clear_caches(model)
+    model(x).sum().backward()
+    assert len(model._pos_embed_cache._cache) == 0
+    assert model.pos_embed.grad is not None
+    assert model.blocks[1].attn.rel_pos_h.grad is not None
+
+
+def test_image_encoder_vit_sdpa():
+    kwargs = dict(
+        img_size=64,
+        patch_size=8,
+        embed_dim=32,
+        depth=2,
+        num_heads=2,
+        out_chans=16,
+        use_rel_pos=True,
+        window_size=4,
+        global_attn_indexes=(1, ))
+    model = ImageEncoderViT(**kwargs)
+    sdpa_model = ImageEncoderViT(use_sdpa=True, **kwargs)
+    for param in (model.pos_embed, model.blocks[1].attn.rel_pos_h,
+                  model.blocks[1].attn.rel_pos_w):
+        torch.nn.init.normal_(param)
+    sdpa_model.load_state_dict(model.state_dict())
+    # several chunks of queries in the global attention block
+    sdpa_model.blocks[1].attn.sdpa_chunk_size = 16
+
+    x = torch.rand(2, 3, 64, 48)
+    out = model(x)
+    sdpa_out = sdpa_model(x)
+    assert torch.allclose(sdpa_out, out, atol=1e-5)
+
+    out.sum().backward()
+    sdpa_out.sum().backward()
+    rel_pos_h = model.blocks[1].attn.rel_pos_h
+    sdpa_rel_pos_h = sdpa_model.blocks[1].attn.rel_pos_h
+    assert torch.allclose(sdpa_rel_pos_h.grad, rel_pos_h.grad, atol=1e-4)
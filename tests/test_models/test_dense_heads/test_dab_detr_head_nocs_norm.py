@@ -0,0 +1,82 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+from unittest import TestCase
+
+import torch
+from mmengine import Config
+from mmengine.structures import InstanceData
+
+from mmdet import *  # noqa
+from mmdet.models.dense_heads import DABDETRHeadNOCSNorm
+
+
+def _gt_instances(num_gts, img_shape):
+    img_h, img_w = img_shape
+    xy = torch.rand(num_gts, 2) * torch.tensor([img_w, img_h]) / 2
+    wh = torch.rand(num_gts, 2) * torch.tensor([img_w, img_h]) / 2 + 1
+    return InstanceData(
+        bboxes=torch.cat([xy, xy + wh], dim=1),
+        labels=torch.randint(0, 6, (num_gts, )),
+        rots_norm=torch.randn(num_gts, 9),
+        poses=torch.randn(num_gts, 3),
+        sizes=torch.rand(num_gts, 3),
+        scales_norm=torch.rand(num_gts))
+
+
+class TestDABDETRHeadNOCSNorm(TestCase):
+
+    def test_get_targets_all_layers(self):
+        """Tests that assigning all decoder layers at once gives the targets
+        of get_targets layer by layer, with and without ground truth."""
+        torch.manual_seed(0)
+        num_layers, num_queries = 3, 10
+        img_metas = [dict(img_shape=(48, 64)), dict(img_shape=(40, 40))] * 2
+        train_cfg = Config(
+            dict(
+                assigner=dict(
+                    type='HungarianAssigner',
+                    match_costs=[
+                        dict(type='FocalLossCost', weight=2., eps=1e-8),
+                        dict(type='BBoxL1Cost', weight=5.0, box_format='xywh'),
+                        dict(type='IoUCost', iou_mode='giou', weight=2.0)
+                    ])))
+        head = DABDETRHeadNOCSNorm(
+            num_classes=6,
+            embed_dims=32,
+            loss_cls=dict(
+                type='FocalLoss',
+                use_sigmoid=True,
+                gamma=2.0,
+                alpha=0.25,
+                loss_weight=1.0),
+            train_cfg=train_cfg)
+        # the second image has no ground truth
+        batch_gt_instances = [
+            _gt_instances(num_gts, meta['img_shape'])
+            for num_gts, meta in zip([3, 0, 1, 5], img_metas)
+        ]
+        num_imgs = len(img_metas)
+        shape = (num_layers, num_imgs, num_queries)
+        all_layers_preds = (torch.randn(*shape, 6), torch.rand(*shape, 4),
+                            torch.randn(*shape, 9), torch.randn(*shape, 3),
+                            torch.rand(*shape, 3), torch.rand(*shape, 1))
+
+        all_layers_targets = head.get_targets_all_layers(
+            *all_layers_preds, batch_gt_instances, img_metas)
+        self.assertEqual(len(all_layers_targets), num_layers)
+        for i, layer_targets in enumerate(all_layers_targets):
+            expected = head.get_targets(
+                *[list(preds[i]) for preds in all_layers_preds],
+                batch_gt_instances, img_metas)
+            self.assertEqual(len(layer_targets), len(expected))
+            # the targets and weights of each image
+            for targets, expected_targets in zip(layer_targets[:-2],
+                                                 expected[:-2]):
+                self.assertEqual(len(targets), num_imgs)
+                for target, expected_target in zip(targets, expected_targets):
+                    self.assertTrue(torch.allclose(target, expected_target))
+            # num_total_pos and num_total_neg
+            self.assertEqual(layer_targets[-2:], expected[-2:])
+            self.assertGreater(layer_targets[-2], 0)
+        # the queries of the image without ground truth are negatives
+        labels = all_layers_targets[0][0][1]
+        self.assertTrue((labels == head.num_classes).all())
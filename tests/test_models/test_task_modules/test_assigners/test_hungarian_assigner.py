@@ -1,11 +1,13 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 from unittest import TestCase
+from unittest.mock import patch
 
 import torch
 from mmengine import ConfigDict
 from mmengine.structures import InstanceData
 
 from mmdet.models.task_modules.assigners import HungarianAssigner
+from mmdet.registry import TASK_UTILS
 
 
 class TestHungarianAssigner(TestCase):
@@ -146,3 +148,103 @@ class TestHungarianAssigner(TestCase):
                          gt_instances.masks.size(0))
         self.assertEqual((assign_result.labels > -1).sum(),
                          gt_instances.masks.size(0))
+
+    def test_assign_batch(self):
+        match_costs = [
+            dict(type='FocalLossCost', weight=2.),
+            dict(type='BBoxL1Cost', weight=5.0),
+            dict(type='IoUCost', iou_mode='giou', weight=2.0)
+        ]
+        img_meta = dict(img_shape=(10, 8))
+        batch_pred_instances, batch_gt_instances = [], []
+        for num_gts in (2, 0, 3, 1):
+            gt_instances = InstanceData()
+            xy = torch.rand((num_gts, 2)) * 4
+            gt_instances.bboxes = torch.cat(
+                [xy, xy + torch.rand((num_gts, 2)) * 4 + 1], dim=1)
+            gt_instances.labels = torch.randint(0, 81, (num_gts, ))
+            pred_instances = InstanceData()
+            pred_instances.scores = torch.rand((10, 81))
+            pred_instances.bboxes = torch.rand((10, 4)) * 8
+            batch_pred_instances.append(pred_instances)
+            batch_gt_instances.append(gt_instances)
+
+        # a second layer sharing the ground truths of the images
+        for gt_instances in batch_gt_instances[:]:
+            pred_instances = InstanceData()
+            pred_instances.scores = torch.rand((10, 81))
+            pred_instances.bboxes = torch.rand((10, 4)) * 8
+            batch_pred_instances.append(pred_instances)
+            batch_gt_instances.append(gt_instances)
+
+        for num_workers in (0, 2):
+            assigner = HungarianAssigner(match_costs, num_workers=num_workers)
+            with patch.object(
+                    assigner, 'get_cost', wraps=assigner.get_cost) as get_cost:
+                assign_results = assigner.assign_batch(
+                    batch_pred_instances, batch_gt_instances,
+                    [img_meta] * len(batch_gt_instances))
+            # one call per image with ground truths, for both layers
+            self.assertEqual(get_cost.call_count, 3)
+            self.assertEqual(len(assign_results), len(batch_gt_instances))
+            for assign_result, pred_instances, gt_instances in zip(
+                    assign_results, batch_pred_instances, batch_gt_instances):
+                expected = assigner.assign(
+                    pred_instances, gt_instances, img_meta=img_meta)
+                self.assertEqual(assign_result.num_gts, len(gt_instances))
+                self.assertTrue(
+                    torch.equal(assign_result.gt_inds, expected.gt_inds))
+                self.assertTrue(
+                    torch.equal(assign_result.labels, expected.labels))
+
+    def test_pose_match_cost(self):
+        rots = torch.linalg.qr(torch.randn(3, 3, 3))[0]
+        rots = rots * torch.det(rots)[:, None, None]
+        gt_instances = InstanceData()
+        gt_instances.labels = torch.LongTensor([0, 2, 5])
+        gt_instances.rots_norm = rots.flatten(1)
+        gt_instances.poses = torch.rand((3, 3))
+        gt_instances.sizes = torch.rand((3, 3))
+        pred_instances = InstanceData()
+        pred_instances.rots = torch.cat([rots[[2, 0]],
+                                         torch.eye(3)[None] * 2]).flatten(1)
+        pred_instances.poses = gt_instances.poses[[2, 0, 1]]
+        pred_instances.sizes = gt_instances.sizes[[2, 0, 1]]
+
+        # test RotationCost, scaled rotations are normalized
+        cost = TASK_UTILS.build(dict(type='RotationCost'))(pred_instances,
+                                                           gt_instances)
+        self.assertEqual(cost.shape, (3, 3))
+        self.assertAlmostEqual(cost[0, 2].item(), 0, delta=1e-3)
+        self.assertAlmostEqual(cost[1, 0].item(), 0, delta=1e-3)
+        traces = rots.diagonal(dim1=1, dim2=2).sum(1)
+        expected = torch.acos(((traces - 1) / 2).clamp(-1, 1))
+        self.assertTrue(torch.allclose(cost[2], expected, atol=1e-3))
+
+        # a rotation around the y axis costs nothing for symmetric classes
+        angle = torch.tensor(1.)
+        rot_y = torch.tensor([[angle.cos(), 0, angle.sin()], [0, 1, 0],
+                              [-angle.sin(), 0, angle.cos()]])
+        pred_instances.rots = (rots @ rot_y).flatten(1)
+        sym_cost = TASK_UTILS.build(
+            dict(type='RotationCost', sym_labels=(0, 1, 3)))(pred_instances,
+                                                             gt_instances)
+        self.assertAlmostEqual(sym_cost[0, 0].item(), 0, delta=1e-3)
+        self.assertAlmostEqual(sym_cost[1, 1].item(), 1, delta=1e-3)
+
+        # test TranslationCost and Size3DCost
+        for cfg in (dict(type='TranslationCost'), dict(type='Size3DCost')):
+            cost = TASK_UTILS.build(cfg)(pred_instances, gt_instances)
+            self.assertEqual(cost.shape, (3, 3))
+            self.assertTrue(
+                torch.allclose(cost[[0, 1, 2], [2, 0, 1]], torch.zeros(3)))
+
+        assigner = HungarianAssigner([
+            dict(type='RotationCost'),
+            dict(type='TranslationCost', weight=2.0),
+            dict(type='Size3DCost')
+        ])
+        pred_instances.rots = rots[[2, 0, 1]].flatten(1)
+        assign_result = assigner.assign(pred_instances, gt_instances)
+        self.assertTrue(
+            torch.equal(assign_result.gt_inds, torch.LongTensor([3, 1, 2])))
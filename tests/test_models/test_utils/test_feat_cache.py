@@ -0,0 +1,57 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import tempfile
+
+import pytest
+import torch
+from torch import nn
+
+from mmdet.models.utils import FeatureCache
+from mmdet.structures import DetDataSample
+
+
+def _data_samples(img_ids):
+    return [
+        DetDataSample(
+            metainfo=dict(
+                img_id=img_id,
+                img_path=f'{img_id}.png',
+                img_shape=(8, 8),
+                batch_input_shape=(8, 8))) for img_id in img_ids
+    ]
+
+
+def test_feature_cache():
+    backbone = nn.Conv2d(3, 4, 3, padding=1)
+    num_calls = [0]
+
+    def forward(x):
+        num_calls[0] += 1
+        return backbone(x), backbone(x)[..., ::2, ::2]
+
+    inputs = torch.rand(2, 3, 8, 8)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = FeatureCache(tmp_dir, backbone=dict(type='Conv2d'))
+        # trainable modules can not be cached
+        with pytest.raises(AssertionError):
+            cache([backbone], forward, inputs, _data_samples([1, 2]))
+        backbone.requires_grad_(False)
+
+        feats = cache([backbone], forward, inputs, _data_samples([1, 2]))
+        assert num_calls[0] == 1
+        cached = cache([backbone], forward, inputs, _data_samples([1, 2]))
+        assert num_calls[0] == 1
+        for feat, cached_feat in zip(feats, cached):
+            assert torch.allclose(feat, cached_feat)
+
+        # the batch is computed again when any image misses
+        cache([backbone], forward, inputs, _data_samples([2, 3]))
+        assert num_calls[0] == 2
+        cached = cache([backbone], forward, inputs[[1, 0]],
+                       _data_samples([3, 1]))
+        assert num_calls[0] == 2
+        assert torch.allclose(cached[0][1], feats[0][0])
+
+        # another backbone has its own namespace
+        other = FeatureCache(tmp_dir, backbone=dict(type='Conv3d'))
+        other([backbone], forward, inputs, _data_samples([1, 2]))
+        assert num_calls[0] == 3
@@ -4,9 +4,11 @@ import pytest
 import torch
 from mmengine.structures import InstanceData
 
-from mmdet.models.utils import (empty_instances, filter_gt_instances,
-                                rename_loss_dict, reweight_loss_dict,
+from mmdet.models.utils import (batched_detr_predictions, empty_instances,
+                                filter_gt_instances, rename_loss_dict,
+                                reweight_loss_dict, unbatch_instances,
                                 unpack_gt_instances)
+from mmdet.structures.bbox import bbox_cxcywh_to_xyxy
 from mmdet.testing import demo_mm_inputs
 
 
@@ -108,3 +110,51 @@ def test_reweight_loss_dict():
     weighted_losses = reweight_loss_dict(copy.deepcopy(losses), weight)
     for name in losses.keys():
         assert weighted_losses[name] == losses[name] * weight
+
+
+@pytest.mark.parametrize('use_sigmoid', [True, False])
+def test_batched_detr_predictions(use_sigmoid):
+    num_classes, num_queries, max_per_img = 3, 10, 5
+    batch_img_metas = [
+        dict(img_shape=(40, 60), scale_factor=(1.5, 2.0)),
+        dict(img_shape=(50, 30), scale_factor=(0.5, 0.5))
+    ]
+    cls_scores = torch.randn(2, num_queries, num_classes + (not use_sigmoid))
+    bbox_preds = torch.rand(2, num_queries, 4)
+    rots = torch.randn(2, num_queries, 9)
+
+    results = batched_detr_predictions(
+        cls_scores,
+        bbox_preds,
+        batch_img_metas,
+        num_classes,
+        use_sigmoid,
+        max_per_img,
+        rots=rots)
+    results_list = unbatch_instances(**results)
+    assert len(results_list) == 2
+
+    for i, img_meta in enumerate(batch_img_metas):
+        # the per image post process of the DETR heads
+        if use_sigmoid:
+            scores, indexes = cls_scores[i].sigmoid().view(-1).topk(
+                max_per_img)
+            labels = indexes % num_classes
+            bbox_index = indexes // num_classes
+        else:
+            scores, labels = cls_scores[i].softmax(-1)[..., :-1].max(-1)
+            scores, bbox_index = scores.topk(max_per_img)
+            labels = labels[bbox_index]
+        bboxes = bbox_cxcywh_to_xyxy(bbox_preds[i][bbox_index])
+        img_h, img_w = img_meta['img_shape']
+        bboxes[:, 0::2] = (bboxes[:, 0::2] * img_w).clamp(min=0, max=img_w)
+        bboxes[:, 1::2] = (bboxes[:, 1::2] * img_h).clamp(min=0, max=img_h)
+        bboxes /= bboxes.new_tensor(img_meta['scale_factor']).repeat((1, 2))
+
+        assert set(results_list[i].keys()) == {
+            'scores', 'labels', 'bboxes', 'rots'
+        }
+        assert torch.equal(results_list[i].scores, scores)
+        assert torch.equal(results_list[i].labels, labels)
+        assert torch.allclose(results_list[i].bboxes, bboxes)
+        assert torch.equal(results_list[i].rots, rots[i][bbox_index])
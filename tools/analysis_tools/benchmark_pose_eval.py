@@ -0,0 +1,277 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+"""Benchmark of the category-level pose evaluation.
+
+Times ``compute_mAP_nocs``, ``compute_mAP_wild6d`` and the CPPF
+``compute_degree_cm_mAP`` on synthetic workloads or on dumped
+``pred_results.pkl`` files, breaks each evaluation down into its stages
+(3D IoU matrices, IoU matching, RT errors, RT matching, AP integration) with
+the ``StageTimer`` hook of the evaluation functions, and reports the peak
+memory of each run. The peak memory is traced in the main process only, so
+it is not reported for the runs matching images in ``--num-workers``
+processes.
+
+Example:
+    python tools/analysis_tools/benchmark_pose_eval.py \
+        --num-images 500 --num-dets 5 10 20 --grid nocs
+"""
+import argparse
+import os.path as osp
+import tempfile
+import time
+import tracemalloc
+
+import mmengine
+import numpy as np
+
+from mmdet.evaluation.functional import (compute_degree_cm_mAP,
+                                         compute_mAP_nocs, compute_mAP_wild6d)
+from mmdet.evaluation.functional.pose_eval import (NOCS_SYNSETS, StageTimer,
+                                                   get_symmetry_flags)
+
+THRESHOLD_GRIDS = {
+    # thresholds of CocoMetricNOCS
+    'nocs': (list(range(0, 61, 1)), [i / 2 for i in range(21)],
+             [i / 100 for i in range(101)]),
+    'coarse': ([5, 10], [2, 5], [0.1, 0.25, 0.5]),
+}
+EVALUATORS = ('nocs', 'wild6d', 'cppf')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Benchmark of the pose mAP evaluation')
+    parser.add_argument(
+        '--pkl',
+        nargs='+',
+        help='pred_results pickles to replay, synthetic workloads are '
+        'generated if not specified. Labels must index NOCS_SYNSETS - 1, as '
+        'dumped by CocoMetricNOCS')
+    parser.add_argument(
+        '--num-images', type=int, default=200, help='synthetic images')
+    parser.add_argument(
+        '--num-dets',
+        type=int,
+        nargs='+',
+        default=[10],
+        help='detections per synthetic image, one workload each')
+    parser.add_argument(
+        '--num-gts', type=int, default=5, help='gts per synthetic image')
+    parser.add_argument(
+        '--grid',
+        choices=list(THRESHOLD_GRIDS),
+        default='nocs',
+        help='threshold grid')
+    parser.add_argument(
+        '--evaluators',
+        nargs='+',
+        choices=EVALUATORS,
+        default=list(EVALUATORS),
+        help='evaluation routines to time')
+    parser.add_argument(
+        '--num-workers',
+        type=int,
+        default=0,
+        help='processes of compute_mAP_nocs and compute_mAP_wild6d')
+    parser.add_argument(
+        '--repeat-num', type=int, default=1, help='runs to average')
+    parser.add_argument(
+        '--no-memory',
+        action='store_true',
+        help='skip the extra run measuring the peak memory')
+    parser.add_argument('--seed', type=int, default=0, help='random seed')
+    parser.add_argument('--out', help='dump the results to a json file')
+    return parser.parse_args()
+
+
+def _random_rotations(num, rng):
+    q, r = np.linalg.qr(rng.normal(size=(num, 3, 3)))
+    q = q * np.sign(np.diagonal(r, axis1=1, axis2=2))[:, None]
+    q[np.linalg.det(q) < 0, :, 0] *= -1
+    return q
+
+
+def _small_rotations(num, degree, rng):
+    axis = rng.normal(size=(num, 3))
+    axis /= np.linalg.norm(axis, axis=1, keepdims=True)
+    angle = np.deg2rad(rng.normal(scale=degree, size=num))
+    K = np.zeros((num, 3, 3))
+    K[:, 0, 1], K[:, 0, 2], K[:, 1, 2] = -axis[:, 2], axis[:, 1], -axis[:, 0]
+    K = K - K.transpose(0, 2, 1)
+    sin, cos = np.sin(angle)[:, None, None], np.cos(angle)[:, None, None]
+    return np.eye(3) + sin * K + (1 - cos) * K @ K
+
+
+def generate_pred_results(num_images, num_dets, num_gts, seed=0):
+    """Synthetic NOCS-style pred_results.
+
+    Each image has ``num_gts`` objects of random classes and ``num_dets``
+    detections: noisy copies of the gts, then random false positives.
+    """
+    rng = np.random.default_rng(seed)
+    num_classes = len(NOCS_SYNSETS) - 1
+    pred_results = []
+    for _ in range(num_images):
+        scales = rng.uniform(0.1, 0.4, size=num_gts)
+        gt_RTs = np.tile(np.eye(4), (num_gts, 1, 1))
+        gt_RTs[:, :3, :3] = _random_rotations(num_gts, rng) * \
+            scales[:, None, None]
+        gt_RTs[:, :3, 3] = rng.normal(scale=0.3, size=(num_gts, 3)) + [0, 0, 1]
+        gt_class_ids = rng.integers(num_classes, size=num_gts)
+        gt_scales = rng.uniform(0.5, 1.5, size=(num_gts, 3))
+
+        src = np.arange(num_dets) % max(num_gts, 1)
+        pred_RTs = gt_RTs[src].copy() if num_gts else np.tile(
+            np.eye(4), (num_dets, 1, 1))
+        pred_RTs[:, :3, :3] = _small_rotations(num_dets, 5, rng) @ \
+            pred_RTs[:, :3, :3]
+        pred_RTs[:, :3, 3] += rng.normal(scale=0.02, size=(num_dets, 3))
+        pred_class_ids = gt_class_ids[src].copy() if num_gts else \
+            rng.integers(num_classes, size=num_dets)
+        pred_scales = gt_scales[src] * rng.uniform(
+            0.9, 1.1, size=(num_dets, 3)) if num_gts else rng.uniform(
+                0.5, 1.5, size=(num_dets, 3))
+        false_positives = np.arange(num_dets) >= num_gts
+        num_fp = int(false_positives.sum())
+        pred_RTs[false_positives, :3, 3] = rng.normal(
+            scale=0.3, size=(num_fp, 3)) + [0, 0, 1]
+        pred_class_ids[false_positives] = rng.integers(
+            num_classes, size=num_fp)
+
+        pred_results.append(
+            dict(
+                gt_class_ids=gt_class_ids.astype(np.int32),
+                gt_bboxes=np.zeros((num_gts, 4), dtype=np.int32),
+                gt_RTs=gt_RTs.astype(np.float32),
+                gt_scales=gt_scales.astype(np.float32),
+                gt_handle_visibility=rng.integers(2, size=num_gts),
+                pred_class_ids=pred_class_ids.astype(np.int32),
+                pred_bboxes=np.zeros((num_dets, 4), dtype=np.int32),
+                pred_scores=rng.uniform(size=num_dets).astype(np.float32),
+                pred_RTs=pred_RTs.astype(np.float32),
+                pred_scales=pred_scales.astype(np.float32)))
+    return pred_results
+
+
+def to_synset_labels(pred_results):
+    """Labels indexing NOCS_SYNSETS, as expected by wild6d and cppf, with the
+    up-axis symmetry flags of cppf."""
+    converted = []
+    for result in pred_results:
+        if 'gt_class_ids' not in result:
+            converted.append(result)
+            continue
+        result = dict(result)
+        result['gt_class_ids'] = result['gt_class_ids'] + 1
+        result['pred_class_ids'] = result['pred_class_ids'] + 1
+        result['gt_up_syms'] = get_symmetry_flags(
+            result['gt_class_ids'], result['gt_handle_visibility'],
+            NOCS_SYNSETS)
+        converted.append(result)
+    return converted
+
+
+def run_evaluator(name, pred_results, grid, num_workers, work_dir, timer=None):
+    degree_thres_list, shift_thres_list, iou_thres_list = grid
+    kwargs = dict(
+        degree_thresholds=degree_thres_list,
+        shift_thresholds=shift_thres_list,
+        iou_3d_thresholds=iou_thres_list,
+        iou_pose_thres=0.1,
+        use_matches_for_pose=True,
+        timer=timer)
+    if name == 'nocs':
+        compute_mAP_nocs(pred_results, None, num_workers=num_workers, **kwargs)
+    elif name == 'wild6d':
+        compute_mAP_wild6d(
+            pred_results,
+            None,
+            select_class='all',
+            num_workers=num_workers,
+            **kwargs)
+    else:
+        compute_degree_cm_mAP(
+            pred_results,
+            NOCS_SYNSETS,
+            osp.join(work_dir, 'cppf'),
+            num_workers=num_workers,
+            **kwargs)
+
+
+def profile_stages(name, pred_results, grid, work_dir):
+    """Seconds spent in each stage of an evaluation, timed in the main
+    process by a StageTimer."""
+    timer = StageTimer()
+    run_evaluator(name, pred_results, grid, 0, work_dir, timer=timer)
+    return dict(timer.times)
+
+
+def measure(func, repeat_num, memory=True):
+    """Mean wall time of ``func`` over ``repeat_num`` runs, and the peak
+    memory traced during one extra run (numpy buffers included).
+
+    tracemalloc only traces the calling process, pass ``memory=False`` when
+    ``func`` does its work in other processes.
+    """
+    times = []
+    for _ in range(repeat_num):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    result = dict(time=float(np.mean(times)))
+    if memory:
+        tracemalloc.start()
+        func()
+        result['peak_memory_mb'] = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return result
+
+
+def main():
+    args = parse_args()
+    grid = THRESHOLD_GRIDS[args.grid]
+    if args.pkl:
+        workloads = [(osp.basename(pkl), mmengine.load(pkl))
+                     for pkl in args.pkl]
+    else:
+        workloads = [(f'synthetic_{args.num_images}x{num_dets}dets',
+                      generate_pred_results(args.num_images, num_dets,
+                                            args.num_gts, args.seed))
+                     for num_dets in args.num_dets]
+
+    print(f'threshold grid {args.grid}: {len(grid[0])} degree x '
+          f'{len(grid[1])} shift x {len(grid[2])} IoU thresholds')
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        for workload, pred_results in workloads:
+            synset_results = to_synset_labels(pred_results)
+            num_dets = sum(
+                len(result.get('pred_class_ids', []))
+                for result in pred_results)
+            print(f'\n{workload}: {len(pred_results)} images, '
+                  f'{num_dets} detections')
+            results[workload] = {}
+            for name in args.evaluators:
+                inputs = pred_results if name == 'nocs' else synset_results
+                in_main_process = args.num_workers <= 1
+                result = measure(
+                    lambda: run_evaluator(name, inputs, grid, args.num_workers,
+                                          work_dir),
+                    args.repeat_num,
+                    memory=in_main_process and not args.no_memory)
+                result['stages'] = profile_stages(name, inputs, grid, work_dir)
+                results[workload][name] = result
+                msg = f'  {name}: {result["time"]:.3f}s'
+                if 'peak_memory_mb' in result:
+                    msg += f', peak memory {result["peak_memory_mb"]:.1f}MB'
+                elif not args.no_memory:
+                    msg += ', peak memory n/a (matched in worker processes)'
+                print(msg)
+                stages = ', '.join(f'{stage} {t:.3f}s'
+                                   for stage, t in result['stages'].items())
+                print(f'    stages: {stages}')
+    if args.out:
+        mmengine.dump(results, args.out)
+
+
+if __name__ == '__main__':
+    main()
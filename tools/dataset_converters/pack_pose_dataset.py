@@ -0,0 +1,45 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import argparse
+
+from mmdet.datasets.packed_pose import pack_pose_dataset
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Pack the images and the pose annotations of a COCO '
+        'style dataset into shards read by PackedPoseDataset')
+    parser.add_argument('ann_file', help='The annotation file')
+    parser.add_argument(
+        'img_root', help='The directory the file names of the images are '
+        'relative to')
+    parser.add_argument('out_dir', help='The output directory')
+    parser.add_argument(
+        '--shard-size',
+        type=int,
+        default=1024,
+        help='The size of the shards in MiB')
+    parser.add_argument(
+        '--extra-keys',
+        type=str,
+        nargs='+',
+        default=[],
+        help='Additional annotation fields to pack, such as "bbox_3d" and '
+        '"bbox_3d_conner" for PhoCaL')
+    args = parser.parse_args()
+    return args
+
+
+def main():
+    args = parse_args()
+    num_shards = pack_pose_dataset(
+        args.ann_file,
+        args.img_root,
+        args.out_dir,
+        shard_bytes=args.shard_size << 20,
+        extra_keys=args.extra_keys)
+    print(f'packed {args.ann_file} into {num_shards} shards in '
+          f'{args.out_dir}')
+
+
+if __name__ == '__main__':
+    main()